@@ -9,7 +9,9 @@ from debugcolor import co
 import time
 import board
 import busio
+import struct
 import traceback
+from micropython import const
 import adafruit_mcp9808     #temperature sensor
 import adafruit_tca9548a    #I2C multiplexer
 import adafruit_veml7700    #light sensor
@@ -19,6 +21,70 @@ import adafruit_drv2605     #Coil motor driver
 import adafruit_ads1x15.ads1015 as ADS
 from adafruit_ads1x15.analog_in import AnalogIn
 
+#FaceSample slot layout: FACE_FIELDS float slots per face, indexed by face address
+TEMP        = const(0)
+LUX         = const(1)
+COUPLE      = const(2)
+FACE_FIELDS = const(3)
+NUM_FACES   = const(5)
+Z_MINUS     = const(4) #address of the z- face, the only one with a thermocouple
+_VALUES     = const(6) #byte offset of the first float slot in a FaceSample record
+
+class FaceSample:
+    '''
+    One poll of every face packed into a single preallocated record:
+        uint32 time | uint16 valid bitmask | NUM_FACES*FACE_FIELDS float32
+    Bit n of the mask is set when slot n holds a real reading, so a missing
+    sensor costs nothing but a cleared bit. Call stamp() once the poll is
+    done; the record bytearray can then be written straight to a log file
+    or copied into a telemetry frame.
+    '''
+    FORMAT = '<IH' + str(NUM_FACES*FACE_FIELDS) + 'f'
+    SIZE   = struct.calcsize(FORMAT)
+
+    def __init__(self):
+        self.record = bytearray(self.SIZE)
+        self.valid = 0
+        self.time = 0
+
+    def clear(self):
+        self.valid = 0
+        struct.pack_into('<IH', self.record, 0, self.time, 0)
+
+    def stamp(self, t=None):
+        if t is None:
+            t = int(time.monotonic())
+        self.time = t
+        struct.pack_into('<IH', self.record, 0, t, self.valid)
+
+    def set(self, face, field, value):
+        slot = face*FACE_FIELDS + field
+        struct.pack_into('<f', self.record, _VALUES + 4*slot, value)
+        self.valid |= 1 << slot
+
+    def get(self, face, field):
+        slot = face*FACE_FIELDS + field
+        if self.valid & (1 << slot):
+            return struct.unpack_from('<f', self.record, _VALUES + 4*slot)[0]
+        return None
+
+    def pack_into(self, buf, offset=0):
+        buf[offset:offset+self.SIZE] = self.record
+        return offset + self.SIZE
+
+    def load(self, buf, offset=0):
+        self.record[:] = buf[offset:offset+self.SIZE]
+        self.time, self.valid = struct.unpack_from('<IH', self.record, 0)
+
+    def as_lists(self):
+        #Legacy Face_Test_All layout: [temp, lux] per face, z- adds the thermocouple
+        out = []
+        for face in range(NUM_FACES):
+            data = [self.get(face,TEMP), self.get(face,LUX)]
+            if face == Z_MINUS:
+                data.append(self.get(face,COUPLE))
+            out.append(data)
+        return out
 
 class Face:
 
@@ -31,6 +97,7 @@ class Face:
         self.address = Add
         self.position = Pos
         self.debug= debug_state
+        self.lux_enabled = True #cleared during eclipse to skip the light sensor
 
         #Sensor List Contains Expected Sensors Based on Face
         self.senlist = []
@@ -143,15 +210,25 @@ class Face:
 
 
     def drv_actuate(self, duration): 
+        if self.drv_play():
+            time.sleep(duration)
+            self.drv_stop()
+
+    #Non-blocking halves of drv_actuate so several coils can be held at once
+    def drv_play(self):
         if self.sensors['DRV']:
             self.debug_print('Actuating Sequence')
             self.debug_print("Playing effect #{0}".format(self.drv))
             self.drv.play()
-            time.sleep(duration)
-            self.drv.stop()
-            self.debug_print('Actuation Complete')
+            return True
         else: 
             self.debug_print('[WARNING]Motor driver not initialized')
+            return False
+
+    def drv_stop(self):
+        if self.sensors['DRV']:
+            self.drv.stop()
+            self.debug_print('Actuation Complete')
 
     @property #driver sequence Getter 
     def drive(self): 
@@ -184,77 +261,55 @@ class Face:
 
 
 
+    #Reads every sensor on this face exactly once into its slots of a FaceSample
+    def read_into(self, sample):
+        face = self.address
+        if self.sensors['MCP']:
+            try:
+                t = self.mcp.temperature
+                sample.set(face,TEMP,t)
+                if self.debug:
+                    self.debug_print('Face Temperature: {}C'.format(t))
+            except Exception as e:
+                self.debug_print('[ERROR][Temperature Sensor]' + ''.join(traceback.format_exception(e)))
+        if self.sensors['VEML'] and self.lux_enabled:
+            try:
+                l = self.veml.lux
+                sample.set(face,LUX,l)
+                if self.debug:
+                    self.debug_print('Face light: {}Lumens/Sq.ft'.format(l))
+            except Exception as e:
+                self.debug_print('[ERROR][Light Sensor]' + ''.join(traceback.format_exception(e)))
+        if self.sensors['COUPLE']:
+            try:
+                c = self.couple_data
+                sample.set(face,COUPLE,c)
+                if self.debug:
+                    self.debug_print('Battery Thermocouple: {}C'.format(c))
+            except Exception as e:
+                self.debug_print('[ERROR][Thermocouple]' + ''.join(traceback.format_exception(e)))
+        return sample
+
     #Function to test all sensors that should be on each face. 
     #Function takes number of tests "num" and polling rate in hz "rate"
     def test_all(self, num, rate): 
         self.datalist=[]
         self.debug_print('Expected Sensors: ' + str(self.senlist_what))
         self.debug_print('Initialized Sensors: ' + str(self.active_sensors))
-        #time.sleep(1) #Remove later for performance boost! 
         self.debug_print('Initializing Test')
+        sample = FaceSample()
 
         for i in range(num): 
-
             self.debug_print('Test Number: {}/{}'.format(i+1,num))
-
-            #Test Temperature Sensor
-            self.debug_print('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
-            if ("MCP" in self.senlist) and (self.sensors.get("MCP") == True):
-                try:
-                    self.debug_print('Temperature Sensor')
-                    self.debug_print('Face Temperature: {}C'.format(self.temperature))
-                    self.datalist.append(self.temperature)
-                except Exception as e:
-                    self.debug_print('[ERROR][Temperature Sensor]' + ''.join(traceback.format_exception(e)))
-            else:
-                self.debug_print('[ERROR]Temperature Sensor Failure')
-                self.datalist.append(None)
-                
-            self.debug_print('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
-            #Test Light Sensor
-            if ("VEML" in self.senlist) and (self.sensors.get('VEML') == True ):
-                try:
-                    self.debug_print('Light Sensor')
-                    self.debug_print('Face light: {}Lumens/Sq.ft'.format(self.lux_data))
-                    self.datalist.append(self.lux_data)
-                    self.lumen.append(self.lux_data)
-                except Exception as e: 
-                    self.debug_print('[ERROR][Light Sensor]' + ''.join(traceback.format_exception(e)))
-            else:
-                self.debug_print('[ERROR]Light Sensor Failure')
-                self.datalist.append(None)
-                
-            self.debug_print('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
-      
-            #Test Motor Driver
-            if ("DRV" in self.senlist) and (self.sensors.get('DRV') == True ):
-                try:
-                    self.debug_print('Motor Driver')
-                    self.debug_print('[ACTIVE][Motor Driver]') #No function defined here yet to use the driver
-                except Exception as e:
-                    self.debug_print('[ERROR][Motor Driver]' + ''.join(traceback.format_exception(e)))
-                self.debug_print('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~') 
-            else:
-                pass
-
-            #Test Thermocouple
-            if ("COUPLE" in self.senlist) and (self.sensors.get('COUPLE') == True ):
-                try:
-                    self.debug_print('Thermocouple')
-                    self.debug_print('Battery Thermocouple: {}C'.format(self.couple_data)) #Unformatted
-                    self.datalist.append(self.couple_data)
-                except Exception as e:
-                    self.debug_print('[ERROR][Thermocouple]' + ''.join(traceback.format_exception(e)))
-                self.debug_print('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~') 
-            elif self.position == "z-":
-                self.debug_print('[ERROR]Thermocouple Failure')
-                self.datalist.append(None)
-            else:
-                pass
-
+            sample.clear()
+            self.read_into(sample)
+            self.datalist.append(sample.get(self.address,TEMP))
+            self.datalist.append(sample.get(self.address,LUX))
+            if self.position == "z-":
+                self.datalist.append(sample.get(self.address,COUPLE))
             self.debug_print('=======================================')
-            #time.sleep(rate) #Remove later for performance boost! 
         return self.datalist
+
     def __del__(self):
         self.debug_print("Object Destroyed!")
 
@@ -263,19 +318,23 @@ class AllFaces:
         if self.debug:
             print(co("[BIG_DATA]"+statement,"teal","bold")) 
     def __init__(self,debug,tca):
-        lumen = []
         self.tca=tca
+        if hasattr(self.tca,'invalidate'):
+            #Faces may have been power cycled since the last poll, re-select on first use
+            self.tca.invalidate()
         # Create the TCA9548A object and give it the I2C1 bus
         self.debug = debug
         self.debug_print("Creating Face Objects...")
         self.BigFaceList=[]
-        self.Face4 = Face(4,"z-",self.debug,self.tca)
+        self.Face4 = Face(Z_MINUS,"z-",self.debug,self.tca)
         self.Face3 = Face(3,"x-",self.debug,self.tca)
         self.Face2 = Face(2,"x+",self.debug,self.tca)
         self.Face1 = Face(1,"y-",self.debug,self.tca)
         self.Face0 = Face(0,"y+",self.debug,self.tca)
         self.debug_print("Done!")
-        print(lumen)
+        self.Faces = (self.Face0,self.Face1,self.Face2,self.Face3,self.Face4)
+        #(mux channel, reader) pairs sorted by channel for the TCA scheduler
+        self._jobs = [(face.address,face.read_into) for face in self.Faces]
 
         #Initialize All Faces 
         try:
@@ -342,16 +401,33 @@ class AllFaces:
         except Exception as e:
             self.debug_print('Driver Test error: ' + ''.join(traceback.format_exception(e)))
 
+    #Polls every sensor on every face once into a (reusable) FaceSample record
+    #lux=False skips the light sensors, e.g. in eclipse
+    def Face_Sample(self, sample=None, lux=True):
+        if sample is None:
+            sample = FaceSample()
+        sample.clear()
+        for face in self.Faces:
+            face.lux_enabled = lux
+        if hasattr(self.tca,'run'):
+            #Group reads per mux channel so each face costs a single channel select
+            try:
+                self.tca.run(self._jobs,sample)
+            except Exception as e:
+                self.debug_print('Face sample error:' + ''.join(traceback.format_exception(e)))
+        else:
+            for face in self.Faces:
+                try:
+                    face.read_into(sample)
+                except Exception as e:
+                    self.debug_print('Face sample error:' + ''.join(traceback.format_exception(e)))
+        sample.stamp()
+        return sample
+
     #Function that polls all of the sensors on all of the faces one time and prints the results. 
-    def Face_Test_All(self):
+    def Face_Test_All(self, sample=None, lux=True):
         try:
-            self.BigFaceList=[]
-            self.debug_print("Creating Face List")
-            self.BigFaceList.append(self.Face0.test_all(1,.1))
-            self.BigFaceList.append(self.Face1.test_all(1,.1))
-            self.BigFaceList.append(self.Face2.test_all(1,.1))
-            self.BigFaceList.append(self.Face3.test_all(1,.1))
-            self.BigFaceList.append(self.Face4.test_all(1,.1))
+            self.BigFaceList = self.Face_Sample(sample, lux).as_lists()
 
             for face in self.BigFaceList:
                 self.debug_print(str(face))
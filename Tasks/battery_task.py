@@ -8,8 +8,15 @@ class task(Task):
     name='vbatt'
     color = 'orange'
 
+    essential = True
+
     async def main_task(self):
-        vbatt=self.cubesat.battery_voltage
+        # the battery manager's last reading: no I2C reads of its own, nothing to block the loop
+        readings=self.cubesat.power_readings
+        vbatt=readings[0] if readings is not None else None
+        if vbatt is None:
+            self.debug('no battery reading')
+            return
         comp_var = ''
 
         if vbatt > self.cubesat.vlowbatt:
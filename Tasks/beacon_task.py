@@ -1,6 +1,7 @@
 # Transmit "Hello World" beacon
 
 from Tasks.template_task import Task
+import time
 
 ANTENNA_ATTACHED = False
 
@@ -10,6 +11,10 @@ class task(Task):
     name='beacon'
     color = 'teal'
 
+    current = 30 # mostly the 10s receive window; tx is ~120mA for <1s
+    duration = 11
+    essential = True
+
     schedule_later = True
 
     async def main_task(self):
@@ -31,7 +36,12 @@ class task(Task):
             self.cubesat.radio1.listen()
 
         self.debug("Listening 10s for response (non-blocking)")
-        heard_something = await self.cubesat.radio1.await_rx(timeout=10)
+        # Tasks run on tasko: poll with its sleep, radio1.await_rx sleeps on asyncio
+        heard_something = self.cubesat.radio1.rx_done()
+        _t = time.monotonic() + 10
+        while not heard_something and time.monotonic() < _t:
+            await self.cubesat.tasko.sleep(0.02)
+            heard_something = self.cubesat.radio1.rx_done()
 
         if heard_something:
             response = self.cubesat.radio1.receive(keep_listening=False)
@@ -8,6 +8,9 @@ class task(Task):
     name='blink'
     color = 'pink'
 
+    current = 10 # LED on every other run
+    duration = 0.25
+
     rgb_on = False
     async def main_task(self):
         if self.rgb_on:
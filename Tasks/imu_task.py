@@ -8,16 +8,20 @@ class task(Task):
     name='imu'
     color = 'green'
 
+    current = 5
+    duration = 0.05
+
     async def main_task(self):
         # take IMU readings
         readings = {
-            'accel':self.cubesat.acceleration,
-            'mag':  self.cubesat.magnetic,
-            'gyro': self.cubesat.gyro,
+            'accel':self.cubesat.IMU.Acceleration,
+            'mag':  self.cubesat.IMU.Magnetometer,
+            'gyro': self.cubesat.IMU.Gyroscope,
         }
 
-        # store them in our cubesat data_cache object
+        # store them in our cubesat data_cache object and the SD record log
         self.cubesat.data_cache.update({'imu':readings})
+        self.cubesat.imu_log(readings['accel'],readings['mag'],readings['gyro'])
 
         # print the readings with some fancy formatting
         self.debug('IMU readings (x,y,z)')
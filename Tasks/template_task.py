@@ -10,6 +10,14 @@ class Task:
         frequency:   Number of times the task must be executed in 1 second (Hz).
         name:        Name of the task object for future reference
         color:       Debug color for serial terminal
+
+    Energy declarations, used by energy_scheduler.EnergyScheduler:
+        current:        Estimated current drawn above the idle baseline while running (mA).
+        duration:       Estimated time each run keeps that current on (s).
+        min_power_mode: Lowest power mode the task may run in ('normal' or 'maximum'). The
+                        registry only runs in normal operations, so lower modes act like 'normal'.
+        min_frequency:  Slowest useful rate when stretched (Hz); None means frequency/10.
+        essential:      Runs at its frequency whatever the energy budget (mode permitting).
     """
 
     priority = 10
@@ -17,6 +25,12 @@ class Task:
     name = 'temp'
     color = 'gray'
 
+    current = 0
+    duration = 0
+    min_power_mode = 'normal'
+    min_frequency = None
+    essential = False
+
     def __init__(self, satellite):
         """
         Initialize the Task using the PyCubed cubesat object.
@@ -29,12 +43,15 @@ class Task:
 
     def debug(self,msg,level=1):
         """
-        Print a debug message formatted with the task name and color
+        Print a debug message formatted with the task name and color, when the
+        cubesat is in debug mode
 
         :param msg: Debug message to print
         :param level: > 1 will print as a sub-level
 
         """
+        if not self.cubesat.debug:
+            return
         if level==1:
             print('{:>30} {}'.format('['+co(msg=self.name,color=self.color)+']',msg))
         else:
@@ -0,0 +1,253 @@
+'''
+Quaternion attitude estimator for Yearling.
+Mahony explicit complementary filter: the gyro is integrated into the
+attitude quaternion and every vector observation (a body-frame measurement
+of a known reference direction) pulls the estimate toward agreement, with an
+integral term that tracks the gyro bias. Chosen over an MEKF because one
+update is a few dozen float operations and no covariance matrices, which
+keeps it cheap enough to run at a fixed rate on the RP2040.
+
+Observations:
+    magnetometer:  needs mag_ref, the field direction in the reference frame
+                   (from a field model or uplink). Unused until it is set
+    sun vector:    optional source with read(out) -> bool (sun sensor), needs sun_ref
+    accelerometer: gravity, only used when |a| is close to 1 g (ground testing).
+                   In orbit the accelerometer reads free fall and is ignored
+
+There is no field or sun model on board. With anchor=True the filter takes
+the sun reference from its first sun vector instead: the sun barely moves in
+inertial space (1 deg/day), so the body frame at that moment serves as an
+inertial frame and q is the rotation since. The field direction turns with
+the orbit (up to about 0.13 deg/s), so a magnetometer reading cannot be
+anchored the same way: the filter would follow the field around. Without any
+reference the filter only integrates the gyro and q drifts without bound;
+the telemetry R: field says which references are set (G: gyro only,
+M: magnetometer, S: sun).
+
+q is the body to reference rotation (w, x, y, z): v_ref = q v_body q*.
+rate is the bias-corrected body rate (rad/s). All state is preallocated.
+'''
+import time
+import asyncio
+import traceback
+from math import sqrt, acos
+from array import array
+import vector
+from debugcolor import co
+
+GRAVITY = 9.80665
+_DOWN = (0.0, 0.0, 1.0)     # specific force of a resting accelerometer, reference frame
+
+def quat_rotate_inv(q, v, out):
+    '''out = q* v q, a reference-frame vector expressed in the body frame'''
+    w = q[0]
+    x = q[1]
+    y = q[2]
+    z = q[3]
+    vx = v[0]
+    vy = v[1]
+    vz = v[2]
+    out[0] = (1 - 2*(y*y + z*z))*vx + 2*(x*y + w*z)*vy + 2*(x*z - w*y)*vz
+    out[1] = 2*(x*y - w*z)*vx + (1 - 2*(x*x + z*z))*vy + 2*(y*z + w*x)*vz
+    out[2] = 2*(x*z + w*y)*vx + 2*(y*z - w*x)*vy + (1 - 2*(x*x + y*y))*vz
+    return out
+
+def quat_rotate(q, v, out):
+    '''out = q v q*, a body-frame vector expressed in the reference frame'''
+    w = q[0]
+    x = q[1]
+    y = q[2]
+    z = q[3]
+    vx = v[0]
+    vy = v[1]
+    vz = v[2]
+    out[0] = (1 - 2*(y*y + z*z))*vx + 2*(x*y - w*z)*vy + 2*(x*z + w*y)*vz
+    out[1] = 2*(x*y + w*z)*vx + (1 - 2*(x*x + z*z))*vy + 2*(y*z - w*x)*vz
+    out[2] = 2*(x*z - w*y)*vx + 2*(y*z + w*x)*vy + (1 - 2*(x*x + y*y))*vz
+    return out
+
+def quat_angle(a, b):
+    '''Angle (rad) of the rotation between two unit quaternions'''
+    d = abs(a[0]*b[0] + a[1]*b[1] + a[2]*b[2] + a[3]*b[3])
+    return 2*acos(min(1.0, d))
+
+class Mahony:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[ATT]" + statement, 'white', 'bold'))
+
+    def __init__(self, kp=0.5, ki=0.02, rate=10, mag_ref=None, sun_ref=None, anchor=False, debug=False):
+        '''
+        kp:      proportional gain (rad/s per unit vector error)
+        ki:      integral gain for the gyro bias
+        rate:    update rate (Hz) for run()
+        mag_ref: reference-frame magnetic field direction
+        sun_ref: reference-frame sun direction
+        anchor:  take the sun reference from the first sun vector (see anchor())
+        '''
+        self.debug = debug
+        self.kp = kp
+        self.ki = ki
+        self.rate_hz = rate
+        self.q = array('f', [1.0, 0.0, 0.0, 0.0])
+        self.bias = vector.vec()
+        self.rate = vector.vec()
+        self.mag_ref = vector.vec()
+        self.sun_ref = vector.vec()
+        self.has_mag_ref = False
+        self.has_sun_ref = False
+        self.anchoring = anchor
+        self.set_reference(mag_ref, sun_ref)
+        self._e = vector.vec()
+        self._u = vector.vec()
+        self._v = vector.vec()
+        self._c = vector.vec()
+        self._w = vector.vec()
+        self._sun = vector.vec()
+        self.reset()
+
+    def reset(self):
+        '''Back to identity attitude, zero bias'''
+        self.q[0] = 1.0
+        self.q[1] = 0.0
+        self.q[2] = 0.0
+        self.q[3] = 0.0
+        vector.put(self.bias, 0.0, 0.0, 0.0)
+        vector.put(self.rate, 0.0, 0.0, 0.0)
+        vector.put(self._e, 0.0, 0.0, 0.0)
+        self.updates = 0
+        self.observations = 0
+        self.residual = 0.0
+        self._last_ns = None
+
+    def set_reference(self, mag_ref=None, sun_ref=None):
+        '''Sets the reference-frame directions. None leaves that one unchanged'''
+        if mag_ref is not None:
+            self.has_mag_ref = vector.normalize(mag_ref, self.mag_ref) > 0
+        if sun_ref is not None:
+            self.has_sun_ref = vector.normalize(sun_ref, self.sun_ref) > 0
+
+    def anchor(self, sun):
+        '''
+        Uses a body-frame sun vector, rotated by the current q, as the sun
+        reference, so it agrees with the estimate as it stands. Returns False
+        if the vector is zero
+        '''
+        if vector.normalize(sun, self._u) <= 0:
+            return False
+        quat_rotate(self.q, self._u, self.sun_ref)
+        self.has_sun_ref = True
+        return True
+
+    def observe(self, body, ref, weight=1.0):
+        '''
+        Adds one vector observation: body is the measured direction in the body
+        frame, ref the same direction in the reference frame (unit). Returns False
+        if the measurement is zero
+        '''
+        if vector.normalize(body, self._u) <= 0:
+            return False
+        quat_rotate_inv(self.q, ref, self._v)
+        vector.cross(self._u, self._v, self._c)
+        vector.axpy(weight, self._c, self._e, self._e)
+        self.residual += weight * vector.norm(self._c)
+        self.observations += 1
+        return True
+
+    def propagate(self, gyro, dt):
+        '''Applies the accumulated observation error and integrates gyro (rad/s) over dt (s)'''
+        e = self._e
+        if self.ki > 0:
+            vector.axpy(-self.ki * dt, e, self.bias, self.bias)
+        vector.sub(gyro, self.bias, self.rate)
+        vector.axpy(self.kp, e, self.rate, self._w)
+        w = self._w
+        q = self.q
+        h = 0.5 * dt
+        q0 = q[0]
+        q1 = q[1]
+        q2 = q[2]
+        q3 = q[3]
+        q[0] = q0 + h*(-q1*w[0] - q2*w[1] - q3*w[2])
+        q[1] = q1 + h*(q0*w[0] + q2*w[2] - q3*w[1])
+        q[2] = q2 + h*(q0*w[1] - q1*w[2] + q3*w[0])
+        q[3] = q3 + h*(q0*w[2] + q1*w[1] - q2*w[0])
+        n = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2] + q[3]*q[3])
+        if n > 0:
+            n = 1.0 / n
+            for i in range(4):
+                q[i] *= n
+        vector.put(e, 0.0, 0.0, 0.0)
+        self.updates += 1
+        return q
+
+    def update(self, gyro, dt, accel=None, mag=None, sun=None):
+        '''One filter step from raw IMU vectors. sun is a body-frame sun vector or None (eclipse)'''
+        self.residual = 0.0
+        self.observations = 0
+        if self.anchoring and sun is not None and not self.has_sun_ref:
+            self.anchor(sun)
+        if mag is not None and self.has_mag_ref:
+            self.observe(mag, self.mag_ref)
+        if sun is not None and self.has_sun_ref:
+            self.observe(sun, self.sun_ref)
+        if accel is not None and abs(vector.norm(accel) - GRAVITY) < 1.0:
+            self.observe(accel, _DOWN)
+        return self.propagate(gyro, dt)
+
+    @property
+    def references(self):
+        '''Which references the filter corrects against: M, S, MS, or G for gyro only'''
+        r = ('M' if self.has_mag_ref else '') + ('S' if self.has_sun_ref else '')
+        return r or 'G'
+
+    @property
+    def telemetry(self):
+        '''Attitude quaternion, body rate (deg/s), gyro bias (deg/s) and references for downlink'''
+        k = 57.29578
+        return "AT Q:{:.4f},{:.4f},{:.4f},{:.4f} W:{:.2f},{:.2f},{:.2f} B:{:.3f},{:.3f},{:.3f} N:{} R:{}".format(
+            self.q[0], self.q[1], self.q[2], self.q[3],
+            self.rate[0]*k, self.rate[1]*k, self.rate[2]*k,
+            self.bias[0]*k, self.bias[1]*k, self.bias[2]*k, self.updates, self.references)
+
+    def step(self, imu, sun=None):
+        '''Reads the payload IMU (and sun sensor) once and runs update(). Returns False without gyro data'''
+        reports = imu.snapshot()
+        gyro = reports.get("gyroscope")
+        if gyro is None:
+            return False
+        stamp = gyro[1]
+        if stamp is None:
+            stamp = time.monotonic_ns()
+        if self._last_ns is None or stamp <= self._last_ns:
+            self._last_ns = stamp
+            return False
+        dt = (stamp - self._last_ns) / 1e9
+        self._last_ns = stamp
+        accel = reports.get("acceleration")
+        mag = reports.get("magnetometer")
+        s = None
+        # without a sun reference (given or anchored) a sun vector has nothing to correct
+        if sun is not None and (self.has_sun_ref or self.anchoring) and sun.read(self._sun):
+            s = self._sun
+        self.update(gyro[0], dt, accel[0] if accel else None, mag[0] if mag else None, s)
+        return True
+
+    async def run(self, imu, sun=None, duration=None):
+        '''Runs step() at rate_hz until `duration` seconds have passed (forever when None)'''
+        period = 1.0 / self.rate_hz
+        start = time.monotonic()
+        next_t = start
+        while duration is None or time.monotonic() - start < duration:
+            try:
+                self.step(imu, sun)
+            except Exception as e:
+                self.debug_print("Estimator error: " + ''.join(traceback.format_exception(e)))
+            next_t += period
+            wait = next_t - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                next_t = time.monotonic()
+                await asyncio.sleep(0)
@@ -0,0 +1,134 @@
+'''
+B-dot detumble controller for Yearling.
+Commands a magnetic dipole opposing the rate of change of the body-frame
+magnetic field, m = -gain * dB/dt, which bleeds off angular rate without
+needing the gyro. Each control period is duty cycled:
+    measure: coils off, two magnetometer reads measure_dt apart -> dB/dt
+    actuate: coils on for up to actuate_time, scaled per axis by the dipole
+    idle:    wait for the next period so the loop runs at a fixed rate
+Dipoles are normalized to the coil maximum (1.0 = full on-time).
+'''
+import time
+import asyncio
+import traceback
+import vector
+from debugcolor import co
+
+class BDot:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[BDOT]" + statement, 'teal', 'bold'))
+
+    def __init__(self, imu=None, mtq=None, gain=0.5, period=10, measure_dt=1.0, actuate_time=7,
+                 converged_rate=0.03, converged_steps=5, debug=False):
+        '''
+        imu:             object with a Magnetometer property (payload.PAYLOAD), uT
+        mtq:             magnetorquer.Magnetorquer used to actuate
+        gain:            normalized dipole per uT/s of field change
+        period:          control period (s)
+        measure_dt:      spacing of the two magnetometer reads (s)
+        actuate_time:    coil on-time for a full-scale dipole (s)
+        converged_rate:  |dB/dt|/|B| (rad/s) below which the satellite counts as detumbled
+        converged_steps: consecutive steps below converged_rate needed to report convergence
+        '''
+        self.debug = debug
+        self.imu = imu
+        self.mtq = mtq
+        self.gain = gain
+        self.period = period
+        self.measure_dt = measure_dt
+        self.actuate_time = min(actuate_time, period - measure_dt)
+        self.converged_rate = converged_rate
+        self.converged_steps = converged_steps
+        self.b = vector.vec()
+        self.bdot = vector.vec()
+        self.dipole = vector.vec()
+        self._last_t = None
+        self.reset()
+
+    def reset(self):
+        '''Clears the field history and convergence telemetry'''
+        self._last_t = None
+        self.steps = 0
+        self.rate = 0.0
+        self.min_rate = -1.0
+        self.calm_steps = 0
+        self.converged = False
+
+    def restart(self):
+        '''Drops the stored sample so the next step starts a fresh finite difference'''
+        self._last_t = None
+
+    def step(self, b, t):
+        '''
+        Feeds one magnetometer sample b (uT) taken at time t (s).
+        Returns the commanded dipole (self.dipole), zero until two samples have been seen.
+        '''
+        if self._last_t is None or t <= self._last_t:
+            vector.copy(b, self.b)
+            vector.put(self.dipole, 0.0, 0.0, 0.0)
+            self._last_t = t
+            return self.dipole
+        dt = t - self._last_t
+        vector.sub(b, self.b, self.bdot)
+        vector.scale(self.bdot, 1.0/dt, self.bdot)
+        vector.copy(b, self.b)
+        vector.scale(self.bdot, -self.gain, self.dipole)
+        vector.clamp(self.dipole, 1.0, self.dipole)
+        self._last_t = t
+        self._telemetry(vector.norm2(self.bdot), vector.norm2(self.b))
+        return self.dipole
+
+    def _telemetry(self, dd, bb):
+        # |dB/dt|/|B| is a lower bound on the body rate perpendicular to B
+        self.steps += 1
+        self.rate = (dd / bb) ** 0.5 if bb > 0 else 0.0
+        if self.min_rate < 0 or self.rate < self.min_rate:
+            self.min_rate = self.rate
+        if self.rate < self.converged_rate:
+            self.calm_steps += 1
+        else:
+            self.calm_steps = 0
+        self.converged = self.calm_steps >= self.converged_steps
+
+    @property
+    def telemetry(self):
+        '''Compact convergence report for downlink'''
+        return "BD:{} R:{:.4f} MR:{:.4f} C:{}".format(self.steps, self.rate, self.min_rate, int(self.converged))
+
+    async def cycle(self):
+        '''One measure/actuate period. Can be scheduled directly with tasko.schedule()'''
+        self.step(self.imu.Magnetometer, time.monotonic())
+        await asyncio.sleep(self.measure_dt)
+        dipole = self.step(self.imu.Magnetometer, time.monotonic())
+        if self.debug:
+            self.debug_print("rate: {:.4f} dipole: {}".format(self.rate, list(dipole)))
+        if self.mtq is not None and not self.converged:
+            await self.mtq.actuate(dipole, self.actuate_time)
+        # The next period starts with a fresh pair of samples; the coils disturb the field
+        self.restart()
+
+    async def run(self, cycles=None):
+        '''
+        Runs the controller at a fixed rate of one cycle per period.
+        Stops after `cycles` periods (forever when None) or once converged.
+        '''
+        n = 0
+        next_t = time.monotonic()
+        while cycles is None or n < cycles:
+            try:
+                await self.cycle()
+            except Exception as e:
+                self.debug_print("Detumble cycle error: " + ''.join(traceback.format_exception(e)))
+            n += 1
+            if self.converged:
+                self.debug_print("Detumbled after {} steps".format(self.steps))
+                break
+            next_t += self.period
+            wait = next_t - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                next_t = time.monotonic()
+        return self.converged
@@ -0,0 +1,114 @@
+'''
+Host simulation: accuracy and cost of the attitude.Mahony estimator.
+
+A slowly tumbling rigid body (detumble_sim.Body, no control torque) flies
+through the tilted dipole field. The estimator gets a biased, noisy gyro, a
+noisy magnetometer against the model field as reference, and a noisy sun
+vector that drops out during eclipse.
+
+Three ways of running it:
+    model:    the model field and sun direction as references (no such model
+              on board yet). Starts from identity, i.e. with a large attitude error
+    anchored: as functions.attitude_estimator flies it, the sun reference
+              taken from the first sun vector and no magnetometer; the error
+              is measured against the body frame at the first update
+    gyro:     no references, the gyro integrated alone
+
+Reports attitude error, rate error, estimated bias and CPU time per update.
+
+    python bench/attitude_sim.py [kp ki]
+'''
+import math
+import random
+import sys
+import time
+
+import hw
+hw.install()
+
+import attitude
+import detumble_sim
+
+RATE = 10                                   # Hz
+DURATION = 5400                             # s, about one orbit
+OMEGA = (math.radians(2), math.radians(-1.5), math.radians(3))
+GYRO_BIAS = (math.radians(0.3), math.radians(-0.2), math.radians(0.5))
+GYRO_NOISE = math.radians(0.05)
+MAG_NOISE_UT = 0.3
+SUN_NOISE = 0.03                            # unit-vector noise (rad-ish)
+SUN_REF = (0.6, 0.8, 0.0)
+ECLIPSE = (0.6, 0.95)                       # fraction of DURATION in eclipse
+Q0 = (0.5, 0.5, -0.5, 0.5)                  # true initial attitude, 120 deg from identity
+
+
+def noisy(v, sigma):
+    return [c + random.gauss(0, sigma) for c in v]
+
+
+def simulate(kp, ki, mode='model', seed=3):
+    random.seed(seed)
+    body = detumble_sim.Body(OMEGA)
+    body.q = Q0
+    if mode == 'anchored':
+        est = attitude.Mahony(kp=kp, ki=ki, rate=RATE, anchor=True)
+    else:
+        est = attitude.Mahony(kp=kp, ki=ki, rate=RATE)
+    frame = None
+    dt = 1.0 / RATE
+    cpu = 0
+    n = 0
+    errors = []
+    rate_errors = []
+    while body.t < DURATION:
+        body.advance(dt)
+        gyro = noisy([body.w[i] + GYRO_BIAS[i] for i in range(3)], GYRO_NOISE)
+        b_ref = detumble_sim.field_inertial(body.t)
+        mag = noisy([c * 1e6 for c in detumble_sim.to_body(body.q, b_ref)], MAG_NOISE_UT)
+        frac = body.t / DURATION
+        sun = None
+        if not ECLIPSE[0] <= frac < ECLIPSE[1]:
+            sun = noisy(detumble_sim.to_body(body.q, SUN_REF), SUN_NOISE)
+        if mode == 'gyro':
+            mag = sun = None
+        if frame is None:
+            # the anchored and gyro estimates are relative to the first body frame
+            frame = (1.0, 0.0, 0.0, 0.0) if mode == 'model' else body.q
+        t0 = time.perf_counter_ns()
+        if mode == 'model':
+            est.set_reference(mag_ref=b_ref, sun_ref=SUN_REF)
+        est.update(gyro, dt, mag=mag, sun=sun)
+        cpu += time.perf_counter_ns() - t0
+        n += 1
+        true_q = detumble_sim.qmul((frame[0], -frame[1], -frame[2], -frame[3]), body.q)
+        errors.append((body.t, math.degrees(attitude.quat_angle(est.q, true_q))))
+        rate_errors.append(math.degrees(math.sqrt(sum((est.rate[i] - body.w[i])**2 for i in range(3)))))
+    return est, errors, rate_errors, cpu / n
+
+
+def window(errors, t0, t1):
+    vals = [e for t, e in errors if t0 <= t < t1]
+    return (sum(vals) / len(vals), max(vals)) if vals else (float('nan'), float('nan'))
+
+
+def main():
+    kp, ki = (float(sys.argv[1]), float(sys.argv[2])) if len(sys.argv) > 2 else (0.5, 0.02)
+    for mode in ('model', 'anchored', 'gyro'):
+        est, errors, rate_errors, cpu = simulate(kp, ki, mode)
+        print('{}, kp {} ki {}: {:.1f} us/update on this host'.format(mode, kp, ki, cpu / 1000))
+        converged = next((t for t, e in errors if e < 5), None)
+        print('  attitude error below 5 deg after {}'.format(
+            'never' if converged is None else '{:.0f} s'.format(converged)))
+        for name, (a, b) in (('sunlit', (600, ECLIPSE[0] * DURATION)),
+                             ('eclipse', (ECLIPSE[0] * DURATION, ECLIPSE[1] * DURATION)),
+                             ('after eclipse', (ECLIPSE[1] * DURATION, DURATION))):
+            mean, worst = window(errors, a, b)
+            print('  {:>14}: attitude error mean {:6.2f} deg, max {:6.2f} deg'.format(name, mean, worst))
+        tail = rate_errors[len(rate_errors) // 2:]
+        print('  rate error (second half) mean {:.3f} deg/s'.format(sum(tail) / len(tail)))
+        print('  bias estimate {} deg/s, true {}'.format(
+            [round(math.degrees(b), 3) for b in est.bias], [round(math.degrees(b), 3) for b in GYRO_BIAS]))
+        print('  ' + est.telemetry)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+'''
+Host benchmark: one beacon cycle (beacon, state of health with its face poll,
+and handling a received packet: functions.listen() minus the 10 s receive
+window) on the stand-in hardware, before and after keeping the hot objects.
+
+"before" rebuilds the Field (radio setup) for every transmission and the
+AllFaces drivers for every face poll, as functions did; "after" is the
+current code (radio_field() and face_sensors()). Per cycle it reports host
+time, the peak Python heap above the cycle start (tracemalloc), objects left
+allocated after the cycle, the Field and face sensor driver objects built
+and the I2C and radio SPI transactions. The stand-in face sensors cost no
+bus traffic to set up; on the board each driver built also configures its
+chip over I2C. time.sleep is counted, not slept.
+
+The radio is a pysquared_rfm9x.RFM9x over hw.RadioSPI, a register file that
+answers the version check and completes every transmission at once.
+
+    python bench/beacon_cycle_bench.py [cycles]
+'''
+import contextlib
+import gc
+import io
+import sys
+import time
+import tracemalloc
+
+import hw
+hw.install_board()
+
+
+sys.modules['busio'].SPI = hw.RadioSPI
+sleeps = []
+time.sleep = lambda s: sleeps.append(s)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import pysquared
+    import functions
+    import Big_Data
+    import Field
+
+c = pysquared.cubesat
+# Nothing on the IMU bus answers; its report is the battery temperature only
+c.hardware['IMU'] = True
+c.IMU = type('IMU', (), {'mcp': hw.MCP9600(hw.I2C())})()
+PACKET = bytearray(b'\xfa\xfb\x00\x00' + b'\x00' * 8)
+built = {'Field': 0, 'drivers': 0}
+
+
+def _counting(cls, key, count):
+    init = cls.__init__
+
+    def __init__(self, *args, **kwargs):
+        built[key] += count(self, *args) if callable(count) else count
+        init(self, *args, **kwargs)
+    cls.__init__ = __init__
+
+
+_counting(Field.Field, 'Field', 1)
+# one driver per expected sensor on the face
+_counting(Big_Data.Face, 'drivers', lambda face, add, pos, *args: {'x+': 3, 'x-': 2, 'y+': 3, 'y-': 2, 'z-': 4}[pos])
+
+
+def before(f):
+    # the previous per-call objects
+    def radio_field():
+        return Field.Field(c, f.debug)
+    f.radio_field = radio_field
+    f.face_sensors = lambda: Big_Data.AllFaces(f.debug, c.tca)
+
+
+def cycle(f):
+    f.beacon()
+    f.state_of_health()
+    f.handle_received(PACKET)
+
+
+def run(name, cycles):
+    with contextlib.redirect_stdout(io.StringIO()):
+        f = functions.functions(c)
+        if name == 'before':
+            before(f)
+        cycle(f)  # first cycle builds what is kept
+        gc.collect()
+        spi = c.radio1._device.spi
+        hw.bus.reset()
+        spi.transactions = 0
+        del sleeps[:]
+        built['Field'] = built['drivers'] = 0
+        tracemalloc.start()
+        peak = 0
+        elapsed = 0.0
+        start_objects = len(gc.get_objects())
+        for _ in range(cycles):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            t = time.perf_counter()
+            cycle(f)
+            elapsed += time.perf_counter() - t
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        gc.collect()
+        left = len(gc.get_objects()) - start_objects
+        # the finalizers print; let them run here
+        del f
+        gc.collect()
+    return {
+        'ms': 1000 * elapsed / cycles,
+        'peak': peak,
+        'left': left / cycles,
+        'i2c': hw.bus.transactions / cycles,
+        'spi': spi.transactions / cycles,
+        'sleep': sum(sleeps) / cycles,
+        'Field': built['Field'] / cycles,
+        'drivers': built['drivers'] / cycles,
+    }
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print('{} beacon cycles (beacon, state of health, one received packet)'.format(cycles))
+    print('{:>8} {:>8} {:>10} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8}'.format(
+        '', 'ms', 'peak B', 'objs', 'Field', 'drivers', 'I2C', 'SPI', 'sleep s'))
+    for name in ('before', 'after'):
+        r = run(name, cycles)
+        print('{:>8} {:>8.2f} {:>10} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.0f} {:>8.0f} {:>8.2f}'.format(
+            name, r['ms'], r['peak'], r['left'], r['Field'], r['drivers'], r['i2c'], r['spi'], r['sleep']))
+    print('(per cycle; objs = objects still allocated after the cycle)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+'''
+Build step: the flight software as .mpy bytecode, laid out for CIRCUITPY.
+
+The board compiles every .py it imports from source, at each boot and for
+each module: parsing and compiling costs time, and heap for the parse tree
+while it runs. A .mpy loads as finished bytecode. Until now only a few lib/
+drivers shipped as .mpy; this cross-compiles all of the project's modules:
+    *.py in the repo root, except code.py, boot.py and safemode.py (run by name)
+    Tasks/*.py
+    lib/**/*.py, except test directories
+into OUT (default build/CIRCUITPY) with the same layout, and copies code.py,
+boot.py, safemode.py, settings.toml and the lib/ .mpy files that have no
+source. Only the .mpy of a module goes into OUT: the board imports X.py before
+X.mpy, so a stale source left next to it would win. (Where lib/ has both, as for
+adafruit_mcp9600, the source is what the board runs today, so it is what
+gets compiled.)
+
+Sources are compiled only when newer than their .mpy in OUT. mpy-cross has to
+match the board firmware (the CircuitPython 8 mpy-cross for CircuitPython 8);
+its --version is printed first.
+
+    python bench/build_mpy.py [--out DIR] [--mpy-cross CMD] [-O N] [--clean]
+
+Copy OUT onto the CIRCUITPY drive, replacing the .py files there.
+'''
+import argparse
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY = ('code.py', 'boot.py', 'safemode.py')
+COPY = ('code.py', 'boot.py', 'safemode.py', 'settings.toml')
+SKIP_DIRS = ('test', '__pycache__')
+
+
+def sources():
+    '''(source path, path relative to CIRCUITPY) of every module to compile'''
+    for name in sorted(os.listdir(ROOT)):
+        if name.endswith('.py') and name not in ENTRY:
+            yield os.path.join(ROOT, name), name
+    for folder in ('Tasks', 'lib'):
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, folder)):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            for name in sorted(filenames):
+                if name.endswith('.py'):
+                    path = os.path.join(dirpath, name)
+                    yield path, os.path.relpath(path, ROOT)
+
+
+def prebuilt():
+    '''lib/ .mpy files without a source next to them'''
+    for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, 'lib')):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            if name.endswith('.mpy') and name[:-4] + '.py' not in filenames:
+                path = os.path.join(dirpath, name)
+                yield path, os.path.relpath(path, ROOT)
+
+
+def compile_one(mpy_cross, source, rel, target, opt):
+    cmd = mpy_cross + ['-o', target, '-s', rel.replace(os.sep, '/')]
+    if opt is not None:
+        cmd.append('-O{}'.format(opt))
+    cmd.append(source)
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError('{}: {}'.format(rel, (result.stderr or result.stdout).strip()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=os.path.join(ROOT, 'build', 'CIRCUITPY'))
+    parser.add_argument('--mpy-cross', default='mpy-cross', help='command, e.g. "python -m mpy_cross"')
+    parser.add_argument('-O', dest='opt', type=int, help='mpy-cross optimisation level (1+ drops asserts)')
+    parser.add_argument('--clean', action='store_true')
+    args = parser.parse_args()
+
+    mpy_cross = shlex.split(args.mpy_cross)
+    try:
+        version = subprocess.run(mpy_cross + ['--version'], capture_output=True, text=True).stdout.strip()
+    except OSError as e:
+        sys.exit('mpy-cross not found ({}); pass --mpy-cross'.format(e))
+    print(version)
+    if args.clean and os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+
+    compiled = skipped = source_bytes = mpy_bytes = 0
+    errors = []
+    for source, rel in sources():
+        target = os.path.join(args.out, rel[:-3] + '.mpy')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        stale = os.path.join(args.out, rel)
+        if os.path.exists(stale):
+            os.remove(stale)
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source):
+            try:
+                compile_one(mpy_cross, source, rel, target, args.opt)
+                compiled += 1
+            except RuntimeError as e:
+                errors.append(str(e))
+                continue
+        else:
+            skipped += 1
+        source_bytes += os.path.getsize(source)
+        mpy_bytes += os.path.getsize(target)
+    copied = 0
+    for path, rel in list(prebuilt()) + [(os.path.join(ROOT, name), name) for name in COPY]:
+        if os.path.exists(path):
+            target = os.path.join(args.out, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(path, target)
+            copied += 1
+
+    print('{} compiled, {} up to date, {} copied -> {}'.format(compiled, skipped, copied, args.out))
+    print('source {} KB -> mpy {} KB'.format(source_bytes // 1024, mpy_bytes // 1024))
+    for line in errors:
+        print('ERROR ' + line)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+'''
+Host simulation: time-to-detumble for the B-dot controller.
+
+Rigid body (diagonal inertia) in a circular orbit through a tilted dipole
+geomagnetic field. The flight bdot.BDot class is fed simulated magnetometer
+readings (with noise) on its real duty cycle: two reads measure_dt apart,
+then the coils held for the on-times magnetorquer.Magnetorquer.durations()
+gives, at MTQ_MAX A*m^2.
+
+The coils are driven as the flight hardware drives them: the DRV2605 effect
+pushes one way only, so an axis only fires when the command has the coil's
+polarity (+ on every axis here). Runs follow main.detumble: RUN_CYCLES
+periods back to back, and after RUNS unconverged runs SLOW_CYCLES periods
+every REST s. Also reported, for comparison only: the same controller with
+coils that could be reversed (no flight driver does this yet), run without
+rests.
+
+    python bench/detumble_sim.py [gain ...]
+'''
+import math
+import random
+import sys
+import time
+
+import hw
+hw.install()
+
+import bdot
+import magnetorquer
+
+MU0_M = 7.94e22 * 1e-7          # mu0/(4 pi) * Earth dipole moment, T m^3
+R_ORBIT = 6371e3 + 500e3        # m
+INCLINATION = math.radians(51.6)
+DIPOLE_TILT = math.radians(11)
+J = (0.0022, 0.0022, 0.0020)    # kg m^2, 1U-class
+MTQ_MAX = 0.02                  # A m^2 per coil
+NOISE_UT = 0.3                  # magnetometer noise (1 sigma)
+DT = 0.1                        # integration step (s)
+OMEGA0 = (math.radians(8), math.radians(-6), math.radians(10))
+DONE_RATE = math.radians(1)     # |w| below this counts as detumbled
+MAX_TIME = 6 * 3600
+# main.detumble
+RUN_CYCLES = 30
+RUNS = 3
+SLOW_CYCLES = 3
+REST = 300
+
+
+def qmul(a, b):
+    return (a[0]*b[0] - a[1]*b[1] - a[2]*b[2] - a[3]*b[3],
+            a[0]*b[1] + a[1]*b[0] + a[2]*b[3] - a[3]*b[2],
+            a[0]*b[2] - a[1]*b[3] + a[2]*b[0] + a[3]*b[1],
+            a[0]*b[3] + a[1]*b[2] - a[2]*b[1] + a[3]*b[0])
+
+
+def to_body(q, v):
+    # v_body = q^-1 * v * q
+    w, x, y, z = q
+    r = qmul(qmul((w, -x, -y, -z), (0.0,) + tuple(v)), q)
+    return r[1:]
+
+
+def field_inertial(t):
+    n = math.sqrt(3.986e14 / R_ORBIT**3)
+    u = n * t
+    r = (R_ORBIT * math.cos(u),
+         R_ORBIT * math.sin(u) * math.cos(INCLINATION),
+         R_ORBIT * math.sin(u) * math.sin(INCLINATION))
+    m = (math.sin(DIPOLE_TILT), 0.0, -math.cos(DIPOLE_TILT))
+    rn = math.sqrt(sum(c*c for c in r))
+    rh = [c / rn for c in r]
+    mr = sum(a*b for a, b in zip(m, rh))
+    k = MU0_M / rn**3
+    return [k * (3 * mr * rh[i] - m[i]) for i in range(3)]
+
+
+def cross(a, b):
+    return (a[1]*b[2] - a[2]*b[1], a[2]*b[0] - a[0]*b[2], a[0]*b[1] - a[1]*b[0])
+
+
+class Body:
+    def __init__(self, omega):
+        self.q = (1.0, 0.0, 0.0, 0.0)
+        self.w = list(omega)
+        self.t = 0.0
+
+    def b_body(self):
+        return to_body(self.q, field_inertial(self.t))
+
+    def advance(self, seconds, dipole=(0.0, 0.0, 0.0)):
+        steps = max(1, int(round(seconds / DT)))
+        h = seconds / steps
+        for _ in range(steps):
+            torque = cross(dipole, self.b_body())
+            jw = [J[i] * self.w[i] for i in range(3)]
+            gyro = cross(self.w, jw)
+            for i in range(3):
+                self.w[i] += h * (torque[i] - gyro[i]) / J[i]
+            wx, wy, wz = self.w
+            dq = qmul(self.q, (0.0, wx, wy, wz))
+            q = [self.q[i] + 0.5 * h * dq[i] for i in range(4)]
+            n = math.sqrt(sum(c*c for c in q))
+            self.q = tuple(c / n for c in q)
+            self.t += h
+
+    @property
+    def rate(self):
+        return math.sqrt(sum(c*c for c in self.w))
+
+
+def magnetometer(body):
+    return [c * 1e6 + random.gauss(0, NOISE_UT) for c in body.b_body()]
+
+
+class Coil:
+    drive = None
+
+
+def coils(polarity):
+    faces = type('Faces', (), {'Face0': Coil(), 'Face2': Coil(), 'Face4': Coil()})()
+    return magnetorquer.Magnetorquer(lambda: faces, threshold=0.05, max_dipole=1.0, polarity=polarity)
+
+
+def simulate(gain, polarity=(1, 1, 1), seed=1):
+    random.seed(seed)
+    body = Body(OMEGA0)
+    ctrl = bdot.BDot(gain=gain)
+    mtq = coils(polarity)
+    cpu = 0
+    steps = 0
+    coil_time = 0.0
+    converged_at = None
+    cycles = 0
+    unconverged = 0
+    while body.t < MAX_TIME and (body.rate > DONE_RATE or converged_at is None):
+        start = body.t
+        ctrl.step(magnetometer(body), body.t)
+        body.advance(ctrl.measure_dt)
+        t0 = time.perf_counter_ns()
+        dipole = ctrl.step(magnetometer(body), body.t)
+        cpu += time.perf_counter_ns() - t0
+        steps += 1
+        if ctrl.converged and converged_at is None:
+            converged_at = body.t
+        ctrl.restart()
+        # Coils run together; each axis drops out after its own on-time
+        on = mtq.durations(dipole, ctrl.actuate_time)
+        held = 0.0
+        for stop in sorted(set(on)):
+            if stop <= held:
+                continue
+            m = [MTQ_MAX * (polarity[i] if polarity else math.copysign(1, dipole[i])) if on[i] > held else 0.0
+                 for i in range(3)]
+            coil_time += stop - held
+            body.advance(stop - held, m)
+            held = stop
+        body.advance(max(0.0, ctrl.period - (body.t - start)))
+        cycles += 1
+        if polarity is None:
+            continue
+        # main.detumble: a run ends after its cycles or on convergence
+        if ctrl.converged or cycles >= (RUN_CYCLES if unconverged < RUNS else SLOW_CYCLES):
+            cycles = 0
+            if ctrl.converged:
+                unconverged = 0
+                ctrl.reset()
+                body.advance(REST)
+            else:
+                unconverged += 1
+                if unconverged >= RUNS:
+                    body.advance(REST)
+    return body.t, body.rate, steps, cpu / max(1, steps), converged_at, coil_time
+
+
+def main():
+    gains = [float(g) for g in sys.argv[1:]] or [0.1, 0.5, 2.0]
+    print('initial rate {:.1f} deg/s, target {:.1f} deg/s'.format(
+        math.degrees(math.sqrt(sum(w*w for w in OMEGA0))), math.degrees(DONE_RATE)))
+    for name, polarity in (('flight, one-way coils', (1, 1, 1)), ('reversible coils (no such driver)', None)):
+        print(name)
+        for gain in gains:
+            t, rate, steps, cpu, converged_at, coil_time = simulate(gain, polarity)
+            status = 'detumbled' if rate <= DONE_RATE else 'NOT detumbled'
+            print('  gain {:5.2f}: {} after {:6.0f} s ({:5.2f} h, {:4d} steps), final {:.2f} deg/s, '
+                  'coils on {:.0f}% of the time, {:.1f} us/step, controller reported convergence at {}'.format(
+                      gain, status, t, t / 3600, steps, math.degrees(rate), 100 * coil_time / t, cpu / 1000,
+                      'never' if converged_at is None else '{:.0f} s'.format(converged_at)))
+
+
+if __name__ == '__main__':
+    main()
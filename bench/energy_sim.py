@@ -0,0 +1,172 @@
+'''
+Host simulation: energy balance of the Tasks/ set over simulated orbits,
+fixed rates vs energy_scheduler.EnergyScheduler.
+
+Orbit model: ORBIT seconds with ECLIPSE of them in shadow. In sunlight the
+arrays deliver SOLAR_MA of charge current scaled by a slow tumble factor
+(between TUMBLE_MIN and 1), none in eclipse. Battery: CAPACITY mAh, terminal
+voltage from the scheduler's OCV table. Baseline draw BASE_MA (MCU, sensors,
+regulators), plus what the running tasks draw.
+
+Task set: the Tasks/ modules with their declared costs, plus mission tasks
+that make the budget bind (payload imaging, detumble bursts, downlink passes).
+
+"fixed" runs every task at its declared frequency whenever the power mode
+(thresholds of Satellite._manage_battery) allows it, as the per-mode
+operation sets do now. "energy" replans every PLAN_S seconds from the
+simulated readings. Power modes follow the battery voltage in both. As in
+flight, where the registry only runs in normal operations, no task runs in
+minimum or critical power.
+
+    python bench/energy_sim.py [orbits] [start soc]
+'''
+import importlib
+import math
+import os
+import sys
+
+import hw
+hw.install()
+
+import energy_scheduler
+from Tasks.template_task import Task
+
+ORBIT = 5700
+ECLIPSE = 2100
+SOLAR_MA = 420
+TUMBLE_MIN = 0.35
+TUMBLE_S = 900
+CAPACITY = 2600
+BASE_MA = 70
+PLAN_S = 60
+NORMAL_BATTERY_VOLTAGE = 6.9
+CRITICAL_BATTERY_VOLTAGE = 6.6
+
+
+class payload_task(Task):
+    priority = 6
+    frequency = 1/60
+    name = 'payload'
+    current = 260
+    duration = 30
+
+
+class detumble_task(Task):
+    priority = 2
+    frequency = 1/300
+    name = 'detumble'
+    current = 180
+    duration = 60
+
+
+class downlink_task(Task):
+    priority = 5
+    frequency = 1/60
+    name = 'downlink'
+    current = 130
+    duration = 12
+    min_frequency = 1/900
+
+
+def load_tasks():
+    tasks = []
+    folder = os.path.join(hw.ROOT, 'Tasks')
+    for file in sorted(os.listdir(folder)):
+        if file.endswith('_task.py') and file not in ('template_task.py', 'test_task.py'):
+            tasks.append(importlib.import_module('Tasks.' + file[:-3]).task)
+    return tasks + [payload_task, detumble_task, downlink_task]
+
+
+def charge_current(t):
+    phase = t % ORBIT
+    if phase >= ORBIT - ECLIPSE:
+        return 0.0
+    tumble = TUMBLE_MIN + (1 - TUMBLE_MIN) * abs(math.sin(math.pi * t / TUMBLE_S))
+    return SOLAR_MA * tumble
+
+
+def vbatt(soc):
+    table = energy_scheduler.OCV
+    for i in range(1, len(table)):
+        if soc <= table[i][1]:
+            (v0, s0), (v1, s1) = table[i-1], table[i]
+            return v0 + (v1 - v0) * (soc - s0) / (s1 - s0)
+    return table[-1][0]
+
+
+def power_mode(v, mode):
+    # Satellite._manage_battery thresholds
+    if v < CRITICAL_BATTERY_VOLTAGE:
+        return 'critical'
+    if v < NORMAL_BATTERY_VOLTAGE:
+        return 'minimum'
+    if v > NORMAL_BATTERY_VOLTAGE + .5:
+        return 'maximum'
+    if v < NORMAL_BATTERY_VOLTAGE + .3 and mode == 'maximum':
+        return 'normal'
+    return 'normal' if mode in ('critical', 'minimum') else mode
+
+
+def mode_allows(mode, min_mode):
+    # the registry is stepped in normal operations only
+    return energy_scheduler.mode_allows(mode, 'normal') and energy_scheduler.mode_allows(mode, min_mode)
+
+
+def simulate(tasks, orbits, start_soc, aware):
+    scheduler = energy_scheduler.EnergyScheduler(capacity=CAPACITY, base_current=BASE_MA)
+    soc = start_soc
+    mode = power_mode(vbatt(soc), 'normal')
+    rates = {t.name: t.frequency for t in tasks}
+    runs = {t.name: 0.0 for t in tasks}
+    orbit_rows = []
+    row = None
+    draw = BASE_MA
+    for t in range(int(orbits * ORBIT)):
+        if t % ORBIT == 0:
+            row = {'in': 0.0, 'out': 0.0, 'min_soc': soc, 'reduced_s': 0}
+            orbit_rows.append(row)
+        ichrg = charge_current(t)
+        v = vbatt(soc)
+        mode = power_mode(v, mode)
+        if aware and t % PLAN_S == 0:
+            rates = dict(scheduler.plan(tasks, mode, v, ichrg, draw))
+        draw = BASE_MA
+        for task in tasks:
+            allowed = mode_allows(mode, task.min_power_mode)
+            rate = rates[task.name] if aware else task.frequency
+            if allowed and rate > 0:
+                draw += task.current * task.duration * rate
+                runs[task.name] += rate
+        soc = min(1.0, max(0.0, soc + (ichrg - draw) / 3600 / CAPACITY))
+        row['in'] += ichrg / 3600
+        row['out'] += draw / 3600
+        row['min_soc'] = min(row['min_soc'], soc)
+        if mode in ('critical', 'minimum'):
+            row['reduced_s'] += 1
+        row['end_soc'] = soc
+    return orbit_rows, runs
+
+
+def report(name, rows, runs, tasks):
+    print('\n' + name)
+    print('{:>5} {:>9} {:>9} {:>9} {:>8} {:>8} {:>11}'.format(
+        'orbit', 'in mAh', 'out mAh', 'net mAh', 'min SOC', 'end SOC', 'min/crit s'))
+    for i, r in enumerate(rows):
+        print('{:>5} {:>9.0f} {:>9.0f} {:>+9.0f} {:>7.0%} {:>7.0%} {:>11}'.format(
+            i + 1, r['in'], r['out'], r['in'] - r['out'], r['min_soc'], r['end_soc'], r['reduced_s']))
+    print('runs: ' + ', '.join('{} {:.0f}'.format(t.name, runs[t.name]) for t in tasks))
+
+
+def main():
+    orbits = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    start = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    tasks = load_tasks()
+    print('{:.0f} orbits of {} s ({} s eclipse), start SOC {:.0%}, {} mAh, baseline {} mA'.format(
+        orbits, ORBIT, ECLIPSE, start, CAPACITY, BASE_MA))
+    for name, aware in (('fixed', False), ('energy', True)):
+        rows, runs = simulate(tasks, orbits, start, aware)
+        report(name, rows, runs, tasks)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+'''
+Host benchmark: allocations and I2C traffic per face poll.
+
+Compares the old Face_Test_All access pattern (every sensor property read
+twice, nested lists per face) against AllFaces.Face_Sample() filling one
+reusable FaceSample record.
+
+    python bench/face_sample_bench.py
+'''
+import tracemalloc
+
+import hw
+hw.install()
+
+import Big_Data
+
+CYCLES = 200
+
+
+def legacy_poll(faces):
+    # Access pattern of the original Face.test_all: value read once for the
+    # debug print and again for the list, one list per face
+    out = []
+    for face in faces.Faces:
+        data = []
+        if face.sensors['MCP']:
+            'Face Temperature: {}C'.format(face.temperature)
+            data.append(face.temperature)
+        else:
+            data.append(None)
+        if face.sensors['VEML']:
+            'Face light: {}Lumens/Sq.ft'.format(face.lux_data)
+            data.append(face.lux_data)
+        else:
+            data.append(None)
+        if face.sensors['COUPLE']:
+            'Battery Thermocouple: {}C'.format(face.couple_data)
+            data.append(face.couple_data)
+        elif face.position == "z-":
+            data.append(None)
+        out.append(data)
+    return out
+
+
+def measure(name, poll):
+    poll()  # warm up
+    hw.bus.reset()
+    peak = 0
+    tracemalloc.start()
+    for _ in range(CYCLES):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        poll()
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print('{:>12}: {:5.1f} I2C transactions/cycle ({}), {:6.0f} heap bytes peak/cycle'.format(
+        name, hw.bus.transactions / CYCLES, hw.bus, peak / CYCLES))
+
+
+def main():
+    faces = Big_Data.AllFaces(False, Big_Data.adafruit_tca9548a.TCA9548A(hw.I2C(), address=0x77))
+    sample = Big_Data.FaceSample()
+    measure('legacy', lambda: legacy_poll(faces))
+    measure('FaceSample', lambda: faces.Face_Sample(sample))
+    print('FaceSample record: {} bytes'.format(Big_Data.FaceSample.SIZE))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,499 @@
+'''
+Stand-in hardware modules for running flight code under CPython.
+
+install() puts fake board/busio/micropython/driver modules into sys.modules
+and adds lib/ and the repo root to sys.path, so benchmarks can import the
+flight modules unchanged. Every fake I2C device shares one Bus object that
+counts transactions, letting benchmarks report bus traffic per cycle.
+'''
+import os
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Bus:
+    '''Counts I2C traffic. mux counts TCA9548A channel-select writes.'''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.reads = 0
+        self.writes = 0
+        self.mux = 0
+        self.read_bytes = 0
+
+    @property
+    def transactions(self):
+        return self.reads + self.writes + self.mux
+
+    def __repr__(self):
+        return 'reads={} writes={} mux={}'.format(self.reads, self.writes, self.mux)
+
+
+bus = Bus()
+
+# address -> device simulator with read(buf) / write(buf), for devices whose
+# replies matter (e.g. the BNO08x SHTP stream). Others just count traffic.
+devices = {}
+
+
+class _TCAChannel:
+    def __init__(self, tca, channel):
+        self.tca = tca
+        self.channel = channel
+        self.channel_switch = bytearray([1 << channel])
+
+    def try_lock(self):
+        # adafruit_tca9548a writes the channel select byte on every lock
+        self.tca.i2c.writeto(self.tca.address, self.channel_switch)
+        return True
+
+    def unlock(self):
+        pass
+
+    def readfrom_into(self, address, buf, **kwargs):
+        self.tca.i2c.readfrom_into(address, buf, **kwargs)
+
+    def writeto(self, address, buf, **kwargs):
+        self.tca.i2c.writeto(address, buf, **kwargs)
+
+    def scan(self):
+        return []
+
+
+class TCA9548A:
+    def __init__(self, i2c, address=0x70):
+        self.i2c = i2c
+        self.address = address
+        self._channels = [_TCAChannel(self, i) for i in range(8)]
+
+    def __getitem__(self, key):
+        return self._channels[key]
+
+
+class I2C:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def writeto(self, address, buf, *args, start=0, end=None, **kwargs):
+        if address == 0x77 or address == 0x70:
+            bus.mux += 1
+        else:
+            bus.writes += 1
+        if address in devices:
+            devices[address].write(memoryview(buf)[start:end])
+
+    def readfrom_into(self, address, buf, *args, start=0, end=None, **kwargs):
+        bus.reads += 1
+        view = memoryview(buf)[start:end]
+        bus.read_bytes += len(view)
+        if address in devices:
+            devices[address].read(view)
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def scan(self):
+        return []
+
+
+class _Sensor:
+    '''One register read per value, locked the way adafruit_bus_device does it.'''
+    address = 0x10
+
+    def __init__(self, i2c, *args, **kwargs):
+        self.i2c = i2c
+        self._buf = bytearray(2)
+
+    def _read(self, value):
+        self.i2c.try_lock()
+        try:
+            self.i2c.readfrom_into(self.address, self._buf)
+        finally:
+            self.i2c.unlock()
+        return value
+
+    def _write(self):
+        self.i2c.try_lock()
+        try:
+            self.i2c.writeto(self.address, self._buf)
+        finally:
+            self.i2c.unlock()
+
+
+class I2CDevice:
+    '''adafruit_bus_device.i2c_device.I2CDevice on the fake bus'''
+
+    def __init__(self, i2c, device_address, probe=True):
+        self.i2c = i2c
+        self.device_address = device_address
+
+    def __enter__(self):
+        self.i2c.try_lock()
+        return self
+
+    def __exit__(self, *exc):
+        self.i2c.unlock()
+        return False
+
+    def readinto(self, buf, *, start=0, end=None):
+        self.i2c.readfrom_into(self.device_address, buf, start=start, end=end)
+
+    def write(self, buf, *, start=0, end=None):
+        self.i2c.writeto(self.device_address, buf, start=start, end=end)
+
+
+class MCP9808(_Sensor):
+    @property
+    def temperature(self):
+        return self._read(21.5)
+
+
+class MCP9600(_Sensor):
+    @property
+    def temperature(self):
+        return self._read(24.0)
+
+    @property
+    def ambient_temperature(self):
+        return self._read(22.0)
+
+
+class VEML7700(_Sensor):
+    @property
+    def lux(self):
+        return self._read(543.25)
+
+
+class Effect:
+    def __init__(self, effect_id):
+        self.id = effect_id
+
+
+class DRV2605(_Sensor):
+    def __init__(self, i2c, *args, **kwargs):
+        super().__init__(i2c)
+        self.sequence = [None] * 8
+        self.playing = False
+
+    def play(self):
+        self._write()
+        self.playing = True
+
+    def stop(self):
+        self._write()
+        self.playing = False
+
+
+class ADS1015(_Sensor):
+    pass
+
+
+class AnalogIn:
+    def __init__(self, ads, pin):
+        self.ads = ads
+
+    @property
+    def voltage(self):
+        return self.ads._read(1.36)
+
+
+class DigitalInOut:
+    def __init__(self, pin=None):
+        self.value = False
+        self.drive_mode = None
+
+    def switch_to_output(self, value=False, drive_mode=None):
+        self.value = value
+        self.drive_mode = drive_mode
+
+    def switch_to_input(self, pull=None):
+        pass
+
+
+class DriveMode:
+    PUSH_PULL = 0
+    OPEN_DRAIN = 1
+
+
+class SPIDevice:
+    def __init__(self, spi, chip_select, baudrate=100000, polarity=0, phase=0):
+        self.spi = spi
+
+    def __enter__(self):
+        return self.spi
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NVM(bytearray):
+    '''microcontroller.nvm: counts the write operations (each one a flash sector erase on the RP2040)'''
+
+    def __init__(self, size=8192):
+        super().__init__(size)
+        self.writes = 0
+        self.bytes_written = 0
+
+    def __setitem__(self, key, value):
+        self.writes += 1
+        self.bytes_written += len(value) if isinstance(key, slice) else 1
+        super().__setitem__(key, value)
+
+
+class SPI:
+    '''busio.SPI with nothing attached: reads return zeros'''
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def configure(self, **kwargs):
+        pass
+
+    def write(self, buf, *, start=0, end=None):
+        pass
+
+    def readinto(self, buf, *, start=0, end=None, write_value=0):
+        view = memoryview(buf)[start:end]
+        for i in range(len(view)):
+            view[i] = 0
+
+    def write_readinto(self, out_buf, in_buf, **kwargs):
+        self.readinto(in_buf)
+
+
+class RadioSPI(SPI):
+    '''
+    SX1276 registers and FIFO behind busio.SPI, for pysquared_rfm9x.RFM9x.
+    Answers the version check. A TX mode write records the packet in sent and
+    raises TxDone after tx_reads more IRQ flag reads (0: at once, None: never).
+    A packet queued with deliver() raises RxDone once the chip listens.
+    overlaps counts TX starts while a packet was still on air.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.regs = bytearray(128)
+        self.regs[0x42] = 18
+        self.fifo = bytearray(256)
+        self.address = None
+        self.transactions = 0
+        self.tx_reads = 0
+        self.sent = []
+        self.incoming = []
+        self.overlaps = 0
+        self._on_air = None
+
+    def deliver(self, packet):
+        self.incoming.append(bytes(packet))
+
+    def write(self, buf, *, start=0, end=None):
+        data = bytes(buf[start:end])
+        self.transactions += 1
+        if self.address is not None and self.address & 0x80:
+            # second half of _write_from: FIFO data
+            if self.address & 0x7F == 0x00:
+                ptr = self.regs[0x0D]
+                self.fifo[ptr:ptr + len(data)] = data
+                self.regs[0x0D] = (ptr + len(data)) & 0xFF
+            self.address = None
+            return
+        if len(data) == 1:
+            self.address = data[0]
+            return
+        self.address = None
+        reg, value = data[0] & 0x7F, data[1]
+        if reg == 0x12:
+            self.regs[reg] &= ~value & 0xFF
+            return
+        self.regs[reg] = value
+        if reg == 0x01 and value & 0x07 == 3:
+            if self._on_air is not None:
+                self.overlaps += 1
+            self.sent.append(bytes(self.fifo[:self.regs[0x22]]))
+            self._on_air = self.tx_reads
+            self._irq()
+
+    def _irq(self):
+        if self._on_air is not None:
+            if self._on_air <= 0:
+                self.regs[0x12] |= 0x08
+                self._on_air = None
+            else:
+                self._on_air -= 1
+        if self.incoming and self.regs[0x01] & 0x07 == 5:
+            packet = self.incoming.pop(0)
+            self.fifo[:len(packet)] = packet
+            self.regs[0x10] = 0
+            self.regs[0x13] = len(packet)
+            self.regs[0x12] |= 0x40
+
+    def readinto(self, buf, *, start=0, end=None, write_value=0):
+        self.transactions += 1
+        view = memoryview(buf)[start:end]
+        reg = (self.address or 0) & 0x7F
+        self.address = None
+        if reg == 0x00:
+            ptr = self.regs[0x0D]
+            view[:] = self.fifo[ptr:ptr + len(view)]
+            self.regs[0x0D] = (ptr + len(view)) & 0xFF
+            return
+        if reg == 0x12:
+            self._irq()
+        for i in range(len(view)):
+            view[i] = self.regs[reg]
+
+
+class UART:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class _Register:
+    '''adafruit_register descriptor (struct, bits, bit): a stored value, 0 until written'''
+
+    def __init__(self, *args, **kwargs):
+        self.key = '_reg{}'.format(id(self))
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.__dict__.get(self.key, 0)
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.key] = value
+
+
+class _RegisterArray(_Register):
+    '''adafruit_register StructArray: count entries of (0, ...)'''
+
+    def __init__(self, register_address, struct_format, count):
+        super().__init__()
+        self.count = count
+        self.width = len(struct_format.lstrip('<>!=@'))
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.__dict__.setdefault(self.key, [(0,) * self.width for _ in range(self.count)])
+
+
+class NeoPixel(list):
+    def __init__(self, pin, n, brightness=1.0, pixel_order=None, **kwargs):
+        super().__init__([(0, 0, 0)] * n)
+        self.brightness = brightness
+
+
+class PWMOut:
+    def __init__(self, pin, duty_cycle=0, frequency=500, **kwargs):
+        self.duty_cycle = duty_cycle
+        self.frequency = frequency
+
+
+class SDCard:
+    def __init__(self, spi, cs, baudrate=None):
+        pass
+
+
+class VfsFat:
+    def __init__(self, block_device):
+        self.block_device = block_device
+
+
+class _Reset(Exception):
+    '''microcontroller.reset() on the host'''
+
+
+def _reset():
+    raise _Reset()
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    return mod
+
+
+def install():
+    '''Register the stand-in modules. Safe to call more than once.'''
+    # lib/ goes after the stdlib so CPython's asyncio is used instead of the
+    # MicroPython port in lib/asyncio
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    if os.path.join(ROOT, 'lib') not in sys.path:
+        sys.path.append(os.path.join(ROOT, 'lib'))
+    if 'board' in sys.modules:
+        return
+    _module('board', SCL0=0, SDA0=1, SCL1=2, SDA1=3)
+    _module('busio', I2C=I2C)
+    _module('micropython', const=lambda x: x)
+    _module('adafruit_mcp9808', MCP9808=MCP9808)
+    _module('adafruit_mcp9600', MCP9600=MCP9600)
+    _module('adafruit_bus_device')
+    _module('adafruit_bus_device.i2c_device', I2CDevice=I2CDevice)
+    sys.modules['adafruit_bus_device'].i2c_device = sys.modules['adafruit_bus_device.i2c_device']
+    _module('adafruit_bus_device.spi_device', SPIDevice=SPIDevice)
+    sys.modules['adafruit_bus_device'].spi_device = sys.modules['adafruit_bus_device.spi_device']
+    _module('digitalio', DigitalInOut=DigitalInOut, DriveMode=DriveMode)
+    _module('alarm')
+    _module('microcontroller', nvm=NVM())
+    _module('adafruit_tca9548a', TCA9548A=TCA9548A)
+    _module('adafruit_veml7700', VEML7700=VEML7700)
+    _module('adafruit_drv2605', DRV2605=DRV2605, Effect=Effect)
+    _module('adafruit_ads1x15')
+    _module('adafruit_ads1x15.ads1015', ADS1015=ADS1015, P1=1)
+    _module('adafruit_ads1x15.analog_in', AnalogIn=AnalogIn)
+    if not hasattr(time, 'monotonic_ns'):
+        time.monotonic_ns = lambda: int(time.monotonic() * 1000000000)
+
+
+def install_board():
+    '''
+    install() plus stand-ins for the rest of what pysquared needs to build a
+    Satellite at import: every board pin, SPI/UART, storage, sdcardio,
+    neopixel, pwmio, microcontroller.cpu and adafruit_register. Nothing is
+    attached to SPI, so the radio fails its version check, as a board
+    without one would; the SD card mounts nowhere, so file writes fail and
+    are handled by the flight code.
+    '''
+    install()
+    if 'storage' in sys.modules:
+        return
+    board = sys.modules['board']
+    board.__getattr__ = lambda name: name
+    sys.modules['busio'].SPI = SPI
+    sys.modules['busio'].UART = UART
+    digitalio = sys.modules['digitalio']
+    digitalio.Pull = types.SimpleNamespace(UP=1, DOWN=2)
+    digitalio.Direction = types.SimpleNamespace(INPUT=0, OUTPUT=1)
+    micro = sys.modules['microcontroller']
+    micro.cpu = types.SimpleNamespace(temperature=31.5, frequency=125000000)
+    micro.RunMode = types.SimpleNamespace(NORMAL=0, SAFE_MODE=1, BOOTLOADER=2)
+    micro.on_next_reset = lambda mode: None
+    micro.reset = _reset
+    _module('storage', mount=lambda vfs, path, readonly=False: None, umount=lambda path: None,
+            remount=lambda path, readonly=False: None, VfsFat=VfsFat)
+    _module('sdcardio', SDCard=SDCard)
+    _module('pwmio', PWMOut=PWMOut)
+    _module('neopixel', NeoPixel=NeoPixel, GRB='GRB', RGB='RGB')
+    _module('adafruit_register')
+    for name, attrs in (('i2c_struct', ('UnaryStruct', 'ROUnaryStruct', 'Struct')),
+                        ('i2c_bits', ('RWBits', 'ROBits')),
+                        ('i2c_bit', ('RWBit', 'ROBit'))):
+        mod = _module('adafruit_register.' + name, **{a: _Register for a in attrs})
+        setattr(sys.modules['adafruit_register'], name, mod)
+    mod = _module('adafruit_register.i2c_struct_array', StructArray=_RegisterArray)
+    sys.modules['adafruit_register'].i2c_struct_array = mod
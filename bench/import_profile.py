@@ -0,0 +1,83 @@
+'''
+Host import profile: the modules main.py imports (pysquared, which builds the
+Satellite at import, and functions) loaded under import_profiler on the
+stand-in hardware (hw.install_board), to catch import-time regressions before
+they reach the board.
+
+Prints every loaded module slowest first (total and self ms, nesting depth),
+then the boot record pysquared's BootManager would write. CPython times are
+not board times, and asyncio, struct, etc. are CPython's own modules, but a
+module that got slower or a new import at boot shows up the same way.
+
+    python bench/import_profile.py [--top N] [--save FILE] [--baseline FILE] [--tolerance X]
+
+--save writes {module: self ms} as JSON. --baseline compares with such a file
+and exits 1 when a module's self time is over tolerance x its baseline + 2 ms,
+or a module is loaded at boot that the baseline did not load.
+'''
+import argparse
+import contextlib
+import io
+import json
+import sys
+
+import hw
+hw.install_board()
+
+import import_profiler
+
+MODULES = ('pysquared', 'functions')
+SLACK_MS = 2.0
+
+
+def profile():
+    profiler = import_profiler.install()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in MODULES:
+            __import__(name)
+    profiler.uninstall()
+    return profiler
+
+
+def compare(profiler, baseline, tolerance):
+    '''Lines describing each regression against baseline {module: self ms}'''
+    problems = []
+    for name, _, _, self_us, _ in profiler.modules:
+        ms = self_us / 1000
+        if name not in baseline:
+            problems.append('new import at boot: {} ({:.1f} ms)'.format(name, ms))
+        elif ms > baseline[name] * tolerance + SLACK_MS:
+            problems.append('{}: {:.1f} ms, baseline {:.1f} ms'.format(name, ms, baseline[name]))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--save')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+
+    profiler = profile()
+    print('{} modules, {:.1f} ms'.format(len(profiler.modules), profiler.total_us() / 1000))
+    print('{:>28} {:>6} {:>10} {:>10}'.format('module', 'depth', 'total ms', 'self ms'))
+    for name, depth, us, self_us, _ in profiler.slowest(args.top):
+        print('{:>28} {:>6} {:>10.1f} {:>10.1f}'.format(name, depth, us / 1000, self_us / 1000))
+    print()
+    print(sys.modules['pysquared'].cubesat.boot.report())
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({m[0]: round(m[3] / 1000, 2) for m in profiler.modules}, f, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(profiler, json.load(f), args.tolerance)
+        for line in problems:
+            print('REGRESSION ' + line)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+Ground decoder for the binary SD logs (log_records): one CSV per record type,
+or Parquet with --parquet (needs pandas and pyarrow).
+
+    python bench/log_decode.py REC_00003.txt [more files] [--out DIR] [--parquet]
+                               [--from MS] [--to MS]
+
+Output files are <log name>_<type>.csv (or .parquet) in DIR, default next to
+the log. --from/--to keep records between those boot times (ms), seeking to
+--from instead of reading the file from the start. Damaged bytes are skipped
+and counted.
+'''
+import argparse
+import csv
+import os
+
+import hw
+hw.install()
+
+import log_records
+
+COLUMNS = {
+    log_records.FACE: ['face{}_{}'.format(face, field) for face in range(5) for field in ('temp', 'lux', 'couple')],
+    log_records.POWER: ['vbatt', 'ichrg', 'vcharge', 'idraw', 'vsys'],
+    log_records.IMU: ['ax', 'ay', 'az', 'mx', 'my', 'mz', 'gx', 'gy', 'gz'],
+    log_records.RADIO: ['rssi', 'length', 'direction'],
+    log_records.TEXT: ['text'],
+}
+
+
+def decode(path, start=None, stop=None):
+    '''{type: [row, ...]} with rows [ms, fields...], and the skipped byte count'''
+    tables = {}
+    with open(path, 'rb') as f:
+        reader = log_records.Reader(f, chunk=65536)
+        if start is not None and reader.seek_time(start) is None:
+            return tables, reader.skipped
+        for _, rtype, t_ms, payload in reader:
+            if stop is not None and t_ms > stop:
+                break
+            values = log_records.fields(rtype, payload)
+            if isinstance(values, str):
+                values = [values]
+            elif isinstance(values, bytes):
+                values = [values.hex()]
+            tables.setdefault(rtype, []).append([t_ms] + values)
+    return tables, reader.skipped
+
+
+def write_csv(path, rtype, rows):
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['ms'] + COLUMNS.get(rtype, ['raw']))
+        w.writerows(rows)
+
+
+def write_parquet(path, rtype, rows):
+    import pandas
+    pandas.DataFrame(rows, columns=['ms'] + COLUMNS.get(rtype, ['raw'])).to_parquet(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--out')
+    parser.add_argument('--parquet', action='store_true')
+    parser.add_argument('--from', dest='start', type=int)
+    parser.add_argument('--to', dest='stop', type=int)
+    args = parser.parse_args()
+    for log in args.logs:
+        tables, skipped = decode(log, args.start, args.stop)
+        folder = args.out or os.path.dirname(os.path.abspath(log))
+        base = os.path.splitext(os.path.basename(log))[0]
+        for rtype, rows in sorted(tables.items()):
+            name = log_records.NAMES.get(rtype, 'type{}'.format(rtype))
+            if args.parquet:
+                out = os.path.join(folder, '{}_{}.parquet'.format(base, name))
+                write_parquet(out, rtype, rows)
+            else:
+                out = os.path.join(folder, '{}_{}.csv'.format(base, name))
+                write_csv(out, rtype, rows)
+            print('{}: {} {} records -> {}'.format(log, len(rows), name, out))
+        if skipped:
+            print('{}: skipped {} damaged bytes'.format(log, skipped))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+'''
+Host benchmark: binary log records (log_records) vs the text lines the logs
+wrote before, in bytes per record, and binary read throughput.
+
+Builds HOURS of a synthetic log (faces every 60 s, power every 20 s, IMU every
+10 s, a radio packet every 5 min) in both formats, then times a full
+Reader pass, a text parse of the same data and seek_time() to random times.
+
+    python bench/log_record_bench.py [hours]
+'''
+import io
+import random
+import sys
+import time
+
+import hw
+hw.install()
+
+import log_records
+
+FACES = [[21.31, 543.2], [20.87, 12.0], [19.5, 0.0], [22.04, 8812.6], [18.25, 230.4, -4.75]]
+POWER = (7.412, 140.0, 7.9, 210.0, 5.02)
+IMU = ((0.12, -9.79, 0.31), (21.4, -3.2, 40.1), (0.011, -0.002, 0.004))
+PERIODS = (('face', 60), ('power', 20), ('imu', 10), ('radio', 300))
+
+
+def records(hours):
+    for t in range(int(hours * 3600)):
+        for name, period in PERIODS:
+            if t % period == 0:
+                yield name, t
+
+
+def build(hours):
+    binary = bytearray()
+    text = []
+    counts = {}
+    for name, t in records(hours):
+        ms = t * 1000
+        counts[name] = counts.get(name, 0) + 1
+        if name == 'face':
+            binary += log_records.face(ms, FACES)
+            # Face_log: one line per face
+            for face in FACES:
+                text.append('{}, {}\n'.format(t, face))
+        elif name == 'power':
+            binary += log_records.power(ms, *POWER)
+            text.append('{}, {}\n'.format(t, list(POWER)))
+        elif name == 'imu':
+            binary += log_records.imu(ms, *IMU)
+            text.append('{}, {}\n'.format(t, [list(v) for v in IMU]))
+        else:
+            binary += log_records.radio(ms, -97, 32)
+            text.append('{}, {}\n'.format(t, [-97, 32, 0]))
+    return bytes(binary), ''.join(text).encode(), counts
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 24
+    binary, text, counts = build(hours)
+    n = sum(counts.values())
+    print('{:.0f} h: {}'.format(hours, ', '.join('{} {}'.format(k, v) for k, v in counts.items())))
+    print('{:>8} {:>10} {:>12}'.format('', 'bytes', 'bytes/record'))
+    print('{:>8} {:>10} {:>12.1f}'.format('text', len(text), len(text) / n))
+    print('{:>8} {:>10} {:>12.1f}'.format('binary', len(binary), len(binary) / n))
+
+    start = time.perf_counter()
+    decoded = 0
+    for _, rtype, _, payload in log_records.Reader(io.BytesIO(binary)):
+        log_records.fields(rtype, payload)
+        decoded += 1
+    binary_s = time.perf_counter() - start
+    start = time.perf_counter()
+    lines = 0
+    for line in text.decode().splitlines():
+        t, _, value = line.partition(', ')
+        int(t)
+        eval(value)
+        lines += 1
+    text_s = time.perf_counter() - start
+    print('read+decode: binary {:.0f} records/s ({:.1f} MB/s), text {:.0f} lines/s ({:.1f} MB/s)'.format(
+        decoded / binary_s, len(binary) / binary_s / 1e6, lines / text_s, len(text) / text_s / 1e6))
+
+    reader = log_records.Reader(io.BytesIO(binary))
+    last = int(hours * 3600 * 1000)
+    start = time.perf_counter()
+    seeks = 200
+    for _ in range(seeks):
+        t_ms = random.randrange(last)
+        offset = reader.seek_time(t_ms)
+        record = reader.next()
+        assert offset is None or record[2] >= t_ms
+    print('seek_time: {:.2f} ms each over {} bytes'.format(1000 * (time.perf_counter() - start) / seeks, len(binary)))
+
+
+if __name__ == '__main__':
+    main()
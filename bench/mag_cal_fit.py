@@ -0,0 +1,120 @@
+'''
+Ground tool: batch magnetometer/gyro calibration with calibration.MagFit.
+
+Reads IMU burst files written by imu_buffer.IMUAcquisition.save_burst
+(rows ax ay az gx gy gz mx my mz), or synthetic data from a made-up
+hard/soft iron distortion when no files are given. Fits, prints the residual
+field magnitude error before and after, the per-sample cost of applying the
+result, and writes the packed record (imu.bin). Uplink it with the cdh
+'imucal' command (args b'set ' + the record), which stores it on SD and NVM
+and applies it, or copy it to /sd/cal/ on the board.
+
+Take the burst with calibration cleared (no /sd/cal/imu.bin and a zeroed NVM
+record), tumbling the board slowly through as many orientations as possible.
+
+    python bench/mag_cal_fit.py [--sphere] [--field uT] [-o imu.bin] [BURST_00001.txt ...]
+'''
+import math
+import random
+import struct
+import sys
+import time
+
+import hw
+hw.install()
+
+import calibration
+
+ROW = struct.Struct('<I9f')
+
+
+def read_burst(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    rate, rows, _ = struct.unpack_from('<HHI', data, 0)
+    out = []
+    for i in range(rows):
+        fields = ROW.unpack_from(data, 8 + i * ROW.size)
+        out.append((fields[4:7], fields[7:10]))
+    return rate, out
+
+
+def synthetic(field, n=1500, seed=4):
+    '''Gyro/mag rows for a still-then-tumbling board with a known distortion'''
+    random.seed(seed)
+    soft = ((1.08, 0.04, -0.02), (0.04, 0.95, 0.03), (-0.02, 0.03, 0.99))
+    offset = (14.0, -22.0, 7.5)
+    bias = (0.004, -0.007, 0.002)
+    rows = []
+    for i in range(n):
+        v = [random.gauss(0, 1) for _ in range(3)]
+        k = field / math.sqrt(sum(c * c for c in v))
+        b = [c * k for c in v]
+        m = [sum(soft[r][c] * b[c] for c in range(3)) + offset[r] + random.gauss(0, 0.3) for r in range(3)]
+        g = [bias[r] + random.gauss(0, 0.001) for r in range(3)]
+        rows.append((g, m))
+    print('synthetic: offset {} soft iron^-1 {} gyro bias {}'.format(offset, soft, bias))
+    return rows
+
+
+def magnitude_error(rows, field, cal=None):
+    errs = []
+    for _, m in rows:
+        v = cal.mag(m) if cal is not None else m
+        errs.append(abs(math.sqrt(sum(c * c for c in v)) - field))
+    return sum(errs) / len(errs), max(errs)
+
+
+def main():
+    args = sys.argv[1:]
+    mode = 'ellipsoid'
+    field = 50.0
+    out = 'imu.bin'
+    files = []
+    while args:
+        a = args.pop(0)
+        if a == '--sphere':
+            mode = 'sphere'
+        elif a == '--field':
+            field = float(args.pop(0))
+        elif a == '-o':
+            out = args.pop(0)
+        else:
+            files.append(a)
+    rows = []
+    for path in files:
+        rows += read_burst(path)[1]
+    if not rows:
+        rows = synthetic(field)
+    fit = calibration.MagFit(mode, field)
+    still = calibration.GyroStill(window=len(rows) // 4)
+    for g, m in rows:
+        fit.add(m)
+        still.add(g)
+    cal = fit.solve()
+    if cal is None:
+        print('fit failed: {} samples do not constrain a {} fit'.format(fit.count, mode))
+        return
+    if still.found:
+        for i in range(3):
+            cal.gyro_bias[i] = still.bias[i]
+    else:
+        print('no still window, gyro bias left at zero')
+    print('{} samples, {} fit'.format(fit.count, mode))
+    print('|B| error before: mean {:.2f} max {:.2f} uT'.format(*magnitude_error(rows, field)))
+    print('|B| error after:  mean {:.2f} max {:.2f} uT'.format(*magnitude_error(rows, field, cal)))
+    print(cal.telemetry)
+    buf = [0.0, 0.0, 0.0]
+    m = rows[0][1]
+    t0 = time.perf_counter()
+    for _ in range(20000):
+        cal.mag(m, buf)
+        cal.gyro(m, buf)
+    print('apply: {:.2f} us/sample on this host'.format((time.perf_counter() - t0) / 20000 * 1e6))
+    with open(out, 'wb') as f:
+        f.write(cal.pack())
+    print('wrote {} ({} bytes), uplink with cdh imucal b"set " + record'.format(out, calibration.RECORD_SIZE))
+
+
+if __name__ == '__main__':
+    main()
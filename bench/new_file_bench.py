@@ -0,0 +1,146 @@
+'''
+Host benchmark: Satellite.new_file on a well-used card, the old per-number
+stat scan vs the file-number index (Satellite.filenumbers + counter file).
+
+The SD card is a temporary directory holding EXISTING files /data/DATA_00000
+.. DATA_<EXISTING-1>. new_file and its helpers are lifted from pysquared.py
+unchanged, with /sd mapped onto the temporary directory; every stat, listdir
+and open is counted (each is a FAT directory lookup on the card).
+
+"old" is the stat loop new_file used before (stat 00000, 00001, ... until one
+is missing). "indexed" is the current code: the first call on a fresh boot
+(empty filenumbers) reads the counter file, or scans the directory once
+without one, and every later call is one stat plus the counter write.
+
+    python bench/new_file_bench.py [existing files] [new files]
+'''
+import ast
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+import hw
+hw.install()
+
+
+class Card:
+    '''/sd on a host directory, counting the file system calls'''
+
+    def __init__(self, root):
+        self.root = root
+        self.calls = {'stat': 0, 'listdir': 0, 'open': 0, 'mkdir': 0}
+
+    def _path(self, path):
+        if path.startswith('/sd'):
+            return self.root + path[3:]
+        return path
+
+    def stat(self, path):
+        self.calls['stat'] += 1
+        return os.stat(self._path(path))
+
+    def listdir(self, path):
+        self.calls['listdir'] += 1
+        return os.listdir(self._path(path))
+
+    def mkdir(self, path):
+        self.calls['mkdir'] += 1
+        return os.mkdir(self._path(path))
+
+    def open(self, path, mode='r'):
+        self.calls['open'] += 1
+        return open(self._path(path), mode)
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+
+def _lift(names, card):
+    path = os.path.join(hw.ROOT, 'pysquared.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == 'Satellite')
+    defs = [n for n in cls.body if isinstance(n, ast.FunctionDef) and n.name in names]
+    namespace = {'traceback': traceback, 'stat': card.stat, 'listdir': card.listdir, 'mkdir': card.mkdir,
+                 'open': card.open}
+    exec(compile(ast.Module(body=defs, type_ignores=[]), path, 'exec'), namespace)
+    return namespace
+
+
+class Sat:
+    '''Satellite.new_file over a Card'''
+
+    def __init__(self, card):
+        lifted = _lift(['new_file', '_read_filenumber', '_scan_filenumber', '_write_filenumber'], card)
+        for name in ('new_file', '_read_filenumber', '_scan_filenumber', '_write_filenumber'):
+            setattr(self, name, lifted[name].__get__(self))
+        self.hardware = {'SDcard': True}
+        self.filenumbers = {}
+        self.debug = False
+
+    def debug_print(self, statement):
+        pass
+
+
+def old_new_file(card, substring):
+    # new_file before the index: stat every number from 0 until one is free
+    _folder = substring[:substring.rfind('/')+1]
+    _file = substring[substring.rfind('/')+1:]
+    ff = ''
+    for i in range(0xFFFF):
+        ff = '/sd{}{}{:05}.txt'.format(_folder, _file, i)
+        try:
+            card.stat(ff)
+        except OSError:
+            break
+    with card.open(ff, 'a') as f:
+        f.tell()
+    return ff
+
+
+def populate(root, existing):
+    os.mkdir(os.path.join(root, 'data'))
+    for i in range(existing):
+        open(os.path.join(root, 'data', 'DATA_{:05}.txt'.format(i)), 'w').close()
+
+
+def run(name, existing, new):
+    with tempfile.TemporaryDirectory() as root:
+        populate(root, existing)
+        card = Card(root)
+        sat = Sat(card)
+        rows = []
+        start = time.perf_counter()
+        for k in range(new):
+            before = card.total
+            if name == 'old':
+                path = old_new_file(card, '/data/DATA_')
+            else:
+                if k == new // 2:
+                    # Reboot: RAM cache gone, counter file left
+                    sat.filenumbers = {}
+                path = sat.new_file('/data/DATA_')
+            rows.append(card.total - before)
+        host = time.perf_counter() - start
+        assert path.endswith('{:05}.txt'.format(existing + new - 1)), path
+        return rows, host, dict(card.calls)
+
+
+def main():
+    existing = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    new = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print('{} existing files in /data, {} new files'.format(existing, new))
+    print('{:>8} {:>10} {:>10} {:>10} {:>10}'.format('', 'first', 'later', 'total', 'host ms'))
+    for name in ('old', 'indexed'):
+        rows, host, calls = run(name, existing, new)
+        later = sum(rows[1:]) / max(1, len(rows) - 1)
+        print('{:>8} {:>10} {:>10.1f} {:>10} {:>10.1f}   {}'.format(
+            name, rows[0], later, sum(rows), 1000 * host, calls))
+    print('(file system calls per new_file; indexed reboots halfway through)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+'''
+Host benchmark: power check load of the normal power task set, per-task
+check_power() vs the shared power_state.PowerState task.
+
+"per-task" is main.normal_power_operations as it was: all eight tasks run
+check_power() (battery manager twice, battery heater, reboot check) before
+every iteration. "shared" runs PowerState.supervise over the same tasks, which
+read power.ok. Task bodies are reduced to their sleeps since only the power
+checks are measured; cadences are the ones in main.py with detumble converged.
+
+The pysquared.Satellite power methods are the real ones, lifted by
+sched_latency. The INA219 stand-ins count one I2C read per register read and
+cost READ_S of CPU each; the MCP9600 reads go over the fake bus. --cold keeps
+the battery below NORMAL_BATT_TEMP so the heater runs on every check.
+
+Reports per mission minute: I2C transactions, power monitor reads, check
+calls, modelled bus CPU time and host CPU time.
+
+    python bench/power_check_load.py [--cold] [mission seconds]
+'''
+import asyncio
+import gc
+import sys
+import time
+
+import hw
+hw.install()
+
+import functions
+import power_state
+import sched_latency
+from sched_latency import SCALE
+
+MISSION = 600
+
+
+class PowerMonitor(sched_latency.PowerMonitor):
+    '''INA219 stand-in on the fake bus'''
+    reads = 0
+
+    def __getattribute__(self, name):
+        if name in ('bus_voltage', 'shunt_voltage', 'current'):
+            PowerMonitor.reads += 1
+            hw.bus.reads += 1
+        return super().__getattribute__(name)
+
+
+# Seconds before the first iteration, seconds between iterations
+CADENCE = {
+    's_lora_beacon': (0, 31),
+    'g_face_data': (0, 60),
+    's_face_data': (20, 200),
+    'g_imu_data': (0, 60),
+    'g_attitude': (0, 60),
+    's_imu_data': (45, 100),
+    'detumble': (300, 300),
+    'joke': (500, 500),
+}
+
+
+class ScaledAsyncio:
+    '''asyncio for the functions module with the heater waits scaled like everything else'''
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+    def sleep(self, seconds):
+        return asyncio.sleep(seconds * SCALE)
+
+
+def satellite(cold):
+    c = sched_latency.Sat()
+    c.pwr = PowerMonitor()
+    c.chrg = PowerMonitor()
+    if cold:
+        c.NORMAL_BATT_TEMP = 30
+    return c, functions.functions(c)
+
+
+async def per_task(c, f, mission, calls):
+    async def check_power():
+        calls[0] += 1
+        gc.collect()
+        await c.battery_manager_async()
+        await f.battery_heater_async()
+        c.check_reboot()
+        await c.battery_manager_async()
+        gc.collect()
+        return c.power_mode == 'normal' or c.power_mode == 'maximum'
+
+    async def task(first, period):
+        await asyncio.sleep(first * SCALE)
+        while await check_power():
+            await asyncio.sleep(period * SCALE)
+
+    tasks = [asyncio.ensure_future(task(*CADENCE[name])) for name in CADENCE]
+    await asyncio.sleep(mission * SCALE)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def shared(c, f, mission, calls):
+    power = power_state.PowerState(c, f, period=20 * SCALE)
+    check = power.check
+
+    async def counted():
+        calls[0] += 1
+        return await check()
+    power.check = counted
+
+    async def task(first, period):
+        await asyncio.sleep(first * SCALE)
+        while power.ok:
+            await asyncio.sleep(period * SCALE)
+
+    supervisor = asyncio.ensure_future(power.supervise(*[task(*CADENCE[name]) for name in CADENCE]))
+    await asyncio.sleep(mission * SCALE)
+    supervisor.cancel()
+    await asyncio.gather(supervisor, return_exceptions=True)
+
+
+def run(name, body, mission, cold):
+    c, f = satellite(cold)
+    functions.asyncio = ScaledAsyncio()
+    hw.bus.reset()
+    PowerMonitor.reads = 0
+    sched_latency.BUSY = 0
+    calls = [0]
+    cpu = time.process_time()
+    asyncio.run(body(c, f, mission, calls))
+    cpu = time.process_time() - cpu
+    functions.asyncio = asyncio
+    minutes = mission / 60
+    print('{:>9} {:>8.1f} {:>10.0f} {:>10.0f} {:>11.2f} {:>11.1f}'.format(
+        name, calls[0] / minutes, hw.bus.transactions / minutes, PowerMonitor.reads / minutes,
+        sched_latency.BUSY / minutes, 1000 * (cpu - sched_latency.BUSY * SCALE) / minutes))
+
+
+def main():
+    args = sys.argv[1:]
+    cold = '--cold' in args
+    args = [a for a in args if a != '--cold']
+    mission = float(args[0]) if args else MISSION
+    print('{:.0f} s of mission time per run, compressed {:.0f}x{}'.format(
+        mission, 1 / SCALE, ', heater on every check' if cold else ''))
+    print('{:>9} {:>8} {:>10} {:>10} {:>11} {:>11}'.format(
+        '', 'checks', 'I2C txns', 'INA reads', 'bus CPU s', 'host CPU ms'))
+    print('{:>9} {:>8} {:>10} {:>10} {:>11} {:>11}'.format('', '/min', '/min', '/min', '/min', '/min'))
+    run('per-task', per_task, mission, cold)
+    run('shared', shared, mission, cold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+'''
+Host benchmark: scheduler latency of the normal-power task set, blocking vs
+cooperative.
+
+Runs the main.normal_power_operations task set twice on the event loop:
+"blocking" calls the synchronous functions layer as main.py did before
+(radio busy-waits, 10 s listen, 50-read power averages), "cooperative" uses
+the async counterparts it awaits now. Two periodic probes stand in for the
+20 Hz IMU sampler and the 10 Hz attitude loop. Every wakeup records how late
+it ran beyond the time it asked for.
+
+What runs for real: functions.functions, lib/Field.py and the RFM9x
+send/receive code of pysquared_rfm9x over a register-level stand-in that
+completes a transmission after the LoRa air time of the packet (SF8, BW125,
+CR4/8) and never receives. The pysquared.Satellite power and heater methods
+are lifted from pysquared.py unchanged (importing pysquared would bring up
+the whole board). Power monitor reads cost READ_S of CPU each.
+
+Time is compressed by SCALE (periods, air time, read cost and timeouts);
+latencies are reported in mission time.
+
+    python bench/sched_latency.py [mission seconds]
+'''
+import ast
+import asyncio
+import os
+import sys
+import time
+import traceback
+import types
+
+import hw
+hw.install()
+
+import Big_Data
+import functions
+import pysquared_rfm9x
+
+SCALE = 0.1
+MISSION = 600           # s of mission time per run
+READ_S = 0.001          # CPU time of one INA219 register read
+BUSY = 0
+
+
+def busy(seconds):
+    global BUSY
+    end = time.perf_counter() + seconds * SCALE
+    while time.perf_counter() < end:
+        pass
+    BUSY += seconds
+
+
+class PowerMonitor:
+    '''INA219 stand-in: every register read costs READ_S'''
+
+    @property
+    def bus_voltage(self):
+        busy(READ_S)
+        return 7.2
+
+    @property
+    def shunt_voltage(self):
+        busy(READ_S)
+        return 0.01
+
+    @property
+    def current(self):
+        busy(READ_S)
+        return 150.0
+
+
+class SimRadio(pysquared_rfm9x.RFM9x):
+    '''RFM9x over a register file: tx done after the packet air time, nothing is ever received'''
+
+    def __init__(self):
+        self.regs = bytearray(0x80)
+        self.buffview = memoryview(bytearray(256))
+        self.dio0 = None
+        self.node = 0xfa
+        self.destination = 0xfb
+        self.identifier = 0
+        self.flags = 0
+        self.xmit_timeout = 2.0 / SCALE
+        self._receive_timeout = None
+        self.DEBUG_HEADER = False
+        self.crc_error_count = 0
+        self.ack_delay = None
+        self.seen_ids = bytearray(256)
+        self.tx_done_at = None
+        self.packets = 0
+        self.high_power = True
+
+    @property
+    def receive_timeout(self):
+        return self._receive_timeout
+
+    @receive_timeout.setter
+    def receive_timeout(self, value):
+        self._receive_timeout = None if value is None else value * SCALE
+
+    @staticmethod
+    def airtime(length, sf=8, bw=125000, cr=4):
+        symbol = (1 << sf) / bw
+        n = (8 * length - 4 * sf + 28 + 16 + 4 * sf - 1) // (4 * sf)
+        return (12.25 + 8 + max(n * (cr + 4), 0)) * symbol
+
+    def _read_into(self, address, buf, length=None):
+        length = len(buf) if length is None else length
+        for i in range(length):
+            buf[i] = 0
+        if address == 0x12:
+            if self.tx_done_at is not None and time.monotonic() >= self.tx_done_at:
+                buf[0] = 0x08
+        else:
+            buf[0] = self.regs[address & 0x7F]
+
+    def _write_u8(self, address, val):
+        address &= 0x7F
+        self.regs[address] = val & 0xFF
+        if address == 0x12:
+            self.tx_done_at = None
+        elif address == 0x01 and val & 0x07 == 3:      # TX mode
+            self.packets += 1
+            self.tx_done_at = time.monotonic() + self.airtime(self.regs[0x22]) * SCALE
+
+    def _write_from(self, address, buf, length=None):
+        pass
+
+
+def _lift(names):
+    '''Compiles the named Satellite methods from pysquared.py into a namespace'''
+    path = os.path.join(hw.ROOT, 'pysquared.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == 'Satellite')
+    defs = [n for n in cls.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name in names]
+    namespace = {'asyncio': asyncio, 'time': time, 'traceback': traceback, 'const': lambda x: x,
+                 'digitalio': sys.modules['digitalio'], 'co': lambda s, *a: s}
+    exec(compile(ast.Module(body=defs, type_ignores=[]), path, 'exec'), namespace)
+    return {name: namespace[name] for name in names}
+
+
+class Sat:
+    '''The parts of pysquared.Satellite the normal-power tasks touch'''
+    locals().update(_lift([
+        'debug_print', 'battery_voltage', 'system_voltage', 'charge_voltage', 'current_draw',
+        'charge_current', 'uptime', 'battery_manager', 'average_async', 'power_readings_async',
+        'battery_manager_async', '_manage_battery', 'powermode', 'check_reboot',
+        'heater_on', 'heater_on_async', '_heater_relay_on', 'heater_off']))
+
+    def __init__(self):
+        self.debug = False
+        self.power_mode = 'normal'
+        self.f_fsk = False
+        self.f_brownout = False
+        self.burned = True
+        self.c_boot = 1
+        self.heating = False
+        self.RGB = (0, 0, 0)
+        self.BOOTTIME = time.time()
+        self.NORMAL_BATT_TEMP = 0
+        self.NORMAL_BATTERY_VOLTAGE = 6.9
+        self.CRITICAL_BATTERY_VOLTAGE = 6.6
+        self.hardware = {'PWR': True, 'SOLAR': True, 'IMU': True}
+        self.pwr = PowerMonitor()
+        self.chrg = PowerMonitor()
+        self.radio1 = SimRadio()
+        self.enable_rf = hw.DigitalInOut()
+        self._relayA = hw.DigitalInOut()
+        self.heater = types.SimpleNamespace(duty_cycle=0)
+        self.neopixel = types.SimpleNamespace(brightness=0.2)
+        self.micro = types.SimpleNamespace(cpu=types.SimpleNamespace(temperature=25.0), nvm=bytearray(256))
+        self.IMU = types.SimpleNamespace(mcp=hw.MCP9600(hw.I2C()))
+        self.tca = Big_Data.adafruit_tca9548a.TCA9548A(hw.I2C(), address=0x77)
+
+    def all_faces_on(self):
+        pass
+
+    # SD logs and NVM commits are not modelled
+    def power_log(self, *readings):
+        pass
+
+    def radio_log(self, *record):
+        pass
+
+    def flush_logs(self):
+        pass
+
+    def poll_logs(self):
+        pass
+
+    def commit_nvm(self):
+        pass
+
+
+class Latency:
+    def __init__(self):
+        self.late = {}
+
+    async def sleep(self, name, seconds):
+        due = time.monotonic() + seconds * SCALE
+        await asyncio.sleep(seconds * SCALE)
+        self.late.setdefault(name, []).append(max(0.0, time.monotonic() - due) / SCALE)
+
+
+def task_set(c, f, lat, cooperative):
+    '''main.normal_power_operations, blocking or cooperative, with scaled sleeps'''
+
+    async def check_power():
+        if cooperative:
+            await c.battery_manager_async()
+            await f.battery_heater_async()
+            c.check_reboot()
+            await c.battery_manager_async()
+        else:
+            c.battery_manager()
+            f.battery_heater()
+            c.check_reboot()
+            c.battery_manager()
+        return c.power_mode in ('normal', 'maximum')
+
+    async def s_lora_beacon():
+        while await check_power():
+            if cooperative:
+                await f.beacon_async()
+                await f.listen_async()
+                await f.state_of_health_async()
+                await lat.sleep('beacon', 1)
+            else:
+                f.beacon()
+                f.listen()
+                f.state_of_health()
+                busy(1)     # time.sleep guard time
+            await lat.sleep('beacon', 30)
+
+    async def g_face_data():
+        while await check_power():
+            f.all_face_data()
+            await lat.sleep('g_face_data', 60)
+
+    async def s_face_data():
+        await lat.sleep('s_face_data', 20)
+        while await check_power():
+            if cooperative:
+                await f.send_face_async()
+            else:
+                f.send_face()
+            await lat.sleep('s_face_data', 200)
+
+    async def s_imu_data():
+        await lat.sleep('s_imu_data', 45)
+        while await check_power():
+            for _ in range(2):
+                if cooperative:
+                    await f.send_async('IMU N:1200 W:200 M:0 B:3072 MEAN:0.1,0.2,9.8 RMS:0.1,0.2,9.8')
+                else:
+                    f.send('IMU N:1200 W:200 M:0 B:3072 MEAN:0.1,0.2,9.8 RMS:0.1,0.2,9.8')
+            await lat.sleep('s_imu_data', 100)
+
+    async def joke():
+        await lat.sleep('joke', 500)
+        while await check_power():
+            if cooperative:
+                await f.joke_async()
+            else:
+                f.joke()
+            await lat.sleep('joke', 500)
+
+    async def periodic(name, rate):
+        while True:
+            await lat.sleep(name, 1.0 / rate)
+
+    return [s_lora_beacon(), g_face_data(), s_face_data(), s_imu_data(), joke(),
+            periodic('imu 20 Hz', 20), periodic('attitude 10 Hz', 10)]
+
+
+async def run(cooperative, mission):
+    c = Sat()
+    f = functions.functions(c)
+    lat = Latency()
+    tasks = [asyncio.ensure_future(t) for t in task_set(c, f, lat, cooperative)]
+    await asyncio.sleep(mission * SCALE)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return lat.late, c.radio1.packets
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def report(name, late, packets):
+    print('\n{} ({} packets sent)'.format(name, packets))
+    print('{:>16} {:>7} {:>10} {:>10} {:>10}'.format('task', 'wakeups', 'mean ms', 'p95 ms', 'max ms'))
+    for task in sorted(late):
+        v = late[task]
+        print('{:>16} {:>7} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+            task, len(v), 1000 * sum(v) / len(v), 1000 * percentile(v, 0.95), 1000 * max(v)))
+
+
+def main():
+    mission = float(sys.argv[1]) if len(sys.argv) > 1 else MISSION
+    print('{:.0f} s of mission time per run, compressed {:.0f}x'.format(mission, 1 / SCALE))
+    for name, cooperative in (('blocking', False), ('cooperative', True)):
+        late, packets = asyncio.run(run(cooperative, mission))
+        report(name, late, packets)
+
+
+if __name__ == '__main__':
+    main()
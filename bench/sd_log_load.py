@@ -0,0 +1,151 @@
+'''
+Host benchmark: SD card writes per mission hour, per-message appends (the
+old Satellite.log / Face_log) vs sd_logger.SDLogger.
+
+Workload: face data (one record per face, FACES faces) every FACE_S seconds
+and an error/status record every ERROR_S seconds, on a simulated clock. Files
+go to a temporary directory; every open() and write() on them is counted.
+
+    python bench/sd_log_load.py [hours]
+'''
+import builtins
+import os
+import sys
+import tempfile
+import time
+
+import hw
+hw.install()
+
+import sd_logger
+
+FACES = 5
+FACE_S = 10
+ERROR_S = 60
+FACE = [12.5, 0.113, 24.0, 3, 55]
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self):
+        return self.t
+
+    def monotonic_ns(self):
+        return int(self.t * 1000000000)
+
+
+class Counter:
+    '''Counts opens and writes of files under root'''
+
+    def __init__(self, root):
+        self.root = root
+        self.opens = 0
+        self.writes = 0
+        self._open = builtins.open
+
+    def __enter__(self):
+        counter = self
+
+        class _File:
+            def __init__(self, f):
+                self.f = f
+
+            def write(self, data):
+                counter.writes += 1
+                return self.f.write(data)
+
+            def __enter__(self):
+                return self
+
+            def close(self):
+                self.f.close()
+
+            def __exit__(self, *exc):
+                self.f.close()
+
+        def _counting_open(path, mode='r', *args, **kwargs):
+            f = counter._open(path, mode, *args, **kwargs)
+            if str(path).startswith(counter.root) and ('a' in mode or 'w' in mode):
+                counter.opens += 1
+                return _File(f)
+            return f
+
+        builtins.open = _counting_open
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open = self._open
+
+
+class Satellite:
+    def __init__(self, root):
+        self.root = root
+        self.hardware = {'SDcard': True}
+        self.n = 0
+
+    def new_file(self, substring):
+        path = os.path.join(self.root, '{}{:05}.txt'.format(substring.strip('/').replace('/', '_'), self.n))
+        self.n += 1
+        open(path, 'a').close()
+        return path
+
+
+def per_message(root, clock, seconds):
+    logfile = os.path.join(root, 'log.txt')
+    facefile = os.path.join(root, 'FaceData.txt')
+    for t in range(seconds):
+        clock.t = t
+        if t % FACE_S == 0:
+            with open(facefile, "a+") as f:
+                for i in range(FACES):
+                    f.write('{}, {}\n'.format(int(clock.t), FACE))
+        if t % ERROR_S == 0:
+            with open(logfile, "a+") as f:
+                f.write('{}, {}\n'.format(int(clock.t), 'Power mode normal, vbatt 7.41V'))
+
+
+def buffered(root, clock, seconds):
+    sat = Satellite(root)
+    error_log = sd_logger.SDLogger(sat, '/error/LOG_', buffer_size=2048, flush_bytes=1024)
+    face_log = sd_logger.SDLogger(sat, '/data/FACE_')
+    for t in range(seconds):
+        clock.t = t
+        if t % FACE_S == 0:
+            for i in range(FACES):
+                face_log.write(FACE)
+        if t % ERROR_S == 0:
+            error_log.write('Power mode normal, vbatt 7.41V')
+        if t % 20 == 0:
+            # PowerState.check
+            error_log.poll()
+            face_log.poll()
+    error_log.flush()
+    face_log.flush()
+    return error_log, face_log
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 24
+    seconds = int(hours * 3600)
+    clock = Clock()
+    sd_logger.time = clock
+    print('{:.0f} h, {} faces every {} s, one status record every {} s'.format(hours, FACES, FACE_S, ERROR_S))
+    print('{:>12} {:>10} {:>10} {:>12} {:>12}'.format('', 'opens/h', 'writes/h', 'bytes/write', 'host s'))
+    for name in ('per-message', 'buffered'):
+        with tempfile.TemporaryDirectory() as root:
+            start = time.perf_counter()
+            with Counter(root) as c:
+                logs = per_message(root, clock, seconds) if name == 'per-message' else buffered(root, clock, seconds)
+            host = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(root, n)) for n in os.listdir(root))
+            print('{:>12} {:>10.1f} {:>10.1f} {:>12.0f} {:>12.3f}'.format(
+                name, c.opens / hours, c.writes / hours, size / max(1, c.writes), host))
+            if logs:
+                for log in logs:
+                    print('    ' + log.stats)
+
+
+if __name__ == '__main__':
+    main()
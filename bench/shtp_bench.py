@@ -0,0 +1,150 @@
+'''
+Host benchmark: BNO08x I2C reads per IMU sample.
+
+A simulated BNO08x sits on the fake bus and replays an SHTP packet stream:
+each control step the sensor queues PER_STEP input-report batches (base
+timestamp + accelerometer + gyroscope + magnetometer). The stream is
+generated here, or read from a capture file of raw SHTP packets as read off
+the bus (4 byte header + cargo, back to back).
+
+Compares the old PAYLOAD access pattern, where every property drains the
+packet stream on its own, against PAYLOAD.snapshot() draining it once.
+
+    python bench/shtp_bench.py [capture.bin]
+'''
+import struct
+import sys
+
+import hw
+hw.install()
+
+import payload
+
+BNO_ADDRESS = 0x4A
+STEPS = 200
+PER_STEP = (0, 1, 4)
+DATA = ["acceleration", "gyroscope", "magnetometer"]
+
+
+class ShtpSensor:
+    '''
+    Answers the driver's control requests and serves queued packets. A packet
+    stays at the head of the queue until one read covers all of it, which is
+    what the driver's header-then-packet read sequence assumes.
+    '''
+
+    def __init__(self):
+        self.queue = []
+        self.seq = [0] * 6
+
+    def push(self, channel, cargo):
+        packet = bytearray(4) + bytes(cargo)
+        struct.pack_into('<HBB', packet, 0, len(packet), channel, self.seq[channel])
+        self.seq[channel] = (self.seq[channel] + 1) & 0xFF
+        self.queue.append(packet)
+
+    def read(self, view):
+        if not self.queue:
+            view[:] = bytes(len(view))
+            return
+        packet = self.queue[0]
+        n = min(len(view), len(packet))
+        view[:n] = packet[:n]
+        if len(view) >= len(packet):
+            self.queue.pop(0)
+
+    def write(self, view):
+        if len(view) < 5 or view[2] != 2:
+            return
+        if view[4] == 0xF9:     # product id request
+            cargo = bytearray(16)
+            struct.pack_into('<BBBBIIH', cargo, 0, 0xF8, 0, 3, 2, 10004135, 7, 0)
+            self.push(2, cargo)
+        elif view[4] == 0xFD:   # set feature -> get feature response
+            cargo = bytearray(17)
+            cargo[0] = 0xFC
+            cargo[1] = view[5]
+            self.push(2, cargo)
+
+
+def record(packets, seed=7):
+    '''Synthetic capture: input-report batches on channel 3'''
+    out = []
+    seq = 0
+    for i in range(packets):
+        cargo = bytearray(struct.pack('<Bi', 0xFB, 120 + i % 7))
+        for report, value in ((0x01, 9.81), (0x02, 0.05), (0x03, 42.0)):
+            q = (8, 9, 4)[report - 1]
+            delay = 10 * report
+            raw = int(value * (1 << q)) + (i * seed + report) % 13
+            cargo += struct.pack('<BBBBhhh', report, i & 0xFF, 3 | (delay >> 8) << 2, delay & 0xFF,
+                                 raw, -raw // 2, raw // 3)
+        header = struct.pack('<HBB', len(cargo) + 4, 3, seq)
+        seq = (seq + 1) & 0xFF
+        out.append(header + cargo)
+    return out
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    out = []
+    i = 0
+    while i + 4 <= len(raw):
+        n = struct.unpack_from('<H', raw, i)[0] & 0x7FFF
+        if n < 4:
+            break
+        out.append(raw[i:i + n])
+        i += n
+    return out
+
+
+def legacy(imu):
+    # What the properties did before snapshot(): one stream drain per property
+    return [imu.bno.acceleration, imu.bno.gyro, imu.bno.magnetic]
+
+
+def snapshot(imu):
+    # functions.get_imu_data(): one drain, properties served from memory
+    imu.snapshot(max_age=0)
+    return [imu.Acceleration, imu.Gyroscope, imu.Magnetometer]
+
+
+def cached(imu):
+    # Further reads in the same control step, inside max_age
+    return [imu.Acceleration, imu.Gyroscope, imu.Magnetometer]
+
+
+def run(imu, sensor, stream, per_step, samples):
+    hw.bus.reset()
+    k = 0
+    for _ in range(STEPS):
+        for _ in range(per_step):
+            sensor.queue.append(stream[k % len(stream)])
+            k += 1
+        for sample in samples:
+            sample(imu)
+    return hw.bus.reads / STEPS, hw.bus.read_bytes / STEPS
+
+
+def main():
+    stream = load(sys.argv[1]) if len(sys.argv) > 1 else record(64)
+    sensor = ShtpSensor()
+    hw.devices[BNO_ADDRESS] = sensor
+    print('bringing up simulated BNO08x...')
+    imu = payload.PAYLOAD(False, hw.I2C(), list(DATA))
+    imu.Enable(imu.data)
+    print('{} packets in stream, {} steps'.format(len(stream), STEPS))
+    print('batches/step  samples/step  legacy reads (bytes)  snapshot reads (bytes)')
+    for per_step in PER_STEP:
+        for reads in (1, 2):
+            lr, lb = run(imu, sensor, stream, per_step, [legacy] * reads)
+            sr, sb = run(imu, sensor, stream, per_step, [snapshot] + [cached] * (reads - 1))
+            print('{:>12}  {:>12}  {:>10.1f} ({:>6.1f})  {:>12.1f} ({:>6.1f})'.format(
+                per_step, reads, lr, lb, sr, sb))
+    for name, (value, stamp) in imu.snapshot(max_age=0).items():
+        print('{:<13} {} @ {} ns'.format(name, tuple(round(v, 3) for v in value), stamp))
+
+
+if __name__ == '__main__':
+    main()
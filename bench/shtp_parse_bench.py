@@ -0,0 +1,104 @@
+'''
+Host benchmark: SHTP decode throughput and heap use, old parser vs in-place.
+
+Replays the shtp_bench packet stream (generated, or a raw capture file)
+through the decoder of a BNO08x brought up on the simulated bus. Each packet
+is placed in the driver's receive buffer as a bus read would leave it, so
+only decoding is measured. "packet objects" is the original path: header
+namedtuple, Packet with a copied payload, _separate_batch slices and a tuple
+per report from _parse_sensor_report_data. "in place" is the path update()
+now takes, decoding straight out of the receive buffer into the
+preallocated per-report slots.
+
+Heap numbers are CPython tracemalloc peaks above the baseline per packet, a
+stand-in for what the MicroPython heap sees. CPython boxes every int and
+float, so the in-place residue is mostly that plus the per-packet
+monotonic_ns() timestamp.
+
+    python bench/shtp_parse_bench.py [capture.bin]
+'''
+import sys
+import time
+import tracemalloc
+
+import hw
+hw.install()
+
+import adafruit_bno08x
+from adafruit_bno08x.i2c import BNO08X_I2C
+import shtp_bench
+
+PACKETS = 3000
+
+
+def packet_objects(bno, readings, n):
+    adafruit_bno08x.Packet.header_from_buffer(bno._data_buffer)
+    packet = adafruit_bno08x.Packet(bno._data_buffer)
+    slices = []
+    adafruit_bno08x._separate_batch(packet, slices)
+    while slices:
+        report_id, report_bytes = slices.pop()
+        if report_id < 0xF0:
+            readings[report_id] = adafruit_bno08x._parse_sensor_report_data(report_bytes)[0]
+
+
+def in_place(bno, readings, n):
+    bno._handle_buffer(n)
+
+
+def reports_in(stream):
+    n = 0
+    for packet in stream:
+        i = 4
+        while i < len(packet):
+            n += 1
+            i += adafruit_bno08x._report_length(packet[i])
+    return n
+
+
+def receive(bno, packet):
+    bno._data_buffer[:len(packet)] = packet
+    return len(packet)
+
+
+def measure(name, bno, stream, decode):
+    readings = {}
+    elapsed = 0
+    for i in range(PACKETS):
+        n = receive(bno, stream[i % len(stream)])
+        t0 = time.perf_counter()
+        decode(bno, readings, n)
+        elapsed += time.perf_counter() - t0
+    peak = 0
+    tracemalloc.start()
+    for i in range(PACKETS):
+        n = receive(bno, stream[i % len(stream)])
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        decode(bno, readings, n)
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    reports = reports_in(stream) * PACKETS / len(stream)
+    print('{:>14}: {:8.0f} reports/s, {:6.1f} heap bytes peak/packet'.format(
+        name, reports / elapsed, peak / PACKETS))
+
+
+def main():
+    stream = shtp_bench.load(sys.argv[1]) if len(sys.argv) > 1 else shtp_bench.record(64)
+    sensor = shtp_bench.ShtpSensor()
+    hw.devices[shtp_bench.BNO_ADDRESS] = sensor
+    print('bringing up simulated BNO08x...')
+    bno = BNO08X_I2C(hw.I2C())
+    for report in (adafruit_bno08x.BNO_REPORT_ACCELEROMETER, adafruit_bno08x.BNO_REPORT_GYROSCOPE,
+                   adafruit_bno08x.BNO_REPORT_MAGNETOMETER):
+        bno.enable_feature(report)
+    print('{} packets/run, {} reports per packet'.format(PACKETS, reports_in(stream) / len(stream)))
+    measure('packet objects', bno, stream, packet_objects)
+    measure('in place', bno, stream, in_place)
+    print('acceleration {} gyro {} magnetic {}'.format(*(bno.reading(r)[0] for r in (
+        adafruit_bno08x.BNO_REPORT_ACCELEROMETER, adafruit_bno08x.BNO_REPORT_GYROSCOPE,
+        adafruit_bno08x.BNO_REPORT_MAGNETOMETER))))
+
+
+if __name__ == '__main__':
+    main()
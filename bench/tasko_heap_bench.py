@@ -0,0 +1,96 @@
+'''
+Host benchmark: tasko.Loop step cost with thousands of tasks.
+
+Two loads under a fake clock installed with tasko.loop.set_time_provider.
+The loop's idle sleep jumps the clock to the next due sleeper, so every task
+hits its rate exactly and the time measured is all scheduler and task
+overhead:
+
+    scheduled: 2000 fixed rate tasks at 1..50 Hz for 2 s of loop time
+    sleepers:  5000 long sleepers under ten 100 Hz tasks. Only due sleepers
+               are touched per step; a loop that scans the sleeping list
+               pays for all of them on every step
+
+lib/tasko/test/test_loop_heap.py checks the same loads for correctness.
+
+    python bench/tasko_heap_bench.py
+'''
+import time
+
+import hw
+hw.install()
+
+from tasko import loop as loop_module
+from tasko.loop import set_time_provider
+from tasko import Loop
+
+LOOP_TIME = 2000000000      # ns of loop time per load
+
+
+class FakeClock:
+    '''Time provider whose sleep() just moves the clock, standing in for the time module'''
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += int(seconds * 1000000000)
+
+
+def _run(loop, clock):
+    start = time.perf_counter()
+    steps = 0
+    while clock.now <= LOOP_TIME:
+        loop._step()
+        steps += 1
+    return steps, time.perf_counter() - start
+
+
+def scheduled(clock, tasks=2000):
+    rates = (1, 2, 4, 5, 8, 10, 20, 25, 40, 50)
+    counters = [0] * tasks
+    loop = Loop()
+
+    async def f(i):
+        counters[i] += 1
+
+    for i in range(tasks):
+        loop.schedule(rates[i % len(rates)], f, i % 4, i)
+    steps, elapsed = _run(loop, clock)
+    runs = sum(counters)
+    print('{} tasks, {} steps, {} runs in {:.3f}s ({:.1f} us/run)'.format(
+        tasks, steps, runs, elapsed, 1e6 * elapsed / runs))
+
+
+def sleepers(clock, count=5000):
+    loop = Loop()
+
+    async def fast():
+        pass
+
+    for i in range(count):
+        loop.run_later(0.1 + i * 0.0001, loop.sleep(100), 1)
+    for _ in range(10):
+        loop.schedule(100, fast, 0)
+    steps, elapsed = _run(loop, clock)
+    print('{} sleepers, {} steps in {:.3f}s ({:.1f} us/step)'.format(
+        count, steps, elapsed, 1e6 * elapsed / steps))
+
+
+def main():
+    for load in (scheduled, sleepers):
+        clock = FakeClock()
+        set_time_provider(clock)
+        loop_module.time = clock
+        try:
+            load(clock)
+        finally:
+            set_time_provider(time.monotonic_ns)
+            loop_module.time = time
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+'''
+Host benchmark: TCA9548A channel-select writes per face poll.
+
+Polls all faces through the stock per-transaction channel select and
+through tca_scheduler.TCAScheduler, then prints the per-channel stats.
+
+    python bench/tca_bench.py
+'''
+import hw
+hw.install()
+
+import Big_Data
+import tca_scheduler
+
+CYCLES = 100
+# Bus time per transaction at 100 kHz: address + register + 2 data bytes ~ 0.4 ms,
+# a channel-select write (address + 1 byte) ~ 0.2 ms
+MUX_WRITE_MS = 0.2
+
+
+def measure(name, tca):
+    faces = Big_Data.AllFaces(False, tca)
+    sample = Big_Data.FaceSample()
+    hw.bus.reset()
+    for _ in range(CYCLES):
+        faces.Face_Sample(sample)
+    mux = hw.bus.mux / CYCLES
+    print('{:>13}: {:5.1f} mux writes/cycle, {:5.1f} sensor reads/cycle, ~{:.1f} ms of mux traffic/cycle'.format(
+        name, mux, hw.bus.reads / CYCLES, mux * MUX_WRITE_MS))
+    return faces
+
+
+def main():
+    measure('TCA9548A', hw.TCA9548A(hw.I2C(), address=0x77))
+    tca = tca_scheduler.TCAScheduler(hw.I2C(), address=0x77)
+    measure('TCAScheduler', tca)
+    tca.print_stats()
+
+
+if __name__ == '__main__':
+    main()
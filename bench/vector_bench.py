@@ -0,0 +1,75 @@
+'''
+Host benchmark: cost per call of the vector module against the list-based
+math the detumble code used before (list comprehension dot product, new list
+per cross product, pow(x, 0.5) for the norm).
+
+CPython numbers only rank the variants; flight timings need the same loops
+run on the board.
+
+    python bench/vector_bench.py
+'''
+import time
+import tracemalloc
+
+import hw
+hw.install()
+
+import vector
+
+N = 20000
+
+
+def legacy_dot(v1, v2):
+    return sum([a*b for a, b in zip(v1, v2)])
+
+
+def legacy_cross(v1, v2):
+    return [v1[1]*v2[2]-v1[2]*v2[1], v1[0]*v2[2]-v1[2]*v2[0], v1[0]*v2[1]-v1[1]*v2[0]]
+
+
+def legacy_dipole(b, w):
+    k = -1.0/pow(legacy_dot(b, b), 0.5)
+    out = legacy_cross(b, w)
+    for i in range(3):
+        out[i] *= k
+    return out
+
+
+def bench(name, fn):
+    fn()
+    t0 = time.perf_counter_ns()
+    for _ in range(N):
+        fn()
+    ns = (time.perf_counter_ns() - t0) / N
+    tracemalloc.start()
+    for _ in range(100):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print('{:>20}: {:7.0f} ns/call, {:4d} bytes transient heap'.format(name, ns, peak))
+
+
+def main():
+    a = vector.vec(21.0, -13.5, 40.2)
+    b = vector.vec(0.1, 0.02, -0.3)
+    out = vector.vec()
+    fa, fb, fo = vector.fx_vec(), vector.fx_vec(), vector.fx_vec()
+    vector.to_fx((1.5, -2.25, 3.0), fa)
+    vector.to_fx((0.5, 0.75, -1.0), fb)
+    bench('legacy dot', lambda: legacy_dot(a, b))
+    bench('vector.dot', lambda: vector.dot(a, b))
+    bench('legacy cross', lambda: legacy_cross(a, b))
+    bench('vector.cross', lambda: vector.cross(a, b, out))
+    bench('vector.norm', lambda: vector.norm(a))
+    bench('vector.matvec', lambda: vector.matvec((1, 0, 0, 0, 1, 0, 0, 0, 1), a, out))
+    bench('vector.fx_cross', lambda: vector.fx_cross(fa, fb, fo))
+    bench('vector.fx_norm', lambda: vector.fx_norm(fa))
+    bench('legacy dipole', lambda: legacy_dipole(a, b))
+    import detumble
+    bench('detumble dipole', lambda: detumble.magnetorquer_dipole(a, b))
+
+
+if __name__ == '__main__':
+    main()
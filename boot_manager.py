@@ -0,0 +1,137 @@
+'''
+Hardware bring-up at boot, timed per device.
+
+Satellite.__init__ brings up the devices the first beacon needs with start()
+and registers the rest with defer(): they come up the first time one of their
+attributes is read (Satellite.__getattr__ calls resolve()), so their init cost
+moves out of the reset-to-beacon path. A device whose init fails is not retried
+and its attributes stay missing, as when a boot-time init failed.
+
+Fixed power-up sleeps are replaced by wait_ready() polling a readiness probe
+(i2c_ready() for devices that only need to answer on the bus) up to a timeout.
+
+Every init and mark() is kept in profile as (name, stage, ms, ok); stage is
+'boot', 'lazy' or 'mark'. Marks hold the ms since code.py installed the
+import profiler (since the manager started without one).
+save() appends report() to the SD card, one line per boot:
+    boot 12 imports:2210ms/61K top:adafruit_bno08x=240,... init@2290 FLD:14
+    SDcard:61 Neopixel:2 PWR:3 SOLAR:3 Radio1:1032 beacon@4410 deferred:IMU,LiDAR,TCA
+with the import_profiler summary, the init ms of each device (~ before lazy
+ones, ! after failed ones) and name@ms for marks.
+'''
+import time
+import traceback
+import import_profiler
+from debugcolor import co
+
+PROFILE_PATH = '/sd/boot_profile.txt'
+
+class BootManager:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[BOOT]" + statement, 'orange', 'bold'))
+
+    def __init__(self, path=PROFILE_PATH, debug=False):
+        self.debug = debug
+        self.path = path
+        # Marks count from code.py when it installed the import profiler
+        self.started = import_profiler.started()
+        if self.started is None:
+            self.started = time.monotonic_ns()
+        self.profile = []
+        self.deferred = {}      # attribute -> device name
+        self.inits = {}         # device name -> init function
+
+    def start(self, name, init, stage='boot'):
+        '''Runs init() now and records its time; returns False if it raised'''
+        t = time.monotonic_ns()
+        ok = True
+        try:
+            init()
+        except Exception as e:
+            ok = False
+            self.debug_print('[ERROR][{}]'.format(name) + ''.join(traceback.format_exception(e)))
+        ms = (time.monotonic_ns() - t) / 1000000
+        self.profile.append((name, stage, ms, ok))
+        self.debug_print('{} {} in {:.1f} ms'.format(name, 'up' if ok else 'FAILED', ms))
+        return ok
+
+    def defer(self, name, attrs, init):
+        '''Brings up device name the first time one of attrs is looked up'''
+        self.inits[name] = init
+        for attr in attrs:
+            self.deferred[attr] = name
+
+    def resolve(self, name):
+        '''
+        Starts the deferred device owning attribute name. Returns False when
+        name is not deferred (or its device was already started)
+        '''
+        device = self.deferred.get(name)
+        if device is None:
+            return False
+        for attr in [a for a, d in self.deferred.items() if d == device]:
+            del self.deferred[attr]
+        self.start(device, self.inits.pop(device), 'lazy')
+        return True
+
+    def pending(self):
+        return sorted(set(self.deferred.values()))
+
+    def mark(self, name):
+        '''Records ms since boot for a milestone (e.g. the first beacon)'''
+        self.profile.append((name, 'mark', (time.monotonic_ns() - self.started) / 1000000, True))
+
+    def wait_ready(self, probe, timeout=1, period=0.002):
+        '''Polls probe() until it returns True, at most timeout seconds; returns the last result'''
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if probe():
+                    return True
+            except Exception:
+                pass
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(period)
+
+    def wait_until(self, t):
+        '''Sleeps until time.monotonic() reaches t (a minimum hold time started earlier)'''
+        remaining = t - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def report(self):
+        imports = import_profiler.active
+        parts = [imports.summary()] if imports is not None else []
+        for name, stage, ms, ok in self.profile:
+            if stage == 'mark':
+                parts.append('{}@{:.0f}'.format(name, ms))
+            else:
+                parts.append('{}{}:{:.0f}{}'.format('~' if stage == 'lazy' else '', name, ms, '' if ok else '!'))
+        if self.deferred:
+            parts.append('deferred:' + ','.join(self.pending()))
+        return ' '.join(parts)
+
+    def save(self, header=''):
+        '''Appends header and report() as one line to path'''
+        line = (header + ' ' if header else '') + self.report()
+        self.debug_print(line)
+        try:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+        except Exception as e:
+            self.debug_print('Error saving the boot profile: ' + ''.join(traceback.format_exception(e)))
+
+def i2c_ready(i2c, address):
+    '''True when the device at address ACKs an empty write'''
+    if not i2c.try_lock():
+        return False
+    try:
+        i2c.writeto(address, b'')
+        return True
+    except OSError:
+        return False
+    finally:
+        i2c.unlock()
@@ -0,0 +1,380 @@
+'''
+IMU calibration for Yearling.
+Magnetometer: hard iron offset b and soft iron matrix S, m_cal = S (m - b).
+Gyro: constant bias, g_cal = g - bias.
+
+The magnetometer fit is linear least squares on the ellipsoid
+(m - b)^T M (m - b) = |B|^2 with M = S^T S, accumulated as normal equations
+one sample at a time, so the same code runs incrementally on board and in
+batch on the ground (bench/mag_cal_fit.py). |B| is either the nominal
+`field` (ground, fixed location) or the model field magnitude given with
+each sample (in orbit, where |B| changes by a factor of two over the orbit).
+'sphere' fits only b and a scale, 'ellipsoid' the full symmetric S.
+
+Coefficients persist to /sd/cal/imu.bin and to NVM as one CRC checked
+record. load() tries SD first and falls back to NVM, save() writes both.
+Applying a calibration is a dozen multiply-adds per sample.
+'''
+import struct
+import binascii
+import traceback
+from math import sqrt
+from array import array
+from micropython import const
+from debugcolor import co
+
+SD_PATH = '/sd/cal/imu.bin'
+NVM_OFFSET = const(64)         # after the pysquared counters and flags
+_MAGIC = b'ICAL'
+_VERSION = const(1)
+# magic, version, samples used, mag offset (3), soft iron row major (9), gyro bias (3)
+_FORMAT = '<4sBH15f'
+_SIZE = struct.calcsize(_FORMAT)
+RECORD_SIZE = _SIZE + 4        # + crc32
+
+def _debug_print(debug, statement):
+    if debug:
+        print(co("[CAL]" + statement, 'teal', 'bold'))
+
+class Calibration:
+    '''Calibration coefficients and the per-sample correction'''
+
+    def __init__(self):
+        self.mag_offset = array('f', [0.0, 0.0, 0.0])
+        self.soft_iron = array('f', [1.0, 0.0, 0.0,
+                                     0.0, 1.0, 0.0,
+                                     0.0, 0.0, 1.0])
+        self.gyro_bias = array('f', [0.0, 0.0, 0.0])
+        self.samples = 0
+        self.source = None
+
+    def mag(self, v, out=None):
+        '''S (v - b). Returns a tuple, or fills out when given'''
+        s = self.soft_iron
+        x = v[0] - self.mag_offset[0]
+        y = v[1] - self.mag_offset[1]
+        z = v[2] - self.mag_offset[2]
+        cx = s[0]*x + s[1]*y + s[2]*z
+        cy = s[3]*x + s[4]*y + s[5]*z
+        cz = s[6]*x + s[7]*y + s[8]*z
+        if out is None:
+            return (cx, cy, cz)
+        out[0] = cx
+        out[1] = cy
+        out[2] = cz
+        return out
+
+    def gyro(self, v, out=None):
+        '''v - bias. Returns a tuple, or fills out when given'''
+        b = self.gyro_bias
+        if out is None:
+            return (v[0] - b[0], v[1] - b[1], v[2] - b[2])
+        out[0] = v[0] - b[0]
+        out[1] = v[1] - b[1]
+        out[2] = v[2] - b[2]
+        return out
+
+    def pack(self):
+        data = struct.pack(_FORMAT, _MAGIC, _VERSION, min(self.samples, 0xFFFF),
+                           *(list(self.mag_offset) + list(self.soft_iron) + list(self.gyro_bias)))
+        return data + struct.pack('<I', binascii.crc32(data) & 0xFFFFFFFF)
+
+    @classmethod
+    def unpack(cls, record):
+        '''Calibration from a packed record, None if it is short, foreign or corrupt'''
+        if record is None or len(record) < RECORD_SIZE:
+            return None
+        data = bytes(record[:_SIZE])
+        crc = struct.unpack('<I', bytes(record[_SIZE:RECORD_SIZE]))[0]
+        if binascii.crc32(data) & 0xFFFFFFFF != crc:
+            return None
+        fields = struct.unpack(_FORMAT, data)
+        if fields[0] != _MAGIC or fields[1] != _VERSION:
+            return None
+        cal = cls()
+        cal.samples = fields[2]
+        for i in range(3):
+            cal.mag_offset[i] = fields[3 + i]
+            cal.gyro_bias[i] = fields[15 + i]
+        for i in range(9):
+            cal.soft_iron[i] = fields[6 + i]
+        return cal
+
+    def save(self, nvm=None, path=SD_PATH, debug=False):
+        '''Writes the record to SD (path) and NVM. Returns the number of copies written'''
+        record = self.pack()
+        written = 0
+        if path is not None:
+            try:
+                import os
+                folder = path[:path.rfind('/')]
+                try:
+                    os.mkdir(folder)
+                except OSError:
+                    pass
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(record)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                os.rename(path + '.tmp', path)
+                written += 1
+            except Exception as e:
+                _debug_print(debug, "SD save error: " + ''.join(traceback.format_exception(e)))
+        if nvm is not None:
+            try:
+                if bytes(nvm[NVM_OFFSET:NVM_OFFSET + RECORD_SIZE]) != record:
+                    nvm[NVM_OFFSET:NVM_OFFSET + RECORD_SIZE] = record
+                written += 1
+            except Exception as e:
+                _debug_print(debug, "NVM save error: " + ''.join(traceback.format_exception(e)))
+        return written
+
+    @property
+    def telemetry(self):
+        return "CAL {} N:{} B:{:.2f},{:.2f},{:.2f} S:{:.3f},{:.3f},{:.3f} G:{:.4f},{:.4f},{:.4f}".format(
+            self.source, self.samples, self.mag_offset[0], self.mag_offset[1], self.mag_offset[2],
+            self.soft_iron[0], self.soft_iron[4], self.soft_iron[8],
+            self.gyro_bias[0], self.gyro_bias[1], self.gyro_bias[2])
+
+def load(nvm=None, path=SD_PATH, debug=False):
+    '''Stored calibration from SD, else NVM, else None'''
+    if path is not None:
+        try:
+            with open(path, 'rb') as f:
+                cal = Calibration.unpack(f.read(RECORD_SIZE))
+            if cal is not None:
+                cal.source = 'sd'
+                _debug_print(debug, "Loaded " + cal.telemetry)
+                return cal
+        except OSError:
+            pass
+    if nvm is not None:
+        try:
+            cal = Calibration.unpack(nvm[NVM_OFFSET:NVM_OFFSET + RECORD_SIZE])
+            if cal is not None:
+                cal.source = 'nvm'
+                _debug_print(debug, "Loaded " + cal.telemetry)
+                return cal
+        except Exception as e:
+            _debug_print(debug, "NVM load error: " + ''.join(traceback.format_exception(e)))
+    _debug_print(debug, "No stored calibration")
+    return None
+
+def _solve(a, y, n):
+    '''Solves the n x n system a x = y (a row major, both copied) by Gauss-Jordan with partial pivoting'''
+    m = [[a[r*n + c] for c in range(n)] + [y[r]] for r in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        if abs(m[pivot][col]) < 1e-12:
+            return None
+        m[col], m[pivot] = m[pivot], m[col]
+        p = m[col][col]
+        for c in range(col, n + 1):
+            m[col][c] /= p
+        for r in range(n):
+            if r != col and m[r][col] != 0:
+                k = m[r][col]
+                for c in range(col, n + 1):
+                    m[r][c] -= k * m[col][c]
+    return [m[r][n] for r in range(n)]
+
+def _sym_sqrt(m):
+    '''Square root of a symmetric positive definite 3x3 matrix (nested lists) via Jacobi rotations'''
+    a = [row[:] for row in m]
+    v = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    for _ in range(50):
+        off = a[0][1]**2 + a[0][2]**2 + a[1][2]**2
+        if off < 1e-20:
+            break
+        for p, q in ((0, 1), (0, 2), (1, 2)):
+            if abs(a[p][q]) < 1e-30:
+                continue
+            theta = (a[q][q] - a[p][p]) / (2 * a[p][q])
+            t = (1 if theta >= 0 else -1) / (abs(theta) + sqrt(theta*theta + 1))
+            c = 1 / sqrt(t*t + 1)
+            s = t * c
+            for k in range(3):
+                akp = a[k][p]
+                akq = a[k][q]
+                a[k][p] = c*akp - s*akq
+                a[k][q] = s*akp + c*akq
+            for k in range(3):
+                apk = a[p][k]
+                aqk = a[q][k]
+                a[p][k] = c*apk - s*aqk
+                a[q][k] = s*apk + c*aqk
+            for k in range(3):
+                vkp = v[k][p]
+                vkq = v[k][q]
+                v[k][p] = c*vkp - s*vkq
+                v[k][q] = s*vkp + c*vkq
+    if min(a[0][0], a[1][1], a[2][2]) <= 0:
+        return None
+    d = [sqrt(a[i][i]) for i in range(3)]
+    return [[sum(v[i][k] * d[k] * v[j][k] for k in range(3)) for j in range(3)] for i in range(3)]
+
+class MagFit:
+    '''
+    Incremental least-squares magnetometer fit. add() costs one normal
+    equation update (15 multiply-adds for 'sphere', 55 for 'ellipsoid') and
+    does not allocate; solve() runs only when a result is wanted.
+    '''
+
+    def __init__(self, mode='ellipsoid', field=50.0, model_field=False):
+        '''
+        mode:        'sphere' (hard iron + scale) or 'ellipsoid' (hard + soft iron)
+        field:       nominal field magnitude (uT); also scales the sums to order 1
+        model_field: every add() passes the model |B| for that sample
+        '''
+        self.mode = mode
+        self.field = field
+        self.model_field = model_field
+        # sphere:    |m|^2 = 2 b.m + c (+ d |B|^2 with model_field)
+        # ellipsoid: m^T M m + 2 g.m (+ c) = 1 (|B|^2 with model_field)
+        # With a constant |B| the extra column would be collinear with the target
+        if mode == 'sphere':
+            self.n = 5 if model_field else 4
+        else:
+            self.n = 10 if model_field else 9
+        self.ata = array('f', [0.0] * (self.n * self.n))
+        self.aty = array('f', [0.0] * self.n)
+        self._row = array('f', [0.0] * self.n)
+        self.count = 0
+
+    def reset(self):
+        for i in range(len(self.ata)):
+            self.ata[i] = 0.0
+        for i in range(self.n):
+            self.aty[i] = 0.0
+        self.count = 0
+
+    def add(self, m, field=None):
+        '''Adds one raw sample m (uT). field is the model |B| at that sample, if known'''
+        k = 1.0 / self.field
+        x = m[0] * k
+        y = m[1] * k
+        z = m[2] * k
+        f = field * k if self.model_field else 1.0
+        r = self._row
+        if self.mode == 'sphere':
+            r[0] = x
+            r[1] = y
+            r[2] = z
+            r[3] = 1.0
+            if self.model_field:
+                r[4] = f*f
+            target = x*x + y*y + z*z
+        else:
+            r[0] = x*x
+            r[1] = y*y
+            r[2] = z*z
+            r[3] = 2*x*y
+            r[4] = 2*x*z
+            r[5] = 2*y*z
+            r[6] = 2*x
+            r[7] = 2*y
+            r[8] = 2*z
+            if self.model_field:
+                r[9] = 1.0
+            target = f*f
+        n = self.n
+        ata = self.ata
+        for i in range(n):
+            ri = r[i]
+            base = i * n
+            for j in range(i, n):
+                ata[base + j] += ri * r[j]
+            self.aty[i] += ri * target
+        self.count += 1
+
+    def solve(self, cal=None):
+        '''
+        Fits and writes mag_offset/soft_iron into cal (a new Calibration when
+        None). Returns cal, or None when the data does not constrain the fit
+        '''
+        n = self.n
+        if self.count < 2 * n:
+            return None
+        a = list(self.ata)
+        for i in range(n):
+            for j in range(i):
+                a[i*n + j] = a[j*n + i]
+        p = _solve(a, self.aty, n)
+        if p is None:
+            return None
+        if self.mode == 'sphere':
+            b = [p[0] / 2, p[1] / 2, p[2] / 2]
+            # radius^2 in field units: 1/d, or c + |b|^2 against the nominal field
+            r2 = 1 / p[4] if self.model_field and p[4] > 0 else p[3] + b[0]*b[0] + b[1]*b[1] + b[2]*b[2]
+            if r2 <= 0:
+                return None
+            k = 1 / sqrt(r2)
+            s = [[k, 0.0, 0.0], [0.0, k, 0.0], [0.0, 0.0, k]]
+        else:
+            m = [[p[0], p[3], p[4]], [p[3], p[1], p[5]], [p[4], p[5], p[2]]]
+            g = [p[6], p[7], p[8]]
+            # centre: M b = -g
+            b = _solve([m[i][j] for i in range(3) for j in range(3)], [-g[0], -g[1], -g[2]], 3)
+            if b is None:
+                return None
+            if not self.model_field:
+                # (m - b)^T M (m - b) = 1 + b^T M b, rescale to the unit (nominal) field
+                k = 1 + sum(b[i] * m[i][j] * b[j] for i in range(3) for j in range(3))
+                if k <= 0:
+                    return None
+                m = [[m[i][j] / k for j in range(3)] for i in range(3)]
+            s = _sym_sqrt(m)
+            if s is None:
+                return None
+        if cal is None:
+            cal = Calibration()
+        for i in range(3):
+            cal.mag_offset[i] = b[i] * self.field
+            for j in range(3):
+                cal.soft_iron[i*3 + j] = s[i][j]
+        cal.samples = self.count
+        cal.source = 'fit'
+        return cal
+
+class GyroStill:
+    '''
+    Gyro bias from stillness: averages `window` samples and accepts the mean
+    as the bias when every axis varied by less than `threshold` (rad/s RMS).
+    On the ground the board sits still; in orbit use attitude.Mahony.bias
+    '''
+
+    def __init__(self, window=200, threshold=0.005):
+        self.window = window
+        self.threshold = threshold
+        self.sum = array('f', [0.0, 0.0, 0.0])
+        self.sumsq = array('f', [0.0, 0.0, 0.0])
+        self.bias = array('f', [0.0, 0.0, 0.0])
+        self.n = 0
+        self.found = False
+
+    def add(self, g):
+        '''Adds one raw gyro sample. Returns True when a window closed still and bias was updated'''
+        for i in range(3):
+            self.sum[i] += g[i]
+            self.sumsq[i] += g[i] * g[i]
+        self.n += 1
+        if self.n < self.window:
+            return False
+        still = True
+        k = 1.0 / self.n
+        for i in range(3):
+            mean = self.sum[i] * k
+            var = self.sumsq[i] * k - mean * mean
+            if var > self.threshold * self.threshold:
+                still = False
+        if still:
+            for i in range(3):
+                self.bias[i] = self.sum[i] * k
+            self.found = True
+        for i in range(3):
+            self.sum[i] = 0.0
+            self.sumsq[i] = 0.0
+        self.n = 0
+        return still
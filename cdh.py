@@ -15,7 +15,12 @@ commands = {
     b'8\x93':    'query',    # new
     b'\x96\xa2': 'exec_cmd',
     b'\xa5\xb4': 'joke_reply',
-    b'\x56\xc4': 'FSK'
+    b'\x56\xc4': 'FSK',
+    b'\x70\x52': 'profile',  # new
+    b'\x3c\x71': 'tasks',    # new
+    b'\x54\x53': 'telemetry', # new
+    b'\x42\x54': 'boot',     # new
+    b'\x49\x43': 'imucal',   # new
 }
 ############### hot start helper ###############
 def hotstart_handler(cubesat,msg):
@@ -98,12 +103,96 @@ def hreset(cubesat):
 
 def FSK(cubesat):
     cubesat.f_fsk=True
+    cubesat.commit_nvm()
 
 def joke_reply(cubesat):
     joke=random.choice(jokereply)
     print(joke)
     cubesat.radio1.send(joke)
 
+def profile(cubesat,args=None):
+    # per-task scheduler profile: no args downlinks it, b'sd' saves it, b'reset' clears it
+    import task_profiler
+    prof=task_profiler.active
+    if prof is None:
+        cubesat.radio1.send(b'profiler off')
+    elif args == b'sd':
+        path=cubesat.new_file('/prof/PROF_')
+        if path is not None and prof.save(path):
+            cubesat.radio1.send('saved '+path)
+        else:
+            cubesat.radio1.send(b'profile save failed')
+    elif args == b'reset':
+        prof.reset()
+        cubesat.radio1.send(b'profile reset')
+    else:
+        for line in prof.report.split('\n'):
+            cubesat.radio1.send(line)
+
+def tasks(cubesat,args=None):
+    # Tasks/ registry: no args downlinks the task list, b'<key> on|off|default|<hz>' changes one
+    import task_registry
+    registry=task_registry.active
+    if registry is None:
+        cubesat.radio1.send(b'tasks off')
+    else:
+        cubesat.radio1.send(registry.command(args))
+
+def telemetry(cubesat,args=None):
+    # SD time series: no args lists the series, b'<series> <t0> <t1> [step] [boot]' sends the samples, tagged with their boot count
+    import telemetry_store
+    store=telemetry_store.active
+    if store is None:
+        cubesat.radio1.send(b'telemetry off')
+    else:
+        for packet in store.command(args):
+            cubesat.radio1.send(packet)
+
+def boot(cubesat,args=None):
+    # boot record (import and device init times, first beacon); b'imports' sends one line per module
+    import import_profiler
+    imports=import_profiler.active
+    if args == b'imports':
+        if imports is None:
+            cubesat.radio1.send(b'import profiler off')
+        else:
+            for line in imports.lines(10):
+                cubesat.radio1.send(line)
+    else:
+        record=cubesat.boot.report()
+        for i in range(0,len(record),200):
+            cubesat.radio1.send(record[i:i+200])
+
+def imucal(cubesat,args=None):
+    # IMU calibration: no args sends the one in use, b'start [seconds] [sphere]' collects and fits
+    # on board, b'set ' + the record from bench/mag_cal_fit.py stores a ground fit (SD and NVM) and applies it
+    import calibration
+    if args is not None and args[:4] == b'set ':
+        cal=calibration.Calibration.unpack(args[4:])
+        if cal is None:
+            cubesat.radio1.send(b'bad cal record')
+            return
+        cal.source='gs'
+        written=cal.save(cubesat.micro.nvm,path=calibration.SD_PATH,debug=cubesat.debug)
+        cubesat.imu_cal=cal
+        if cubesat.hardware['IMU']:
+            # a deferred IMU loads the saved record when it starts
+            cubesat.IMU.cal=cal
+        cubesat.radio1.send('saved {}x '.format(written)+cal.telemetry)
+    elif args is not None and args[:5] == b'start':
+        import functions
+        words=args.split()
+        duration=int(words[1]) if len(words) > 1 else 600
+        mode='sphere' if b'sphere' in words else 'ellipsoid'
+        if functions.active is None or not functions.active.start_imu_calibration(duration,mode):
+            cubesat.radio1.send(b'imucal not started')
+        else:
+            cubesat.radio1.send('imucal {} s {}'.format(duration,mode))
+    elif cubesat.imu_cal is None:
+        cubesat.radio1.send(b'no imu cal')
+    else:
+        cubesat.radio1.send(cubesat.imu_cal.telemetry)
+
 ########### commands with arguments ###########
 
 def shutdown(cubesat,args):
@@ -112,6 +201,7 @@ def shutdown(cubesat,args):
         print('valid shutdown command received')
         # set shutdown NVM bit flag
         cubesat.f_shtdwn=True
+        cubesat.commit_nvm()
 
         """
         Exercise for the user:
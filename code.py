@@ -7,7 +7,10 @@ Authors: Nicole Maggard, Michael Pham
 
 import time
 import microcontroller
+import import_profiler
 
+# Times every module main pulls in for the boot record (see import_profiler)
+import_profiler.install()
 try:
     import main
 
@@ -1,16 +1,23 @@
+import vector
+
+_dipole = vector.vec()
+
 def dot_product(vector1, vector2):
-    return sum([a*b for a,b in zip(vector1, vector2)])
+    return vector.dot(vector1, vector2)
 
-def x_product(vector1, vector2):
-    return [vector1[1]*vector2[2]-vector1[2]*vector2[1],vector1[0]*vector2[2]-vector1[2]*vector2[0],vector1[0]*vector2[1]-vector1[1]*vector2[0]]
+def x_product(vector1, vector2, out=None):
+    if out is None:
+        out = vector.vec()
+    return vector.cross(vector1, vector2, out)
 
 def gain_func():
     return 1.0
 
-def magnetorquer_dipole(mag_field,ang_vel):
+def magnetorquer_dipole(mag_field,ang_vel,out=None):
+    #Writes into a shared buffer unless out is given; copy the result to keep it
+    if out is None:
+        out = _dipole
     gain=gain_func()
-    scalar_coef=-gain/pow(dot_product(mag_field,mag_field),0.5)
-    dipole_out=x_product(mag_field,ang_vel)
-    for i in range(3):
-        dipole_out[i]*=scalar_coef
-    return dipole_out
+    scalar_coef=-gain/vector.norm(mag_field)
+    vector.cross(mag_field,ang_vel,out)
+    return vector.scale(out,scalar_coef,out)
@@ -0,0 +1,169 @@
+'''
+Energy-aware admission for the Tasks/ task set.
+
+Each task declares what a run costs (see Tasks/template_task.py): `current`
+mA above the idle baseline for `duration` seconds, so at its declared
+frequency it draws current * duration * frequency mA on average, and the
+lowest power mode it may run in.
+
+plan() turns the battery state into a current budget
+
+    budget = charge current - baseline draw + reserve / horizon
+
+where reserve is the charge above soc_floor (state of charge estimated from
+the battery voltage) and horizon is how long that reserve should last, one
+orbit by default. Tasks are taken in priority order (lowest number first).
+Essential tasks always run. The others run at their declared frequency while
+the budget covers it, are stretched to the rate the rest of the budget pays
+for while that is at least min_frequency, and are skipped otherwise or when
+the power mode is below their min_power_mode.
+
+The mode gate only applies within normal operations: task_registry.run() is
+stepped from main.normal_power_operations under PowerState.supervise, which
+cancels it on leaving normal/maximum, so update() only ever sees 'normal' or
+'maximum'. In flight min_power_mode = 'maximum' holds a task back until the
+satellite is in maximum power; 'minimum' and 'critical' act like 'normal',
+since no Tasks/ task runs below normal power at all.
+
+The baseline is the measured draw minus what the running tasks declared,
+smoothed, so it tracks the load nobody declared.
+
+update() takes its readings from the last battery manager pass
+(Satellite.power_readings) so planning adds no I2C traffic, and falls back to
+Satellite.battery_voltage, charge_current and current_draw without one.
+'''
+import traceback
+from debugcolor import co
+
+MODES = ('critical', 'minimum', 'normal', 'maximum')
+
+# Open circuit voltage (V, 2S pack, as Satellite.battery_voltage reports it) -> state of charge
+OCV = ((6.0, 0.0), (6.6, 0.05), (6.9, 0.12), (7.2, 0.35), (7.4, 0.55), (7.6, 0.72), (7.9, 0.88), (8.4, 1.0))
+
+RUN = 'run'
+STRETCH = 'stretch'
+SKIP = 'skip'
+
+def soc(vbatt):
+    '''State of charge (0..1) for a battery voltage, linear between OCV points'''
+    if vbatt <= OCV[0][0]:
+        return 0.0
+    for i in range(1, len(OCV)):
+        v, s = OCV[i]
+        if vbatt <= v:
+            v0, s0 = OCV[i-1]
+            return s0 + (s - s0) * (vbatt - v0) / (v - v0)
+    return 1.0
+
+def mode_allows(mode, min_mode):
+    return MODES.index(mode) >= MODES.index(min_mode)
+
+class EnergyScheduler:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[ENERGY]" + statement, 'green', 'bold'))
+
+    def __init__(self, cubesat=None, capacity=2600, soc_floor=0.3, horizon=5700, base_current=60.0,
+                 smoothing=0.3, debug=False):
+        '''
+        cubesat:      pysquared.Satellite for update()
+        capacity:     battery capacity (mAh)
+        soc_floor:    state of charge the budget leaves untouched
+        horizon:      seconds the reserve above soc_floor is spread over
+        base_current: idle draw (mA) assumed until a measurement arrives
+        smoothing:    weight of each new baseline measurement
+        '''
+        self.debug = debug
+        self.cubesat = cubesat
+        self.capacity = capacity
+        self.soc_floor = soc_floor
+        self.horizon = horizon
+        self.base = base_current
+        self.smoothing = smoothing
+        self.soc = None
+        self.budget = 0.0
+        self.declared = 0.0
+        self.rates = {}
+        self.states = {}
+
+    def demand(self, task, rate=None):
+        '''Average current (mA) of a task run at rate (default: its declared frequency)'''
+        return task.current * task.duration * (task.frequency if rate is None else rate)
+
+    def plan(self, tasks, mode, vbatt, ichrg, idraw=None):
+        '''
+        Admits, stretches or skips each task. Returns {name: rate in Hz}, 0 for
+        skipped tasks; self.states holds RUN/STRETCH/SKIP per name.
+        '''
+        if idraw is not None:
+            measured = max(0.0, idraw - self.declared)
+            self.base += self.smoothing * (measured - self.base)
+        self.soc = soc(vbatt)
+        reserve = max(0.0, self.soc - self.soc_floor) * self.capacity * 3600 / self.horizon
+        budget = max(0.0, ichrg or 0.0) - self.base + reserve
+        self.budget = budget
+        declared = 0.0
+        for task in sorted(tasks, key=lambda t: t.priority):
+            cost = task.current * task.duration
+            rate = task.frequency
+            state = RUN
+            if not mode_allows(mode, task.min_power_mode):
+                rate, state = 0, SKIP
+            elif not task.essential and cost * rate > budget:
+                floor = task.min_frequency if task.min_frequency is not None else task.frequency / 10
+                rate = budget / cost if budget > 0 else 0
+                if rate >= floor and rate > 0:
+                    state = STRETCH
+                else:
+                    rate, state = 0, SKIP
+            budget -= cost * rate
+            declared += cost * rate
+            self.rates[task.name] = rate
+            self.states[task.name] = state
+        self.declared = declared
+        self.debug_print("budget {:.0f}mA soc {:.0%} base {:.0f}mA: {}".format(
+            self.budget, self.soc, self.base, self.states))
+        return self.rates
+
+    def readings(self):
+        '''(vbatt, ichrg, idraw) from the last battery manager pass, or read now'''
+        c = self.cubesat
+        if c.power_readings is not None:
+            vbatt, ichrg, _, idraw, _ = c.power_readings
+            if vbatt is not None:
+                return vbatt, ichrg, idraw
+        return c.battery_voltage, c.charge_current, c.current_draw
+
+    def update(self, tasks):
+        '''plan() from the satellite's readings and power mode'''
+        try:
+            vbatt, ichrg, idraw = self.readings()
+            return self.plan(tasks, self.cubesat.power_mode, vbatt, ichrg, idraw)
+        except Exception as e:
+            self.debug_print("Error planning task energy: " + ''.join(traceback.format_exception(e)))
+            return self.rates
+
+    def apply(self, scheduled):
+        '''
+        Applies the last plan to tasko ScheduledTasks, scheduled being
+        {name: ScheduledTask}: skipped tasks are stopped, the others run at
+        their planned rate.
+        '''
+        for name, rate in self.rates.items():
+            handle = scheduled.get(name)
+            if handle is None:
+                continue
+            if rate > 0:
+                handle.change_rate(rate)
+                handle.start()
+            else:
+                handle.stop()
+
+    @property
+    def telemetry(self):
+        '''Compact plan summary for downlink'''
+        states = list(self.states.values())
+        return "EN B:{:.0f} S:{:.0f} BASE:{:.0f} R:{}/{}/{}".format(
+            self.budget, 100 * (self.soc or 0), self.base,
+            states.count(RUN), states.count(STRETCH), states.count(SKIP))
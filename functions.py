@@ -5,23 +5,46 @@ our will.
 Authors: Nicole Maggard, Michael Pham, and Rachel Sarmiento
 '''
 import time
+import asyncio
 import alarm
 import gc
 import traceback
 import random
+import Field # every transmission goes through it: loaded once with functions and kept
+import log_records
 from debugcolor import co
 
+# The flight functions, for the cdh commands that start background work
+active = None
+
 class functions:
 
     def debug_print(self,statement):
         if self.debug:
             print(co("[Functions]" + statement, 'green', 'bold'))
     def __init__(self,cubesat):
+        global active
         self.cubesat = cubesat
         self.debug = cubesat.debug
         self.debug_print("Initializing Functionalities")
         self.Errorcount=0
         self.facestring=[]
+        self.facesample=None
+        self.field=None
+        self.allfaces=None
+        self.allfaces_cycle=None
+        self.imu_acq=None
+        self.attitude=None
+        self.sun=None
+        self.power=None
+        self.registry=None
+        self.telemetry=None
+        self.imu_calibrating=False
+        self.imu_cal_task=None
+        active=self
+        #Tasks interleave at every await: one radio user at a time, one heater run at a time
+        self.radio_lock=asyncio.Lock()
+        self.heater_lock=asyncio.Lock()
         self.jokes=["Hey Its pretty cold up here, did someone forget to pay the electric bill?",
                     "Connect with me on LinkedIn: https://www.linkedin.com/in/ernesto-montes/",
                     "Connect with me on LinkedIn: https://www.linkedin.com/in/ali-i-malik/",
@@ -101,6 +124,40 @@ class functions:
             return False
         finally:
             self.cubesat.heater_off()
+
+    async def battery_heater_async(self):
+        """battery_heater() that sleeps on the event loop while the heater runs"""
+        if self.heater_lock.locked():
+            self.debug_print("Battery heater already running")
+            return False
+        async with self.heater_lock:
+            return await self._battery_heater_async()
+
+    async def _battery_heater_async(self):
+        try:
+            self.cubesat.all_faces_on()
+            
+            ThermoTemp=self.cubesat.IMU.mcp.temperature
+            
+            if ThermoTemp < self.cubesat.NORMAL_BATT_TEMP:
+                end_time=0
+                await self.cubesat.heater_on_async()
+                while ThermoTemp < self.cubesat.NORMAL_BATT_TEMP+4 and end_time<5:
+                    await asyncio.sleep(1)
+                    ThermoTemp=self.cubesat.IMU.mcp.temperature
+                    end_time+=1
+                    self.debug_print(str(f"Heater has been on for {end_time} seconds and the battery temp is {ThermoTemp}C"))
+                self.cubesat.heater_off()
+                return True
+            else: 
+                self.debug_print("Battery is already warm enough")
+                return False
+        except Exception as e:
+            self.cubesat.heater_off()
+            self.debug_print("Error Initiating Battery Heater" + ''.join(traceback.format_exception(e)))
+            return False
+        finally:
+            self.cubesat.heater_off()
     
     def current_check(self):
         return self.cubesat.current_draw
@@ -136,53 +193,96 @@ class functions:
     '''
     Radio Functions
     '''  
+    def radio_field(self):
+        """The Field every transmission goes through, built once; its radio setup is re-applied per call"""
+        if self.field is None:
+            self.field = Field.Field(self.cubesat,self.debug)
+        else:
+            self.field.configure()
+        return self.field
+
+    def transmit(self,message):
+        """Sends one message over LoRa, and as CW too when FSK mode is set. Logs a TX radio record"""
+        self.radio_field().Beacon(message)
+        if self.cubesat.f_fsk:
+            self.cubesat.radio1.cw(message)
+        self.cubesat.radio_log(self.cubesat.radio1.tx_power,len(message),log_records.TX)
+
+    async def transmit_async(self,message):
+        """transmit() that yields to the event loop while the radio is on air"""
+        async with self.radio_lock:
+            await self.radio_field().Beacon_async(message)
+            if self.cubesat.f_fsk:
+                await self.cubesat.radio1.cw_async(message)
+        self.cubesat.radio_log(self.cubesat.radio1.tx_power,len(message),log_records.TX)
+
     def send(self,msg):
         """Calls the RFM9x to send a message. Currently only sends with default settings.
         
         Args:
             msg (String,Byte Array): Pass the String or Byte Array to be sent. 
         """
-        import Field
-        self.field = Field.Field(self.cubesat,self.debug)
         message="KN6NAT " + str(msg) + " KN6NAT"
-        self.field.Beacon(message)
-        if self.cubesat.f_fsk:
-            self.cubesat.radio1.cw(message)
+        self.transmit(message)
+        self.debug_print(f"Sent Packet: " + message)
+
+    async def send_async(self,msg):
+        message="KN6NAT " + str(msg) + " KN6NAT"
+        await self.transmit_async(message)
         self.debug_print(f"Sent Packet: " + message)
-        del self.field
-        del Field
+
+    def beacon_message(self,vbatt):
+        return "KN6NAT Hello I am Yearling! I am in: " + str(self.cubesat.power_mode) +" power mode. V_Batt = " + str(vbatt) + "V. IHBPFJASTMNE! KN6NAT"
 
     def beacon(self):
         """Calls the RFM9x to send a beacon. """
-        import Field
         try:
-            lora_beacon = "KN6NAT Hello I am Yearling! I am in: " + str(self.cubesat.power_mode) +" power mode. V_Batt = " + str(self.cubesat.battery_voltage) + "V. IHBPFJASTMNE! KN6NAT"
+            lora_beacon = self.beacon_message(self.cubesat.battery_voltage)
         except Exception as e:
             self.debug_print("Error with obtaining power data: " + ''.join(traceback.format_exception(e)))
             lora_beacon = "KN6NAT Hello I am Yearling! I am in: " + "an unidentified" +" power mode. V_Batt = " + "Unknown" + ". IHBPFJASTMNE! KN6NAT"
+        self.transmit(lora_beacon)
 
-        self.field = Field.Field(self.cubesat,self.debug)
-        self.field.Beacon(lora_beacon)
-        if self.cubesat.f_fsk:
-            self.cubesat.radio1.cw(lora_beacon)
-        del self.field
-        del Field
+    async def beacon_async(self):
+        try:
+            vbatt=(await self.cubesat.power_readings_async())[0]
+            lora_beacon = self.beacon_message(vbatt)
+        except Exception as e:
+            self.debug_print("Error with obtaining power data: " + ''.join(traceback.format_exception(e)))
+            lora_beacon = "KN6NAT Hello I am Yearling! I am in: " + "an unidentified" +" power mode. V_Batt = " + "Unknown" + ". IHBPFJASTMNE! KN6NAT"
+        await self.transmit_async(lora_beacon)
     
     def joke(self):
         self.send(random.choice(self.jokes))
+
+    async def joke_async(self):
+        await self.send_async(random.choice(self.jokes))
     
 
     def state_of_health(self):
-        import Field
         self.test_faces()
+        self.transmit(self.state_of_health_message(self.cubesat.battery_voltage,
+            self.cubesat.current_draw,self.cubesat.system_voltage))
+
+    async def state_of_health_async(self):
+        self.test_faces()
+        vbatt=idraw=vsys=None
+        try:
+            vbatt,_,_,idraw,vsys=await self.cubesat.power_readings_async()
+        except Exception as e:
+            self.debug_print("Couldn't aquire power data for the state of health: " + ''.join(traceback.format_exception(e)))
+        await self.transmit_async(self.state_of_health_message(vbatt,idraw,vsys))
+
+    def state_of_health_message(self,vbatt,idraw,vsys):
+        """Next state of health message; alternates between the sensor half and the hardware half"""
         self.state_list=[]
         #list of state information 
         try:
             self.state_list = [
                 f"PM:{self.cubesat.power_mode}",
-                f"VB:{self.cubesat.battery_voltage}",
-                f"ID:{self.cubesat.current_draw}",
-                f"VS:{self.cubesat.system_voltage}",
+                f"VB:{vbatt}",
+                f"ID:{idraw}",
+                f"VS:{vsys}",
                 f"UT:{self.cubesat.uptime}",
                 f"BN:{self.cubesat.c_boot}",
                 f"MT:{self.cubesat.micro.cpu.temperature}",
@@ -196,31 +296,24 @@ class functions:
         except Exception as e:
             self.debug_print("Couldn't aquire data for the state of health: " + ''.join(traceback.format_exception(e)))
         
-        self.field = Field.Field(self.cubesat,self.debug)
         if not self.state_bool:
-            self.field.Beacon("KN6NAT Yearling State of Health 1/2" + str(self.state_list)+ "KN6NAT")
-            if self.cubesat.f_fsk:
-                self.cubesat.radio1.cw("KN6NAT Yearling State of Health 1/2" + str(self.state_list)+ "KN6NAT")
             self.state_bool=True
-        else:
-            self.field.Beacon("KN6NAT YSOH 2/2" + str(self.cubesat.hardware) +"KN6NAT")
-            if self.cubesat.f_fsk:
-                self.cubesat.radio1.cw("KN6NAT YSOH 2/2" + str(self.cubesat.hardware) +"KN6NAT")
-            self.state_bool=False
-        del self.field
-        del Field
+            return "KN6NAT Yearling State of Health 1/2" + str(self.state_list)+ "KN6NAT"
+        self.state_bool=False
+        return "KN6NAT YSOH 2/2" + str(self.cubesat.hardware) +"KN6NAT"
 
     def send_face(self):
         """Calls the data transmit function from the field class
         """
-        import Field
-        self.field = Field.Field(self.cubesat,self.debug)
         self.debug_print("Sending Face Data")
-        self.field.Beacon(f'KN6NAT Y-: {self.facestring[0]} Y+: {self.facestring[1]} X-: {self.facestring[2]} X+: {self.facestring[3]}  Z-: {self.facestring[4]} KN6NAT')
-        if self.cubesat.f_fsk:
-                self.cubesat.radio1.cw(f'KN6NAT Y-: {self.facestring[0]} Y+: {self.facestring[1]} X-: {self.facestring[2]} X+: {self.facestring[3]}  Z-: {self.facestring[4]} KN6NAT')
-        del self.field
-        del Field
+        self.transmit(self.face_message())
+
+    async def send_face_async(self):
+        self.debug_print("Sending Face Data")
+        await self.transmit_async(self.face_message())
+
+    def face_message(self):
+        return f'KN6NAT Y-: {self.facestring[0]} Y+: {self.facestring[1]} X-: {self.facestring[2]} X+: {self.facestring[3]}  Z-: {self.facestring[4]} KN6NAT'
     
     def send_face_data_small(self):
         self.debug_print("Trying to get the data! ")
@@ -237,7 +330,6 @@ class functions:
             return False
     
     def listen(self):
-        import cdh
         #This just passes the message through. Maybe add more functionality later. 
         try:
             self.debug_print("Listening")
@@ -246,14 +338,31 @@ class functions:
         except Exception as e:
             self.debug_print("An Error has occured while listening: " + ''.join(traceback.format_exception(e)))
             received=None
+        return self.handle_received(received)
+
+    async def listen_async(self):
+        """listen() that waits for the packet on the event loop"""
+        try:
+            self.debug_print("Listening")
+            self.cubesat.radio1.receive_timeout=10
+            async with self.radio_lock:
+                received = await self.cubesat.radio1.receive_async(keep_listening=True)
+        except Exception as e:
+            self.debug_print("An Error has occured while listening: " + ''.join(traceback.format_exception(e)))
+            received=None
+        return self.handle_received(received)
+
+    def handle_received(self,received):
+        # Loaded on the first packet (not at boot) and then served from sys.modules
+        import cdh
         try:
             if received is not None:
                 self.debug_print("Recieved Packet: "+str(received))
+                self.cubesat.radio_log(self.cubesat.radio1.last_rssi-137,len(received))
                 cdh.message_handler(self.cubesat,received)
                 return True
         except Exception as e:
             self.debug_print("An Error has occured while handling command: " + ''.join(traceback.format_exception(e)))
-        del cdh
         
         return False
 
@@ -277,31 +386,178 @@ class functions:
         
         self.cubesat.all_faces_on()
         try:
-            import Big_Data
-            a = Big_Data.AllFaces(self.debug,self.cubesat.tca)
-            
-            self.facestring = a.Face_Test_All()
+            a = self.face_sensors()
+            if self.facesample is None:
+                import Big_Data
+                self.facesample = Big_Data.FaceSample()
             
-            del a
-            del Big_Data
+            #Light sensors are skipped in eclipse; when read they also update the sun vector
+            lux = self.sun is None or self.sun.light_needed
+            self.facestring = a.Face_Test_All(self.facesample, lux)
+            if self.sun is not None and lux:
+                self.sun.from_sample(self.facesample)
+            self.log_face_data(self.facestring)
         except Exception as e:
             self.debug_print("Big_Data error" + ''.join(traceback.format_exception(e)))
         
         return self.facestring
     
+    def face_sensors(self):
+        """
+        AllFaces for the face polls. Kept between polls and rebuilt (drivers set up
+        again) once the faces have been powered off since it was built, or while
+        one of its sensors is missing, which every poll retried before
+        """
+        faces=self.allfaces
+        if (faces is None or self.allfaces_cycle != self.cubesat.face_power_cycles
+                or not all(face.sensors[s] for face in faces.Faces for s in face.senlist)):
+            import Big_Data
+            self.allfaces = None # the old drivers can go before the new ones are allocated
+            self.allfaces = Big_Data.AllFaces(self.debug,self.cubesat.tca)
+            self.allfaces_cycle = self.cubesat.face_power_cycles
+        return self.allfaces
+
     def get_imu_data(self):
         
         self.cubesat.all_faces_on()
         try:
             data=[]
+            # one pass over the BNO packet stream; the reads below come from the snapshot
+            self.cubesat.IMU.snapshot(max_age=0)
             data.append(self.cubesat.IMU.Acceleration)
             data.append(self.cubesat.IMU.Gyroscope)
             data.append(self.cubesat.IMU.Magnetometer)
+            self.cubesat.imu_log(data[0],data[2],data[1])
         except Exception as e:
             self.debug_print("Error retrieving IMU data" + ''.join(traceback.format_exception(e)))
         
         return data
     
+    def imu_acquisition(self, rate=20, decimation=10, window=10, capacity=64, burst_capacity=200):
+        """Returns the background IMU sampler, built on first use. Buffers are allocated once here"""
+        if self.imu_acq is None:
+            import imu_buffer
+            self.imu_acq=imu_buffer.IMUAcquisition(self.cubesat.IMU,rate=rate,decimation=decimation,window=window,
+                capacity=capacity,burst_capacity=burst_capacity,cubesat=self.cubesat,debug=self.debug)
+        return self.imu_acq
+
+    async def calibrate_imu(self, duration=600, rate=10, mode='ellipsoid', model_field=None):
+        """
+        Collects raw magnetometer and gyro samples for `duration` seconds, fits
+        hard/soft iron and gyro bias, then saves the result to SD and NVM and
+        applies it to the IMU. model_field(t) may return the model |B| (uT) for
+        in-orbit fits. Without a still window the gyro bias comes from the
+        attitude estimator when it is running.
+        """
+        import calibration
+        self.imu_calibrating=True
+        try:
+            imu=self.cubesat.IMU
+            fit=calibration.MagFit(mode,model_field=model_field is not None)
+            still=calibration.GyroStill(window=rate*20)
+            period=1.0/rate
+            start=time.monotonic()
+            while time.monotonic()-start < duration:
+                imu.snapshot(max_age=0)
+                mag=imu.raw.get("magnetometer")
+                gyro=imu.raw.get("gyroscope")
+                if mag is not None:
+                    fit.add(mag, model_field(time.monotonic()) if model_field is not None else None)
+                if gyro is not None:
+                    still.add(gyro)
+                await asyncio.sleep(period)
+            cal=imu.cal if imu.cal is not None else calibration.Calibration()
+            old_bias=list(cal.gyro_bias)
+            if fit.solve(cal) is None:
+                self.debug_print("Magnetometer fit failed after " + str(fit.count) + " samples")
+                return None
+            if still.found:
+                for i in range(3):
+                    cal.gyro_bias[i]=still.bias[i]
+            elif self.attitude is not None:
+                # the estimator tracks what is left after the old bias was removed
+                for i in range(3):
+                    cal.gyro_bias[i]=old_bias[i]+self.attitude.bias[i]
+            cal.save(self.cubesat.micro.nvm, path=calibration.SD_PATH, debug=self.debug)
+            imu.cal=cal
+            self.cubesat.imu_cal=cal
+            self.debug_print(cal.telemetry)
+            return cal
+        except Exception as e:
+            self.debug_print("IMU calibration error: " + ''.join(traceback.format_exception(e)))
+            return None
+        finally:
+            self.imu_calibrating=False
+
+    def start_imu_calibration(self, duration=600, mode='ellipsoid'):
+        """
+        Runs calibrate_imu as a background task (cdh 'imucal'). Returns False while one
+        is running. The task is not one of the supervised normal operations, so main.py
+        ends it with stop_imu_calibration when they end
+        """
+        if self.imu_calibrating:
+            return False
+        self.imu_cal_task=asyncio.create_task(self.calibrate_imu(duration,mode=mode))
+        self.imu_calibrating=True
+        return True
+
+    async def stop_imu_calibration(self):
+        """Cancels a background calibration and waits for it to end. Nothing is saved"""
+        task=self.imu_cal_task
+        self.imu_cal_task=None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self.imu_calibrating=False
+
+    def attitude_estimator(self, rate=10, kp=0.5, ki=0.02):
+        """
+        Returns the attitude estimator, built on first use. Other tasks read its q and rate.
+        There is no field or sun model on board, so it anchors the sun reference to its
+        first sun vector: q is relative to the body frame at that moment. Until then it
+        integrates the gyro alone (R:G in its telemetry)
+        """
+        if self.attitude is None:
+            import attitude
+            self.attitude=attitude.Mahony(kp=kp,ki=ki,rate=rate,anchor=True,debug=self.debug)
+        return self.attitude
+
+    def sun_sensor(self):
+        """
+        Returns the face light sun sensor, built on first use. It is fed by the face
+        polls in all_face_data and reads the same face drivers (face_sensors) when polled
+        """
+        if self.sun is None:
+            import sun_sensor
+            self.sun=sun_sensor.SunSensor(self.face_sensors,debug=self.debug)
+        return self.sun
+
+    def power_state(self, period=20):
+        """Returns the shared power state task, built on first use"""
+        if self.power is None:
+            import power_state
+            self.power=power_state.PowerState(self.cubesat,self,period=period,store=self.telemetry_store(),debug=self.debug)
+        return self.power
+
+    def telemetry_store(self):
+        """Returns the SD time-series store, built on first use; None without an SD card"""
+        if self.telemetry is None and self.cubesat.hardware['SDcard']:
+            try:
+                import telemetry_store
+                self.telemetry=telemetry_store.TelemetryStore(boot=self.cubesat.c_boot,debug=self.debug)
+            except Exception as e:
+                self.debug_print('Telemetry store error: ' + ''.join(traceback.format_exception(e)))
+        return self.telemetry
+
+    def task_registry(self):
+        """Returns the Tasks/ registry with energy-aware rates, built on first use"""
+        if self.registry is None:
+            import energy_scheduler
+            import task_registry
+            energy=energy_scheduler.EnergyScheduler(self.cubesat,debug=self.debug)
+            self.registry=task_registry.TaskRegistry(self.cubesat,energy=energy,debug=self.debug)
+        return self.registry
+
     def OTA(self):
         # resets file system to whatever new file is received
         pass
@@ -313,76 +569,44 @@ class functions:
         
         self.debug_print("Logging Face Data")
         try:
-                self.cubesat.Face_log(data)
-        except:
-            try:
-                self.cubesat.new_file(self.cubesat.Facelogfile)
-            except Exception as e:
-                self.debug_print('SD error: ' + ''.join(traceback.format_exception(e)))
+            self.cubesat.Face_log(data)
+        except Exception as e:
+            self.debug_print('SD error: ' + ''.join(traceback.format_exception(e)))
         
     def log_error_data(self,data):
         
         self.debug_print("Logging Error Data")
         try:
-                self.cubesat.log(data)
-        except:
-            try:
-                self.cubesat.new_file(self.cubesat.logfile)
-            except Exception as e:
-                self.debug_print('SD error: ' + ''.join(traceback.format_exception(e)))
+            self.cubesat.log(data)
+        except Exception as e:
+            self.debug_print('SD error: ' + ''.join(traceback.format_exception(e)))
     
     '''
     Misc Functions
     '''  
     #Goal for torque is to make a control system 
     #that will adjust position towards Earth based on Gyro data
-    def detumble(self,dur = 7, margin = 0.2, seq = 118):
+    def detumble_controller(self, gain=0.5, period=10, actuate_time=7, seq=52):
+        """
+        Builds the B-dot controller around the payload magnetometer and the coil
+        drivers of face_sensors(), so the coils follow it when it is rebuilt
+        """
+        import magnetorquer
+        import bdot
+        mtq=magnetorquer.Magnetorquer(self.face_sensors,self.debug,threshold=0.05,max_dipole=1.0,sequence=seq)
+        return bdot.BDot(self.cubesat.IMU,mtq,gain=gain,period=period,actuate_time=actuate_time,debug=self.debug)
+
+    def detumble(self,dur = 7, margin = 0.2, seq = 52, cycles = 3):
+        """Blocking detumble for use outside the event loop: runs the B-dot controller for a few periods"""
+        import asyncio
         self.debug_print("Detumbling")
         self.cubesat.RGB=(255,255,255)
         self.cubesat.all_faces_on()
-        try:
-            import Big_Data
-            a=Big_Data.AllFaces(self.debug, self.cubesat.tca)
-        except Exception as e:
-            self.debug_print("Error Importing Big Data: " + ''.join(traceback.format_exception(e)))
-
-        try:
-            a.sequence=52
-        except Exception as e:
-            self.debug_print("Error setting motor driver sequences: " + ''.join(traceback.format_exception(e)))
-        
-        def actuate(dipole,duration):
-            #TODO figure out if there is a way to reverse direction of sequence
-            if abs(dipole[0]) > 1:
-                a.Face2.drive=52
-                a.drvx_actuate(duration)
-            if abs(dipole[1]) > 1:
-                a.Face0.drive=52
-                a.drvy_actuate(duration)
-            if abs(dipole[2]) > 1:
-                a.Face4.drive=52
-                a.drvz_actuate(duration)
-            
-        def do_detumble():
-            try:
-                import detumble
-                for _ in range(3):
-                    data=[self.cubesat.IMU.Gyroscope,self.cubesat.IMU.Magnetometer]
-                    data[0]=list(data[0])
-                    for x in range(3):
-                        if data[0][x] < 0.01:
-                            data[0][x]=0.0
-                    data[0]=tuple(data[0])
-                    dipole=detumble.magnetorquer_dipole(data[1],data[0])
-                    self.debug_print("Dipole: " + str(dipole))
-                    self.send("Detumbling! Gyro, Mag: " + str(data))
-                    time.sleep(1)
-                    actuate(dipole,dur)
-            except Exception as e:
-                self.debug_print("Detumble error: " + ''.join(traceback.format_exception(e)))
         try:
             self.debug_print("Attempting")
-            do_detumble()
+            controller=self.detumble_controller(period=dur+1,actuate_time=dur,seq=seq)
+            asyncio.run(controller.run(cycles))
+            self.send("Detumbling! " + controller.telemetry)
         except Exception as e:
             self.debug_print('Detumble error: ' + ''.join(traceback.format_exception(e)))
         self.cubesat.RGB=(100,100,50)
@@ -390,9 +614,13 @@ class functions:
     
     def Short_Hybernate(self):
         self.debug_print("Short Hybernation Coming UP")
+        self.cubesat.flush_logs()
+        if self.telemetry is not None:
+            self.telemetry.flush()
         gc.collect()
         #all should be off from cubesat powermode
         self.cubesat.f_softboot=True
+        self.cubesat.commit_nvm()
         time_alarm = alarm.time.TimeAlarm(epoch_time=time.time() + 120)#change to 2 min when not testing
         # Exit the program, and then deep sleep until the alarm wakes us.
         alarm.exit_and_deep_sleep_until_alarms(time_alarm)
@@ -400,9 +628,13 @@ class functions:
     
     def Long_Hybernate(self):
         self.debug_print("LONG Hybernation Coming UP")
+        self.cubesat.flush_logs()
+        if self.telemetry is not None:
+            self.telemetry.flush()
         gc.collect()
         #all should be off from cubesat powermode
         self.cubesat.f_softboot=True
+        self.cubesat.commit_nvm()
         time_alarm = alarm.time.TimeAlarm(epoch_time=time.time() + 600)
         # Exit the program, and then deep sleep until the alarm wakes us.
         alarm.exit_and_deep_sleep_until_alarms(time_alarm)
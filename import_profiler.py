@@ -0,0 +1,123 @@
+'''
+Boot-time import profiler.
+
+install() replaces builtins.__import__ (CircuitPython builds with
+MICROPY_CAN_OVERRIDE_BUILTINS honour this) with a wrapper that times every
+import that actually loads a module, i.e. whose name is not in sys.modules
+yet. Each load records
+    name, depth (nesting), total us (with the imports it made), self us
+    (without them) and heap: the drop in gc.mem_free() across the load,
+    children included (None on the CPython host)
+in load order. Imports that are already loaded go straight through the
+original __import__; relative imports are not split out and count toward
+the module making them.
+
+code.py installs it before `import main`; main uninstalls it after the first
+beacon and writes summary() into the boot record (see boot_manager). The cdh
+'boot' command downlinks summary() and lines().
+
+On the host, bench/import_profile.py runs it over the flight modules with the
+bench/hw.py stand-in hardware.
+'''
+import gc
+import sys
+import time
+from debugcolor import co
+
+try:
+    _mem_free = gc.mem_free
+except AttributeError:
+    # CPython host
+    _mem_free = None
+
+# The installed profiler: boot_manager starts its clock here, cdh reports it
+active = None
+
+class ImportProfiler:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[IMPORT]" + statement, 'gray', 'bold'))
+
+    def __init__(self, debug=False):
+        self.debug = debug
+        self.started = time.monotonic_ns()
+        self.modules = []       # (name, depth, total_us, self_us, heap) in load order
+        self._children = []     # us spent in nested loads, one entry per open load
+        self._import = None
+        self._hook = self.load
+
+    def install(self):
+        global active
+        import builtins
+        self._import = builtins.__import__
+        builtins.__import__ = self._hook
+        active = self
+        return self
+
+    def uninstall(self):
+        '''Restores __import__; the records stay for summary() and lines()'''
+        import builtins
+        if self._import is not None and builtins.__import__ is self._hook:
+            builtins.__import__ = self._import
+            self.debug_print(self.summary())
+
+    def load(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        mem = _mem_free() if _mem_free is not None else 0
+        self._children.append(0)
+        start = time.monotonic_ns()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            us = (time.monotonic_ns() - start) // 1000
+            nested = self._children.pop()
+            if self._children:
+                self._children[-1] += us
+            heap = mem - _mem_free() if _mem_free is not None else None
+            self.modules.append((name, len(self._children), us, us - nested, heap))
+
+    def total_us(self):
+        return sum(m[2] for m in self.modules if m[1] == 0)
+
+    def heap(self):
+        '''Bytes taken by the top level loads, None on the host'''
+        if _mem_free is None:
+            return None
+        return sum(m[4] for m in self.modules if m[1] == 0)
+
+    def slowest(self, top=None):
+        '''Records by self time, slowest first'''
+        order = sorted(self.modules, key=lambda m: -m[3])
+        return order if top is None else order[:top]
+
+    def summary(self, top=5):
+        '''imports:<ms>/<KB> top:<module>=<self ms>,... for the top slowest modules'''
+        heap = self.heap()
+        return 'imports:{:.0f}ms/{} top:{}'.format(self.total_us() / 1000,
+            '-' if heap is None else '{}K'.format(heap // 1024),
+            ','.join('{}={:.0f}'.format(m[0], m[3] / 1000) for m in self.slowest(top)))
+
+    def lines(self, top=None):
+        '''One line per loaded module, slowest first'''
+        out = []
+        for name, depth, us, self_us, heap in self.slowest(top):
+            out.append('{} d:{} tot:{:.1f}ms self:{:.1f}ms mem:{}'.format(
+                name, depth, us / 1000, self_us / 1000, '-' if heap is None else heap))
+        return out
+
+def install(debug=False):
+    '''Installs a profiler unless one is active; returns the active one'''
+    if active is None:
+        ImportProfiler(debug=debug).install()
+    return active
+
+def uninstall():
+    '''Stops recording (after boot); the active profiler keeps its records'''
+    if active is not None:
+        active.uninstall()
+
+def started():
+    '''monotonic_ns() when the active profiler was installed, None without one'''
+    return active.started if active is not None else None
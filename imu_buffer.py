@@ -0,0 +1,259 @@
+'''
+Background IMU acquisition for Yearling.
+Samples acceleration, gyro and magnetometer from one BNO08x snapshot per tick
+at a fixed rate (10-100 Hz) into preallocated arrays:
+    decimated: ring of boxcar means, one row per `decimation` raw samples
+    stats:     min/max/mean/RMS per channel over the last completed window
+    burst:     optional raw capture, written to SD in one go once it is full
+Every buffer is sized at construction, so memory use is fixed and reported by
+nbytes / telemetry. Rows are CHANNELS floats: ax ay az gx gy gz mx my mz.
+'''
+import time
+import asyncio
+import struct
+import traceback
+from array import array
+from debugcolor import co
+
+CHANNELS = 9
+_SOURCES = ("acceleration", "gyroscope", "magnetometer")
+
+class Ring:
+    '''Fixed capacity ring of CHANNELS-float rows, each with a ms timestamp. Oldest rows are overwritten'''
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = array('f', [0.0] * (capacity * CHANNELS))
+        self.t_ms = array('L', [0] * capacity)
+        self.clear()
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.overwritten = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.data) * 4 + len(self.t_ms) * 4
+
+    def append(self, t_ms, row):
+        base = self.head * CHANNELS
+        for i in range(CHANNELS):
+            self.data[base + i] = row[i]
+        self.t_ms[self.head] = t_ms
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.overwritten += 1
+
+    def get(self, index, out):
+        '''Copies row `index` (0 = oldest) into out and returns its timestamp'''
+        slot = (self.head - self.count + index) % self.capacity
+        base = slot * CHANNELS
+        for i in range(CHANNELS):
+            out[i] = self.data[base + i]
+        return self.t_ms[slot]
+
+class WindowStats:
+    '''Running min/max/sum/sum of squares per channel'''
+
+    def __init__(self):
+        self.min = array('f', [0.0] * CHANNELS)
+        self.max = array('f', [0.0] * CHANNELS)
+        self.sum = array('f', [0.0] * CHANNELS)
+        self.sumsq = array('f', [0.0] * CHANNELS)
+        self.n = 0
+
+    @property
+    def nbytes(self):
+        return 4 * 4 * CHANNELS
+
+    def reset(self):
+        self.n = 0
+        for i in range(CHANNELS):
+            self.sum[i] = 0.0
+            self.sumsq[i] = 0.0
+
+    def add(self, row):
+        first = self.n == 0
+        for i in range(CHANNELS):
+            v = row[i]
+            if first or v < self.min[i]:
+                self.min[i] = v
+            if first or v > self.max[i]:
+                self.max[i] = v
+            self.sum[i] += v
+            self.sumsq[i] += v * v
+        self.n += 1
+
+    def copy_from(self, other):
+        self.n = other.n
+        for i in range(CHANNELS):
+            self.min[i] = other.min[i]
+            self.max[i] = other.max[i]
+            self.sum[i] = other.sum[i]
+            self.sumsq[i] = other.sumsq[i]
+
+    def mean(self, i):
+        return self.sum[i] / self.n if self.n else 0.0
+
+    def rms(self, i):
+        return (self.sumsq[i] / self.n) ** 0.5 if self.n else 0.0
+
+class IMUAcquisition:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[IMU]" + statement, 'pink', 'bold'))
+
+    def __init__(self, imu, rate=20, decimation=10, window=10, capacity=64, burst_capacity=0,
+                 cubesat=None, debug=False):
+        '''
+        imu:            payload.PAYLOAD with acceleration, gyroscope and magnetometer enabled
+        rate:           raw sample rate (Hz), 10-100
+        decimation:     raw samples averaged into each decimated row
+        window:         statistics window (s)
+        capacity:       decimated rows kept
+        burst_capacity: raw rows a burst can hold, 0 disables bursts
+        cubesat:        pysquared.Satellite used to create burst files on the SD card
+        '''
+        self.debug = debug
+        self.imu = imu
+        self.cubesat = cubesat
+        self.rate = max(10, min(100, rate))
+        self.decimation = max(1, decimation)
+        self.window_samples = max(1, int(window * self.rate))
+        self.row = array('f', [0.0] * CHANNELS)
+        self._acc = array('f', [0.0] * CHANNELS)
+        self._acc_n = 0
+        self._out = array('f', [0.0] * CHANNELS)
+        self.decimated = Ring(capacity)
+        self._window = WindowStats()
+        self.stats = WindowStats()
+        self.stats_t_ms = 0
+        self.burst = Ring(burst_capacity) if burst_capacity else None
+        self.burst_armed = False
+        self.burst_files = 0
+        self.samples = 0
+        self.missed = 0
+        self.errors = 0
+
+    @property
+    def nbytes(self):
+        '''Bytes held by the sample buffers'''
+        n = self.decimated.nbytes + self._window.nbytes + self.stats.nbytes + 3 * 4 * CHANNELS
+        if self.burst is not None:
+            n += self.burst.nbytes
+        return n
+
+    def sample(self, t_ms):
+        '''Takes one raw sample into self.row. Returns False if the IMU had nothing'''
+        reports = self.imu.snapshot(max_age=0)
+        k = 0
+        for name in _SOURCES:
+            report = reports.get(name)
+            if report is None:
+                return False
+            value = report[0]
+            self.row[k] = value[0]
+            self.row[k + 1] = value[1]
+            self.row[k + 2] = value[2]
+            k += 3
+        self.feed(t_ms, self.row)
+        return True
+
+    def feed(self, t_ms, row):
+        '''Pushes one raw row through decimation, statistics and the burst buffer'''
+        self.samples += 1
+        for i in range(CHANNELS):
+            self._acc[i] += row[i]
+        self._acc_n += 1
+        if self._acc_n >= self.decimation:
+            k = 1.0 / self._acc_n
+            for i in range(CHANNELS):
+                self._acc[i] *= k
+            self.decimated.append(t_ms, self._acc)
+            for i in range(CHANNELS):
+                self._acc[i] = 0.0
+            self._acc_n = 0
+        self._window.add(row)
+        if self._window.n >= self.window_samples:
+            self.stats.copy_from(self._window)
+            self.stats_t_ms = t_ms
+            self._window.reset()
+        if self.burst_armed:
+            self.burst.append(t_ms, row)
+            if len(self.burst) >= self.burst.capacity:
+                self.burst_armed = False
+                self.save_burst()
+
+    def start_burst(self):
+        '''Starts a raw capture. It is written to SD once burst_capacity rows are in'''
+        if self.burst is None:
+            return False
+        self.burst.clear()
+        self.burst_armed = True
+        return True
+
+    def save_burst(self):
+        '''
+        Writes the burst buffer to /sd/imu/BURST_nnnnn.txt: a '<HHI' header
+        (rate, rows, first timestamp ms) followed by the rows as little endian
+        float32, each prefixed with its uint32 ms timestamp.
+        '''
+        if self.burst is None or not len(self.burst) or self.cubesat is None:
+            return None
+        try:
+            path = self.cubesat.new_file('/imu/BURST_', binary=True)
+            if path is None:
+                return None
+            row = self._out
+            with open(path, 'ab') as f:
+                f.write(struct.pack('<HHI', self.rate, len(self.burst), self.burst.get(0, row)))
+                for i in range(len(self.burst)):
+                    f.write(struct.pack('<I', self.burst.get(i, row)))
+                    f.write(row)
+            self.burst_files += 1
+            self.debug_print("Burst of {} rows saved to {}".format(len(self.burst), path))
+            return path
+        except Exception as e:
+            self.debug_print("Burst save error: " + ''.join(traceback.format_exception(e)))
+            return None
+
+    @property
+    def telemetry(self):
+        '''Compact window summary for downlink: mean/RMS per channel plus gyro extremes'''
+        s = self.stats
+        return "IMU N:{} W:{} M:{} B:{} MEAN:{} RMS:{} GMIN:{} GMAX:{}".format(
+            self.samples, s.n, self.missed, self.nbytes,
+            ",".join("{:.3f}".format(s.mean(i)) for i in range(CHANNELS)),
+            ",".join("{:.3f}".format(s.rms(i)) for i in range(CHANNELS)),
+            ",".join("{:.3f}".format(s.min[i]) for i in range(3, 6)),
+            ",".join("{:.3f}".format(s.max[i]) for i in range(3, 6)))
+
+    async def run(self, duration=None):
+        '''Samples at self.rate until `duration` seconds have passed (forever when None)'''
+        period = 1.0 / self.rate
+        start = time.monotonic()
+        next_t = start
+        self.debug_print("Sampling at {} Hz, {} bytes of buffers".format(self.rate, self.nbytes))
+        while duration is None or time.monotonic() - start < duration:
+            try:
+                if not self.sample((time.monotonic_ns() // 1000000) & 0xFFFFFFFF):
+                    self.missed += 1
+            except Exception as e:
+                self.errors += 1
+                self.debug_print("Sample error: " + ''.join(traceback.format_exception(e)))
+            next_t += period
+            wait = next_t - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                # Overran the period: count the dropped ticks and resynchronize
+                self.missed += int(-wait / period)
+                next_t = time.monotonic()
+                await asyncio.sleep(0)
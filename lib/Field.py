@@ -16,6 +16,10 @@ class Field():
     def __init__(self,cubesat,debug):
         self.debug=debug
         self.cubesat=cubesat
+        self.configure()
+
+    def configure(self):
+        # Radio on with the beacon settings; re-applied before each transmission
         try:
             self.cubesat.enable_rf.value=True
             self.cubesat.radio1.spreading_factor=8
@@ -36,6 +40,13 @@ class Field():
         except Exception as e:
             self.debug_print("Tried Beaconing but encountered error: ".join(traceback.format_exception(e)))
 
+    async def Beacon_async(self, msg):
+        try:
+            self.debug_print("I am beaconing: " + str(msg))
+            await self.cubesat.radio1.send_async(msg)
+        except Exception as e:
+            self.debug_print("Tried Beaconing but encountered error: " + ''.join(traceback.format_exception(e)))
+
     def troubleshooting(self):
         # this is for troubleshooting comms
         pass
@@ -30,6 +30,7 @@ __repo__ = "https:# github.com/adafruit/Adafruit_CircuitPython_BNO08x.git"
 
 from struct import unpack_from, pack_into
 from collections import namedtuple
+from array import array
 import time
 from micropython import const
 
@@ -153,6 +154,19 @@ _AVAIL_SENSOR_REPORTS = {
     BNO_REPORT_RAW_GYROSCOPE: (1, 3, 16),
     BNO_REPORT_RAW_MAGNETOMETER: (1, 3, 16),
 }
+# Vector reports decoded in place into a preallocated slot per report
+_SLOT_REPORTS = (
+    BNO_REPORT_ACCELEROMETER,
+    BNO_REPORT_GYROSCOPE,
+    BNO_REPORT_MAGNETOMETER,
+    BNO_REPORT_LINEAR_ACCELERATION,
+    BNO_REPORT_ROTATION_VECTOR,
+    BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR,
+    BNO_REPORT_GAME_ROTATION_VECTOR,
+    BNO_REPORT_RAW_ACCELEROMETER,
+    BNO_REPORT_RAW_GYROSCOPE,
+    BNO_REPORT_RAW_MAGNETOMETER,
+)
 _INITIAL_REPORTS = {
     BNO_REPORT_ACTIVITY_CLASSIFIER: {
         "Tilting": -1,
@@ -206,6 +220,19 @@ def _elapsed(start_time):
     return time.monotonic() - start_time
 
 
+def _s32(buf, offset):
+    # little endian int32 without the tuple unpack_from would allocate
+    value = (
+        buf[offset]
+        | (buf[offset + 1] << 8)
+        | (buf[offset + 2] << 16)
+        | (buf[offset + 3] << 24)
+    )
+    if value & 0x80000000:
+        value -= 0x100000000
+    return value
+
+
 ############ PACKET PARSING ###########################
 def _parse_sensor_report_data(report_bytes):
     """Parses reports with only 16-bit fields"""
@@ -510,6 +537,10 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         self._id_read = False
         # for saving the most recent reading when decoding several packets
         self._readings = {}
+        # per report: [host time of its packet (ns), delay from that time (100us ticks)]
+        self._report_times = {}
+        self._packet_time = 0
+        self._base_ticks = 0
         self.initialize()
 
     def initialize(self):
@@ -530,7 +561,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         """A tuple of the current magnetic field measurements on the X, Y, and Z axes"""
         self._process_available_packets()  # decorator?
         try:
-            return self._readings[BNO_REPORT_MAGNETOMETER]
+            return tuple(self._readings[BNO_REPORT_MAGNETOMETER])
         except KeyError:
             raise RuntimeError("No magfield report found, is it enabled?") from None
 
@@ -539,7 +570,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         """A quaternion representing the current rotation vector"""
         self._process_available_packets()
         try:
-            return self._readings[BNO_REPORT_ROTATION_VECTOR]
+            return tuple(self._readings[BNO_REPORT_ROTATION_VECTOR])
         except KeyError:
             raise RuntimeError("No quaternion report found, is it enabled?") from None
 
@@ -548,7 +579,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         """A quaternion representing the current geomagnetic rotation vector"""
         self._process_available_packets()
         try:
-            return self._readings[BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR]
+            return tuple(self._readings[BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR])
         except KeyError:
             raise RuntimeError(
                 "No geomag quaternion report found, is it enabled?"
@@ -562,7 +593,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         corrected using the magnetometer. Some drift is expected"""
         self._process_available_packets()
         try:
-            return self._readings[BNO_REPORT_GAME_ROTATION_VECTOR]
+            return tuple(self._readings[BNO_REPORT_GAME_ROTATION_VECTOR])
         except KeyError:
             raise RuntimeError(
                 "No game quaternion report found, is it enabled?"
@@ -583,7 +614,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         axes in meters per second squared"""
         self._process_available_packets()
         try:
-            return self._readings[BNO_REPORT_LINEAR_ACCELERATION]
+            return tuple(self._readings[BNO_REPORT_LINEAR_ACCELERATION])
         except KeyError:
             raise RuntimeError("No lin. accel report found, is it enabled?") from None
 
@@ -593,7 +624,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         axes in meters per second squared"""
         self._process_available_packets()
         try:
-            return self._readings[BNO_REPORT_ACCELEROMETER]
+            return tuple(self._readings[BNO_REPORT_ACCELEROMETER])
         except KeyError:
             raise RuntimeError("No accel report found, is it enabled?") from None
 
@@ -603,7 +634,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         axes in radians per second"""
         self._process_available_packets()
         try:
-            return self._readings[BNO_REPORT_GYROSCOPE]
+            return tuple(self._readings[BNO_REPORT_GYROSCOPE])
         except KeyError:
             raise RuntimeError("No gyro report found, is it enabled?") from None
 
@@ -677,7 +708,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         """Returns the sensor's raw, unscaled value from the accelerometer registers"""
         self._process_available_packets()
         try:
-            raw_acceleration = self._readings[BNO_REPORT_RAW_ACCELEROMETER]
+            raw_acceleration = tuple(self._readings[BNO_REPORT_RAW_ACCELEROMETER])
             return raw_acceleration
         except KeyError:
             raise RuntimeError(
@@ -689,7 +720,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         """Returns the sensor's raw, unscaled value from the gyro registers"""
         self._process_available_packets()
         try:
-            raw_gyro = self._readings[BNO_REPORT_RAW_GYROSCOPE]
+            raw_gyro = tuple(self._readings[BNO_REPORT_RAW_GYROSCOPE])
             return raw_gyro
         except KeyError:
             raise RuntimeError("No raw gyro report found, is it enabled?") from None
@@ -699,7 +730,7 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         """Returns the sensor's raw, unscaled value from the magnetometer registers"""
         self._process_available_packets()
         try:
-            raw_magnetic = self._readings[BNO_REPORT_RAW_MAGNETOMETER]
+            raw_magnetic = tuple(self._readings[BNO_REPORT_RAW_MAGNETOMETER])
             return raw_magnetic
         except KeyError:
             raise RuntimeError("No raw magnetic report found, is it enabled?") from None
@@ -775,25 +806,38 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
                 return
         raise RuntimeError("Could not save calibration data")
 
+    def update(self):
+        """Drain every packet the sensor has queued in a single pass.
+        Returns the number of packets processed"""
+        return self._process_available_packets()
+
+    def reading(self, report_id):
+        """The latest value of an enabled report and its sensor timestamp, in
+        `time.monotonic_ns()` units, without touching the bus. Call `update` first.
+        Returns (None, None) if the report has not arrived yet"""
+        value = self._readings.get(report_id)
+        times = self._report_times.get(report_id)
+        if value is None or times is None or not times[0]:
+            return None, None
+        return tuple(value), times[0] + times[1] * 100000
+
     ############### private/helper methods ###############
     # # decorator?
     def _process_available_packets(self, max_packets=None):
+        # Hot path: packets are decoded straight out of _data_buffer, no Packet objects
         processed_count = 0
         while self._data_ready:
             if max_packets and processed_count > max_packets:
-                return
-            # print("reading a packet")
+                return processed_count
             try:
-                new_packet = self._read_packet()
+                packet_byte_count = self._read_packet_into()
             except PacketError:
                 continue
-            self._handle_packet(new_packet)
+            self._handle_buffer(packet_byte_count)
             processed_count += 1
-            self._dbg("")
-            # print("Processed", processed_count, "packets")
-            self._dbg("")
-        self._dbg("")
-        self._dbg(" ** DONE! **")
+        if self._debug:
+            self._dbg(" ** DONE! **")
+        return processed_count
 
     def _wait_for_packet_type(self, channel_number, report_id=None, timeout=5.0):
         if report_id:
@@ -837,7 +881,65 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         seq = new_packet.header.sequence_number
         self._sequence_number[channel] = seq
 
+    def _handle_buffer(self, packet_byte_count):
+        """Decode every report of the packet sitting in _data_buffer, in order, so the
+        newest report of each type wins. Vector reports are written into their slots
+        without allocating; everything else goes through _process_report"""
+        buf = self._data_buffer
+        self._packet_time = time.monotonic_ns()
+        self._base_ticks = 0
+        index = _BNO_HEADER_LEN
+        while index < packet_byte_count:
+            report_id = buf[index]
+            required_bytes = _report_length(report_id)
+            if packet_byte_count - index < required_bytes:
+                raise RuntimeError("Unprocessable Batch bytes", packet_byte_count - index)
+            if report_id == _BASE_TIMESTAMP:
+                self._base_ticks = _s32(buf, index + 1)
+            elif report_id in self._report_times:
+                self._decode_into(report_id, buf, index)
+            else:
+                self._process_report(
+                    report_id, buf[index : index + required_bytes]
+                )
+            index += required_bytes
+
+    def _decode_into(self, report_id, buf, offset):
+        slot = self._readings[report_id]
+        scalar = _AVAIL_SENSOR_REPORTS[report_id][0]
+        status = buf[offset + 2]
+        if report_id == BNO_REPORT_MAGNETOMETER:
+            self._magnetometer_accuracy = status & 0b11
+        times = self._report_times[report_id]
+        times[0] = self._packet_time
+        # 14 bit delay from the base timestamp, 100us ticks
+        times[1] = (((status >> 2) << 8) | buf[offset + 3]) - self._base_ticks
+        signed = report_id not in _RAW_REPORTS
+        offset += 4
+        for idx in range(len(slot)):
+            raw = buf[offset] | (buf[offset + 1] << 8)
+            if signed and raw & 0x8000:
+                raw -= 0x10000
+            slot[idx] = raw * scalar
+            offset += 2
+
+    def _enable_slot(self, report_id):
+        if report_id in self._report_times:
+            return
+        count = _AVAIL_SENSOR_REPORTS[report_id][1]
+        if report_id in _RAW_REPORTS:
+            self._readings[report_id] = array("l", [0] * count)
+        else:
+            self._readings[report_id] = array("f", [0.0] * count)
+        self._report_times[report_id] = array("q", [0, 0])
+
     def _handle_packet(self, packet):
+        # A batch starts with a base timestamp: how long (100us ticks) before the
+        # host read the batch reference time was. Report delays count from there.
+        self._packet_time = time.monotonic_ns()
+        self._base_ticks = 0
+        if packet.header.data_length >= 5 and packet.data[0] == _BASE_TIMESTAMP:
+            self._base_ticks = _s32(packet.data, 1)
         # split out reports first
         try:
             _separate_batch(packet, self._packet_slices)
@@ -865,9 +967,12 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         if report_id == _GET_FEATURE_RESPONSE:
             get_feature_report = _parse_get_feature_response_report(report_bytes)
             _report_id, feature_report_id, *_remainder = get_feature_report
-            self._readings[feature_report_id] = _INITIAL_REPORTS.get(
-                feature_report_id, (0.0, 0.0, 0.0)
-            )
+            if feature_report_id in _SLOT_REPORTS:
+                self._enable_slot(feature_report_id)
+            else:
+                self._readings[feature_report_id] = _INITIAL_REPORTS.get(
+                    feature_report_id, (0.0, 0.0, 0.0)
+                )
         if report_id == _COMMAND_RESPONSE:
             self._handle_command_response(report_bytes)
 
@@ -932,6 +1037,10 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
             activity_classification = _parse_activity_classifier_report(report_bytes)
             self._readings[BNO_REPORT_ACTIVITY_CLASSIFIER] = activity_classification
             return
+        if report_id in _SLOT_REPORTS:
+            self._enable_slot(report_id)
+            self._decode_into(report_id, report_bytes, 0)
+            return
         sensor_data, accuracy = _parse_sensor_report_data(report_bytes)
         if report_id == BNO_REPORT_MAGNETOMETER:
             self._magnetometer_accuracy = accuracy
@@ -1078,6 +1187,12 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
     def _read_packet(self):
         raise RuntimeError("Not implemented")
 
+    def _read_packet_into(self):
+        """Read the next packet into _data_buffer and return its byte count, header included.
+        Transports override this to skip building a Packet"""
+        packet = self._read_packet()
+        return packet.header.packet_byte_count
+
     def _increment_report_seq(self, report_id):
         current = self._two_ended_sequence_numbers.get(report_id, 0)
         self._two_ended_sequence_numbers[report_id] = (current + 1) % 256
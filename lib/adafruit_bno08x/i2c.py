@@ -89,6 +89,18 @@ class BNO08X_I2C(BNO08X):
 
         return new_packet
 
+    def _read_packet_into(self):
+        # _data_ready has just read this packet's header into _data_buffer and the
+        # sensor re-sends the packet from its start on the next read, so one read
+        # of the full length gets it all
+        buf = self._data_buffer
+        packet_byte_count = (buf[0] | (buf[1] << 8)) & 0x7FFF
+        self._sequence_number[buf[2]] = buf[3]
+        if packet_byte_count <= 4:
+            raise PacketError("No packet available")
+        self._read(packet_byte_count - 4)
+        return packet_byte_count
+
     # returns true if all requested data was read
     def _read(self, requested_read_length):
         self._dbg("trying to read", requested_read_length, "bytes")
@@ -105,17 +117,21 @@ class BNO08X_I2C(BNO08X):
 
     @property
     def _data_ready(self):
-        header = self._read_header()
+        # decoded in place: this runs once per packet plus once per drain
+        with self.bus_device_obj as i2c:
+            i2c.readinto(self._data_buffer, end=4)
+        buf = self._data_buffer
+        packet_byte_count = (buf[0] | (buf[1] << 8)) & 0x7FFF
 
-        if header.channel_number > 5:
-            self._dbg("channel number out of range:", header.channel_number)
-        if header.packet_byte_count == 0x7FFF:
+        if buf[2] > 5:
+            self._dbg("channel number out of range:", buf[2])
+        if packet_byte_count == 0x7FFF:
             print("Byte count is 0x7FFF/0xFFFF; Error?")
-            if header.sequence_number == 0xFF:
+            if buf[3] == 0xFF:
                 print("Sequence number is 0xFF; Error?")
             ready = False
         else:
-            ready = header.data_length > 0
+            ready = packet_byte_count > 4
 
         # self._dbg("\tdata ready", ready)
         return ready
@@ -168,6 +168,10 @@ def _promote_to_task(aw):
     return aw if isinstance(aw, Task) else create_task(aw)
 
 
+# Opt-in task profiler (see task_profiler.py); wraps the coroutines of new tasks
+_profiler = None
+
+
 # Create and schedule a new task from a coroutine
 def create_task(coro):
     """Create a new task from the given coroutine and schedule it to run.
@@ -177,6 +181,8 @@ def create_task(coro):
 
     if not hasattr(coro, "send"):
         raise TypeError("coroutine expected")
+    if _profiler is not None:
+        coro = _profiler.wrap(coro)
     t = Task(coro, globals())
     _task_queue.push_head(t)
     return t
@@ -1,3 +1,5 @@
+import binascii
+
 class bitFlag:
     '''
     Single bit register WITHIN a byte that can be read or set
@@ -11,13 +13,13 @@ class bitFlag:
         self.byte=register
 
     def __get__(self,obj,objtype=None):
-        return bool(obj.micro.nvm[self.byte] & self.bit_mask)
+        return bool(obj.nvm[self.byte] & self.bit_mask)
 
     def __set__(self,obj,value):
         if value:
-            obj.micro.nvm[self.byte] |= self.bit_mask
+            obj.nvm[self.byte] |= self.bit_mask
         else:
-            obj.micro.nvm[self.byte] &= ~self.bit_mask
+            obj.nvm[self.byte] &= ~self.bit_mask
 
 class multiBitFlag:
     '''
@@ -37,15 +39,15 @@ class multiBitFlag:
         #     raise ValueError("Cannot have more bits than register size")
 
     def __get__(self,obj,objtype=None):
-        return (obj.micro.nvm[self.byte] & self.bit_mask) >> self.lowest_bit
+        return (obj.nvm[self.byte] & self.bit_mask) >> self.lowest_bit
 
     def __set__(self,obj,value):
         if value >= self.maxval:
             value=self.maxval
         value <<= self.lowest_bit
-        reg=obj.micro.nvm[self.byte]
+        reg=obj.nvm[self.byte]
         reg &= ~self.bit_mask
-        obj.micro.nvm[self.byte] = (reg | value)
+        obj.nvm[self.byte] = (reg | value)
 
 class multiByte:
     '''
@@ -59,10 +61,76 @@ class multiByte:
         self.num_bytes = num_bytes
 
     def __get__(self,obj,objtype=None):
-        return int.from_bytes(obj.micro.nvm[self.start:self.stop],'big')
+        return int.from_bytes(obj.nvm[self.start:self.stop],'big')
 
     def __set__(self,obj,value):
         if value >= self.maxval:
             value=self.maxval
-        obj.micro.nvm[self.start:self.stop] = value.to_bytes(self.num_bytes,'big')
+        obj.nvm[self.start:self.stop] = value.to_bytes(self.num_bytes,'big')
+
+class NVMShadow:
+    '''
+    RAM copy of the register block nvm[start:start+size] for the descriptors
+    above (point obj.nvm at it). Reads come from RAM; writes only mark the
+    block dirty, and commit() stores everything changed since the last commit
+    with one nvm[a:b] slice assignment. Each nvm write is a flash sector
+    erase on the RP2040, so flags flipped in a loop cost one write per
+    commit, not one per assignment.
+
+    The two bytes after the block hold a 16-bit check (low half of the
+    CRC-32 of the block). crc_ok is False when the stored check did not
+    match at load: the registers were corrupted or never sealed. The next
+    commit() reseals them.
+    '''
+    def __init__(self,nvm,size,start=0):
+        self.nvm=nvm
+        self.start=start
+        self.size=size
+        self.regs=bytearray(nvm[start:start+size+2])
+        self.crc_ok=self._crc()==self.regs[size]|(self.regs[size+1]<<8)
+        self.lo=None
+        self.commits=0
+
+    def _crc(self):
+        return binascii.crc32(self.regs[:self.size]) & 0xFFFF
+
+    def __getitem__(self,key):
+        return self.regs[key]
+
+    def __setitem__(self,key,value):
+        if isinstance(key,slice):
+            lo=key.start or 0
+            hi=self.size if key.stop is None else key.stop
+            # regs holds the check after the block: an open or long slice would overwrite it
+            key=slice(lo,hi)
+        else:
+            lo=key
+            hi=lo+1
+        if not 0 <= lo < hi <= self.size:
+            raise IndexError('register outside the NVM shadow')
+        if isinstance(key,slice) and len(value)!=hi-lo:
+            # a bytearray slice assignment would resize regs and move the check
+            raise ValueError('value does not fit the registers')
+        if self.regs[key]==value:
+            return
+        self.regs[key]=value
+        if self.lo is None or lo < self.lo:
+            self.lo=lo
+
+    @property
+    def dirty(self):
+        return self.lo is not None or not self.crc_ok
 
+    def commit(self):
+        '''Writes the changed registers and the check to NVM. True if it wrote'''
+        if not self.dirty:
+            return False
+        lo=0 if self.lo is None else self.lo
+        crc=self._crc()
+        self.regs[self.size]=crc & 0xFF
+        self.regs[self.size+1]=crc >> 8
+        self.nvm[self.start+lo:self.start+self.size+2]=self.regs[lo:self.size+2]
+        self.lo=None
+        self.crc_ok=True
+        self.commits+=1
+        return True
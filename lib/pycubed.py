@@ -78,6 +78,7 @@ class Satellite:
         self.send_buff = memoryview(SEND_BUFF)
         self.debug=False #Define verbose output here. True or False
         self.micro=microcontroller
+        self.nvm=self.micro.nvm # bitflags registers, written through
         self.hardware = {
                        'IMU':    False,
                        'Radio1': False,
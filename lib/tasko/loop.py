@@ -27,6 +27,44 @@ def _get_future_nanos(seconds_in_future):
     return _monotonic_ns() + int(seconds_in_future * 1000000000)
 
 
+# Binary min-heap on a plain list, as heapq is not in every CircuitPython build.
+# Entries are tuples ending in a unique sequence number, so ties never reach the
+# Task/Sleeper objects at the end of the tuple.
+def _heappush(heap, item):
+    heap.append(item)
+    pos = len(heap) - 1
+    while pos > 0:
+        parent = (pos - 1) >> 1
+        if item < heap[parent]:
+            heap[pos] = heap[parent]
+            pos = parent
+        else:
+            break
+    heap[pos] = item
+
+
+def _heappop(heap):
+    last = heap.pop()
+    if not heap:
+        return last
+    top = heap[0]
+    end = len(heap)
+    pos = 0
+    child = 1
+    while child < end:
+        right = child + 1
+        if right < end and heap[right] < heap[child]:
+            child = right
+        if heap[child] < last:
+            heap[pos] = heap[child]
+            pos = child
+            child = 2 * pos + 1
+        else:
+            break
+    heap[pos] = last
+    return top
+
+
 class Sleeper:
     def __init__(self, resume_nanos, task):
         self.task = task
@@ -149,10 +187,15 @@ class Loop:
     """
 
     def __init__(self, debug=False):
+        # Heaps: _tasks holds (priority, seq, Task), _sleeping holds
+        # (resume_nanos, priority, seq, Sleeper). seq keeps FIFO order among equals.
         self._tasks = []
         self._sleeping = []
         self._ready = []
+        self._seq = 0
         self._current = None
+        # Opt-in task_profiler.TaskProfiler, set by its install()
+        self.profiler = None
         self.debug=debug
         if debug:
             self._debug = print
@@ -168,7 +211,7 @@ class Loop:
         """
         self._debug("adding task ", awaitable_task)
         # Added a priority parameter
-        self._tasks.append(Task(awaitable_task, priority))
+        self._push_task(Task(awaitable_task, priority))
 
     async def sleep(self, seconds):
         """
@@ -214,7 +257,7 @@ class Loop:
         suspended = self._current
 
         def resume():
-            self._tasks.append(suspended)
+            self._push_task(suspended)
 
         self._current = None
         return _yield_once(), resume
@@ -297,46 +340,56 @@ class Loop:
         # self._step()
         self._debug("Loop completed", self._tasks, self._sleeping)
 
-    def _step(self):
-        self._debug("  stepping over ", len(self._tasks), " tasks")
+    def idle_seconds(self):
+        """
+        Seconds until the loop has work: 0 while tasks are active, None when it has nothing at all.
+        For driving the loop from another scheduler with _step(block=False).
+        """
+        if self._tasks:
+            return 0
+        if not self._sleeping:
+            return None
+        return max(0, self._sleeping[0][0] - _monotonic_ns()) / 1000000000.0
 
-        # Sort tasks by priority
-        self._tasks.sort(key=Task.priority_sort)
+    def _step(self, block=True):
+        self._debug("  stepping over ", len(self._tasks), " tasks")
 
-        for _ in range(len(self._tasks)):
-            task = self._tasks.pop(0)
-            self._run_task(task)
+        # Run the active tasks in priority order. Tasks that stay active are
+        # queued on a fresh heap for the next step, so each runs once per step.
+        tasks = self._tasks
+        self._tasks = []
+        while tasks:
+            self._run_task(_heappop(tasks)[2])
 
         if self.debug:
-            self._debug("  sleeping list (unsorted):")
+            self._debug("  sleeping heap:")
             for i in self._sleeping:
-                self._debug("    {}".format(i))
+                self._debug("    {}".format(i[3]))
 
-        #Create the ready list based on whichever tasks are ready to be executed
-        self._ready = [x for x in self._sleeping if x.resume_nanos() <= _monotonic_ns()]
-        #Sort the ready tasks based on priority
-        self._ready.sort(key=lambda x: x.task.priority)
+        # Move the sleepers that are due onto the ready heap. The sleeping heap is
+        # ordered by resume time, so this stops at the first one still waiting.
+        now = _monotonic_ns()
+        sleeping = self._sleeping
+        ready = self._ready
+        while sleeping and sleeping[0][0] <= now:
+            entry = _heappop(sleeping)
+            _heappush(ready, (entry[1], entry[2], entry[3]))
 
         if self.debug:
-            self._debug("  ready list (sorted)")
-            for i in self._ready:
-                self._debug("    {}".format(i))
-
-
-        #Run the ready tasks, and simultaneously remove them from the _sleeping and _ready lists
-        for i in range(len(self._ready)):
-            ready_task = self._ready.pop(0)
-            self._sleeping.remove(ready_task)
-            self._run_task(ready_task.task)
+            self._debug("  ready heap:")
+            for i in ready:
+                self._debug("    {}".format(i[2]))
 
-        if len(self._tasks) == 0 and len(self._sleeping) > 0:
+        # Run the ready tasks by priority. Anything they put back to sleep goes on
+        # the sleeping heap and waits for the next step, even if already due.
+        while ready:
+            sleeper = _heappop(ready)[2]
+            self._run_task(sleeper.task, sleeper.resume_nanos())
 
-            #Sort the sleeper list only when we need to, i.e, only
-            #when there are no active tasks, and the system needs to
-            #ACTUALLY sleep.
+        if block and len(self._tasks) == 0 and len(sleeping) > 0:
 
-            self._sleeping.sort(key=Sleeper.resume_nanos)
-            next_sleeper = self._sleeping[0]
+            # The earliest sleeper is always at the top of the heap.
+            next_sleeper = sleeping[0][3]
             sleep_nanos = next_sleeper.resume_nanos() - _monotonic_ns()
 
             if sleep_nanos > 0:
@@ -353,20 +406,24 @@ class Loop:
 
                 time.sleep(sleep_seconds)
 
-    def _run_task(self, task: Task):
+    def _run_task(self, task: Task, due_nanos=None):
         """
         Runs a task and re-queues for the next loop if it is both (1) not complete and (2) not sleeping.
+        due_nanos is when a sleeping task asked to resume, for the profiler.
         """
 
         self._current = task
         try:
 
-            task.coroutine.send(None)
+            if self.profiler is None:
+                task.coroutine.send(None)
+            else:
+                self.profiler.resume(task, due_nanos, _monotonic_ns())
             self._debug("  current", self._current)
             # Sleep gate here, in case the current task suspended.
             # If a sleeping task re-suspends it will have already put itself in the sleeping queue.
             if self._current is not None:
-                self._tasks.append(task)
+                self._push_task(task)
         except StopIteration:
             # This task is all done.
             self._debug("  task complete")
@@ -374,13 +431,21 @@ class Loop:
         finally:
             self._current = None
 
+    def _push_task(self, task):
+        self._seq += 1
+        _heappush(self._tasks, (task.priority, self._seq, task))
+
     async def _sleep_until_nanos(self, target_run_nanos):
         """
         From within a coroutine, sleeps until the target time.monotonic_ns
         Returns the thing to await
         """
         assert self._current is not None, "You can only sleep from within a task"
-        self._sleeping.append(Sleeper(target_run_nanos, self._current))
+        self._seq += 1
+        _heappush(
+            self._sleeping,
+            (target_run_nanos, self._current.priority, self._seq, Sleeper(target_run_nanos, self._current)),
+        )
         self._debug("  sleeping ", self._current)
         self._current = None
         # Pretty subtle here.  This yields once, then it continues next time the task scheduler executes it.
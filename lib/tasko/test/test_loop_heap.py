@@ -0,0 +1,137 @@
+from tasko import loop as loop_module
+from tasko.loop import _heappop, _heappush, _yield_once, set_time_provider
+import random
+import time
+from unittest import TestCase
+
+from tasko import Loop
+
+
+class FakeClock:
+    """Time provider whose sleep() just moves the clock, standing in for the time module"""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += int(seconds * 1000000000)
+
+
+class TestLoopHeap(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        set_time_provider(self.clock)
+        loop_module.time = self.clock
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+        loop_module.time = time
+
+    def test_heap_order(self):
+        random.seed(3)
+        heap = []
+        values = [random.randint(0, 1000) for _ in range(500)]
+        for v in values:
+            _heappush(heap, v)
+        self.assertEqual(sorted(values), [_heappop(heap) for _ in values])
+
+    def test_ready_by_priority(self):
+        loop = Loop()
+        order = []
+
+        async def sleeper(name, seconds):
+            await loop.sleep(seconds)
+            order.append(name)
+
+        loop.add_task(sleeper('late low', 2), 5)
+        loop.add_task(sleeper('low', 1), 5)
+        loop.add_task(sleeper('high', 1), 1)
+        loop.add_task(sleeper('mid', 1), 3)
+        loop._step()
+        self.clock.now = 1000000000
+        loop._step()
+        self.assertEqual(['high', 'mid', 'low'], order, 'due sleepers run in priority order')
+        self.clock.now = 2000000000
+        loop._step()
+        self.assertEqual('late low', order[-1])
+        self.assertFalse(loop._sleeping)
+
+    def test_active_task_runs_once_per_step(self):
+        loop = Loop()
+        count = 0
+
+        async def spin():
+            nonlocal count
+            while True:
+                count += 1
+                await _yield_once()
+
+        loop.add_task(spin(), 1)
+        for _ in range(3):
+            loop._step()
+        self.assertEqual(3, count)
+
+    def test_suspend_resume(self):
+        loop = Loop()
+        resumers = []
+        done = []
+
+        async def waiter():
+            suspender, resume = loop.suspend()
+            resumers.append(resume)
+            await suspender
+            done.append(True)
+
+        loop.add_task(waiter(), 1)
+        loop._step()
+        self.assertFalse(loop._tasks)
+        resumers[0]()
+        loop._step()
+        self.assertEqual([True], done)
+
+    def test_thousands_of_scheduled_tasks(self):
+        # Many fixed rate tasks under a fake clock. The loop's idle sleep jumps
+        # the clock to the next due sleeper, so every task hits its rate exactly.
+        # bench/tasko_heap_bench.py times this load.
+        tasks = 2000
+        rates = (1, 2, 4, 5, 8, 10, 20, 25, 40, 50)
+        counters = [0] * tasks
+        loop = Loop()
+
+        async def f(i):
+            counters[i] += 1
+
+        for i in range(tasks):
+            loop.schedule(rates[i % len(rates)], f, i % 4, i)
+
+        while self.clock.now <= 2000000000:
+            loop._step()
+
+        for i in range(tasks):
+            # Runs at t=0 then once per period up to and including t=2s
+            self.assertEqual(1 + 2 * rates[i % len(rates)], counters[i])
+
+    def test_many_sleepers(self):
+        # Thousands of long sleepers under a few fast tasks; only due sleepers
+        # are touched per step. bench/tasko_heap_bench.py times this load.
+        sleepers = 5000
+        count = 0
+        loop = Loop()
+
+        async def fast():
+            nonlocal count
+            count += 1
+
+        for i in range(sleepers):
+            loop.run_later(0.1 + i * 0.0001, loop.sleep(100), 1)
+        for _ in range(10):
+            loop.schedule(100, fast, 0)
+
+        while self.clock.now <= 2000000000:
+            loop._step()
+
+        self.assertEqual(10 * (1 + 2 * 100), count)
+        self.assertEqual(sleepers + 10, len(loop._sleeping))
@@ -0,0 +1,150 @@
+"""
+`tca_scheduler`
+====================================================
+
+Channel-caching front end for the TCA9548A I2C multiplexer on the face bus.
+
+The stock adafruit_tca9548a channel writes the channel-select byte to the
+mux on every lock, i.e. once per sensor register transaction. TCAScheduler
+remembers which channel is currently selected and only writes the mux when
+a transaction targets a different one. run() executes a batch of per-channel
+jobs grouped by channel, starting with the channel that is already selected,
+so a full face poll costs one mux write per face instead of one per read.
+
+Per-channel stats (locks, mux writes, bus hold time) are kept in fixed
+arrays and can be printed with print_stats().
+
+Implementation Notes
+--------------------
+Drop-in for adafruit_tca9548a.TCA9548A: tca[n] returns an object that can be
+handed to any driver expecting an I2C bus.
+"""
+
+import time
+from array import array
+from micropython import const
+
+_NO_CHANNEL = const(0xFF)
+
+
+class TCAChannel:
+    """One downstream bus of the mux. Passes transactions straight through."""
+
+    def __init__(self, tca, channel):
+        self.tca = tca
+        self.channel = channel
+        self.channel_switch = bytearray([1 << channel])
+
+    def try_lock(self):
+        tca = self.tca
+        while not tca.i2c.try_lock():
+            pass
+        if tca.selected != self.channel:
+            try:
+                tca.i2c.writeto(tca.address, self.channel_switch)
+            except Exception:
+                tca.selected = _NO_CHANNEL
+                tca.i2c.unlock()
+                raise
+            tca.selected = self.channel
+            tca.switches[self.channel] += 1
+        tca.locks[self.channel] += 1
+        tca._t0 = time.monotonic_ns()
+        return True
+
+    def unlock(self):
+        tca = self.tca
+        dt = (time.monotonic_ns() - tca._t0) // 1000
+        tca.busy_us[self.channel] += dt
+        if dt > tca.max_us[self.channel]:
+            tca.max_us[self.channel] = dt
+        return tca.i2c.unlock()
+
+    def readfrom_into(self, address, buffer, **kwargs):
+        if address == self.tca.address:
+            raise ValueError("Device address must be different than TCA9548A address.")
+        return self.tca.i2c.readfrom_into(address, buffer, **kwargs)
+
+    def writeto(self, address, buffer, **kwargs):
+        if address == self.tca.address:
+            raise ValueError("Device address must be different than TCA9548A address.")
+        try:
+            return self.tca.i2c.writeto(address, buffer, **kwargs)
+        except Exception:
+            # A failed write may have been a NACK from the mux itself
+            self.tca.selected = _NO_CHANNEL
+            raise
+
+    def writeto_then_readfrom(self, address, buffer_out, buffer_in, **kwargs):
+        if address == self.tca.address:
+            raise ValueError("Device address must be different than TCA9548A address.")
+        return self.tca.i2c.writeto_then_readfrom(address, buffer_out, buffer_in, **kwargs)
+
+    def scan(self):
+        return self.tca.i2c.scan()
+
+
+class TCAScheduler:
+    """
+    TCA9548A wrapper that skips redundant channel-select writes.
+
+    :param i2c: The upstream bus the mux sits on
+    :param address: Mux address (0x70 - 0x77)
+    """
+
+    def __init__(self, i2c, address=0x70):
+        self.i2c = i2c
+        self.address = address
+        self.selected = _NO_CHANNEL
+        self._t0 = 0
+        self.channels = [TCAChannel(self, i) for i in range(8)]
+        self.locks = array('L', [0]*8)
+        self.switches = array('L', [0]*8)
+        self.busy_us = array('L', [0]*8)
+        self.max_us = array('L', [0]*8)
+
+    def __len__(self):
+        return 8
+
+    def __getitem__(self, key):
+        if not 0 <= key <= 7:
+            raise IndexError("Channel must be an integer in the range: 0-7.")
+        return self.channels[key]
+
+    def invalidate(self):
+        """Forget the cached channel; the next transaction re-selects. Call after a mux reset or power cycle."""
+        self.selected = _NO_CHANNEL
+
+    def run(self, jobs, *args):
+        """
+        Run a batch of bus jobs grouped by mux channel.
+
+        :param jobs: list of (channel, function) pairs, sorted by channel. Each function is called with *args.
+        Starts at the group for the channel that is already selected (if any) and wraps around,
+        so every channel is selected at most once per batch.
+        """
+        n = len(jobs)
+        start = 0
+        for i in range(n):
+            if jobs[i][0] == self.selected:
+                start = i
+                break
+        for i in range(n):
+            jobs[(start + i) % n][1](*args)
+
+    def reset_stats(self):
+        for i in range(8):
+            self.locks[i] = 0
+            self.switches[i] = 0
+            self.busy_us[i] = 0
+            self.max_us[i] = 0
+
+    def stats(self, channel):
+        """Returns (transactions, mux writes, total bus time us, longest transaction us) for a channel"""
+        return self.locks[channel], self.switches[channel], self.busy_us[channel], self.max_us[channel]
+
+    def print_stats(self):
+        print("ch  locks  mux  busy_us  max_us")
+        for i in range(8):
+            if self.locks[i]:
+                print("{}  {:>5}  {:>3}  {:>7}  {:>6}".format(i, *self.stats(i)))
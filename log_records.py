@@ -0,0 +1,245 @@
+'''
+Binary log records for the SD card logs.
+
+Every record is a 7 byte header, a packed payload and a 2 byte check:
+
+    uint8 sync (0xA5) | uint8 type | uint8 payload length | uint32 ms since boot
+    payload
+    uint16 crc (low half of the CRC-32 of header and payload)
+
+Payloads, scaled integers with MISSING (-32768) for a reading that is None:
+    FACE  uint16 valid mask, then one int16 per valid FaceSample slot in slot
+          order: temperatures in 0.01 C, lux in 2 lux steps (unsigned)
+    POWER int16 vbatt mV, charge mA, vcharge mV, draw mA, vsys mV
+    IMU   int16 accel x,y,z 0.01 m/s^2, mag x,y,z 0.1 uT, gyro x,y,z mrad/s
+    RADIO int16 rssi dBm (TX: transmit power dBm), uint8 packet length,
+          uint8 direction (RX/TX)
+    TEXT  utf-8 message
+
+Records are self-delimiting, so a reader can start at any byte offset and
+find the next record by its sync byte and check. Reader.seek_time() uses that
+to bisect a file by time without reading it through. Each boot starts a new
+file, so times only grow within one file.
+
+bench/log_decode.py turns a log into CSV (or Parquet) on the ground.
+'''
+import struct
+import binascii
+from micropython import const
+
+SYNC = const(0xA5)
+FACE = const(1)
+POWER = const(2)
+IMU = const(3)
+RADIO = const(4)
+TEXT = const(5)
+NAMES = {FACE: 'face', POWER: 'power', IMU: 'imu', RADIO: 'radio', TEXT: 'text'}
+
+RX = const(0)
+TX = const(1)
+
+MISSING = const(-32768)
+HEADER = '<BBBI'
+HEADER_SIZE = const(7)
+CRC_SIZE = const(2)
+MAX_PAYLOAD = const(255)
+_SYNC_BYTE = bytes((SYNC,))
+
+# FaceSample slot layout (Big_Data): TEMP, LUX, COUPLE per face, 5 faces
+FACE_FIELDS = const(3)
+_LUX = const(1)
+_LUX_STEP = const(2)
+
+# Field scales (stored = value * scale)
+POWER_SCALES = (1000, 1, 1000, 1, 1000)
+IMU_SCALES = (100, 100, 100, 10, 10, 10, 1000, 1000, 1000)
+
+def _crc(data):
+    return binascii.crc32(data) & 0xFFFF
+
+def _scaled(value, scale):
+    if value is None:
+        return MISSING
+    v = int(round(value * scale))
+    if v > 32767:
+        return 32767
+    if v < -32767:
+        return -32767
+    return v
+
+def _unscaled(v, scale):
+    return None if v == MISSING else v / scale
+
+def pack(rtype, t_ms, payload):
+    '''One record around a payload (bytes)'''
+    if len(payload) > MAX_PAYLOAD:
+        payload = payload[:MAX_PAYLOAD]
+    head = struct.pack(HEADER, SYNC, rtype, len(payload), t_ms & 0xFFFFFFFF)
+    body = head + payload
+    return body + struct.pack('<H', _crc(body))
+
+def face(t_ms, faces):
+    '''
+    FACE record from per-face lists, [temp, lux] per face, [temp, lux, couple]
+    for the last one (Face_log / FaceSample.as_lists layout)
+    '''
+    mask = 0
+    values = []
+    for i in range(len(faces)):
+        data = faces[i]
+        for field in range(min(len(data), FACE_FIELDS)):
+            value = data[field]
+            if value is None:
+                continue
+            if field == _LUX:
+                v = int(value / _LUX_STEP + 0.5)
+                v = 0 if v < 0 else (65535 if v > 65535 else v)
+            else:
+                v = _scaled(value, 100) & 0xFFFF
+            mask |= 1 << (i * FACE_FIELDS + field)
+            values.append(v)
+    return pack(FACE, t_ms, struct.pack('<H' + str(len(values)) + 'H', mask, *values))
+
+def power(t_ms, vbatt, ichrg, vcharge, idraw, vsys):
+    values = (vbatt, ichrg, vcharge, idraw, vsys)
+    return pack(POWER, t_ms, struct.pack('<5h', *[_scaled(values[i], POWER_SCALES[i]) for i in range(5)]))
+
+def imu(t_ms, accel, mag, gyro):
+    values = []
+    for vector in (accel, mag, gyro):
+        for k in range(3):
+            values.append(None if vector is None else vector[k])
+    return pack(IMU, t_ms, struct.pack('<9h', *[_scaled(values[i], IMU_SCALES[i]) for i in range(9)]))
+
+def radio(t_ms, rssi, length, direction=RX):
+    return pack(RADIO, t_ms, struct.pack('<hBB', _scaled(rssi, 1), min(length, 255), direction))
+
+def text(t_ms, msg):
+    return pack(TEXT, t_ms, str(msg).encode())
+
+def fields(rtype, payload):
+    '''Decoded payload: a list of values (None for missing), a str for TEXT'''
+    if rtype == POWER:
+        raw = struct.unpack('<5h', payload)
+        return [_unscaled(raw[i], POWER_SCALES[i]) for i in range(5)]
+    if rtype == IMU:
+        raw = struct.unpack('<9h', payload)
+        return [_unscaled(raw[i], IMU_SCALES[i]) for i in range(9)]
+    if rtype == FACE:
+        mask = struct.unpack_from('<H', payload, 0)[0]
+        out = []
+        offset = 2
+        for slot in range(16):
+            if not mask & (1 << slot):
+                out.append(None)
+                continue
+            v = struct.unpack_from('<H', payload, offset)[0]
+            offset += 2
+            if slot % FACE_FIELDS == _LUX:
+                out.append(v * _LUX_STEP)
+            else:
+                out.append((v - 65536 if v > 32767 else v) / 100)
+        # Drop the unused slots after the last face
+        return out[:15]
+    if rtype == RADIO:
+        rssi, length, direction = struct.unpack('<hBB', payload)
+        return [_unscaled(rssi, 1), length, direction]
+    if rtype == TEXT:
+        return bytes(payload).decode()
+    return bytes(payload)
+
+class Reader:
+    '''
+    Iterates the records of an open binary log file (opened 'rb'). Damaged
+    bytes are skipped: the reader moves on to the next sync byte whose record
+    checks out, and counts the skipped bytes in `skipped`.
+    '''
+
+    def __init__(self, f, chunk=4096):
+        self.f = f
+        self.chunk = chunk
+        self.buf = b''
+        self.start = 0      # file offset of buf[0]
+        self.i = 0          # read position in buf
+        self.skipped = 0
+        f.seek(0, 2)
+        self.size = f.tell()
+        f.seek(0)
+
+    def _fill(self, need):
+        # Make sure buf holds `need` bytes from i on, if the file has them
+        if len(self.buf) - self.i < need:
+            self.start += self.i
+            self.f.seek(self.start)
+            self.buf = self.f.read(max(self.chunk, need))
+            self.i = 0
+        return len(self.buf) - self.i >= need
+
+    def seek(self, offset):
+        '''Continues from a byte offset (need not be a record boundary)'''
+        self.start = offset
+        self.buf = b''
+        self.i = 0
+
+    def next(self):
+        '''(offset, type, ms, payload) of the next good record, None at the end'''
+        while True:
+            if not self._fill(HEADER_SIZE):
+                return None
+            buf = self.buf
+            i = self.i
+            if buf[i] != SYNC:
+                j = buf.find(_SYNC_BYTE, i + 1)
+                if j < 0:
+                    j = len(buf)
+                self.skipped += j - i
+                self.i = j
+                continue
+            n = HEADER_SIZE + buf[i + 2] + CRC_SIZE
+            if not self._fill(n):
+                # Cut short by the end of the file: not a record
+                self.skipped += 1
+                self.i += 1
+                continue
+            buf = self.buf
+            i = self.i
+            end = i + n - CRC_SIZE
+            if struct.unpack_from('<H', buf, end)[0] != _crc(buf[i:end]):
+                self.skipped += 1
+                self.i = i + 1
+                continue
+            self.i = i + n
+            return self.start + i, buf[i + 1], struct.unpack_from('<I', buf, i + 3)[0], buf[i + HEADER_SIZE:end]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        record = self.next()
+        if record is None:
+            raise StopIteration
+        return record
+
+    def seek_time(self, t_ms):
+        '''
+        Positions the reader on the first record at or after t_ms by bisecting
+        the file on byte offsets. Returns that record's offset, None if no
+        record is that late.
+        '''
+        lo, hi = 0, self.size
+        while hi - lo > self.chunk:
+            mid = (lo + hi) // 2
+            self.seek(mid)
+            record = self.next()
+            if record is None or record[2] >= t_ms:
+                hi = mid
+            else:
+                lo = record[0] + 1
+        self.seek(lo)
+        while True:
+            record = self.next()
+            if record is None:
+                return None
+            if record[2] >= t_ms:
+                self.seek(record[0])
+                return record[0]
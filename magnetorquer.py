@@ -0,0 +1,136 @@
+'''
+Magnetorquer driver for Yearling.
+Each axis coil is driven by the DRV2605 on one face (x: Face2, y: Face0, z: Face4).
+All coils that need to fire are started together and each one is stopped after
+its own on-time, so one actuation step takes max(on-times) instead of their sum.
+On-time per axis is the commanded duration scaled by that axis' share of the dipole.
+
+The DRV2605 plays its effect in one direction only, so each coil can produce
+a dipole of one sign along its axis (polarity). An axis is only fired when the
+command has that sign; firing it for the other sign would add energy instead of
+removing it. For B-dot this half-wave drive still never adds rotational energy
+(dE/dt = -m.dB/dt stays <= 0 on every fired axis), it just damps more slowly.
+Pass polarity=None once a driver can reverse the coils.
+
+The coils belong to the shared face drivers (functions.face_sensors), which
+are rebuilt after the faces are power cycled. Every actuation binds the coils
+of the current AllFaces and loads the effect into drivers it has not seen.
+'''
+import time
+import asyncio
+import traceback
+from array import array
+from debugcolor import co
+
+class Magnetorquer:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[MTQ]" + statement, 'orange', 'bold'))
+
+    def __init__(self, faces, debug=False, threshold=1.0, max_dipole=None, sequence=52, polarity=(1, 1, 1)):
+        '''
+        faces:      callable returning the Big_Data.AllFaces that owns the motor
+                    drivers (functions.face_sensors)
+        threshold:  dipole components at or below this magnitude are not actuated
+        max_dipole: dipole magnitude that earns the full duration. None scales
+                    against the largest component of each command instead
+        sequence:   DRV2605 effect loaded into every coil driver
+        polarity:   sign of the dipole each coil (x, y, z) produces, None for coils
+                    that can be driven both ways
+        '''
+        self.debug = debug
+        self.threshold = threshold
+        self.max_dipole = max_dipole
+        self.polarity = polarity
+        self.faces = faces
+        self.sequence = sequence
+        self.coils = None
+        self._bound = None
+        self.on_time = array('f', [0.0, 0.0, 0.0])
+        self._active = [False, False, False]
+
+    def attach(self):
+        '''Binds the coils of the current AllFaces, loading the effect into new drivers'''
+        faces = self.faces()
+        if faces is not self._bound:
+            self._bound = faces
+            self.coils = (faces.Face2, faces.Face0, faces.Face4)
+            for coil in self.coils:
+                coil.drive = self.sequence
+        return self.coils
+
+    def durations(self, dipole, duration):
+        '''Fills self.on_time with the on-time (s) of each axis for this dipole command'''
+        scale = self.max_dipole
+        if scale is None:
+            scale = max(abs(dipole[0]), abs(dipole[1]), abs(dipole[2]))
+        for i in range(3):
+            if self.polarity is None:
+                m = abs(dipole[i])
+            else:
+                # a coil that can only push one way is left off for the other sign
+                m = dipole[i] * self.polarity[i]
+            if m <= self.threshold or scale <= 0:
+                self.on_time[i] = 0.0
+            else:
+                self.on_time[i] = duration * min(1.0, m/scale)
+        return self.on_time
+
+    def _start(self, dipole, duration):
+        self.attach()
+        self.durations(dipole, duration)
+        for i in range(3):
+            if self.on_time[i] > 0:
+                self._active[i] = self.coils[i].drv_play()
+        if self.debug:
+            self.debug_print("On-times x,y,z: " + str(list(self.on_time)))
+
+    def _next_stop(self, elapsed):
+        '''Returns (axis, time until it stops) for the next active coil, (None, 0) when all are stopped'''
+        axis = None
+        for i in range(3):
+            if self._active[i] and (axis is None or self.on_time[i] < self.on_time[axis]):
+                axis = i
+        if axis is None:
+            return None, 0
+        return axis, max(0, self.on_time[axis] - elapsed)
+
+    def stop(self):
+        for i in range(3):
+            if self._active[i]:
+                try:
+                    self.coils[i].drv_stop()
+                except Exception as e:
+                    self.debug_print('Coil stop error: ' + ''.join(traceback.format_exception(e)))
+                self._active[i] = False
+
+    def actuate_blocking(self, dipole, duration):
+        '''Concurrent actuation for callers outside the event loop'''
+        try:
+            self._start(dipole, duration)
+            start = time.monotonic()
+            while True:
+                axis, wait = self._next_stop(time.monotonic() - start)
+                if axis is None:
+                    break
+                time.sleep(wait)
+                self.coils[axis].drv_stop()
+                self._active[axis] = False
+        finally:
+            self.stop()
+
+    async def actuate(self, dipole, duration):
+        '''Concurrent actuation that yields to the event loop while the coils are on'''
+        try:
+            self._start(dipole, duration)
+            start = time.monotonic()
+            while True:
+                axis, wait = self._next_stop(time.monotonic() - start)
+                if axis is None:
+                    break
+                await asyncio.sleep(wait)
+                self.coils[axis].drv_stop()
+                self._active[axis] = False
+        finally:
+            self.stop()
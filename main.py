@@ -10,6 +10,7 @@ import traceback
 import gc #Garbage collection
 import microcontroller
 import functions
+import import_profiler
 from debugcolor import co
 def debug_print(statement):
     if c.debug:
@@ -20,14 +21,21 @@ try:
     debug_print(str(gc.mem_free()) + " Bytes remaining")
     #setup global vars below:
     lora_beacon = "KN6NAT Hello I am Yearling! IHBPFJASTMNE! KN6NAT"
+    #per-task scheduler profiling (cdh 'profile' command), off unless debugging task starvation
+    profile_tasks = False
 
-    #power cycle faces to ensure sensors are on:
+    #power cycle faces to ensure sensors are on. They stay off (at least 1 s) through
+    #the battery check and the first beacon instead of a fixed sleep
     c.all_faces_off()
-    time.sleep(1)
-    c.all_faces_on()
+    faces_off=time.monotonic()
     #test the battery:
     c.battery_manager()
     f.beacon()
+    c.boot.mark('beacon')
+    import_profiler.uninstall()
+    c.boot.save('boot ' + str(c.c_boot))
+    c.boot.wait_until(faces_off+1)
+    c.all_faces_on()
     f.listen()
     distance1=0
     distance2=0
@@ -120,39 +128,24 @@ def normal_power_operations():
     debug_print("Entering Norm Operations")
     FaceData=[]
     #Defining L1 Tasks
-    def check_power():
-        gc.collect()
-        c.battery_manager()
-        f.battery_heater()
-        c.check_reboot()
-        c.battery_manager() #Second check to make sure we have enough power to continue
-        
-        if c.power_mode == 'normal' or c.power_mode == 'maximum': 
-            pwr = True
-            if c.power_mode == 'normal':
-                c.RGB=(255,255,0)
-            else:
-                c.RGB=(0,255,0)
-        else:
-            pwr = False
-
-        debug_print(c.power_mode)
-        gc.collect()
-        return pwr
+    #One task runs the power checks and publishes the mode; the others read power.ok
+    #and are cancelled when the satellite leaves normal/maximum power.
+    #Every wait below (power averaging, heater, radio air time, listening) yields to the other tasks
+    power=f.power_state()
     
     async def s_lora_beacon():
         
-        while check_power():
-            f.beacon()
-            f.listen()
-            f.state_of_health()   
-            time.sleep(1) # Guard Time
+        while power.ok:
+            await f.beacon_async()
+            await f.listen_async()
+            await f.state_of_health_async()
+            await asyncio.sleep(1) # Guard Time
             
             await asyncio.sleep(30)
 
     async def g_face_data():
         
-        while check_power():
+        while power.ok:
 
             FaceData=[]
 
@@ -174,10 +167,10 @@ def normal_power_operations():
 
         await asyncio.sleep(20)
 
-        while check_power():
+        while power.ok:
             try:
                 debug_print("Looking to send face data...")
-                f.send_face()
+                await f.send_face_async()
                 
             except asyncio.TimeoutError as e:
                 debug_print('Outta time! ' + ''.join(traceback.format_exception(e)))
@@ -186,19 +179,47 @@ def normal_power_operations():
             
             await asyncio.sleep(200)
 
+    async def g_imu_data():
+
+        imu=f.imu_acquisition()
+        
+        while power.ok:
+            
+            try:
+                #Sample in the background in one minute runs; the power task cancels this on a mode change
+                await imu.run(duration=60)
+            except Exception as e:
+                debug_print('IMU sampling error: ' + ''.join(traceback.format_exception(e)))
+            
+            gc.collect()
+            await asyncio.sleep(0)
+
+    async def g_attitude():
+
+        estimator=f.attitude_estimator()
+        sun=f.sun_sensor()
+        
+        while power.ok:
+            
+            try:
+                await estimator.run(c.IMU, sun=sun, duration=60)
+            except Exception as e:
+                debug_print('Attitude estimator error: ' + ''.join(traceback.format_exception(e)))
+            
+            gc.collect()
+            await asyncio.sleep(0)
+
     async def s_imu_data():
 
         await asyncio.sleep(45)
         
-        while check_power():
+        while power.ok:
             
             try:
-                debug_print("Looking to get imu data...")
-                IMUData=[]
-
-                debug_print("IMU has baton")
-                IMUData = f.get_imu_data()
-                f.send(IMUData)
+                debug_print("Looking to send imu data...")
+                #Window statistics instead of a single sample
+                await f.send_async(f.imu_acquisition().telemetry)
+                await f.send_async(f.attitude_estimator().telemetry)
                 f.face_data_baton = False
 
             except Exception as e:
@@ -211,11 +232,22 @@ def normal_power_operations():
     async def detumble():
         
         await asyncio.sleep(300)
+        controller=None
+        #The coils only push one way (see magnetorquer), so the rates may never settle.
+        #After detumble_runs unconverged runs back to back, fall back to the old
+        #cadence: a few periods every 300 s
+        detumble_runs=3
+        unconverged=0
         
-        while check_power():
+        while power.ok:
             try:
                 debug_print("Looking to detumble...")
-                f.detumble()
+                if controller is None:
+                    controller=f.detumble_controller()
+                c.all_faces_on()
+                #Fixed-rate B-dot bursts; returns early once the rates have settled
+                await controller.run(cycles=30 if unconverged < detumble_runs else 3)
+                await f.send_async(controller.telemetry)
                 debug_print("Detumble complete")
                 
             except Exception as e:
@@ -223,15 +255,21 @@ def normal_power_operations():
                 
             gc.collect()
             
-            await asyncio.sleep(300)
+            if controller is None or controller.converged:
+                controller=None
+                unconverged=0
+                await asyncio.sleep(300)
+            else:
+                unconverged+=1
+                await asyncio.sleep(0 if unconverged < detumble_runs else 300)
 
     async def joke():
         await asyncio.sleep(500)
 
-        while check_power():
+        while power.ok:
             try:
                 debug_print("Joke send go!")
-                f.joke()
+                await f.joke_async()
                 debug_print("done!")
             except Exception as e:
                 debug_print(f'Outta time!' + ''.join(traceback.format_exception(e)))
@@ -239,18 +277,26 @@ def normal_power_operations():
             gc.collect()
             await asyncio.sleep(500)
     
+    async def l2_tasks():
+        #Tasks/ modules on tasko, stepped from here; rates set by the ground and the energy budget
+        registry=f.task_registry()
+        await registry.run(lambda: power.ok)
+
     async def main_loop():
         #log_face_data_task = asyncio.create_task(l_face_data())
-            
-        t1 = asyncio.create_task(s_lora_beacon())
-        t2 = asyncio.create_task(s_face_data())
-        t3 = asyncio.create_task(s_imu_data())
-        t4 = asyncio.create_task(g_face_data())
-        t5 = asyncio.create_task(detumble())
-        t6 = asyncio.create_task(joke())
         
-        await asyncio.gather(t1,t2,t3,t4,t5,t6)
+        try:
+            mode = await power.supervise(s_lora_beacon(), s_face_data(), s_imu_data(), g_face_data(),
+                detumble(), joke(), g_imu_data(), g_attitude(), l2_tasks())
+        finally:
+            #an uplinked IMU calibration (cdh imucal) runs outside the supervised set
+            await f.stop_imu_calibration()
+        debug_print("Leaving normal operations: " + mode)
         
+    if profile_tasks:
+        import task_profiler
+        if task_profiler.active is None:
+            task_profiler.TaskProfiler(debug=c.debug).install()
     asyncio.run(main_loop())
 
 
@@ -261,6 +307,7 @@ try:
         #L0 automatic tasks no matter the battery level
         c.battery_manager()
         c.check_reboot()
+        c.poll_logs()
         
         if c.power_mode == 'critical':
             c.RGB=(0,0,0)
@@ -282,6 +329,8 @@ try:
             f.listen()
 except Exception as e:
     debug_print("Error in Main Loop: " + ''.join(traceback.format_exception(e)))
+    c.flush_logs()
+    c.commit_nvm()
     time.sleep(10)
     microcontroller.on_next_reset(microcontroller.RunMode.NORMAL)
     microcontroller.reset()
@@ -10,8 +10,26 @@ import busio
 import traceback
 from debugcolor import co
 from adafruit_bno08x.i2c import BNO08X_I2C
+from adafruit_bno08x import (BNO_REPORT_ACCELEROMETER, BNO_REPORT_GYROSCOPE, BNO_REPORT_MAGNETOMETER,
+    BNO_REPORT_LINEAR_ACCELERATION, BNO_REPORT_ROTATION_VECTOR, BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR,
+    BNO_REPORT_GAME_ROTATION_VECTOR, BNO_REPORT_RAW_ACCELEROMETER, BNO_REPORT_RAW_GYROSCOPE,
+    BNO_REPORT_RAW_MAGNETOMETER)
 import adafruit_mcp9600     #Thermocouple
 
+# data name -> (BNO08x report, attribute holding its latest value)
+REPORTS = {
+    "acceleration":                 (BNO_REPORT_ACCELEROMETER, "acceleration"),
+    "gyroscope":                    (BNO_REPORT_GYROSCOPE, "gyroscope"),
+    "magnetometer":                 (BNO_REPORT_MAGNETOMETER, "magnetometer"),
+    "linear acceleration":          (BNO_REPORT_LINEAR_ACCELERATION, "linear_acceleration"),
+    "rotation vector":              (BNO_REPORT_ROTATION_VECTOR, "rotation"),
+    "geomagnetic rotation vector":  (BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR, "geomagnetic_rotation"),
+    "game rotation vector":         (BNO_REPORT_GAME_ROTATION_VECTOR, "game_rotation"),
+    "raw acceleration":             (BNO_REPORT_RAW_ACCELEROMETER, "raw_acceleration"),
+    "raw gyroscope":                (BNO_REPORT_RAW_GYROSCOPE, "raw_gyroscope"),
+    "raw magnetometer":             (BNO_REPORT_RAW_MAGNETOMETER, "raw_magnetometer"),
+}
+
 class PAYLOAD:
     def debug_print(self,statement):
         if self.debug:
@@ -59,10 +77,21 @@ class PAYLOAD:
             from adafruit_bno08x import BNO_REPORT_RAW_MAGNETOMETER
             self.bno.enable_feature(BNO_REPORT_RAW_MAGNETOMETER)
             self.raw_magnetometer=(0,0,0)
+        self.drained_at=None
 
-    def __init__(self, debug, i2c, data=[]):
+    def __init__(self, debug, i2c, data=[], max_age=0.05, cal=None):
+        '''
+        max_age: seconds a snapshot stays fresh. Reads within one control step
+                 share a single pass over the SHTP stream
+        cal:     calibration.Calibration applied to magnetometer and gyroscope
+        '''
         self.debug=debug
         self.data=data
+        self.max_age=max_age
+        self.cal=cal
+        self.drained_at=None
+        self.reports={}
+        self.raw={}
         self.debug_print("Initializing BNO08x...")
         try:
             self.bno = BNO08X_I2C(i2c)
@@ -83,6 +112,40 @@ class PAYLOAD:
         except Exception as e:
             self.debug_print("ERROR Initializing BNO sensor: " + ''.join(traceback.format_exception(e)))
 
+    def snapshot(self, max_age=None):
+        '''
+        Drains the BNO08x packet stream once and returns {data name: (value, timestamp_ns)}
+        for every enabled report. timestamp_ns is the sensor sample time on the
+        time.monotonic_ns() scale. Calls within max_age seconds of the last drain
+        are served from memory without touching the bus. Magnetometer and gyro
+        values are calibrated when self.cal is set; self.raw keeps them as read.
+        '''
+        if max_age is None:
+            max_age=self.max_age
+        now=time.monotonic()
+        if self.drained_at is not None and now-self.drained_at < max_age:
+            return self.reports
+        self.drained_at=now
+        try:
+            self.bno.update()
+            for name in self.data:
+                if name not in REPORTS:
+                    continue
+                report, attr = REPORTS[name]
+                value, stamp = self.bno.reading(report)
+                if value is not None:
+                    self.raw[name]=value
+                    if self.cal is not None:
+                        if name == "magnetometer":
+                            value=self.cal.mag(value)
+                        elif name == "gyroscope":
+                            value=self.cal.gyro(value)
+                    setattr(self, attr, value)
+                    self.reports[name]=(value, stamp)
+        except Exception as e:
+            self.debug_print("Error reading BNO packets: " + ''.join(traceback.format_exception(e)))
+        return self.reports
+
     @property
     def Data(self):
         return self.data
@@ -98,60 +161,50 @@ class PAYLOAD:
 
     @property
     def Acceleration(self):
-        if "acceleration" in self. data:
-            self.acceleration=self.bno.acceleration
+        self.snapshot()
         return self.acceleration
     
     @property
     def Gyroscope(self):
-        if "gyroscope" in self. data:
-            self.gyroscope=self.bno.gyro
+        self.snapshot()
         return self.gyroscope
     
     @property
     def Magnetometer(self):
-        if "magnetometer" in self. data:
-            self.magnetometer=self.bno.magnetic
+        self.snapshot()
         return self.magnetometer
     
     @property
     def Linear_Acceleration(self):
-        if "linear acceleration" in self. data:
-            self.linear_acceleration=self.bno.linear_acceleration
+        self.snapshot()
         return self.linear_acceleration
     
     @property
     def Rotation(self):
-        if "rotation vector" in self. data:
-            self.rotation=self.bno.quaternion
+        self.snapshot()
         return self.rotation
     
     @property
     def Geomagnetic_Rotation(self):
-        if "geomagnetic rotation vector" in self. data:
-            self.geomagnetic_rotation=self.bno.geomagnetic_quaternion
+        self.snapshot()
         return self.geomagnetic_rotation
     
     @property
     def Game_Rotation(self):
-        if "game rotation vector" in self. data:
-            self.game_rotation=self.bno.game_quaternion
+        self.snapshot()
         return self.game_rotation
     
     @property
     def Raw_Acceleration(self):
-        if "raw acceleration" in self. data:
-            self.raw_acceleration=self.bno.raw_acceleration
+        self.snapshot()
         return self.raw_acceleration
     
     @property
     def Raw_Gyroscope(self):
-        if "raw gyroscope" in self. data:
-            self.raw_gyroscope=self.bno.raw_gyro
+        self.snapshot()
         return self.raw_gyroscope
     
     @property
     def Raw_Magnetometer(self):
-        if "raw magnetometer" in self. data:
-            self.raw_magnetometer=self.bno.raw_magnetic
+        self.snapshot()
         return self.raw_magnetometer
\ No newline at end of file
@@ -0,0 +1,116 @@
+'''
+Shared power state for the normal power task set.
+
+A single PowerState task runs the L1 power checks (battery manager, battery
+heater, reboot check) every `period` seconds and publishes the result. The
+other tasks read PowerState.ok, a plain attribute compare, instead of each
+running the checks (two 250-read battery averages per call) on every loop.
+
+With a telemetry_store.TelemetryStore, each check also stores the battery
+manager readings as the vbatt, ichrg, vcharge, idraw and vsys series.
+
+Mode changes pulse the `changed` event. Leaving normal/maximum cancels the
+supervised tasks so main.py can fall through to the minimum or critical power
+operations; a task that must tidy up on the way out can catch
+asyncio.CancelledError. The magnetorquer and heater already switch off in
+their finally blocks.
+'''
+import asyncio
+import gc
+import traceback
+from debugcolor import co
+
+# LED colour while each mode is active
+_RGB = {'normal': (255,255,0), 'maximum': (0,255,0)}
+# Satellite.power_readings order
+_SERIES = ('vbatt', 'ichrg', 'vcharge', 'idraw', 'vsys')
+
+class PowerState:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[PWR]" + statement, 'green', 'bold'))
+
+    def __init__(self, cubesat, functions, period=20, store=None, debug=False):
+        '''
+        cubesat:   pysquared.Satellite
+        functions: functions.functions, for the battery heater
+        period:    seconds between power checks
+        store:     optional TelemetryStore for the power readings
+        '''
+        self.debug = debug
+        self.cubesat = cubesat
+        self.functions = functions
+        self.period = period
+        self.store = store
+        self.mode = cubesat.power_mode
+        self.ok = self.mode in _RGB
+        self.changed = asyncio.Event()
+        self.checks = 0
+        self.transitions = 0
+
+    async def check(self):
+        '''One round of the L1 power checks. Returns self.ok'''
+        c = self.cubesat
+        gc.collect()
+        try:
+            await c.battery_manager_async()
+            if await self.functions.battery_heater_async():
+                # The heater drew power; make sure there is still enough to continue
+                await c.battery_manager_async()
+            c.check_reboot()
+            c.poll_logs()
+            if self.store is not None and c.power_readings is not None:
+                self._store(c.power_readings)
+        except Exception as e:
+            self.debug_print("Error in power check: " + ''.join(traceback.format_exception(e)))
+        self.checks += 1
+        self._publish(c.power_mode)
+        gc.collect()
+        return self.ok
+
+    def _store(self, readings):
+        for i in range(len(_SERIES)):
+            if readings[i] is not None:
+                self.store.append(_SERIES[i], readings[i])
+
+    def _publish(self, mode):
+        if mode in _RGB:
+            self.cubesat.RGB = _RGB[mode]
+        if mode == self.mode:
+            return
+        self.debug_print("Power mode {} -> {}".format(self.mode, mode))
+        self.mode = mode
+        self.ok = mode in _RGB
+        self.transitions += 1
+        # Wakes every waiter, then re-arms for the next transition
+        self.changed.set()
+        self.changed.clear()
+
+    async def wait_change(self):
+        '''Waits for the next power mode transition and returns the new mode'''
+        await self.changed.wait()
+        return self.mode
+
+    async def supervise(self, *coroutines):
+        '''
+        Runs the coroutines as tasks while the power mode allows normal
+        operations, checking power every period. Cancels them when it no longer
+        does and returns the mode.
+        '''
+        if not await self.check():
+            for coroutine in coroutines:
+                coroutine.close()
+            return self.mode
+        tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+        try:
+            while True:
+                await asyncio.sleep(self.period)
+                if not await self.check():
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.debug_print("Left normal operations in {} mode".format(self.mode))
+        return self.mode
@@ -9,6 +9,7 @@ Library Repo:
 # Common CircuitPython Libs
 import board, microcontroller
 import busio, time, sys, traceback
+import asyncio
 from storage import mount,umount,VfsFat
 import digitalio, sdcardio, pwmio
 from debugcolor import co
@@ -18,16 +19,18 @@ import gc
 import pysquared_rfm9x # Radio
 import neopixel # RGB LED
 import adafruit_pca9685 # LED Driver
-import adafruit_vl6180x # LiDAR Distance Sensor for Antenna
 import adafruit_ina219 # Power Monitor
-import payload
+# Drivers of the deferred devices (IMU: payload and calibration, TCA9548A: tca_scheduler,
+# LiDAR: adafruit_vl6180x) are imported by their _init_ methods on first use
 
 
-import adafruit_tca9548a # I2C Multiplexer
+import sd_logger # Buffered SD logs
+import log_records # Binary log records
+import boot_manager # Deferred bring-up and boot profile
 
 # Common CircuitPython Libs
-from os import listdir,stat,statvfs,mkdir,chdir
-from bitflags import bitFlag,multiBitFlag,multiByte
+from os import listdir,stat,statvfs,mkdir
+from bitflags import bitFlag,multiBitFlag,multiByte,NVMShadow
 from micropython import const
 
 
@@ -39,6 +42,7 @@ _TOUTS    = const(9)
 _ICHRG    = const(11)
 _DIST     = const(13)
 _FLAG     = const(16)
+_NVM_SIZE = const(30) # registers 0-29 are shadowed in RAM, 30-31 hold their check
 
 SEND_BUFF=bytearray(252)
 
@@ -75,7 +79,8 @@ class Satellite:
         self.hardware['Face4']=True
 
     def all_faces_off(self):
-        #De-Power Faces
+        #De-Power Faces; their sensors come back unconfigured, so face drivers are rebuilt after this
+        self.face_power_cycles+=1
         self.Face0.duty_cycle = 0x0000
         time.sleep(0.1)
         self.hardware['Face0']=False
@@ -113,12 +118,19 @@ class Satellite:
         self.NORMAL_BATTERY_VOLTAGE=6.9#6.9
         self.CRITICAL_BATTERY_VOLTAGE=6.6#6.6
         self.data_cache={}
+        self.face_power_cycles=0
         self.filenumbers={}
+        self.imu_cal=None
+        self.power_readings=None # (vbatt,ichrg,vcharge,idraw,vsys) from the last battery manager pass
         self.image_packets=0
         self.urate = 115200
         self.vlowbatt=6.0
         self.send_buff = memoryview(SEND_BUFF)
         self.micro=microcontroller
+        # Flags and counters are served from RAM and reach NVM at commit_nvm()
+        self.nvm=NVMShadow(self.micro.nvm,_NVM_SIZE)
+        if not self.nvm.crc_ok:
+            self.debug_print('[WARNING] NVM register check failed: registers corrupted or not yet sealed')
         self.radio_cfg = {
                         'id':   0xfa,
                         'gs':   0xfb,
@@ -153,6 +165,10 @@ class Satellite:
         self._resetReg.switch_to_output(drive_mode=digitalio.DriveMode.OPEN_DRAIN)
 
 
+        # Devices the first beacon needs come up now; the rest on first use (see boot_manager)
+        self.boot=boot_manager.BootManager(debug=self.debug)
+        self.boot.mark('init')
+
         # Define SPI,I2C,UART | paasing I2C1 to BigData
         try:
             self.i2c0  = busio.I2C(board.SCL0,board.SDA0,timeout=5)
@@ -163,28 +179,16 @@ class Satellite:
         except Exception as e:
             self.debug_print("ERROR INITIALIZING BUSSES: " + ''.join(traceback.format_exception(e)))
 
-        # Initialize LED Driver
-        try:
-            self.faces = adafruit_pca9685.PCA9685(self.i2c0, address=int(0x56))
-            self.faces.frequency = 2000
-            self.hardware['FLD'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][LED Driver]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize all of the Faces and their sensors
-        try:
-            self.Face0 = self.faces.channels[0]
-            self.Face1 = self.faces.channels[1]
-            self.Face2 = self.faces.channels[2]
-            self.Face3 = self.faces.channels[3]
-            self.Face4 = self.faces.channels[4]
-            self.all_faces_on()
-        except Exception as e:
-            self.debug_print("ERROR INITIALIZING FACES: " + ''.join(traceback.format_exception(e)))
+        # Initialize LED Driver and all of the Faces
+        self.boot.start('FLD',self._init_faces)
 
         # Define filesystem stuff
-        self.logfile="/error/log.txt"
-        self.Facelogfile="/data/FaceData.txt"
+        self.logfile="/error/LOG_"
+        self.Facelogfile="/data/REC_"
+        # Buffered: records reach the SD card in sector-sized batches (see sd_logger)
+        self.error_log=sd_logger.SDLogger(self,self.logfile,buffer_size=2048,flush_bytes=1024,debug=self.debug)
+        # Face, power, IMU and radio readings as binary records (see log_records)
+        self.record_log=sd_logger.SDLogger(self,self.Facelogfile,debug=self.debug)
 
         """ # Define I2C Reset
         self._i2c_reset = digitalio.DigitalInOut(board.I2C_RESET)
@@ -198,122 +202,137 @@ class Satellite:
         
         if self.f_softboot:
             self.f_softboot=False
+        self.commit_nvm()
 
         # Define radio
-        _rf_cs1 = digitalio.DigitalInOut(board.SPI0_CS)
-        _rf_rst1 = digitalio.DigitalInOut(board.RF_RESET)
+        self._rf_cs1 = digitalio.DigitalInOut(board.SPI0_CS)
+        self._rf_rst1 = digitalio.DigitalInOut(board.RF_RESET)
         self.enable_rf = digitalio.DigitalInOut(board.ENABLE_RF)
         self.radio1_DIO0=digitalio.DigitalInOut(board.RF_IO0)
         self.radio1_DIO4=digitalio.DigitalInOut(board.RF_IO4)
 
         # self.enable_rf.switch_to_output(value=False) # if U21
         self.enable_rf.switch_to_output(value=True) # if U7
-        _rf_cs1.switch_to_output(value=True)
-        _rf_rst1.switch_to_output(value=True)
+        self._rf_cs1.switch_to_output(value=True)
+        self._rf_rst1.switch_to_output(value=True)
         self.radio1_DIO0.switch_to_input()
         self.radio1_DIO4.switch_to_input()
 
         # Define Heater Pins
         self.heater = self.faces.channels[5]
 
-
         # Initialize SD card (always init SD before anything else on spi bus)
-        try:
-            # Baud rate depends on the card, 4MHz should be safe
-            _sd = sdcardio.SDCard(self.spi1, board.SPI1_CS, baudrate=4000000)
-            _vfs = VfsFat(_sd)
-            mount(_vfs, "/sd")
-            self.fs=_vfs
-            sys.path.append("/sd")
-            self.hardware['SDcard'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][SD Card]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize Neopixel
-        try:
-            self.neopwr = digitalio.DigitalInOut(board.NEOPIXEL_POWER)
-            self.neopwr.switch_to_output(value=True)
-            self.neopixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2, pixel_order=neopixel.GRB)
-            self.neopixel[0] = (0,0,255)
-            self.hardware['Neopixel'] = True
-        except Exception as e:
-            self.debug_print('[WARNING][Neopixel]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize IMU
-        try:
-            self.data=[
-                "acceleration",
-                "gyroscope",
-                "magnetometer",
-            ]
-            self.IMU = payload.PAYLOAD(self.debug,self.i2c1,self.data)
-            self.hardware['IMU'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][IMU]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize Power Monitor update to utilize multiplexer on BIG_DATA
-        try:
-            time.sleep(1)
-            self.pwr = adafruit_ina219.INA219(self.i2c0,addr=int(0x40))
-            self.hardware['PWR'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][Power Monitor]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize Solar Power Monitor update to utilize multiplexer on BIG_DATA
-        try:
-            time.sleep(1)
-            self.chrg = adafruit_ina219.INA219(self.i2c0,addr=int(0x44))
-            self.hardware['SOLAR'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][SOLAR Power Monitor]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize TCA
-        try:
-            self.tca = adafruit_tca9548a.TCA9548A(self.i2c0,address=int(0x77))
-            for channel in range(8):
-                if self.tca[channel].try_lock():
-                    self.debug_print("Channel {}:".format(channel))
-                    addresses = self.tca[channel].scan()
-                    print([hex(address) for address in addresses if address != 0x70])
-                    self.tca[channel].unlock()
-        except Exception as e:
-            self.debug_print("[ERROR][TCA]" + ''.join(traceback.format_exception(e)))
-
-        # Initialize LiDAR
-        try:
-            self.LiDAR = adafruit_vl6180x.VL6180X(self.i2c1,offset=0)
-            self.hardware['LiDAR'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][LiDAR]' + ''.join(traceback.format_exception(e)))
-
-        # Initialize radio #1 - UHF
-        try:
-            self.radio1 = pysquared_rfm9x.RFM9x(self.spi0, _rf_cs1, _rf_rst1,self.radio_cfg['freq'],code_rate=8,baudrate=1320000)
-            # Default LoRa Modulation Settings
-            # Frequency: 437.4 MHz, SF7, BW125kHz, CR4/8, Preamble=8, CRC=True
-            self.radio1.dio0=self.radio1_DIO0
-            #self.radio1.dio4=self.radio1_DIO4
-            self.radio1.max_output=True
-            self.radio1.tx_power=self.radio_cfg['pwr']
-            self.radio1.spreading_factor=self.radio_cfg['sf']
-            self.radio1.node=self.radio_cfg['id']
-            self.radio1.destination=self.radio_cfg['gs']
-            self.radio1.enable_crc=True
-            self.radio1.ack_delay=0.2
-            if self.radio1.spreading_factor > 9: self.radio1.preamble_length = self.radio1.spreading_factor
-            self.hardware['Radio1'] = True
-        except Exception as e:
-            self.debug_print('[ERROR][RADIO 1]' + ''.join(traceback.format_exception(e)))
-
+        self.boot.start('SDcard',self._init_sd)
+        self.boot.start('Neopixel',self._init_neopixel)
+        # Power monitors: battery voltage goes in the beacon
+        self.boot.start('PWR',self._init_pwr)
+        self.boot.start('SOLAR',self._init_solar)
+        self.boot.start('Radio1',self._init_radio)
         self.enable_rf.value = False
 
+        # Not needed before the first beacon: brought up by the first lookup of these attributes
+        self.boot.defer('IMU',('IMU','data'),self._init_imu)
+        self.boot.defer('TCA',('tca',),self._init_tca)
+        self.boot.defer('LiDAR',('LiDAR',),self._init_lidar)
 
         # Prints init state of PyCubed hardware
         self.debug_print(str(self.hardware))
+        self.debug_print('Deferred: ' + str(self.boot.pending()))
 
         # set PyCubed power mode
         self.power_mode = 'normal'
 
+    def __getattr__(self,name):
+        # Only called for missing attributes: starts a deferred device, then looks again
+        if name!='boot' and self.boot.resolve(name):
+            return getattr(self,name)
+        raise AttributeError(name)
+
+    def _init_faces(self):
+        self.faces = adafruit_pca9685.PCA9685(self.i2c0, address=int(0x56))
+        self.faces.frequency = 2000
+        self.hardware['FLD'] = True
+        self.Face0 = self.faces.channels[0]
+        self.Face1 = self.faces.channels[1]
+        self.Face2 = self.faces.channels[2]
+        self.Face3 = self.faces.channels[3]
+        self.Face4 = self.faces.channels[4]
+        self.all_faces_on()
+
+    def _init_sd(self):
+        # Baud rate depends on the card, 4MHz should be safe
+        _sd = sdcardio.SDCard(self.spi1, board.SPI1_CS, baudrate=4000000)
+        _vfs = VfsFat(_sd)
+        mount(_vfs, "/sd")
+        self.fs=_vfs
+        sys.path.append("/sd")
+        self.hardware['SDcard'] = True
+
+    def _init_neopixel(self):
+        self.neopwr = digitalio.DigitalInOut(board.NEOPIXEL_POWER)
+        self.neopwr.switch_to_output(value=True)
+        self.neopixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2, pixel_order=neopixel.GRB)
+        self.neopixel[0] = (0,0,255)
+        self.hardware['Neopixel'] = True
+
+    def _init_pwr(self):
+        # Poll until the INA219 answers instead of a fixed 1 s settle
+        self.boot.wait_ready(lambda: boot_manager.i2c_ready(self.i2c0,0x40))
+        self.pwr = adafruit_ina219.INA219(self.i2c0,addr=int(0x40))
+        self.hardware['PWR'] = True
+
+    def _init_solar(self):
+        self.boot.wait_ready(lambda: boot_manager.i2c_ready(self.i2c0,0x44))
+        self.chrg = adafruit_ina219.INA219(self.i2c0,addr=int(0x44))
+        self.hardware['SOLAR'] = True
+
+    def _init_radio(self):
+        # Initialize radio #1 - UHF
+        self.radio1 = pysquared_rfm9x.RFM9x(self.spi0, self._rf_cs1, self._rf_rst1,self.radio_cfg['freq'],code_rate=8,baudrate=1320000)
+        # Default LoRa Modulation Settings
+        # Frequency: 437.4 MHz, SF7, BW125kHz, CR4/8, Preamble=8, CRC=True
+        self.radio1.dio0=self.radio1_DIO0
+        #self.radio1.dio4=self.radio1_DIO4
+        self.radio1.max_output=True
+        self.radio1.tx_power=self.radio_cfg['pwr']
+        self.radio1.spreading_factor=self.radio_cfg['sf']
+        self.radio1.node=self.radio_cfg['id']
+        self.radio1.destination=self.radio_cfg['gs']
+        self.radio1.enable_crc=True
+        self.radio1.ack_delay=0.2
+        if self.radio1.spreading_factor > 9: self.radio1.preamble_length = self.radio1.spreading_factor
+        self.hardware['Radio1'] = True
+
+    def _init_imu(self):
+        import payload
+        import calibration # IMU calibration coefficients
+        self.data=[
+            "acceleration",
+            "gyroscope",
+            "magnetometer",
+        ]
+        self.imu_cal = calibration.load(self.micro.nvm, debug=self.debug)
+        self.IMU = payload.PAYLOAD(self.debug,self.i2c1,self.data,cal=self.imu_cal)
+        self.hardware['IMU'] = True
+
+    def _init_tca(self):
+        import tca_scheduler # I2C Multiplexer (channel-caching TCA9548A)
+        self.tca = tca_scheduler.TCAScheduler(self.i2c0,address=int(0x77))
+
+    def _init_lidar(self):
+        import adafruit_vl6180x # LiDAR Distance Sensor for Antenna
+        self.LiDAR = adafruit_vl6180x.VL6180X(self.i2c1,offset=0)
+        self.hardware['LiDAR'] = True
+
+    def tca_scan(self):
+        '''Prints the addresses on every TCA9548A channel (was run at each boot)'''
+        for channel in range(8):
+            if self.tca[channel].try_lock():
+                self.debug_print("Channel {}:".format(channel))
+                addresses = self.tca[channel].scan()
+                print([hex(address) for address in addresses if address != 0x70])
+                self.tca[channel].unlock()
+
     def reinit(self,dev):
         dev=dev.lower()
         if dev=='pwr':
@@ -323,7 +342,7 @@ class Satellite:
         elif dev=='lidar':
             self.LiDAR.__init__(self.i2c1)
         elif dev=='imu':
-            self.IMU.__init__(self.debug,self.i2c1,self.data)
+            self.IMU.__init__(self.debug,self.i2c1,self.data,cal=self.imu_cal)
         else:
             self.debug_print('Invalid Device? ->' + str(dev))
 
@@ -563,23 +582,43 @@ class Satellite:
         return distance_mm/10
 
     def log(self, msg):
-        if self.hardware['SDcard']:
-            with open(self.logfile, "a+") as f:
-                t=int(time.monotonic())
-                f.write('{}, {}\n'.format(t,msg))
+        self.error_log.write(msg)
+
+    @property
+    def log_time(self):
+        """Record timestamp: ms since boot"""
+        return time.monotonic_ns()//1000000
 
     def Face_log(self, msg):
-        if self.hardware['SDcard']:
-            with open(self.Facelogfile, "a+") as f:
-                t=int(time.monotonic())
-                for face in msg:
-                    f.write('{}, {}\n'.format(t,face))
+        self.record_log.write_record(log_records.face(self.log_time,msg))
+
+    def power_log(self,vbatt,ichrg,vcharge,idraw,vsys):
+        self.record_log.write_record(log_records.power(self.log_time,vbatt,ichrg,vcharge,idraw,vsys))
+
+    def imu_log(self,accel,mag,gyro):
+        self.record_log.write_record(log_records.imu(self.log_time,accel,mag,gyro))
+
+    def radio_log(self,rssi,length,direction=log_records.RX):
+        self.record_log.write_record(log_records.radio(self.log_time,rssi,length,direction))
+
+    def flush_logs(self):
+        """Writes the buffered log records to the SD card"""
+        self.error_log.flush()
+        self.record_log.flush()
+
+    def poll_logs(self):
+        self.error_log.poll()
+        self.record_log.poll()
     
     def check_reboot(self):
         self.UPTIME=self.uptime
         self.debug_print(str("Current up time: "+str(self.UPTIME)))
         if self.UPTIME>86400:
+            self.flush_logs()
+            self.commit_nvm()
             self.reset_vbus()
+        else:
+            self.commit_nvm()
 
     def print_file(self,filedir=None,binary=False):
         if filedir==None:
@@ -594,29 +633,48 @@ class Satellite:
                 for line in file:
                     self.debug_print(line.strip())
 
+    def commit_nvm(self):
+        """Writes the changed NVM registers: before anything that may reset or brown out the board"""
+        try:
+            self.nvm.commit()
+        except Exception as e:
+            self.debug_print("Error committing NVM: " + ''.join(traceback.format_exception(e)))
+
     def timeout_handler(self):
         self.debug_print('Incrementing timeout register')
-        if (self.micro.nvm[_TOUTS] + 1) >= 255:
-            self.micro.nvm[_TOUTS]=0
+        if (self.nvm[_TOUTS] + 1) >= 255:
+            self.nvm[_TOUTS]=0
+            self.commit_nvm()
             # soft reset
             self.micro.on_next_reset(self.micro.RunMode.NORMAL)
             self.micro.reset()
         else:
-            self.micro.nvm[_TOUTS] += 1
+            self.nvm[_TOUTS] += 1
 
     def heater_on(self):
-        self._relayA.drive_mode=digitalio.DriveMode.PUSH_PULL
-        if self.f_brownout:
-            pass
-        else:
-            self.f_brownout=True
-            self.heating=True
-            self._relayA.value = 1
-            self.RGB=(255,165,0)
+        if self._heater_relay_on():
             # Pause to ensure relay is open
             time.sleep(0.5)
             self.heater.duty_cycle = 0x7fff
 
+    async def heater_on_async(self):
+        if self._heater_relay_on():
+            # Pause to ensure relay is open
+            await asyncio.sleep(0.5)
+            self.heater.duty_cycle = 0x7fff
+
+    def _heater_relay_on(self):
+        self._relayA.drive_mode=digitalio.DriveMode.PUSH_PULL
+        if self.f_brownout:
+            return False
+        self.f_brownout=True
+        # Must be in NVM before the relay closes, in case the heater browns us out
+        self.commit_nvm()
+        self.heating=True
+        self._relayA.value = 1
+        self.RGB=(255,165,0)
+        return True
+
 
     def heater_off(self):
         self.heater.duty_cycle = 0x0000
@@ -625,6 +683,7 @@ class Satellite:
         if self.heating==True:
             self.heating=False
             self.f_brownout=False
+            self.commit_nvm()
             self.debug_print("Battery Heater off!")
             self.RGB=(0,0,0)
         
@@ -633,6 +692,7 @@ class Satellite:
 
     def battery_manager(self):
         self.debug_print(f'Started to manage battery')
+        vbatt=ichrg=vcharge=idraw=vsys=None
         try:
             vbatt=self.battery_voltage
             ichrg=self.charge_current
@@ -642,11 +702,53 @@ class Satellite:
             micro_temp=self.micro.cpu.temperature
 
             self.debug_print('MICROCONTROLLER Temp: {} C'.format(micro_temp))
-            self.debug_print(f'Battery Temperature: {self.IMU.mcp.temperature} C')
+            if self.hardware['IMU']:
+                self.debug_print(f'Battery Temperature: {self.IMU.mcp.temperature} C')
+        except Exception as e:
+            self.debug_print("Error obtaining battery data: " + ''.join(traceback.format_exception(e)))
+        self._manage_battery(vbatt,ichrg,vcharge,idraw,vsys)
+
+    async def average_async(self, read, n=50, per_yield=10):
+        '''Mean of n calls to read(), yielding to the event loop every per_yield reads'''
+        total=0
+        for i in range(n):
+            total+=read()
+            if (i+1)%per_yield==0:
+                await asyncio.sleep(0)
+        return total/n
+
+    async def power_readings_async(self):
+        '''
+        (battery voltage, charge current, charge voltage, current draw, system voltage)
+        averaged like the properties of the same names. None where the monitor is missing
+        '''
+        vbatt=ichrg=vcharge=idraw=vsys=None
+        if self.hardware['PWR']:
+            vbatt=await self.average_async(lambda: self.pwr.bus_voltage) + 0.2
+            idraw=await self.average_async(lambda: self.pwr.current)
+            vsys=await self.average_async(lambda: self.pwr.bus_voltage+self.pwr.shunt_voltage)
+        if self.hardware['SOLAR']:
+            ichrg=await self.average_async(lambda: self.chrg.current)
+            vcharge=await self.average_async(lambda: self.chrg.bus_voltage)
+        return vbatt,ichrg,vcharge,idraw,vsys
+
+    async def battery_manager_async(self):
+        '''battery_manager() with the 50-read power averages spread over event loop turns'''
+        self.debug_print(f'Started to manage battery')
+        vbatt=ichrg=vcharge=idraw=vsys=None
+        try:
+            vbatt,ichrg,vcharge,idraw,vsys=await self.power_readings_async()
+            self.debug_print('MICROCONTROLLER Temp: {} C'.format(self.micro.cpu.temperature))
+            if self.hardware['IMU']:
+                self.debug_print(f'Battery Temperature: {self.IMU.mcp.temperature} C')
         except Exception as e:
             self.debug_print("Error obtaining battery data: " + ''.join(traceback.format_exception(e)))
+        self._manage_battery(vbatt,ichrg,vcharge,idraw,vsys)
 
+    def _manage_battery(self,vbatt,ichrg,vcharge,idraw,vsys):
+        self.power_readings=(vbatt,ichrg,vcharge,idraw,vsys)
         try:
+            self.power_log(vbatt,ichrg,vcharge,idraw,vsys)
             self.debug_print(f"charge current: {ichrg}mA, and charge voltage: {vcharge}V")
             self.debug_print("draw current: {}mA, and battery voltage: {}V".format(idraw,vbatt))
             self.debug_print("system voltage: {}V".format(vsys))
@@ -674,6 +776,9 @@ class Satellite:
         Configure the hardware for minimum or normal power consumption
         Add custom modes for mission-specific control
         """
+        # Buffered logs and NVM go out before the mode change (critical may never come back)
+        self.flush_logs()
+        self.commit_nvm()
         if 'crit' in mode:
             self.neopixel.brightness=0
             self.enable_rf.value = False
@@ -701,37 +806,82 @@ class Satellite:
         substring something like '/data/DATA_'
         directory is created on the SD!
         int padded with zeros will be appended to the last found file
+
+        The next number per prefix is kept in self.filenumbers and persisted
+        to a counter file beside the data (/sd/data/DATA_.num), so creating a
+        file is one stat; the directory is only scanned when the counter is
+        missing or stale.
         '''
         if self.hardware['SDcard']:
-            ff=''
-            n=0
             _folder=substring[:substring.rfind('/')+1]
             _file=substring[substring.rfind('/')+1:]
             self.debug_print('Creating new file in directory: /sd{} with file prefix: {}'.format(_folder,_file))
-            try: chdir('/sd'+_folder)
-            except OSError:
-                self.debug_print('Directory {} not found. Creating...'.format(_folder))
-                try: mkdir('/sd'+_folder)
-                except Exception as e:
-                    self.debug_print("Error with creating new file: " + ''.join(traceback.format_exception(e)))
+            n=self.filenumbers.get(substring)
+            if n is None:
+                n=self._read_filenumber(substring)
+            ff='/sd{}{}{:05}.txt'.format(_folder,_file,n)
+            try:
+                stat(ff)
+                # Stale counter (files copied in, counter lost): scan once
+                n=self._scan_filenumber(_folder,_file)
+                if n is None:
                     return None
-            for i in range(0xFFFF):
-                ff='/sd{}{}{:05}.txt'.format(_folder,_file,(n+i)%0xFFFF)
-                try:
-                    if n is not None:
-                        stat(ff)
-                except:
-                    n=(n+i)%0xFFFF
-                    # print('file number is',n)
-                    break
+                ff='/sd{}{}{:05}.txt'.format(_folder,_file,n)
+            except OSError:
+                pass
             self.debug_print('creating file...'+str(ff))
             if binary: b='ab'
             else: b='a'
-            with open(ff,b) as f:
-                f.tell()
-            chdir('/')
+            try:
+                with open(ff,b) as f:
+                    f.tell()
+            except OSError:
+                # No directory yet
+                try: mkdir('/sd'+_folder[:-1])
+                except Exception as e:
+                    self.debug_print("Error with creating new file: " + ''.join(traceback.format_exception(e)))
+                    return None
+                with open(ff,b) as f:
+                    f.tell()
+            self.filenumbers[substring]=(n+1)%0xFFFF
+            self._write_filenumber(substring)
             return ff
 
+    def _read_filenumber(self,substring):
+        try:
+            with open('/sd'+substring+'.num','r') as f:
+                return int(f.read())%0xFFFF
+        except (OSError,ValueError):
+            # No counter: the first file or the directory decides
+            _folder=substring[:substring.rfind('/')+1]
+            n=self._scan_filenumber(_folder,substring[substring.rfind('/')+1:])
+            return 0 if n is None else n
+
+    def _scan_filenumber(self,folder,prefix):
+        # One listdir: the number after the highest one in use
+        try:
+            names=listdir('/sd'+folder[:-1])
+        except OSError:
+            return 0
+        n=-1
+        for name in names:
+            if name.startswith(prefix) and name.endswith('.txt'):
+                try:
+                    n=max(n,int(name[len(prefix):-4]))
+                except ValueError:
+                    pass
+        if n+1 >= 0xFFFF:
+            self.debug_print('No file numbers left for /sd{}{}'.format(folder,prefix))
+            return None
+        return n+1
+
+    def _write_filenumber(self,substring):
+        try:
+            with open('/sd'+substring+'.num','w') as f:
+                f.write(str(self.filenumbers[substring]))
+        except Exception as e:
+            self.debug_print("Error saving file number: " + ''.join(traceback.format_exception(e)))
+
     def burn(self,burn_num,dutycycle=0,freq=1000,duration=1):
         """
         Operate burn wire circuits. Wont do anything unless the a nichrome burn wire
@@ -829,6 +979,8 @@ class Satellite:
                 if self.burnarm:
                     self.burnarm=False
                     self.f_triedburn = True
+                    # A brownout during the burn must find the attempt recorded
+                    self.commit_nvm()
 
                     # Configure the relay control pin & open relay
                     self.RGB=(0,165,0)
@@ -884,6 +1036,7 @@ class Satellite:
                     self.burnarm=False
                     self.burned=True
                     self.f_triedburn=True
+                    self.commit_nvm()
                     self.burn("1",dutycycle,freq,4)
                     time.sleep(5)
 
@@ -903,6 +1056,7 @@ class Satellite:
             self.RGB=(0,0,0)
             burnwire.deinit()
             self._relayA.drive_mode=digitalio.DriveMode.OPEN_DRAIN
+            self.commit_nvm()
 
 
 
@@ -12,6 +12,7 @@ Library Repo: https://github.com/pycubed/library_pycubed.py
 Added temperature readout by Nicole Maggard
 """
 import time
+import asyncio
 from random import random
 import digitalio
 from micropython import const
@@ -359,7 +360,30 @@ class RFM9x:
         self.lna_boost=3 # mode agnostic
 
     def cw(self,msg=None):
-        success=False
+        cache=self._cw_start(msg)
+        _t=time.monotonic() + 10
+        while time.monotonic() < _t:
+            if self._cw_done():
+                time.sleep(0.01)
+                break
+        return self._cw_end(cache)
+
+    async def cw_async(self,msg=None,poll=0.02):
+        """cw() that yields to the event loop while the message keys out"""
+        cache=self._cw_start(msg)
+        _t=time.monotonic() + 10
+        while time.monotonic() < _t:
+            if self._cw_done():
+                await asyncio.sleep(0.01)
+                break
+            await asyncio.sleep(poll)
+        return self._cw_end(cache)
+
+    def _cw_done(self):
+        # FIFO empty: the whole message has been keyed out
+        return (self._read_u8(0x3f)>>6)&1
+
+    def _cw_start(self,msg):
         if msg is None:
             msg = VR3X
 
@@ -388,17 +412,12 @@ class RFM9x:
         # Set payload length VR3X Morse length = 51
         self._write_u8(0x35,len(msg)-1)
         self._write_from(_RH_RF95_REG_00_FIFO, bytearray(msg))
-
-        _t=time.monotonic() + 10
         self.operation_mode = TX_MODE
-        while time.monotonic() < _t:
-            a=self._read_u8(0x3f)
-            # print(a,end=' ')
-            if (a>>6)&1:
-                time.sleep(0.01)
-                success=True
-                break
-        if not (a>>6)&1:
+        return cache
+
+    def _cw_end(self,cache):
+        success=bool(self._cw_done())
+        if not success:
             print('cw timeout')
         self.idle()
         if cache:
@@ -739,11 +758,12 @@ class RFM9x:
         else:
             return (self._read_u8(_RH_RF95_REG_12_IRQ_FLAGS) & 0x40) >> 6
 
-    async def await_rx(self,timeout=60):
+    async def await_rx(self,timeout=60,poll=0.02):
+        """Waits for rx done without blocking the event loop. False on timeout"""
         _t=time.monotonic()+timeout
         while not self.rx_done():
             if time.monotonic() < _t:
-                yield
+                await asyncio.sleep(poll)
             else:
                 # Timed out
                 return False
@@ -777,6 +797,42 @@ class RFM9x:
 
            Returns: True if success or False if the send timed out.
         """
+        self._tx_start(data, destination, node, identifier, flags)
+        # Wait for tx done interrupt with explicit polling (not ideal but
+        # best that can be done right now without interrupts).
+        start = time.monotonic()
+        timed_out = False
+        while not timed_out and not self.tx_done():
+            if (time.monotonic() - start) >= self.xmit_timeout:
+                timed_out = True
+        return self._tx_end(keep_listening, timed_out)
+
+    async def send_async(
+        self,
+        data,
+        *,
+        keep_listening=False,
+        destination=None,
+        node=None,
+        identifier=None,
+        flags=None,
+        poll=0.01
+    ):
+        """send() that yields to the event loop every `poll` seconds while the packet
+           is on air instead of busy waiting for tx done.
+        """
+        self._tx_start(data, destination, node, identifier, flags)
+        start = time.monotonic()
+        timed_out = False
+        while not timed_out and not self.tx_done():
+            if (time.monotonic() - start) >= self.xmit_timeout:
+                timed_out = True
+            else:
+                await asyncio.sleep(poll)
+        return self._tx_end(keep_listening, timed_out)
+
+    def _tx_start(self, data, destination, node, identifier, flags):
+        # Fills the FIFO and starts transmitting, shared by send and send_async
         # Disable pylint warning to not use length as a check for zero.
         # This is a puzzling warning as the below code is clearly the most
         # efficient and proper way to ensure a precondition that the provided
@@ -834,14 +890,8 @@ class RFM9x:
         self._write_u8(_RH_RF95_REG_22_PAYLOAD_LENGTH, l)
         # Turn on transmit mode to send out the packet.
         self.transmit()
-        # Wait for tx done interrupt with explicit polling (not ideal but
-        # best that can be done right now without interrupts).
-        start = time.monotonic()
-        timed_out = False
-        while not timed_out and not self.tx_done():
-            if (time.monotonic() - start) >= self.xmit_timeout:
-                timed_out = True
 
+    def _tx_end(self, keep_listening, timed_out):
         if hasattr(self,'txrx'): # RX
             self.txrx[0].value=False
             self.txrx[1].value=True
@@ -933,6 +983,34 @@ class RFM9x:
             while not timed_out and not self.rx_done():
                 if (time.monotonic() - start) >= timeout:
                     timed_out = True
+        return self._rx_end(timed_out, keep_listening, with_header, with_ack, debug, view)
+
+    async def receive_async(
+        self, *, keep_listening=True, with_header=False, with_ack=False, timeout=None, debug=False, view=False,
+        poll=0.02):
+        """receive() that yields to the event loop every `poll` seconds while waiting
+           for a packet. An ACK, when requested, is still sent blocking (one
+           short packet).
+        """
+        if hasattr(self,'txrx'): # RX
+            self.txrx[0].value=False
+            self.txrx[1].value=True
+
+        timed_out = False
+        if timeout is None:
+            timeout = self.receive_timeout
+        if timeout is not None:
+            self.listen()
+            start = time.monotonic()
+            while not timed_out and not self.rx_done():
+                if (time.monotonic() - start) >= timeout:
+                    timed_out = True
+                else:
+                    await asyncio.sleep(poll)
+        return self._rx_end(timed_out, keep_listening, with_header, with_ack, debug, view)
+
+    def _rx_end(self, timed_out, keep_listening, with_header, with_ack, debug, view):
+        # Reads out the FIFO once rx is done (or timed out), shared by receive and receive_async
         # Payload ready is set, a packet is in the FIFO.
         packet = None
         # save last RSSI reading
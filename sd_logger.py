@@ -0,0 +1,148 @@
+'''
+Buffered SD card logger.
+
+Records are appended to a preallocated RAM buffer and reach the card in
+large writes: when `flush_bytes` are buffered (whole 512 byte sectors, the
+tail stays in RAM), when the oldest buffered record is `flush_period`
+seconds old, on flush() (power mode changes, before a reset), or on poll()
+from a periodic task. Each boot starts a new file through
+Satellite.new_file and the logger rotates to the next one once a file
+reaches `max_file_size`.
+
+A failed write keeps the records buffered and the logger leaves the card
+alone for `retry_period` seconds; records that do not fit in a full buffer
+are dropped and counted.
+
+write() logs a text line, "<monotonic s>, <message>"; write_record() logs
+bytes as given, like the binary records of log_records.
+'''
+import time
+import traceback
+from debugcolor import co
+
+SECTOR = 512
+
+class SDLogger:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[LOG]" + statement, 'gray', 'bold'))
+
+    def __init__(self, cubesat, prefix, buffer_size=4096, flush_bytes=2048, flush_period=300,
+                 max_file_size=262144, retry_period=30, debug=False):
+        '''
+        cubesat:       pysquared.Satellite (new_file and the SD card flag)
+        prefix:        file prefix on the SD card, like '/logs/ERR_'
+        buffer_size:   RAM buffer (bytes)
+        flush_bytes:   buffered bytes that trigger a write
+        flush_period:  longest time a record waits in RAM (s)
+        max_file_size: size at which the logger moves to a new file (bytes)
+        retry_period:  wait after a failed write (s)
+        '''
+        self.debug = debug
+        self.cubesat = cubesat
+        self.prefix = prefix
+        self.flush_bytes = flush_bytes
+        self.flush_period = flush_period
+        self.max_file_size = max_file_size
+        self.retry_period = retry_period
+        self.failed = None
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.fill = 0
+        self.oldest = None
+        self.file = None
+        self.file_size = 0
+        # Stats
+        self.records = 0
+        self.dropped = 0
+        self.writes = 0
+        self.written = 0
+        self.files = 0
+        self.errors = 0
+        self.flush_ms_last = 0
+        self.flush_ms_max = 0
+        self.flush_ms_total = 0
+
+    def write(self, msg):
+        '''Buffers one text line; True when it fit'''
+        return self.write_record((str(int(time.monotonic())) + ', ' + str(msg) + '\n').encode())
+
+    def write_record(self, record):
+        '''Buffers one record (bytes); True when it fit'''
+        n = len(record)
+        if self.fill + n > len(self.buffer):
+            self.flush()
+            if self.fill + n > len(self.buffer):
+                self.dropped += 1
+                return False
+        self.buffer[self.fill:self.fill + n] = record
+        self.fill += n
+        self.records += 1
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+        if self.fill >= self.flush_bytes:
+            self._flush(self.fill - self.fill % SECTOR)
+        elif time.monotonic() - self.oldest >= self.flush_period:
+            self.flush()
+        return True
+
+    def poll(self):
+        '''Flushes once the oldest buffered record is flush_period old'''
+        if self.oldest is not None and time.monotonic() - self.oldest >= self.flush_period:
+            self.flush()
+
+    def flush(self):
+        '''Writes everything buffered; True when the buffer is empty'''
+        if self.fill:
+            self._flush(self.fill)
+        return self.fill == 0
+
+    def _flush(self, n):
+        if not self.cubesat.hardware['SDcard']:
+            return
+        if self.failed is not None and time.monotonic() - self.failed < self.retry_period:
+            return
+        start = time.monotonic_ns()
+        try:
+            if self.file is None or self.file_size + n > self.max_file_size:
+                self._rotate()
+            with open(self.file, 'ab') as f:
+                f.write(self.view[:n])
+        except Exception as e:
+            self.errors += 1
+            self.failed = time.monotonic()
+            self.file = None
+            self.debug_print("Error writing {}: {}".format(self.prefix, ''.join(traceback.format_exception(e))))
+            return
+        self.failed = None
+        self.file_size += n
+        self.writes += 1
+        self.written += n
+        # Keep the unwritten tail at the front of the buffer
+        rest = self.fill - n
+        if rest:
+            self.buffer[:rest] = self.view[n:self.fill]
+        self.fill = rest
+        self.oldest = time.monotonic() if rest else None
+        ms = (time.monotonic_ns() - start) // 1000000
+        self.flush_ms_last = ms
+        self.flush_ms_total += ms
+        if ms > self.flush_ms_max:
+            self.flush_ms_max = ms
+
+    def _rotate(self):
+        path = self.cubesat.new_file(self.prefix)
+        if path is None:
+            raise OSError("no file for " + self.prefix)
+        self.file = path
+        self.file_size = 0
+        self.files += 1
+        self.debug_print("Logging to " + path)
+
+    @property
+    def stats(self):
+        '''Compact counters for downlink'''
+        return "LOG {} R:{} D:{} W:{} B:{} F:{} E:{} MS:{}/{}/{}".format(
+            self.prefix, self.records, self.dropped, self.writes, self.written, self.files, self.errors,
+            self.flush_ms_last, self.flush_ms_max, self.flush_ms_total // max(1, self.writes))
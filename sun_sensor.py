@@ -0,0 +1,183 @@
+'''
+Coarse sun sensor for Yearling built from the face VEML7700 light sensors.
+Each face sees lux_i = gain_i * E * max(0, n_i . s) + offset_i for a sun
+direction s and irradiance E, so after calibration the opposing x and y faces
+give the x and y components directly. There is no z+ face: when z- is dark the
+z component is recovered from the calibrated full-sun level,
+z = sqrt(full^2 - x^2 - y^2).
+
+Eclipse is declared when the total corrected light falls below
+eclipse_fraction * full (with hysteresis). With the sun close to z+ the side
+faces see almost nothing, so that cone looks like eclipse too; the attitude
+filter coasts on the gyro there.
+
+The sensor does not poll on its own schedule: the regular face poll
+(functions.all_face_data) hands it each FaceSample through from_sample(), and
+read() serves that vector for max_age seconds after it. The body keeps
+turning, so an older vector is not served at all. During eclipse
+light_needed tells the face poll it can skip the light sensors, except every
+eclipse_poll seconds to notice the sun coming back.
+
+compute() works on the preallocated lux array and does not allocate.
+'''
+import time
+import traceback
+from math import sqrt
+from array import array
+from debugcolor import co
+
+NUM_FACES = 5
+# Face addresses by outward normal
+_Y_PLUS = 0
+_Y_MINUS = 1
+_X_PLUS = 2
+_X_MINUS = 3
+_Z_MINUS = 4
+
+class SunSensor:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[SUN]" + statement, 'orange', 'bold'))
+
+    def __init__(self, faces=None, gains=None, offsets=None, full=100000.0, eclipse_fraction=0.1,
+                 max_age=1.0, eclipse_poll=30, debug=False):
+        '''
+        faces:            callable returning the Big_Data.AllFaces poll() reads
+                          (functions.face_sensors)
+        gains:            per-face sensitivity relative to a nominal sensor (5 values)
+        offsets:          per-face dark reading in lux (5 values)
+        full:             corrected lux for the sun at normal incidence
+        eclipse_fraction: light level, as a fraction of full, that counts as eclipse
+        max_age:          read() serves the last polled vector for this long (s)
+        eclipse_poll:     seconds between face polls while in eclipse
+        '''
+        self.debug = debug
+        self.faces = faces
+        self.gain = array('f', gains if gains is not None else [1.0] * NUM_FACES)
+        self.offset = array('f', offsets if offsets is not None else [0.0] * NUM_FACES)
+        self.full = full
+        self.eclipse_fraction = eclipse_fraction
+        self.max_age = max_age
+        self.eclipse_poll = eclipse_poll
+        self.lux = array('f', [0.0] * NUM_FACES)
+        self._c = array('f', [0.0] * NUM_FACES)
+        self.valid = 0
+        self.vector = array('f', [0.0, 0.0, 0.0])
+        self.illumination = 0.0
+        self.eclipse = False
+        self.sunlit = False
+        self.last_poll = None
+
+    def set_lux(self, face, value):
+        '''Stores one face reading. None marks the face as missing'''
+        if value is None:
+            self.valid &= ~(1 << face)
+        else:
+            self.lux[face] = value
+            self.valid |= 1 << face
+
+    def from_sample(self, sample):
+        '''Takes the light readings of a Big_Data.FaceSample and runs compute()'''
+        import Big_Data
+        self.last_poll = time.monotonic()
+        for face in range(NUM_FACES):
+            self.set_lux(face, sample.get(face, Big_Data.LUX))
+        return self.compute()
+
+    def poll(self):
+        '''Reads the light sensor of every face once, outside the regular face poll, and runs compute()'''
+        self.last_poll = time.monotonic()
+        if self.faces is None:
+            return False
+        for face in self.faces().Faces:
+            if face.sensors['VEML']:
+                try:
+                    self.set_lux(face.address, face.veml.lux)
+                except Exception as e:
+                    self.set_lux(face.address, None)
+                    self.debug_print('Light sensor error on face {}: '.format(face.address)
+                                     + ''.join(traceback.format_exception(e)))
+            else:
+                self.set_lux(face.address, None)
+        return self.compute()
+
+    def compute(self, out=None):
+        '''
+        Turns the stored lux readings into a unit sun vector (self.vector, copied to out).
+        Returns True when the sun is visible, False in eclipse or without data
+        '''
+        c = self._c
+        total = 0.0
+        for i in range(NUM_FACES):
+            if self.valid & (1 << i):
+                v = (self.lux[i] - self.offset[i]) / self.gain[i]
+                c[i] = v if v > 0 else 0.0
+            else:
+                c[i] = 0.0
+            total += c[i]
+        self.illumination = total
+        if self.valid == 0:
+            self.sunlit = False
+            return False
+        # Hysteresis: leave eclipse at twice the level that enters it
+        limit = self.eclipse_fraction * self.full
+        if self.eclipse:
+            self.eclipse = total < 2 * limit
+        else:
+            self.eclipse = total < limit
+        if self.eclipse:
+            self.sunlit = False
+            return False
+        x = c[_X_PLUS] - c[_X_MINUS]
+        y = c[_Y_PLUS] - c[_Y_MINUS]
+        if c[_Z_MINUS] > 0:
+            z = -c[_Z_MINUS]
+        else:
+            r = self.full*self.full - x*x - y*y
+            z = sqrt(r) if r > 0 else 0.0
+        n = sqrt(x*x + y*y + z*z)
+        if n <= 0:
+            self.sunlit = False
+            return False
+        n = 1.0 / n
+        self.vector[0] = x * n
+        self.vector[1] = y * n
+        self.vector[2] = z * n
+        if out is not None:
+            out[0] = self.vector[0]
+            out[1] = self.vector[1]
+            out[2] = self.vector[2]
+        self.sunlit = True
+        return True
+
+    @property
+    def light_needed(self):
+        '''False while in eclipse between polls, so face polling can skip the light sensors'''
+        if not self.eclipse or self.last_poll is None:
+            return True
+        return time.monotonic() - self.last_poll >= self.eclipse_poll
+
+    def read(self, out):
+        '''
+        Sun vector source for attitude.Mahony: the vector of the last face poll
+        while it is younger than max_age. Never reads the sensors itself
+        '''
+        if not self.sunlit or self.last_poll is None or time.monotonic() - self.last_poll > self.max_age:
+            return False
+        out[0] = self.vector[0]
+        out[1] = self.vector[1]
+        out[2] = self.vector[2]
+        return True
+
+    def calibrate_dark(self):
+        '''Uses the current readings as per-face dark offsets. Call in eclipse'''
+        for i in range(NUM_FACES):
+            if self.valid & (1 << i):
+                self.offset[i] = self.lux[i]
+        self.debug_print("Dark offsets: " + str(list(self.offset)))
+
+    @property
+    def telemetry(self):
+        return "SUN V:{:.3f},{:.3f},{:.3f} L:{:.0f} E:{}".format(
+            self.vector[0], self.vector[1], self.vector[2], self.illumination, int(self.eclipse))
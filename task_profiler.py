@@ -0,0 +1,198 @@
+'''
+Opt-in per-task profiler for the asyncio and tasko schedulers.
+
+For every task it records the number of slices (resumes), cumulative and
+longest slice time, scheduling lateness (how long the task waited between
+becoming due and being resumed) and the heap it allocated, measured as the
+drop in gc.mem_free() across each slice (slices where the collector ran are
+counted as zero). Statistics live in fixed arrays of `slots` entries; tasks
+past the last slot share it under the name "other".
+
+Hooks, each a single `is None` test when the profiler is off:
+  asyncio: core.create_task wraps the coroutine in a timing proxy, so only
+           tasks created after install() are profiled. Install it before
+           asyncio.run().
+  tasko:   Loop._run_task resumes through resume() while loop.profiler is set.
+
+The report is dumped with the cdh 'profile' command or to SD with save().
+'''
+import gc
+import time
+import traceback
+from array import array
+from debugcolor import co
+
+try:
+    _mem_free = gc.mem_free
+except AttributeError:
+    # CPython host
+    _mem_free = None
+
+# The installed profiler, for the cdh command
+active = None
+# lib/asyncio core, set by install()
+_core = None
+
+def task_name(coroutine):
+    '''Function name of a coroutine/generator object'''
+    name = getattr(coroutine, '__name__', None)
+    if name is not None:
+        return name
+    # MicroPython: <generator object 'name' at 20001234>
+    parts = repr(coroutine).split(' ')
+    return parts[2].strip("'") if len(parts) > 2 else parts[0]
+
+class TaskProfiler:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[PROF]" + statement, 'gray', 'bold'))
+
+    def __init__(self, slots=16, debug=False):
+        self.debug = debug
+        self.slots = slots
+        self.names = [None] * slots
+        self._index = {}
+        self.runs = array('L', [0] * slots)
+        self.total_us = array('f', [0.0] * slots)
+        self.max_us = array('L', [0] * slots)
+        self.late_us = array('f', [0.0] * slots)
+        self.late_max_us = array('L', [0] * slots)
+        self.alloc = array('f', [0.0] * slots)
+        self.alloc_max = array('L', [0] * slots)
+        self.started = time.monotonic()
+
+    def install(self, tasko_loop=None):
+        '''Hooks into lib/asyncio (when it is the asyncio in use) and optionally a tasko.Loop'''
+        global active, _core
+        active = self
+        try:
+            from asyncio import core
+            core._profiler = self
+            _core = core
+        except ImportError:
+            self.debug_print("asyncio has no core module, not profiling asyncio tasks")
+        if tasko_loop is not None:
+            tasko_loop.profiler = self
+        return self
+
+    def uninstall(self, tasko_loop=None):
+        global active
+        if active is self:
+            active = None
+        try:
+            from asyncio import core
+            if core._profiler is self:
+                core._profiler = None
+        except ImportError:
+            pass
+        if tasko_loop is not None and tasko_loop.profiler is self:
+            tasko_loop.profiler = None
+
+    def reset(self):
+        for i in range(self.slots):
+            self.runs[i] = 0
+            self.total_us[i] = 0.0
+            self.max_us[i] = 0
+            self.late_us[i] = 0.0
+            self.late_max_us[i] = 0
+            self.alloc[i] = 0.0
+            self.alloc_max[i] = 0
+        self.started = time.monotonic()
+
+    def slot(self, name):
+        '''Index of the statistics for a task name, allocated on first use'''
+        i = self._index.get(name)
+        if i is None:
+            i = len(self._index)
+            if i >= self.slots - 1:
+                i = self.slots - 1
+                name = 'other'
+            self.names[i] = name
+            self._index[name] = i
+        return i
+
+    def measure(self, slot, resume, value, late_us):
+        '''Runs resume(value) as one slice of the task in slot'''
+        mem = _mem_free() if _mem_free is not None else 0
+        start = time.monotonic_ns()
+        try:
+            return resume(value)
+        finally:
+            us = (time.monotonic_ns() - start) // 1000
+            self.runs[slot] += 1
+            self.total_us[slot] += us
+            if us > self.max_us[slot]:
+                self.max_us[slot] = us
+            if late_us > 0:
+                self.late_us[slot] += late_us
+                if late_us > self.late_max_us[slot]:
+                    self.late_max_us[slot] = late_us
+            if _mem_free is not None:
+                used = mem - _mem_free()
+                if used > 0:
+                    self.alloc[slot] += used
+                    if used > self.alloc_max[slot]:
+                        self.alloc_max[slot] = used
+
+    def wrap(self, coroutine):
+        '''asyncio hook: the coroutine for a new task'''
+        return _Profiled(self, coroutine)
+
+    def resume(self, task, due_nanos, now_nanos):
+        '''tasko hook: resumes a tasko.Task that was due at due_nanos (None when not sleeping)'''
+        slot = getattr(task, 'profile_slot', None)
+        if slot is None:
+            slot = task.profile_slot = self.slot(task_name(task.coroutine))
+        late = (now_nanos - due_nanos) // 1000 if due_nanos is not None else 0
+        return self.measure(slot, task.coroutine.send, None, late)
+
+    def lines(self, top=None):
+        '''One line per task, busiest first'''
+        order = sorted((i for i in range(self.slots) if self.runs[i]), key=lambda i: -self.total_us[i])
+        if top is not None:
+            order = order[:top]
+        out = []
+        for i in order:
+            n = self.runs[i]
+            out.append("{} n:{} tot:{:.0f}ms max:{:.1f}ms late:{:.1f}/{:.1f}ms mem:{:.0f}/{}B".format(
+                self.names[i], n, self.total_us[i] / 1000, self.max_us[i] / 1000,
+                self.late_us[i] / n / 1000, self.late_max_us[i] / 1000, self.alloc[i] / n, self.alloc_max[i]))
+        return out
+
+    @property
+    def report(self):
+        head = "PROF {:.0f}s late avg/max mem avg/max".format(time.monotonic() - self.started)
+        return '\n'.join([head] + self.lines())
+
+    def save(self, path):
+        '''Appends the report to a text file (e.g. from cubesat.new_file). Returns True on success'''
+        try:
+            with open(path, 'a') as f:
+                f.write(self.report)
+                f.write('\n')
+            return True
+        except Exception as e:
+            self.debug_print("Error saving profile: " + ''.join(traceback.format_exception(e)))
+            return False
+
+class _Profiled:
+    '''Stands in for a task's coroutine and times every resume'''
+
+    def __init__(self, profiler, coroutine):
+        self.profiler = profiler
+        self.coroutine = coroutine
+        self.slot = profiler.slot(task_name(coroutine))
+
+    def _late(self):
+        # ph_key is when the task was due (or queued), in ticks_ms
+        return max(0, _core.ticks_diff(_core.ticks(), _core.cur_task.ph_key)) * 1000
+
+    def send(self, value):
+        return self.profiler.measure(self.slot, self.coroutine.send, value, self._late())
+
+    def throw(self, exc):
+        return self.profiler.measure(self.slot, self.coroutine.throw, exc, self._late())
+
+    def close(self):
+        return self.coroutine.close()
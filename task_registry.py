@@ -0,0 +1,295 @@
+'''
+Loader for the Tasks/ modules, run on a tasko.Loop inside the flight loop.
+
+The task set is discovered by listing Tasks/*_task.py; nothing is imported
+until a task is enabled. enable() imports Tasks/<key>_task, builds its task
+class with the Satellite and schedules main_task at the declared frequency
+and priority (schedule_later when the class sets it). disable() stops it and
+drops the module from sys.modules, so a task that is not running costs no RAM.
+Keys are module names without the _task suffix ('battery', 'imu', ...).
+
+The ground changes rates or enables/disables tasks with the cdh 'tasks'
+command. Overrides are saved to SD_PATH and reapplied at boot.
+
+Tasks run on tasko, not asyncio, so they may only await tasko primitives
+(self.cubesat.tasko.sleep). run() drives the tasko loop from an asyncio task
+and sleeps on the asyncio side while no tasko task is due. With an
+energy_scheduler.EnergyScheduler, run() also replans the running tasks every
+`rebalance` seconds.
+
+A task that raises is logged; after MAX_ERRORS failures in a row it is disabled
+until the next boot or ground command.
+'''
+import asyncio
+import gc
+import os
+import sys
+import time
+import traceback
+from debugcolor import co
+
+TASK_DIR = '/Tasks'
+SD_PATH = '/sd/tasks.cfg'
+# Not started unless the ground enables them: test is a demo, beacon and blink
+# duplicate the main.py beacon and status LED
+DEFAULT_DISABLED = ('test', 'beacon', 'blink')
+MAX_ERRORS = 5
+
+# The flight loop's registry, for the cdh command
+active = None
+
+class TaskRegistry:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[TASKS]" + statement, 'pink', 'bold'))
+
+    def __init__(self, cubesat, loop=None, energy=None, path=SD_PATH, task_dir=TASK_DIR, max_wait=1.0,
+                 rebalance=60, debug=False):
+        '''
+        cubesat:   pysquared.Satellite handed to every task (gets .tasko = loop)
+        loop:      tasko.Loop, tasko's global loop by default
+        energy:    optional EnergyScheduler applied to the running tasks
+        path:      override file, None to keep overrides in RAM only
+        max_wait:  longest asyncio sleep between tasko steps (s)
+        rebalance: seconds between energy plans
+        '''
+        global active
+        if loop is None:
+            import tasko
+            loop = tasko.get_loop()
+        self.debug = debug
+        self.cubesat = cubesat
+        self.loop = loop
+        self.energy = energy
+        self.path = path
+        self.task_dir = task_dir
+        self.max_wait = max_wait
+        self.rebalance = rebalance
+        self.running = {}   # key -> (task instance, tasko ScheduledTask)
+        self.overrides = {} # key -> rate in Hz, 0 for disabled
+        self.errors = {}
+        cubesat.tasko = loop
+        self.keys = self.discover()
+        self.load()
+        active = self
+
+    def discover(self):
+        '''Task keys from the module names in task_dir'''
+        keys = []
+        try:
+            for file in os.listdir(self.task_dir):
+                name = file[:file.rfind('.')]
+                if name.endswith('_task') and (file.endswith('.py') or file.endswith('.mpy')):
+                    key = name[:-5]
+                    # template_task holds the Task base class
+                    if key != 'template' and key not in keys:
+                        keys.append(key)
+        except OSError as e:
+            self.debug_print("No task directory {}: {}".format(self.task_dir, e))
+        keys.sort()
+        return keys
+
+    def wanted(self, key):
+        rate = self.overrides.get(key)
+        if rate is None:
+            return key not in DEFAULT_DISABLED
+        return rate > 0
+
+    def start(self):
+        '''Enables every wanted task'''
+        for key in self.keys:
+            if self.wanted(key):
+                self.enable(key, save=False)
+        return self
+
+    def enable(self, key, save=True):
+        '''Imports and schedules a task. Returns True when it is running'''
+        if key in self.running:
+            return True
+        if key not in self.keys:
+            return False
+        if self.overrides.get(key) == 0:
+            del self.overrides[key]
+        try:
+            module = __import__('Tasks.' + key + '_task', None, None, ['task'])
+            task = module.task(self.cubesat)
+            rate = self.overrides.get(key)
+            if rate:
+                task.frequency = rate
+            if getattr(task, 'schedule_later', False):
+                schedule = self.loop.schedule_later
+            else:
+                schedule = self.loop.schedule
+            handle = schedule(task.frequency, self._run_task, task.priority, key, task)
+        except Exception as e:
+            self.debug_print("Could not start {}: {}".format(key, ''.join(traceback.format_exception(e))))
+            self._unload(key)
+            return False
+        self.running[key] = (task, handle)
+        self.errors[key] = 0
+        if not self.wanted(key):
+            # Off by default: remember that the ground turned it on
+            self.overrides[key] = task.frequency
+        self.debug_print("Started {} at {:.3f}Hz".format(key, task.frequency))
+        if save:
+            self.save()
+        return True
+
+    def disable(self, key, save=True):
+        '''Stops a task and unloads its module'''
+        if key in self.keys:
+            self.overrides[key] = 0
+        self._stop(key)
+        if save:
+            self.save()
+
+    def default(self, key, save=True):
+        '''Drops the override for a task: declared rate, default on/off'''
+        self.overrides.pop(key, None)
+        self._stop(key)
+        if self.wanted(key):
+            self.enable(key, save=False)
+        if save:
+            self.save()
+
+    def set_rate(self, key, hz, save=True):
+        '''Runs a task at hz from now on, starting it if needed'''
+        self.overrides[key] = hz
+        entry = self.running.get(key)
+        if entry is None:
+            self.enable(key, save=False)
+        else:
+            entry[0].frequency = hz
+            entry[1].change_rate(hz)
+        if save:
+            self.save()
+
+    def _stop(self, key):
+        entry = self.running.pop(key, None)
+        if entry is not None:
+            entry[1].stop()
+            self._unload(key)
+            self.debug_print("Stopped " + key)
+
+    def _unload(self, key):
+        name = key + '_task'
+        sys.modules.pop('Tasks.' + name, None)
+        package = sys.modules.get('Tasks')
+        if package is not None and hasattr(package, name):
+            delattr(package, name)
+        gc.collect()
+
+    async def _run_task(self, key, task):
+        try:
+            await task.main_task()
+            self.errors[key] = 0
+        except Exception as e:
+            self.errors[key] = self.errors.get(key, 0) + 1
+            self.debug_print("{} failed ({} in a row): {}".format(
+                key, self.errors[key], ''.join(traceback.format_exception(e))))
+            if self.errors[key] >= MAX_ERRORS:
+                # Not an override: the ground or a reboot brings it back
+                self._stop(key)
+
+    def plan(self):
+        '''Applies the energy scheduler to the running tasks'''
+        if self.energy is None or not self.running:
+            return
+        tasks = [entry[0] for entry in self.running.values()]
+        self.energy.update(tasks)
+        self.energy.apply({entry[0].name: entry[1] for entry in self.running.values()})
+
+    async def run(self, keep_running=None):
+        '''Starts the wanted tasks and steps the tasko loop from asyncio while keep_running() is true'''
+        self.start()
+        next_plan = time.monotonic()
+        while keep_running is None or keep_running():
+            if self.energy is not None and time.monotonic() >= next_plan:
+                self.plan()
+                next_plan = time.monotonic() + self.rebalance
+            self.loop._step(block=False)
+            wait = self.loop.idle_seconds()
+            await asyncio.sleep(self.max_wait if wait is None else min(wait, self.max_wait))
+
+    def load(self):
+        '''Reads saved ground overrides: one "key rate" per line, rate 0 for disabled'''
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and parts[0] in self.keys:
+                        self.overrides[parts[0]] = float(parts[1])
+        except OSError:
+            pass
+        except Exception as e:
+            self.debug_print("Bad override file: " + ''.join(traceback.format_exception(e)))
+
+    def save(self):
+        if self.path is None:
+            return False
+        try:
+            with open(self.path + '.tmp', 'w') as f:
+                for key in self.overrides:
+                    f.write("{} {}\n".format(key, self.overrides[key]))
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            os.rename(self.path + '.tmp', self.path)
+            return True
+        except Exception as e:
+            self.debug_print("Could not save overrides: " + ''.join(traceback.format_exception(e)))
+            return False
+
+    def command(self, args):
+        '''
+        Ground command: b'' lists the tasks; b'<key> on|off|default|<hz>'
+        changes one. Returns the reply text.
+        '''
+        parts = bytes(args).decode().split() if args else []
+        if not parts:
+            return self.status
+        key = parts[0]
+        if key not in self.keys or len(parts) != 2:
+            return 'bad task command: ' + ' '.join(parts)
+        action = parts[1]
+        if action == 'on':
+            ok = self.enable(key)
+        elif action == 'off':
+            self.disable(key)
+            ok = True
+        elif action == 'default':
+            self.default(key)
+            ok = True
+        else:
+            try:
+                hz = float(action)
+            except ValueError:
+                return 'bad task command: ' + ' '.join(parts)
+            if hz > 0:
+                self.set_rate(key, hz)
+                ok = key in self.running
+            else:
+                self.disable(key)
+                ok = True
+        return ('ok ' if ok else 'failed ') + self.describe(key)
+
+    def describe(self, key):
+        '''key:rate, key:off, or the energy scheduler's verdict when it is not running the task as declared'''
+        entry = self.running.get(key)
+        if entry is None:
+            return key + ':off'
+        text = "{}:{:.4g}".format(key, entry[0].frequency)
+        if self.energy is not None:
+            state = self.energy.states.get(entry[0].name)
+            if state is not None and state != 'run':
+                text += '(' + state + ')'
+        return text
+
+    @property
+    def status(self):
+        '''Compact task list for downlink'''
+        return 'TASKS ' + ' '.join(self.describe(key) for key in self.keys)
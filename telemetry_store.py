@@ -0,0 +1,297 @@
+'''
+Time-series telemetry store on the SD card with time range queries.
+
+Each series (vbatt, idraw, ...) is a directory of segments under ROOT. A
+segment is a data file of fixed BLOCK_SIZE blocks, each
+    uint16 sample count | uint16 boot count | uint32 first sample time
+    SAMPLES_PER_BLOCK samples of uint32 time (s, the RTC clock) | float32 value
+and an index file holding the first time of every block (uint32 each).
+Blocks fill in RAM and are written whole; flush() also writes the partial
+last block in place, so only the last block of a segment is ever short.
+A segment closes at segment_blocks blocks, when the clock steps back and at
+boot (its last block may be partial).
+
+Sample times come from time.time(), and nothing on board sets the RTC, so the
+clock restarts at every reset and each boot writes the same time range
+again. Every segment therefore carries the boot count (Satellite.c_boot) it
+was written in: query() returns it with each sample and can select one boot,
+and the ground response marks where the boot changes. c_boot wraps after
+200 boots.
+
+query() bisects the segment index for the first block at or after t0, then
+addresses samples by position (block = n // SAMPLES_PER_BLOCK), so with a
+decimation step it reads only the blocks that hold a returned sample: the
+cost follows the result size, not the file size.
+
+Ground access is the cdh 'telemetry' command (see command()).
+'''
+import os
+import struct
+import time
+import traceback
+from micropython import const
+from debugcolor import co
+
+ROOT = '/sd/ts'
+BLOCK_SIZE = const(512)
+_HEADER = '<HHI'
+_HEADER_SIZE = const(8)
+_SAMPLE = '<If'
+_SAMPLE_SIZE = const(8)
+SAMPLES_PER_BLOCK = (BLOCK_SIZE - _HEADER_SIZE) // _SAMPLE_SIZE
+MAX_POINTS = const(120)       # per ground query
+PACKET_CHARS = const(200)     # per radio packet
+
+# The flight store, for the cdh command
+active = None
+
+class _Segment:
+    '''One data file and its index; blocks counts full and partial blocks'''
+
+    def __init__(self, path, number, boot=0):
+        self.number = number
+        self.boot = boot
+        self.data = '{}/{:05}.dat'.format(path, number)
+        self.index = '{}/{:05}.idx'.format(path, number)
+        self.blocks = 0
+        self.first = None
+        self.last = None
+
+class _Series:
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.segments = []
+        self.block = bytearray(BLOCK_SIZE)
+        self.count = 0          # samples in the RAM block
+        self.dirty = False      # RAM block not on the card yet
+        self.sealed = False     # last segment is from an earlier boot
+
+class TelemetryStore:
+
+    def debug_print(self,statement):
+        if self.debug:
+            print(co("[TS]" + statement, 'teal', 'bold'))
+
+    def __init__(self, root=ROOT, segment_blocks=1024, flush_period=600, boot=0, debug=False):
+        '''
+        root:           store directory on the SD card
+        segment_blocks: blocks per segment file (512 KB at the default)
+        flush_period:   seconds a partial block may stay in RAM only
+        boot:           boot count the new segments are tagged with (Satellite.c_boot)
+        '''
+        global active
+        self.debug = debug
+        self.root = root
+        self.boot = boot
+        self.segment_blocks = segment_blocks
+        self.flush_period = flush_period
+        self.series = {}
+        self.flushed = time.monotonic()
+        self.blocks_read = 0
+        self.blocks_written = 0
+        _makedirs(root)
+        for name in _listdir(root):
+            self._open(name)
+        active = self
+
+    def names(self):
+        return sorted(self.series)
+
+    def _open(self, name):
+        s = self.series.get(name)
+        if s is not None:
+            return s
+        path = self.root + '/' + name
+        _makedirs(path)
+        s = _Series(name, path)
+        numbers = sorted(int(f[:-4]) for f in _listdir(path) if f.endswith('.idx'))
+        for number in numbers:
+            seg = _Segment(path, number)
+            try:
+                seg.blocks = os.stat(seg.index)[6] // 4
+                if seg.blocks:
+                    seg.first = self._index_entry(seg, 0)
+                    with open(seg.data, 'rb') as f:
+                        f.seek((seg.blocks - 1) * BLOCK_SIZE)
+                        block = f.read(BLOCK_SIZE)
+                    n, seg.boot = struct.unpack_from(_HEADER, block, 0)[:2]
+                    seg.last = struct.unpack_from(_SAMPLE, block, _HEADER_SIZE + (n - 1) * _SAMPLE_SIZE)[0]
+                    s.segments.append(seg)
+            except Exception as e:
+                self.debug_print("Skipping segment {}: {}".format(seg.data, ''.join(traceback.format_exception(e))))
+        s.sealed = bool(s.segments)
+        self.series[name] = s
+        return s
+
+    def append(self, name, value, t=None):
+        '''Adds one sample; t defaults to time.time()'''
+        if t is None:
+            t = time.time()
+        t = int(t)
+        s = self._open(name)
+        seg = s.segments[-1] if s.segments else None
+        if (seg is None or s.sealed or (seg.last is not None and t < seg.last)
+                or (s.count == 0 and seg.blocks >= self.segment_blocks)):
+            self._write_block(s)
+            seg = _Segment(s.path, seg.number + 1 if seg else 0, self.boot)
+            s.segments.append(seg)
+            s.sealed = False
+            s.count = 0
+        if s.count == 0:
+            struct.pack_into(_HEADER, s.block, 0, 0, seg.boot, t)
+            seg.blocks += 1
+            if seg.first is None:
+                seg.first = t
+        struct.pack_into(_SAMPLE, s.block, _HEADER_SIZE + s.count * _SAMPLE_SIZE, t, value)
+        s.count += 1
+        struct.pack_into('<H', s.block, 0, s.count)
+        seg.last = t
+        s.dirty = True
+        if s.count == SAMPLES_PER_BLOCK:
+            self._write_block(s)
+            s.count = 0
+        elif time.monotonic() - self.flushed >= self.flush_period:
+            self.flush()
+
+    def flush(self):
+        '''Writes the partial blocks of every series'''
+        for s in self.series.values():
+            self._write_block(s)
+        self.flushed = time.monotonic()
+
+    def _write_block(self, s):
+        if not s.dirty:
+            return
+        seg = s.segments[-1]
+        k = seg.blocks - 1
+        try:
+            with open(seg.data, 'r+b' if k else 'wb') as f:
+                f.seek(k * BLOCK_SIZE)
+                f.write(s.block)
+            with open(seg.index, 'r+b' if k else 'wb') as f:
+                f.seek(k * 4)
+                f.write(s.block[4:8])
+            s.dirty = False
+            self.blocks_written += 1
+        except Exception as e:
+            self.debug_print("Error writing {}: {}".format(seg.data, ''.join(traceback.format_exception(e))))
+
+    def _index_entry(self, seg, k):
+        with open(seg.index, 'rb') as f:
+            f.seek(k * 4)
+            return struct.unpack('<I', f.read(4))[0]
+
+    def _first_block(self, seg, t0):
+        # Last block whose first time is < t0 (0 when t0 is before the segment): equal
+        # times may run on from the block before
+        lo, hi = 0, seg.blocks - 1
+        with open(seg.index, 'rb') as f:
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                f.seek(mid * 4)
+                if struct.unpack('<I', f.read(4))[0] < t0:
+                    lo = mid
+                else:
+                    hi = mid - 1
+        return lo
+
+    def query(self, name, t0, t1, step=1, limit=None, boot=None):
+        '''
+        Yields (t, value, boot) for t0 <= t <= t1, every step-th sample, at
+        most limit of them. boot selects the samples of one boot count
+        '''
+        self.flush()
+        s = self.series.get(name)
+        if s is None:
+            return
+        step = max(1, int(step))
+        returned = 0
+        # Segments are in write order; one after a reboot or clock step may cover t0..t1 again
+        for seg in s.segments:
+            if seg.first is None or seg.last < t0 or seg.first > t1:
+                continue
+            if boot is not None and seg.boot != boot:
+                continue
+            with open(seg.data, 'rb') as f:
+                k = self._first_block(seg, t0)
+                block = self._read_block(f, k)
+                n = struct.unpack_from(_HEADER, block, 0)[0]
+                i = 0
+                while i < n and struct.unpack_from(_SAMPLE, block, _HEADER_SIZE + i * _SAMPLE_SIZE)[0] < t0:
+                    i += 1
+                pos = k * SAMPLES_PER_BLOCK + i
+                while True:
+                    bk, i = divmod(pos, SAMPLES_PER_BLOCK)
+                    if bk >= seg.blocks:
+                        break
+                    if bk != k:
+                        k = bk
+                        block = self._read_block(f, k)
+                        n = struct.unpack_from(_HEADER, block, 0)[0]
+                    if i >= n:
+                        break
+                    t, value = struct.unpack_from(_SAMPLE, block, _HEADER_SIZE + i * _SAMPLE_SIZE)
+                    if t > t1:
+                        break
+                    yield t, value, seg.boot
+                    returned += 1
+                    if limit is not None and returned >= limit:
+                        return
+                    pos += step
+
+    def _read_block(self, f, k):
+        f.seek(k * BLOCK_SIZE)
+        self.blocks_read += 1
+        return f.read(BLOCK_SIZE)
+
+    def command(self, args):
+        '''
+        Ground command: b'' lists the series; b'<series> <t0> <t1> [step] [boot]'
+        returns those samples (at most MAX_POINTS) as radio packets of
+        "TS <series> b<boot> t:value ..." text, with a new b<boot> wherever
+        the boot count changes. Returns the list of packets.
+        '''
+        parts = bytes(args).decode().split() if args else []
+        if not parts:
+            return ['TS ' + ' '.join(self.names())]
+        try:
+            name = parts[0]
+            t0 = int(parts[1])
+            t1 = int(parts[2])
+            step = int(parts[3]) if len(parts) > 3 else 1
+            boot = int(parts[4]) if len(parts) > 4 else None
+        except (IndexError, ValueError):
+            return ['bad telemetry query: ' + ' '.join(parts)]
+        packets = []
+        line = 'TS ' + name
+        last = None
+        for t, value, b in self.query(name, t0, t1, step, MAX_POINTS, boot):
+            point = ' {}:{:.4g}'.format(t, value)
+            if b != last:
+                point = ' b{}'.format(b) + point
+            if len(line) + len(point) > PACKET_CHARS:
+                packets.append(line)
+                # every packet names its boot
+                line = 'TS {} b{}'.format(name, b)
+                point = ' {}:{:.4g}'.format(t, value)
+            line += point
+            last = b
+        packets.append(line)
+        return packets
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+def _makedirs(path):
+    p = ''
+    for part in path.strip('/').split('/'):
+        p += '/' + part
+        try:
+            os.mkdir(p)
+        except OSError:
+            pass
@@ -0,0 +1,72 @@
+import math
+import os
+import sys
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import attitude
+
+
+class Sun:
+    def __init__(self, v):
+        self.v = v
+        self.reads = 0
+
+    def read(self, out):
+        self.reads += 1
+        out[0], out[1], out[2] = self.v
+        return True
+
+
+class IMU:
+    def __init__(self, gyro):
+        self.gyro = gyro
+        self.t = 0
+
+    def snapshot(self):
+        self.t += 100_000_000
+        return {'gyroscope': (self.gyro, self.t)}
+
+
+class AnchorTests(TestCase):
+
+    def test_without_references_it_is_gyro_only(self):
+        est = attitude.Mahony()
+        sun = Sun((1.0, 0.0, 0.0))
+        imu = IMU((0.0, 0.0, 0.1))
+        for _ in range(3):
+            est.step(imu, sun)
+        # nothing to correct against: the sun sensor is not even read
+        self.assertEqual(0, sun.reads)
+        self.assertEqual('G', est.references)
+        self.assertTrue(est.telemetry.endswith('R:G'))
+
+    def test_sun_reference_anchored_at_the_current_estimate(self):
+        est = attitude.Mahony(anchor=True)
+        est.q[0], est.q[3] = math.cos(math.pi / 4), math.sin(math.pi / 4)  # 90 deg about z
+        est.update((0.0, 0.0, 0.0), 0.1, sun=(1.0, 0.0, 0.0))
+        self.assertEqual('S', est.references)
+        # body x seen through a 90 deg turn about z is reference y
+        for x, y in zip(est.sun_ref, (0.0, 1.0, 0.0)):
+            self.assertAlmostEqual(x, y, places=5)
+        # the anchor agrees with the estimate, so the first update applies no correction
+        self.assertAlmostEqual(0.0, est.residual, places=5)
+
+    def test_anchored_sun_holds_against_gyro_bias(self):
+        bias = (0.0, 0.0, math.radians(0.5))
+        anchored = attitude.Mahony(kp=0.5, ki=0.02, anchor=True)
+        free = attitude.Mahony(kp=0.5, ki=0.02)
+        for _ in range(1200):
+            # body at rest, sun along body x; only the gyro bias moves the estimate
+            anchored.update(bias, 0.1, sun=(1.0, 0.0, 0.0))
+            free.update(bias, 0.1, sun=(1.0, 0.0, 0.0))
+        identity = (1.0, 0.0, 0.0, 0.0)
+        self.assertLess(math.degrees(attitude.quat_angle(anchored.q, identity)), 1.0)
+        self.assertGreater(math.degrees(attitude.quat_angle(free.q, identity)), 50.0)
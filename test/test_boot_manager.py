@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import boot_manager
+
+
+class Board:
+    '''Deferred devices looked up the way Satellite.__getattr__ does it'''
+
+    def __init__(self, path=None):
+        self.boot = boot_manager.BootManager(path=path)
+        self.starts = 0
+
+    def __getattr__(self, name):
+        if name != 'boot' and self.boot.resolve(name):
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def init_imu(self):
+        self.starts += 1
+        self.IMU = 'imu'
+        self.data = ['acceleration']
+
+    def init_lidar(self):
+        self.starts += 1
+        raise OSError('no ACK')
+
+
+class BootManagerTests(TestCase):
+
+    def test_deferred_device_starts_on_first_use(self):
+        board = Board()
+        board.boot.defer('IMU', ('IMU', 'data'), board.init_imu)
+        self.assertEqual(['IMU'], board.boot.pending())
+        self.assertEqual(0, board.starts)
+        self.assertEqual(['acceleration'], board.data)
+        self.assertEqual('imu', board.IMU)
+        self.assertEqual(1, board.starts)
+        self.assertEqual([], board.boot.pending())
+        self.assertEqual(('IMU', 'lazy', True), tuple(board.boot.profile[0][i] for i in (0, 1, 3)))
+        with self.assertRaises(AttributeError):
+            board.radio1
+
+    def test_failed_device_is_not_retried(self):
+        board = Board()
+        board.boot.defer('LiDAR', ('LiDAR',), board.init_lidar)
+        for _ in range(3):
+            self.assertFalse(hasattr(board, 'LiDAR'))
+        self.assertEqual(1, board.starts)
+        self.assertFalse(board.boot.profile[0][3])
+        self.assertIn('~LiDAR:', board.boot.report())
+        self.assertTrue(board.boot.report().endswith('!'))
+
+    def test_wait_ready(self):
+        boot = boot_manager.BootManager()
+        polls = []
+        self.assertTrue(boot.wait_ready(lambda: polls.append(1) or len(polls) == 3, timeout=1, period=0))
+        self.assertEqual(3, len(polls))
+        self.assertFalse(boot.wait_ready(lambda: False, timeout=0.01, period=0.001))
+        self.assertTrue(boot_manager.i2c_ready(hw.I2C(), 0x40))
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'boot_profile.txt')
+            board = Board(path)
+            self.assertTrue(board.boot.start('PWR', lambda: None))
+            board.boot.defer('IMU', ('IMU',), board.init_imu)
+            board.boot.mark('beacon')
+            board.boot.save('boot 3')
+            board.boot.save('boot 4')
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith('boot 3 PWR:'))
+        self.assertIn(' beacon@', lines[0])
+        self.assertTrue(lines[0].endswith('deferred:IMU'))
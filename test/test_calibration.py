@@ -0,0 +1,237 @@
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import calibration
+
+# Raw reading = SOFT B + OFFSET, so the fitted S should invert SOFT
+SOFT = ((1.1, 0.05, -0.03), (0.05, 0.92, 0.02), (-0.03, 0.02, 1.04))
+OFFSET = (12.0, -30.0, 5.0)
+
+
+def _unit():
+    v = [random.gauss(0, 1) for _ in range(3)]
+    n = math.sqrt(sum(c*c for c in v))
+    return [c / n for c in v]
+
+
+def _raw(b):
+    return [sum(SOFT[r][c] * b[c] for c in range(3)) + OFFSET[r] for r in range(3)]
+
+
+def _norm(v):
+    return math.sqrt(sum(c*c for c in v))
+
+
+class MagFitTests(TestCase):
+
+    def _check(self, mode, model_field, tolerance):
+        random.seed(5)
+        fit = calibration.MagFit(mode, 50.0, model_field=model_field)
+        samples = []
+        for _ in range(400):
+            field = 25 + 40 * random.random() if model_field else 50.0
+            m = _raw([field * c for c in _unit()])
+            fit.add(m, field)
+            samples.append((m, field))
+        cal = fit.solve()
+        self.assertIsNotNone(cal)
+        for i in range(3):
+            self.assertAlmostEqual(cal.mag_offset[i], OFFSET[i], delta=0.5)
+        worst = max(abs(_norm(cal.mag(m)) - field) for m, field in samples)
+        self.assertLess(worst, tolerance)
+
+    def test_ellipsoid(self):
+        self._check('ellipsoid', False, 0.1)
+
+    def test_ellipsoid_model_field(self):
+        self._check('ellipsoid', True, 0.1)
+
+    def test_sphere_offset(self):
+        # A sphere cannot undo the soft iron, only the offset and scale
+        self._check('sphere', False, 10.0)
+
+    def test_underdetermined(self):
+        fit = calibration.MagFit()
+        for _ in range(5):
+            fit.add((1.0, 2.0, 3.0))
+        self.assertIsNone(fit.solve())
+
+
+class GyroStillTests(TestCase):
+
+    def test_still_and_moving(self):
+        random.seed(6)
+        still = calibration.GyroStill(window=100, threshold=0.005)
+        for _ in range(100):
+            still.add([0.01 + random.gauss(0, 0.001), -0.02, 0.0])
+        self.assertTrue(still.found)
+        self.assertAlmostEqual(still.bias[0], 0.01, delta=0.001)
+        moving = calibration.GyroStill(window=100, threshold=0.005)
+        for i in range(100):
+            moving.add([0.1 * math.sin(i / 5), 0.0, 0.0])
+        self.assertFalse(moving.found)
+
+
+class PersistenceTests(TestCase):
+
+    def _cal(self):
+        cal = calibration.Calibration()
+        for i in range(3):
+            cal.mag_offset[i] = OFFSET[i]
+            cal.gyro_bias[i] = 0.001 * (i + 1)
+        cal.soft_iron[1] = 0.25
+        cal.samples = 321
+        return cal
+
+    def test_round_trip_and_crc(self):
+        record = self._cal().pack()
+        self.assertEqual(len(record), calibration.RECORD_SIZE)
+        cal = calibration.Calibration.unpack(record)
+        self.assertEqual(cal.samples, 321)
+        self.assertAlmostEqual(cal.soft_iron[1], 0.25, places=6)
+        self.assertAlmostEqual(cal.gyro_bias[2], 0.003, places=6)
+        corrupt = bytearray(record)
+        corrupt[12] ^= 0x10
+        self.assertIsNone(calibration.Calibration.unpack(corrupt))
+
+    def test_sd_then_nvm(self):
+        nvm = bytearray(256)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'cal', 'imu.bin')
+            self.assertEqual(self._cal().save(nvm, path), 2)
+            self.assertEqual(calibration.load(nvm, path).source, 'sd')
+            os.remove(path)
+            cal = calibration.load(nvm, path)
+            self.assertEqual(cal.source, 'nvm')
+            self.assertAlmostEqual(cal.mag_offset[1], OFFSET[1], places=5)
+            nvm[calibration.NVM_OFFSET] ^= 0xFF
+            self.assertIsNone(calibration.load(nvm, path))
+
+
+class Radio:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+class CommandTests(TestCase):
+    '''cdh 'imucal': uplink of a ground fit and start of the on-board collection'''
+
+    def setUp(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            import cdh
+            import functions
+        self.cdh = cdh
+        self.functions = functions
+        self.dir = tempfile.TemporaryDirectory()
+        self.sd_path = calibration.SD_PATH
+        calibration.SD_PATH = os.path.join(self.dir.name, 'cal', 'imu.bin')
+        self.sat = SimpleNamespace(debug=False, radio1=Radio(), micro=SimpleNamespace(nvm=bytearray(256)),
+                                   hardware={'IMU': True}, IMU=SimpleNamespace(cal=None), imu_cal=None)
+
+    def tearDown(self):
+        calibration.SD_PATH = self.sd_path
+        self.functions.active = None
+        self.dir.cleanup()
+
+    def test_set_stores_and_applies_a_ground_fit(self):
+        self.cdh.imucal(self.sat, b'set ' + PersistenceTests._cal(self).pack())
+        self.assertTrue(self.sat.radio1.sent[-1].startswith('saved 2x CAL gs N:321'))
+        self.assertIs(self.sat.IMU.cal, self.sat.imu_cal)
+        self.assertAlmostEqual(self.sat.IMU.cal.mag_offset[0], OFFSET[0], places=5)
+        # both copies load back
+        self.assertEqual(calibration.load(self.sat.micro.nvm, calibration.SD_PATH).source, 'sd')
+        self.assertEqual(calibration.load(self.sat.micro.nvm, None).samples, 321)
+        self.cdh.imucal(self.sat)
+        self.assertTrue(self.sat.radio1.sent[-1].startswith('CAL gs'))
+
+    def test_set_rejects_a_corrupt_record(self):
+        record = bytearray(PersistenceTests._cal(self).pack())
+        record[10] ^= 1
+        self.cdh.imucal(self.sat, b'set ' + bytes(record))
+        self.assertEqual(b'bad cal record', self.sat.radio1.sent[-1])
+        self.assertIsNone(self.sat.imu_cal)
+        self.assertEqual(bytes(256), bytes(self.sat.micro.nvm))
+
+    def test_start_runs_the_on_board_fit(self):
+        started = []
+        self.functions.active = SimpleNamespace(
+            start_imu_calibration=lambda duration, mode: started.append((duration, mode)) or True)
+        self.cdh.imucal(self.sat, b'start 120 sphere')
+        self.assertEqual([(120, 'sphere')], started)
+        self.cdh.imucal(self.sat, b'start')
+        self.assertEqual((600, 'ellipsoid'), started[-1])
+        self.functions.active = None
+        self.cdh.imucal(self.sat, b'start')
+        self.assertEqual(b'imucal not started', self.sat.radio1.sent[-1])
+
+    def test_start_collects_in_the_background(self):
+        import asyncio
+        random.seed(5)
+
+        class IMU:
+            cal = None
+            raw = {}
+
+            def snapshot(self, max_age=None):
+                self.raw = {'magnetometer': _raw([40.0 * c for c in _unit()]), 'gyroscope': (0.01, 0.0, -0.02)}
+
+        self.sat.IMU = IMU()
+        f = self.functions.functions(self.sat)
+
+        async def main():
+            self.cdh.imucal(self.sat, b'start 1 sphere')
+            self.assertTrue(f.imu_calibrating)
+            # a second start is refused while the first runs
+            self.cdh.imucal(self.sat, b'start 1')
+            self.assertEqual(b'imucal not started', self.sat.radio1.sent[-1])
+            while f.imu_calibrating:
+                await asyncio.sleep(0.05)
+
+        asyncio.run(main())
+        self.assertIsNotNone(self.sat.IMU.cal)
+        self.assertIs(self.sat.IMU.cal, self.sat.imu_cal)
+        self.assertEqual(calibration.load(self.sat.micro.nvm, calibration.SD_PATH).samples, self.sat.IMU.cal.samples)
+
+    def test_stop_cancels_the_background_fit(self):
+        import asyncio
+
+        class IMU:
+            cal = None
+            raw = {}
+
+            def snapshot(self, max_age=None):
+                self.raw = {'magnetometer': _raw([40.0 * c for c in _unit()]), 'gyroscope': (0.0, 0.0, 0.0)}
+
+        self.sat.IMU = IMU()
+        f = self.functions.functions(self.sat)
+
+        async def main():
+            self.assertTrue(f.start_imu_calibration(600))
+            await asyncio.sleep(0.05)
+            # normal operations end: main.py stops the fit with them
+            task = f.imu_cal_task
+            await f.stop_imu_calibration()
+            self.assertTrue(task.cancelled())
+
+        asyncio.run(main())
+        self.assertFalse(f.imu_calibrating)
+        self.assertIsNone(self.sat.IMU.cal)
+        self.assertEqual(bytes(256), bytes(self.sat.micro.nvm))
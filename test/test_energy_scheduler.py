@@ -0,0 +1,134 @@
+import os
+import sys
+from types import SimpleNamespace
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+import energy_scheduler
+from energy_scheduler import RUN, SKIP, STRETCH
+from Tasks.template_task import Task
+
+
+class radio(Task):
+    priority = 1
+    frequency = 1/10
+    name = 'radio'
+    current = 100
+    duration = 5        # 50 mA at full rate
+    min_power_mode = 'minimum'
+
+
+class camera(Task):
+    priority = 2
+    frequency = 1/10
+    name = 'camera'
+    current = 200
+    duration = 5        # 100 mA at full rate
+
+
+class monitor(Task):
+    priority = 9
+    frequency = 1
+    name = 'monitor'
+    current = 10
+    duration = 1
+    min_power_mode = 'critical'
+    essential = True
+
+
+class survey(Task):
+    priority = 4
+    frequency = 1/60
+    name = 'survey'
+    current = 20
+    duration = 10
+    min_power_mode = 'maximum'
+
+
+TASKS = [camera, monitor, radio]
+
+
+class Handle:
+    '''tasko ScheduledTask stand-in'''
+
+    def __init__(self):
+        self.running = True
+        self.rate = None
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def change_rate(self, hz):
+        self.rate = hz
+
+
+class EnergySchedulerTests(TestCase):
+
+    def _scheduler(self):
+        # No reserve below 100% SOC, fixed 50 mA baseline
+        return energy_scheduler.EnergyScheduler(soc_floor=1.0, base_current=50.0, smoothing=0.0)
+
+    def test_soc_table(self):
+        self.assertEqual(0.0, energy_scheduler.soc(5.0))
+        self.assertEqual(1.0, energy_scheduler.soc(9.0))
+        self.assertAlmostEqual(0.45, energy_scheduler.soc(7.3))
+
+    def test_full_budget_runs_everything(self):
+        s = self._scheduler()
+        rates = s.plan(TASKS, 'normal', 7.4, 300.0)
+        self.assertEqual({'radio': 0.1, 'camera': 0.1, 'monitor': 1}, rates)
+        self.assertEqual(RUN, s.states['camera'])
+
+    def test_stretch_then_skip(self):
+        s = self._scheduler()
+        # 150 mA in, 50 mA baseline: radio takes 50, camera gets the other 50 (monitor is essential)
+        s.plan(TASKS, 'normal', 7.4, 200.0)
+        self.assertEqual(RUN, s.states['camera'])
+        s.plan(TASKS, 'normal', 7.4, 150.0)
+        self.assertEqual(STRETCH, s.states['camera'])
+        self.assertAlmostEqual(0.05, s.rates['camera'])
+        self.assertEqual(RUN, s.states['monitor'])
+        # Stretched below frequency/10: skipped
+        s.plan(TASKS, 'normal', 7.4, 104.0)
+        self.assertEqual(SKIP, s.states['camera'])
+        self.assertEqual(0, s.rates['camera'])
+
+    def test_power_mode(self):
+        s = self._scheduler()
+        s.plan(TASKS, 'minimum', 7.4, 1000.0)
+        self.assertEqual(SKIP, s.states['camera'])
+        self.assertEqual(RUN, s.states['radio'])
+        s.plan(TASKS, 'critical', 7.4, 0.0)
+        self.assertEqual(SKIP, s.states['radio'])
+        self.assertEqual(RUN, s.states['monitor'])
+
+    def test_baseline_tracks_undeclared_draw(self):
+        s = energy_scheduler.EnergyScheduler(soc_floor=1.0, base_current=50.0, smoothing=1.0)
+        s.plan(TASKS, 'normal', 7.4, 300.0)
+        # Declared 160 mA running, 240 mA measured: 80 mA baseline
+        s.plan(TASKS, 'normal', 7.4, 300.0, idraw=240.0)
+        self.assertAlmostEqual(80.0, s.base)
+
+    def test_mode_gate_within_normal_operations(self):
+        # The registry only plans in normal or maximum power: a task declared
+        # for maximum waits out normal power and starts again in maximum
+        sat = SimpleNamespace(power_mode='normal', power_readings=(7.4, 1000.0, 8.0, 0.0, 5.0))
+        s = energy_scheduler.EnergyScheduler(sat, soc_floor=1.0, base_current=50.0, smoothing=0.0)
+        handles = {'survey': Handle(), 'monitor': Handle()}
+        s.update([survey, monitor])
+        s.apply(handles)
+        self.assertEqual(SKIP, s.states['survey'])
+        self.assertFalse(handles['survey'].running)
+        self.assertTrue(handles['monitor'].running)
+        sat.power_mode = 'maximum'
+        s.update([survey, monitor])
+        s.apply(handles)
+        self.assertEqual(RUN, s.states['survey'])
+        self.assertTrue(handles['survey'].running)
+        self.assertAlmostEqual(1/60, handles['survey'].rate)
@@ -0,0 +1,101 @@
+import os
+import sys
+from types import SimpleNamespace
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import functions
+
+
+class Radio:
+    tx_power = 13
+
+    def __init__(self):
+        self.sent = []
+        self.writes = 0
+
+    def __setattr__(self, name, value):
+        if name not in ('sent', 'writes'):
+            self.writes += 1
+        object.__setattr__(self, name, value)
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+class FakeSatellite:
+    def __init__(self):
+        self.debug = False
+        self.f_fsk = False
+        self.hardware = {}
+        self.face_power_cycles = 0
+        self.enable_rf = SimpleNamespace(value=False)
+        self.radio1 = Radio()
+        self.IMU = None
+        self.tca = hw.TCA9548A(hw.I2C())
+        self.radio_records = []
+
+    def radio_log(self, rssi, length, direction):
+        self.radio_records.append((rssi, length, direction))
+
+    def all_faces_on(self):
+        pass
+
+    def Face_log(self, data):
+        pass
+
+
+class FunctionsCacheTests(TestCase):
+
+    def setUp(self):
+        self.sat = FakeSatellite()
+        self.f = functions.functions(self.sat)
+
+    def test_field_is_kept_and_reconfigured(self):
+        self.f.transmit('one')
+        field = self.f.field
+        writes = self.sat.radio1.writes
+        self.sat.enable_rf.value = False
+        self.f.transmit('two')
+        self.assertIs(field, self.f.field)
+        self.assertEqual(['one', 'two'], self.sat.radio1.sent)
+        # the radio setup is applied again for every transmission
+        self.assertEqual(2 * writes, self.sat.radio1.writes)
+        self.assertTrue(self.sat.enable_rf.value)
+
+    def test_transmit_logs_tx_records(self):
+        self.f.transmit('one')
+        self.f.send('two')
+        tx = functions.log_records.TX
+        self.assertEqual([(13, 3, tx), (13, 17, tx)], self.sat.radio_records)
+
+    def test_face_drivers_rebuilt_after_power_cycle(self):
+        self.f.all_face_data()
+        faces = self.f.allfaces
+        self.assertIsNotNone(faces)
+        self.f.all_face_data()
+        self.assertIs(faces, self.f.allfaces)
+        self.sat.face_power_cycles += 1
+        self.f.all_face_data()
+        self.assertIsNot(faces, self.f.allfaces)
+
+    def test_detumble_uses_the_shared_faces(self):
+        controller = self.f.detumble_controller()
+        faces = self.f.face_sensors()
+        self.assertIs(faces.Face2, controller.mtq.attach()[0])
+        self.sat.face_power_cycles += 1
+        coils = controller.mtq.attach()
+        self.assertIsNot(faces, self.f.allfaces)
+        self.assertIs(self.f.allfaces.Face2, coils[0])
+
+    def test_missing_sensor_is_retried(self):
+        faces = self.f.face_sensors()
+        faces.Face1.sensors['VEML'] = False
+        self.assertIsNot(faces, self.f.face_sensors())
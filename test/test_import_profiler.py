@@ -0,0 +1,64 @@
+import builtins
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+import import_profiler
+
+MODULES = {
+    'ip_outer': 'import time\nimport ip_inner\nimport ip_leaf\nx = sum(range(20000))\n',
+    'ip_inner': 'import ip_leaf\ny = sum(range(20000))\n',
+    'ip_leaf': 'z = 1\n',
+}
+
+
+class ImportProfilerTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for name, source in MODULES.items():
+            with open(os.path.join(self.dir.name, name + '.py'), 'w') as f:
+                f.write(source)
+        sys.path.insert(0, self.dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self.dir.name)
+        for name in MODULES:
+            sys.modules.pop(name, None)
+        self.dir.cleanup()
+        import_profiler.active = None
+
+    def test_records_loads_with_nesting(self):
+        original = builtins.__import__
+        profiler = import_profiler.ImportProfiler().install()
+        try:
+            import ip_outer
+            import ip_outer
+        finally:
+            profiler.uninstall()
+        self.assertIs(original, builtins.__import__)
+        self.assertIs(profiler, import_profiler.active)
+        # Load order is completion order; ip_leaf and time are loaded once
+        names = [m[0] for m in profiler.modules]
+        self.assertEqual(['ip_leaf', 'ip_inner', 'ip_outer'], [n for n in names if n.startswith('ip_')])
+        self.assertEqual(1, names.count('ip_leaf'))
+        records = {m[0]: m for m in profiler.modules}
+        self.assertEqual((2, 1, 0), (records['ip_leaf'][1], records['ip_inner'][1], records['ip_outer'][1]))
+        outer = records['ip_outer']
+        nested = sum(m[2] for m in profiler.modules if m[1] == 1)
+        self.assertEqual(outer[2] - nested, outer[3])
+        self.assertEqual(outer[2], profiler.total_us())
+        self.assertIsNone(profiler.heap())
+        self.assertTrue(profiler.summary(2).startswith('imports:'))
+        self.assertEqual(len(profiler.modules), len(profiler.lines()))
+
+    def test_uninstalled_records_nothing(self):
+        profiler = import_profiler.ImportProfiler().install()
+        profiler.uninstall()
+        import ip_leaf
+        self.assertEqual([], profiler.modules)
@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import log_records
+from log_records import FACE, IMU, POWER, RADIO, TEXT
+
+FACES = [[21.31, 543.2], [None, 12.0], [-19.5, 0.0], [22.04, 88126.6], [18.25, 230.4, -4.75]]
+
+
+def _log(n=500):
+    data = bytearray()
+    for i in range(n):
+        data += log_records.power(i * 1000, 7.412, 140.0, None, 210.0, 5.02)
+        data += log_records.imu(i * 1000 + 500, (0.12, -9.79, 0.31), None, (0.011, -0.002, 0.004))
+    return bytes(data)
+
+
+class LogRecordTests(TestCase):
+
+    def test_round_trip(self):
+        data = (log_records.face(1, FACES) + log_records.radio(2, -97, 32, log_records.TX)
+                + log_records.text(3, 'hello'))
+        records = list(log_records.Reader(io.BytesIO(data)))
+        self.assertEqual([FACE, RADIO, TEXT], [r[1] for r in records])
+        self.assertEqual([1, 2, 3], [r[2] for r in records])
+        faces = log_records.fields(FACE, records[0][3])
+        self.assertAlmostEqual(21.31, faces[0])
+        self.assertEqual(544, faces[1])
+        self.assertIsNone(faces[3])
+        self.assertAlmostEqual(-19.5, faces[6])
+        self.assertEqual(88126, faces[10])
+        self.assertAlmostEqual(-4.75, faces[14])
+        self.assertEqual([-97, 32, log_records.TX], log_records.fields(RADIO, records[1][3]))
+        self.assertEqual('hello', log_records.fields(TEXT, records[2][3]))
+        power = log_records.fields(POWER, log_records.power(0, 7.412, 140.0, None, 210.0, 5.02)[7:-2])
+        self.assertEqual([7.412, 140.0, None, 210.0, 5.02], power)
+
+    def test_damage_is_skipped(self):
+        data = bytearray(_log(20))
+        # Corrupt the first IMU record and cut the last one short
+        data[30] ^= 0xFF
+        data = bytes(data[:-5])
+        reader = log_records.Reader(io.BytesIO(data), chunk=64)
+        records = list(reader)
+        self.assertEqual(38, len(records))
+        self.assertGreater(reader.skipped, 0)
+        self.assertEqual([POWER, POWER, IMU], [r[1] for r in records[:3]])
+        self.assertEqual(1000, records[1][2])
+
+    def test_seek_time(self):
+        data = _log()
+        reader = log_records.Reader(io.BytesIO(data), chunk=256)
+        offset = reader.seek_time(123400)
+        record = reader.next()
+        self.assertEqual(offset, record[0])
+        self.assertEqual(123500, record[2])
+        self.assertEqual(0, reader.seek_time(0))
+        self.assertIsNone(reader.seek_time(10 ** 9))
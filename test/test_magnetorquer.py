@@ -0,0 +1,54 @@
+import os
+import sys
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import magnetorquer
+
+
+class Coil:
+    drive = None
+
+
+class Faces:
+    def __init__(self):
+        self.Face0 = Coil()
+        self.Face2 = Coil()
+        self.Face4 = Coil()
+
+
+class DurationTests(TestCase):
+
+    def test_one_way_coils_skip_the_other_sign(self):
+        mtq = magnetorquer.Magnetorquer(lambda: None, threshold=0.05, max_dipole=1.0)
+        self.assertEqual([0.0, 3.5, 0.0], list(mtq.durations((-1.0, 0.5, -0.2), 7)))
+
+    def test_polarity_per_axis(self):
+        mtq = magnetorquer.Magnetorquer(lambda: None, threshold=0.05, max_dipole=1.0, polarity=(-1, 1, 1))
+        self.assertEqual([7.0, 3.5, 0.0], list(mtq.durations((-1.0, 0.5, -0.2), 7)))
+
+    def test_reversible_coils_use_the_magnitude(self):
+        mtq = magnetorquer.Magnetorquer(lambda: None, threshold=0.05, max_dipole=1.0, polarity=None)
+        self.assertEqual([7.0, 3.5, 0.0], [round(t, 3) for t in mtq.durations((-1.0, 0.5, -0.02), 7)])
+
+
+class AttachTests(TestCase):
+
+    def test_coils_follow_the_shared_faces(self):
+        shared = [Faces()]
+        mtq = magnetorquer.Magnetorquer(lambda: shared[0], sequence=47)
+        first = mtq.attach()
+        self.assertIs(shared[0].Face2, first[0])
+        self.assertEqual(47, shared[0].Face4.drive)
+        self.assertIs(first, mtq.attach())
+        # face_sensors() rebuilt the drivers after a power cycle
+        shared[0] = Faces()
+        self.assertIs(shared[0].Face0, mtq.attach()[1])
+        self.assertEqual(47, shared[0].Face0.drive)
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import new_file_bench
+
+
+class NewFileTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.card = new_file_bench.Card(self.dir.name)
+        self.sat = new_file_bench.Sat(self.card)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_creates_directory_and_counts(self):
+        self.assertEqual('/sd/logs/ERR_00000.txt', self.sat.new_file('/logs/ERR_'))
+        self.assertEqual('/sd/logs/ERR_00001.txt', self.sat.new_file('/logs/ERR_'))
+        self.assertEqual(2, self.sat.filenumbers['/logs/ERR_'])
+        before = self.card.calls['stat']
+        self.sat.new_file('/logs/ERR_')
+        self.assertEqual(before + 1, self.card.calls['stat'])
+        self.assertEqual(1, self.card.calls['listdir'])
+
+    def test_reboot_and_stale_counter(self):
+        new_file_bench.populate(self.dir.name, 30)
+        self.assertEqual('/sd/data/DATA_00030.txt', self.sat.new_file('/data/DATA_'))
+        # Next boot reads the counter file, no scan
+        sat = new_file_bench.Sat(self.card)
+        listdirs = self.card.calls['listdir']
+        self.assertEqual('/sd/data/DATA_00031.txt', sat.new_file('/data/DATA_'))
+        self.assertEqual(listdirs, self.card.calls['listdir'])
+        # Counter behind the files on the card: one scan
+        with open(os.path.join(self.dir.name, 'data', 'DATA_.num'), 'w') as f:
+            f.write('3')
+        sat = new_file_bench.Sat(self.card)
+        self.assertEqual('/sd/data/DATA_00032.txt', sat.new_file('/data/DATA_'))
+        self.assertEqual(listdirs + 1, self.card.calls['listdir'])
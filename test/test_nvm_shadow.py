@@ -0,0 +1,100 @@
+import os
+import sys
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+from bitflags import NVMShadow, bitFlag, multiBitFlag, multiByte
+
+
+class Registers:
+    '''The pysquared.Satellite register layout, on either the shadow or raw NVM'''
+    c_boot      = multiBitFlag(register=0, lowest_bit=0, num_bits=8)
+    f_brownout  = bitFlag(register=16, bit=3)
+    f_triedburn = bitFlag(register=16, bit=4)
+    f_burned    = bitFlag(register=16, bit=6)
+    c_long      = multiByte(num_bytes=2, lowest_register=20)
+
+    def __init__(self, nvm, shadow=True):
+        self.nvm = NVMShadow(nvm, 30) if shadow else nvm
+
+
+def _burn_loop(r):
+    # smart_burn / heater pattern: flags flipped every pass
+    for _ in range(50):
+        r.f_triedburn = True
+        r.f_brownout = True
+        r.f_triedburn = False
+        r.f_brownout = False
+    r.f_burned = True
+
+
+class NVMShadowTests(TestCase):
+
+    def test_writes_coalesce(self):
+        raw = hw.NVM(256)
+        _burn_loop(Registers(raw, shadow=False))
+        self.assertEqual(201, raw.writes)
+
+        nvm = hw.NVM(256)
+        r = Registers(nvm)
+        _burn_loop(r)
+        r.c_boot = 7
+        r.c_long = 0x1234
+        self.assertEqual(0, nvm.writes)
+        self.assertTrue(r.f_burned)
+        self.assertTrue(r.nvm.commit())
+        self.assertEqual(1, nvm.writes)
+        self.assertEqual(32, nvm.bytes_written)
+        self.assertFalse(r.nvm.commit())
+        # Only from the lowest changed register on
+        r.f_burned = False
+        r.nvm.commit()
+        self.assertEqual(2, nvm.writes)
+        self.assertEqual(32 + 16, nvm.bytes_written)
+        # Setting a flag to what it is does not dirty the block
+        r.f_burned = False
+        self.assertFalse(r.nvm.dirty)
+
+    def test_check(self):
+        nvm = hw.NVM(256)
+        r = Registers(nvm)
+        self.assertFalse(r.nvm.crc_ok)
+        r.c_boot = 3
+        r.nvm.commit()
+        r = Registers(nvm)
+        self.assertTrue(r.nvm.crc_ok)
+        self.assertEqual(3, r.c_boot)
+        nvm[5] ^= 0x40
+        r = Registers(nvm)
+        self.assertFalse(r.nvm.crc_ok)
+        # Resealed by the next commit, with nothing else changed
+        self.assertTrue(r.nvm.commit())
+        self.assertTrue(Registers(nvm).nvm.crc_ok)
+        with self.assertRaises(IndexError):
+            r.nvm[30] = 1
+
+    def test_slices_stay_inside_the_block(self):
+        nvm = hw.NVM(256)
+        r = Registers(nvm)
+        r.c_boot = 3
+        r.nvm.commit()
+        # a descriptor or slice running into the two check bytes
+        for key in (slice(29, 31), slice(28, 32), slice(40, 42)):
+            with self.assertRaises(IndexError):
+                r.nvm[key] = bytes(key.stop - key.start)
+        # an open slice ends at the block, and the value has to fit it
+        with self.assertRaises(ValueError):
+            r.nvm[28:] = b'\xff\xff\xff\xff'
+        self.assertFalse(r.nvm.dirty)
+        r.nvm[28:30] = b'\x01\x02'
+        r.nvm.commit()
+        shadow = Registers(nvm).nvm
+        self.assertTrue(shadow.crc_ok)
+        self.assertEqual(b'\x01\x02', bytes(shadow[28:30]))
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+import time
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import power_state
+
+PERIOD = 0.05
+
+
+class Satellite:
+    '''Battery manager that walks through a list of power modes, one per call'''
+
+    def __init__(self, modes):
+        self.modes = list(modes)
+        self.power_mode = self.modes[0]
+        self.power_readings = (7.4, 0.1, 0.0, 0.2, 5.0)
+        self.RGB = None
+        self.calls = []
+
+    async def battery_manager_async(self):
+        self.calls.append(time.monotonic())
+        if len(self.modes) > 1:
+            self.modes.pop(0)
+        self.power_mode = self.modes[0]
+
+    def check_reboot(self):
+        pass
+
+    def poll_logs(self):
+        pass
+
+
+class Functions:
+    async def battery_heater_async(self):
+        return False
+
+
+class Store:
+    def __init__(self):
+        self.series = {}
+
+    def append(self, name, value):
+        self.series.setdefault(name, []).append(value)
+
+
+class PowerStateTests(TestCase):
+
+    def _state(self, modes, store=None):
+        self.sat = Satellite(modes)
+        return power_state.PowerState(self.sat, Functions(), period=PERIOD, store=store)
+
+    def test_check_publishes_mode_and_stores_readings(self):
+        store = Store()
+        state = self._state(['normal', 'normal'], store)
+        self.assertTrue(asyncio.run(state.check()))
+        self.assertEqual((255, 255, 0), self.sat.RGB)
+        self.assertEqual([7.4], store.series['vbatt'])
+        self.assertEqual(0, state.transitions)
+
+    def test_mode_change_pulses_and_cancels_supervised_tasks(self):
+        # two checks in normal power, the third finds the battery at minimum
+        state = self._state(['normal', 'normal', 'normal', 'minimum'])
+        seen = []
+        cancelled = []
+
+        async def watcher():
+            seen.append(await state.wait_change())
+
+        async def worker():
+            try:
+                while True:
+                    self.assertTrue(state.ok)
+                    await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def main():
+            w = asyncio.create_task(watcher())
+            await asyncio.sleep(0)
+            mode = await state.supervise(worker(), worker())
+            await w
+            return mode
+
+        self.assertEqual('minimum', asyncio.run(main()))
+        self.assertEqual(['minimum'], seen)
+        self.assertEqual([True, True], cancelled)
+        self.assertFalse(state.ok)
+        self.assertEqual(1, state.transitions)
+        # the event re-arms for the next transition
+        self.assertFalse(state.changed.is_set())
+        # checks stay at the configured period
+        self.assertEqual(3, state.checks)
+        for a, b in zip(self.sat.calls, self.sat.calls[1:]):
+            self.assertAlmostEqual(PERIOD, b - a, delta=0.03)
+
+    def test_supervise_does_not_start_in_low_power(self):
+        state = self._state(['normal', 'critical'])
+        started = []
+
+        async def worker():
+            started.append(True)
+
+        self.assertEqual('critical', asyncio.run(state.supervise(worker())))
+        self.assertEqual([], started)
+        self.assertEqual(1, state.checks)
@@ -0,0 +1,150 @@
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install_board()
+
+import pysquared_rfm9x
+import functions
+
+HEADER = bytes((0xfb, 0xfa, 0, 0))
+
+
+def _radio():
+    spi = hw.RadioSPI()
+    # the driver waits 1 s for the oscillator calibration
+    with mock.patch.object(time, 'sleep'):
+        radio = pysquared_rfm9x.RFM9x(spi, hw.DigitalInOut(), hw.DigitalInOut(), 437.4)
+    radio.node = 0xfa
+    radio.destination = 0xfb
+    return radio, spi
+
+
+async def _ticks(counter, stop):
+    # counts how often the event loop got to another task
+    while not stop:
+        counter.append(1)
+        await asyncio.sleep(0.001)
+
+
+class SendTests(TestCase):
+
+    def setUp(self):
+        self.radio, self.spi = _radio()
+
+    def test_tx_done(self):
+        self.spi.tx_reads = 3
+        self.assertTrue(self.radio.send('hello'))
+        self.assertEqual([HEADER + b'hello'], self.spi.sent)
+        # the interrupt is cleared and the chip left idle
+        self.assertEqual(0, self.spi.regs[0x12])
+        self.assertEqual(pysquared_rfm9x.STANDBY_MODE, self.radio.operation_mode)
+
+    def test_tx_timeout(self):
+        self.spi.tx_reads = None
+        self.radio.xmit_timeout = 0.05
+        self.assertFalse(self.radio.send('lost'))
+
+    def test_send_async_yields_while_on_air(self):
+        self.spi.tx_reads = 5
+        ticks = []
+        stop = []
+
+        async def main():
+            other = asyncio.create_task(_ticks(ticks, stop))
+            done = await self.radio.send_async('hello', keep_listening=True, poll=0.002)
+            stop.append(1)
+            await other
+            return done
+
+        self.assertTrue(asyncio.run(main()))
+        self.assertGreater(len(ticks), 1)
+        self.assertEqual(pysquared_rfm9x.RX_MODE, self.radio.operation_mode)
+
+    def test_send_async_timeout(self):
+        self.spi.tx_reads = None
+        self.radio.xmit_timeout = 0.05
+        self.assertFalse(asyncio.run(self.radio.send_async('lost', poll=0.005)))
+        self.assertEqual(0, self.spi.regs[0x12])
+
+
+class ReceiveTests(TestCase):
+
+    def setUp(self):
+        self.radio, self.spi = _radio()
+
+    def test_receive_async_packet(self):
+        self.spi.deliver(bytes((0xfa, 0xfb, 7, 0)) + b'cmd')
+        packet = asyncio.run(self.radio.receive_async(timeout=1, poll=0.002))
+        self.assertEqual(b'cmd', packet)
+        self.assertEqual(pysquared_rfm9x.RX_MODE, self.radio.operation_mode)
+
+    def test_receive_async_timeout_yields(self):
+        ticks = []
+        stop = []
+
+        async def main():
+            other = asyncio.create_task(_ticks(ticks, stop))
+            packet = await self.radio.receive_async(timeout=0.05, keep_listening=False, poll=0.005)
+            stop.append(1)
+            await other
+            return packet
+
+        start = time.monotonic()
+        self.assertIsNone(asyncio.run(main()))
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertGreater(len(ticks), 1)
+        self.assertEqual(pysquared_rfm9x.STANDBY_MODE, self.radio.operation_mode)
+
+    def test_not_for_this_node(self):
+        self.spi.deliver(bytes((0x10, 0xfb, 7, 0)) + b'cmd')
+        self.assertIsNone(asyncio.run(self.radio.receive_async(timeout=1, poll=0.002)))
+
+    def test_await_rx(self):
+        self.radio.listen()
+        self.assertFalse(asyncio.run(self.radio.await_rx(timeout=0.03, poll=0.005)))
+        self.spi.deliver(HEADER + b'x')
+        self.assertTrue(asyncio.run(self.radio.await_rx(timeout=1, poll=0.005)))
+
+
+class RadioLockTests(TestCase):
+
+    def setUp(self):
+        self.radio, self.spi = _radio()
+        self.spi.tx_reads = 5
+        self.logged = []
+        sat = SimpleNamespace(debug=False, f_fsk=False, enable_rf=SimpleNamespace(value=False), radio1=self.radio,
+                              radio_log=lambda *record: self.logged.append(record))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.f = functions.functions(sat)
+
+    def test_concurrent_transmits_serialise(self):
+        async def main():
+            await asyncio.gather(self.f.transmit_async('first'), self.f.transmit_async('second'))
+
+        asyncio.run(main())
+        self.assertEqual(0, self.spi.overlaps)
+        self.assertEqual([HEADER + b'first', HEADER + b'second'], self.spi.sent)
+        self.assertEqual([(13, 5, functions.log_records.TX), (13, 6, functions.log_records.TX)], self.logged)
+
+    def test_without_the_lock_the_packets_overlap(self):
+        # what the lock prevents: the second packet overwrites the FIFO of the first on air
+        self.radio.xmit_timeout = 0.1
+
+        async def main():
+            await asyncio.gather(self.radio.send_async('first', poll=0.002),
+                                 self.radio.send_async('second', poll=0.002))
+
+        asyncio.run(main())
+        self.assertEqual(1, self.spi.overlaps)
@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+import sd_logger
+
+
+class FakeSatellite:
+    '''Satellite.new_file over a temporary directory'''
+
+    def __init__(self, root):
+        self.root = root
+        self.hardware = {'SDcard': True}
+        self.count = 0
+
+    def new_file(self, substring):
+        path = os.path.join(self.root, '{}{:05}.txt'.format(substring.strip('/').replace('/', '_'), self.count))
+        self.count += 1
+        open(path, 'a').close()
+        return path
+
+
+class SDLoggerTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.sat = FakeSatellite(self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _contents(self):
+        data = b''
+        for name in sorted(os.listdir(self.dir.name)):
+            with open(os.path.join(self.dir.name, name), 'rb') as f:
+                data += f.read()
+        return data
+
+    def test_batches_whole_sectors(self):
+        log = sd_logger.SDLogger(self.sat, '/error/LOG_', buffer_size=4096, flush_bytes=2048)
+        for i in range(200):
+            log.write('message {:04}'.format(i))
+        # ~20 bytes a record: one 2048 byte write so far, the tail still in RAM
+        self.assertEqual(1, log.writes)
+        self.assertEqual(2048, log.written)
+        self.assertTrue(0 < log.fill < 2048)
+        log.flush()
+        lines = self._contents().decode().splitlines()
+        self.assertEqual(200, len(lines))
+        self.assertTrue(lines[199].endswith(', message 0199'))
+
+    def test_rotation(self):
+        log = sd_logger.SDLogger(self.sat, '/data/FACE_', buffer_size=1024, flush_bytes=512, max_file_size=1024)
+        for i in range(300):
+            log.write(i)
+        log.flush()
+        self.assertGreater(log.files, 2)
+        sizes = [os.path.getsize(os.path.join(self.dir.name, n)) for n in os.listdir(self.dir.name)]
+        self.assertTrue(all(size <= 1024 for size in sizes))
+        self.assertEqual(300, len(self._contents().splitlines()))
+
+    def test_no_card_drops_when_full(self):
+        self.sat.hardware['SDcard'] = False
+        log = sd_logger.SDLogger(self.sat, '/error/LOG_', buffer_size=256, flush_bytes=128)
+        for i in range(50):
+            log.write('x' * 20)
+        self.assertEqual(0, log.writes)
+        self.assertGreater(log.dropped, 0)
+        self.assertEqual(50, log.records + log.dropped)
+        self.sat.hardware['SDcard'] = True
+        self.assertTrue(log.flush())
+        self.assertEqual(log.records, len(self._contents().splitlines()))
+        self.assertIn('D:', log.stats)
@@ -0,0 +1,111 @@
+import math
+import os
+import random
+import sys
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import sun_sensor
+import Big_Data
+
+# Outward normal of each face, indexed by face address
+NORMALS = ((0, 1, 0), (0, -1, 0), (1, 0, 0), (-1, 0, 0), (0, 0, -1))
+FULL = 1000.0
+
+
+def _illuminate(sensor, s, scale=1.0):
+    for face, n in enumerate(NORMALS):
+        sensor.set_lux(face, scale * FULL * max(0.0, n[0]*s[0] + n[1]*s[1] + n[2]*s[2]))
+
+
+def _unit():
+    v = [random.gauss(0, 1) for _ in range(3)]
+    n = math.sqrt(sum(c*c for c in v))
+    return [c / n for c in v]
+
+
+def _angle(a, b):
+    return math.degrees(math.acos(max(-1.0, min(1.0, sum(x*y for x, y in zip(a, b))))))
+
+
+class SunSensorTests(TestCase):
+
+    def test_recovers_direction(self):
+        random.seed(1)
+        sensor = sun_sensor.SunSensor(full=FULL)
+        out = [0.0, 0.0, 0.0]
+        for _ in range(500):
+            s = _unit()
+            if abs(s[0]) + abs(s[1]) < 0.2 and s[2] > 0:
+                continue        # blind cone around z+, reads as eclipse
+            _illuminate(sensor, s)
+            self.assertTrue(sensor.compute(out))
+            self.assertLess(_angle(out, s), 0.1)
+
+    def test_calibration(self):
+        gains = [1.2, 0.8, 1.1, 0.9, 1.05]
+        offsets = [3.0, 1.0, 0.0, 2.0, 5.0]
+        sensor = sun_sensor.SunSensor(gains=gains, offsets=offsets, full=FULL)
+        s = [0.6, -0.3, 0.742]
+        n = math.sqrt(sum(c*c for c in s))
+        s = [c / n for c in s]
+        _illuminate(sensor, s)
+        for face in range(sun_sensor.NUM_FACES):
+            sensor.set_lux(face, sensor.lux[face] * gains[face] + offsets[face])
+        self.assertTrue(sensor.compute())
+        self.assertLess(_angle(sensor.vector, s), 0.1)
+
+    def test_eclipse_hysteresis(self):
+        sensor = sun_sensor.SunSensor(full=FULL, eclipse_fraction=0.1)
+        s = [1.0, 0.0, 0.0]
+        _illuminate(sensor, s, 0.05)
+        self.assertFalse(sensor.compute())
+        self.assertTrue(sensor.eclipse)
+        # Above the entry level but below twice it: still eclipsed
+        _illuminate(sensor, s, 0.15)
+        self.assertFalse(sensor.compute())
+        _illuminate(sensor, s, 0.5)
+        self.assertTrue(sensor.compute())
+        self.assertFalse(sensor.eclipse)
+
+    def test_missing_faces(self):
+        sensor = sun_sensor.SunSensor(full=FULL)
+        self.assertFalse(sensor.compute())
+        _illuminate(sensor, [0.0, 1.0, 0.0])
+        sensor.set_lux(1, None)
+        self.assertTrue(sensor.compute())
+        self.assertLess(_angle(sensor.vector, [0.0, 1.0, 0.0]), 0.1)
+
+    def test_read_serves_the_face_poll_only(self):
+        polled = []
+        sensor = sun_sensor.SunSensor(faces=lambda: polled.append(1), full=FULL, max_age=1.0)
+        out = [0.0, 0.0, 0.0]
+        self.assertFalse(sensor.read(out))
+        sample = Big_Data.FaceSample()
+        for face, n in enumerate(NORMALS):
+            sample.set(face, Big_Data.LUX, FULL * max(0.0, n[0]))
+        self.assertTrue(sensor.from_sample(sample))
+        self.assertTrue(sensor.read(out))
+        self.assertLess(_angle(out, [1.0, 0.0, 0.0]), 0.1)
+        # the body turns: an old vector is not served, and the sensors are not read for a new one
+        sensor.last_poll -= 2.0
+        self.assertFalse(sensor.read(out))
+        self.assertEqual([], polled)
+
+    def test_eclipse_skips_light_between_polls(self):
+        sensor = sun_sensor.SunSensor(full=FULL, eclipse_poll=30)
+        sample = Big_Data.FaceSample()
+        for face in range(sun_sensor.NUM_FACES):
+            sample.set(face, Big_Data.LUX, 0.0)
+        self.assertFalse(sensor.from_sample(sample))
+        self.assertTrue(sensor.eclipse)
+        self.assertFalse(sensor.light_needed)
+        sensor.last_poll -= 30
+        self.assertTrue(sensor.light_needed)
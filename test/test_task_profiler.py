@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+import task_profiler
+from tasko import loop as tasko_loop
+
+
+class TaskoProfileTests(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        tasko_loop.set_time_provider(lambda: self.now)
+
+    def tearDown(self):
+        tasko_loop.set_time_provider(time.monotonic_ns)
+
+    def test_counts_and_lateness(self):
+        loop = tasko_loop.Loop()
+        prof = task_profiler.TaskProfiler(slots=4).install(loop)
+        try:
+            async def sleeper():
+                await loop.sleep(1)
+
+            async def spinner():
+                for _ in range(3):
+                    await tasko_loop._yield_once()
+
+            loop.add_task(sleeper(), 1)
+            loop.add_task(spinner(), 2)
+            loop._step()
+            # Due at 1 s, resumed 250 ms late
+            self.now = 1250000000
+            for _ in range(4):
+                loop._step()
+        finally:
+            prof.uninstall(loop)
+        self.assertIsNone(loop.profiler)
+        s = prof.slot('sleeper')
+        self.assertEqual(2, prof.runs[s])
+        self.assertEqual(250000, prof.late_max_us[s])
+        self.assertEqual(4, prof.runs[prof.slot('spinner')])
+        self.assertEqual(0, prof.late_us[prof.slot('spinner')])
+        self.assertEqual(3, len(prof.report.split('\n')))
+
+    def test_slots_overflow(self):
+        prof = task_profiler.TaskProfiler(slots=3)
+        self.assertEqual(0, prof.slot('a'))
+        self.assertEqual(1, prof.slot('b'))
+        self.assertEqual(2, prof.slot('c'))
+        self.assertEqual(2, prof.slot('d'))
+        self.assertEqual('other', prof.names[2])
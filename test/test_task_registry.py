@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+import task_registry
+from tasko import loop as tasko_loop
+
+
+class TaskRegistryTests(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        tasko_loop.set_time_provider(lambda: self.now)
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'tasks.cfg')
+        # No power_readings: the battery task fails every run
+        self.cubesat = SimpleNamespace(debug=False, data_cache={})
+
+    def tearDown(self):
+        tasko_loop.set_time_provider(time.monotonic_ns)
+        self.dir.cleanup()
+        for key in ('battery', 'beacon', 'blink', 'imu', 'test', 'time'):
+            sys.modules.pop('Tasks.' + key + '_task', None)
+
+    def _registry(self):
+        return task_registry.TaskRegistry(self.cubesat, loop=tasko_loop.Loop(), path=self.path,
+                                          task_dir=os.path.join(ROOT, 'Tasks'))
+
+    def test_defaults(self):
+        r = self._registry()
+        self.assertIn('beacon', r.keys)
+        self.assertNotIn('template', r.keys)
+        r.start()
+        self.assertEqual(['battery', 'imu', 'time'], sorted(r.running))
+        self.assertIs(r.loop, self.cubesat.tasko)
+        self.assertNotIn('Tasks.beacon_task', sys.modules)
+        self.assertIn('Tasks.imu_task', sys.modules)
+
+    def test_command_off_unloads(self):
+        r = self._registry().start()
+        self.assertEqual('ok imu:off', r.command(b'imu off'))
+        self.assertNotIn('imu', r.running)
+        self.assertNotIn('Tasks.imu_task', sys.modules)
+        self.assertTrue(r.command(b'imu nope').startswith('bad'))
+        self.assertTrue(r.command(b'camera on').startswith('bad'))
+
+    def test_rate_persists(self):
+        r = self._registry().start()
+        self.assertEqual('ok time:0.5', r.command(b'time 0.5'))
+        self.assertEqual(2000000000, r.running['time'][1]._nanoseconds_per_invocation)
+        r.command(b'blink on')
+        r.command(b'imu off')
+        # Next boot
+        r2 = self._registry().start()
+        self.assertEqual(0.5, r2.running['time'][0].frequency)
+        self.assertIn('blink', r2.running)
+        self.assertNotIn('imu', r2.running)
+        r2.command(b'imu default')
+        self.assertIn('imu', r2.running)
+        self.assertIn('TASKS ', r2.status)
+
+    def test_failing_task_disabled(self):
+        r = self._registry().start()
+        r.command(b'battery 1')
+        for _ in range(task_registry.MAX_ERRORS + 1):
+            r.loop._step(block=False)
+            self.now += 1000000000
+        self.assertNotIn('battery', r.running)
+        self.assertEqual(task_registry.MAX_ERRORS, r.errors['battery'])
+        # Not saved as an override: back at the next boot
+        self.assertIn('battery', self._registry().start().running)
+        self.assertIn('imu', r.running)
+
+    def _output(self, key):
+        r = self._registry()
+        self.assertTrue(r.enable(key, save=False))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            asyncio.run(r.running[key][0].main_task())
+        return out.getvalue()
+
+    def test_time_reports_uptime(self):
+        self.cubesat.uptime = 42
+        self.assertEqual('', self._output('time'))
+        self.cubesat.debug = True
+        self.assertIn('42s since boot', self._output('time'))
+
+    def test_battery_uses_the_last_reading(self):
+        self.cubesat.debug = True
+        self.cubesat.vlowbatt = 6.0
+        self.cubesat.power_readings = None
+        self.assertIn('no battery reading', self._output('battery'))
+        self.cubesat.power_readings = (None, 0.0, 0.0, 0.0, 0.0)
+        self.assertIn('no battery reading', self._output('battery'))
+        self.cubesat.power_readings = (7.4, 0.0, 0.0, 0.0, 0.0)
+        self.assertIn('7.4V > threshold: 6.0V', self._output('battery'))
@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'bench'))
+
+import hw
+hw.install()
+
+import telemetry_store
+from telemetry_store import SAMPLES_PER_BLOCK
+
+T0 = 1700000000
+
+
+class TelemetryStoreTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.dir.name, 'ts')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _fill(self, store, n, period=20):
+        for i in range(n):
+            store.append('vbatt', 7.0 + i / 10000, T0 + i * period)
+
+    def test_range_and_decimation(self):
+        store = telemetry_store.TelemetryStore(self.root, segment_blocks=8)
+        self._fill(store, 2000)
+        # 02:00-03:00 worth of samples from the middle of a segment
+        points = list(store.query('vbatt', T0 + 20 * 700, T0 + 20 * 879))
+        self.assertEqual(180, len(points))
+        self.assertEqual(T0 + 20 * 700, points[0][0])
+        self.assertAlmostEqual(7.07, points[0][1], places=4)
+        points = list(store.query('vbatt', T0 + 20 * 700, T0 + 20 * 879, step=30))
+        self.assertEqual([T0 + 20 * (700 + 30 * k) for k in range(6)], [p[0] for p in points])
+        self.assertEqual([], list(store.query('vbatt', T0 - 100, T0 - 1)))
+        self.assertEqual([], list(store.query('idraw', T0, T0 + 100)))
+
+    def test_cost_follows_result(self):
+        store = telemetry_store.TelemetryStore(self.root)
+        self._fill(store, 50 * SAMPLES_PER_BLOCK)
+        store.blocks_read = 0
+        points = list(store.query('vbatt', T0 + 20 * 1000, T0 + 20 * 3000, step=SAMPLES_PER_BLOCK * 4))
+        self.assertEqual(8, len(points))
+        # One block per returned sample, plus the one that ends the range
+        self.assertEqual(9, store.blocks_read)
+
+    def test_reopen_and_clock_step(self):
+        store = telemetry_store.TelemetryStore(self.root, segment_blocks=4, boot=3)
+        self._fill(store, 300)
+        store.flush()
+        # Next boot: appends go to a new segment, old data stays queryable
+        store = telemetry_store.TelemetryStore(self.root, segment_blocks=4, boot=4)
+        self.assertEqual(['vbatt'], store.names())
+        store.append('vbatt', 8.0, T0 + 20 * 300)
+        # Clock set back by the ground
+        store.append('vbatt', 6.5, T0 + 10)
+        points = list(store.query('vbatt', T0, T0 + 20 * 300))
+        self.assertEqual(302, len(points))
+        self.assertEqual((T0 + 10, 6.5, 4), points[-1])
+        packets = store.command(b'vbatt 1700000000 1700000100')
+        self.assertTrue(packets[0].startswith('TS vbatt b3 1700000000:7'))
+        self.assertEqual(['TS vbatt'], store.command(b''))
+        self.assertTrue(store.command(b'vbatt x')[0].startswith('bad'))
+
+    def test_boots_kept_apart(self):
+        # The RTC restarts at every reset: two boots write the same time range
+        for boot in (7, 8):
+            store = telemetry_store.TelemetryStore(self.root, boot=boot)
+            for i in range(100):
+                store.append('vbatt', boot + i / 1000, T0 + i * 20)
+            store.flush()
+        store = telemetry_store.TelemetryStore(self.root, boot=9)
+        points = list(store.query('vbatt', T0, T0 + 20 * 99))
+        self.assertEqual([7] * 100 + [8] * 100, [p[2] for p in points])
+        points = list(store.query('vbatt', T0, T0 + 20 * 99, boot=8))
+        self.assertEqual(100, len(points))
+        self.assertAlmostEqual(8.0, points[0][1], places=4)
+        self.assertEqual([], list(store.query('vbatt', T0, T0 + 20 * 99, boot=9)))
+        # the response marks each boot, and every packet names its own
+        packets = store.command(b'vbatt 1700000000 1700000040')
+        self.assertEqual(['TS vbatt b7 1700000000:7 1700000020:7.001 1700000040:7.002'
+                          ' b8 1700000000:8 1700000020:8.001 1700000040:8.002'], packets)
+        packets = store.command(b'vbatt 1700000000 1700002000 1')
+        self.assertGreater(len(packets), 1)
+        for packet in packets:
+            self.assertRegex(packet, r'^TS vbatt b[78] ')
+        self.assertEqual(['TS vbatt b8 1700000000:8'], store.command(b'vbatt 1700000000 1700000000 1 8'))
@@ -0,0 +1,154 @@
+import os
+import random
+import sys
+from unittest import TestCase
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Property-style checks: every operation is compared on many random vectors
+# against NumPy when it is installed, else against a plain-Python reference.
+CASES = 500
+
+
+def _rand(scale=100.0):
+    return [random.uniform(-scale, scale) for _ in range(3)]
+
+
+def _ref_cross(a, b):
+    if numpy is not None:
+        return list(numpy.cross(a, b))
+    return [a[1]*b[2] - a[2]*b[1], a[2]*b[0] - a[0]*b[2], a[0]*b[1] - a[1]*b[0]]
+
+
+def _ref_dot(a, b):
+    if numpy is not None:
+        return float(numpy.dot(a, b))
+    return sum(x*y for x, y in zip(a, b))
+
+
+class TestVector(TestCase):
+    def setUp(self):
+        random.seed(1234)
+
+    def assertVecAlmostEqual(self, a, b, rel=1e-5):
+        for x, y in zip(a, b):
+            self.assertAlmostEqual(x, y, delta=rel * max(1.0, abs(y)))
+
+    def test_cross_matches_reference(self):
+        out = vector.vec()
+        for _ in range(CASES):
+            a, b = _rand(), _rand()
+            # reference uses the float32 values actually stored
+            self.assertVecAlmostEqual(vector.cross(vector.vec(*a), vector.vec(*b), out),
+                                      _ref_cross(list(vector.vec(*a)), list(vector.vec(*b))), rel=1e-4)
+
+    def test_cross_properties(self):
+        out = vector.vec()
+        for _ in range(CASES):
+            a, b = _rand(), _rand()
+            c = vector.cross(a, b, [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(vector.dot(c, a), 0.0, delta=1e-6 * vector.norm(a)**2 * vector.norm(b))
+            self.assertVecAlmostEqual(vector.cross(b, a, out), [-x for x in c])
+
+    def test_cross_aliasing(self):
+        for _ in range(CASES):
+            a, b = _rand(), _rand()
+            expected = _ref_cross(a, b)
+            alias = list(a)
+            vector.cross(alias, b, alias)
+            self.assertVecAlmostEqual(alias, expected)
+
+    def test_dot_norm(self):
+        for _ in range(CASES):
+            a, b = _rand(), _rand()
+            self.assertAlmostEqual(vector.dot(a, b), _ref_dot(a, b), delta=1e-9 * 3e4)
+            self.assertAlmostEqual(vector.norm(a), _ref_dot(a, a) ** 0.5, delta=1e-9 * 200)
+
+    def test_normalize(self):
+        out = [0.0, 0.0, 0.0]
+        for _ in range(CASES):
+            a = _rand()
+            n = vector.normalize(a, out)
+            self.assertAlmostEqual(vector.norm(out), 1.0, delta=1e-9)
+            self.assertVecAlmostEqual([x * n for x in out], a)
+        self.assertEqual(vector.normalize([0.0, 0.0, 0.0], out), 0.0)
+
+    def test_linear_ops(self):
+        out = [0.0, 0.0, 0.0]
+        for _ in range(CASES):
+            a, b, k = _rand(), _rand(), random.uniform(-10, 10)
+            self.assertVecAlmostEqual(vector.add(a, b, out), [x + y for x, y in zip(a, b)])
+            self.assertVecAlmostEqual(vector.sub(a, b, out), [x - y for x, y in zip(a, b)])
+            self.assertVecAlmostEqual(vector.scale(a, k, out), [x * k for x in a])
+            self.assertVecAlmostEqual(vector.axpy(k, a, b, out), [k * x + y for x, y in zip(a, b)])
+            self.assertVecAlmostEqual(vector.clamp(a, 50.0, out), [max(-50.0, min(50.0, x)) for x in a])
+
+    def test_matvec(self):
+        out = [0.0, 0.0, 0.0]
+        for _ in range(CASES):
+            m = _rand() + _rand() + _rand()
+            a = _rand()
+            expected = [_ref_dot(m[3*r:3*r + 3], a) for r in range(3)]
+            self.assertVecAlmostEqual(vector.matvec(m, a, out), expected)
+
+    def test_fixed_point(self):
+        fa, fb, fo = vector.fx_vec(), vector.fx_vec(), vector.fx_vec()
+        out = [0.0, 0.0, 0.0]
+        step = 1.0 / vector.FX_ONE
+        for _ in range(CASES):
+            a, b = _rand(10.0), _rand(10.0)
+            vector.to_fx(a, fa)
+            vector.to_fx(b, fb)
+            self.assertAlmostEqual(vector.fx_dot(fa, fb) * step, _ref_dot(a, b), delta=0.3)
+            vector.from_fx(vector.fx_cross(fa, fb, fo), out)
+            # inputs are quantized to 1/FX_ONE, each product term carries ~|a|/FX_ONE of error
+            for x, y in zip(out, _ref_cross(a, b)):
+                self.assertAlmostEqual(x, y, delta=0.2)
+            self.assertAlmostEqual(vector.fx_norm(fa) * step, vector.norm(a), delta=0.05)
+
+    def test_fixed_point_products_stay_small_ints(self):
+        # MicroPython small ints end at +-2^30; every product is shifted before the sum
+        limit = 1 << 30
+        seen = []
+
+        class Checked(int):
+            def __mul__(self, other):
+                r = int(self) * int(other)
+                seen.append(r)
+                return Checked(r)
+
+            def __rshift__(self, n):
+                return Checked(int(self) >> n)
+
+            def __add__(self, other):
+                r = int(self) + int(other)
+                seen.append(r)
+                return Checked(r)
+
+            def __sub__(self, other):
+                r = int(self) - int(other)
+                seen.append(r)
+                return Checked(r)
+
+        # exact in Q8, so only the per-product shift rounds
+        a, b = (127.5, -127.75, 127.25), (-127.5, -126.75, 127.0)
+        fa = [Checked(x) for x in vector.to_fx(a, vector.fx_vec())]
+        fb = [Checked(x) for x in vector.to_fx(b, vector.fx_vec())]
+        self.assertAlmostEqual(vector.fx_dot(fa, fb) / vector.FX_ONE, _ref_dot(a, b), delta=0.02)
+        out = [0, 0, 0]
+        vector.fx_cross(fa, fb, out)
+        for x, y in zip(out, _ref_cross(a, b)):
+            self.assertAlmostEqual(x / vector.FX_ONE, y, delta=0.02)
+        self.assertTrue(all(-limit < v < limit for v in seen))
+
+    def test_detumble_cross_sign(self):
+        import detumble
+        self.assertVecAlmostEqual(detumble.x_product([1, 0, 0], [0, 0, 1]), [0, -1, 0])
+        self.assertVecAlmostEqual(detumble.x_product([0, 0, 1], [1, 0, 0]), [0, 1, 0])
@@ -0,0 +1,167 @@
+'''
+3-vector math for the attitude code (detumble, B-dot, estimators).
+Every operation writes into a caller-supplied output (any 3-element
+mutable sequence, normally an array('f') made once with vec()), so the
+control loops run without building lists or tuples per step. Outputs may
+alias inputs.
+
+The fx_* functions are a fixed-point variant on plain ints in Q(FX_SHIFT)
+format, for loops that want to avoid software float math on the RP2040.
+A MicroPython small int holds 31 bits (below +-2^30); anything larger is
+allocated as a long. With FX_SHIFT = 8 a product of two values below +-128
+stays under 2^30, so fx_dot, fx_cross and fx_scale shift every product back
+to Q8 before adding: inputs below +-128 allocate nothing. fx_norm has to sum
+the unshifted squares, so it only stays a small int below about +-73 per
+component (2^30/3 per square).
+'''
+from array import array
+from math import sqrt
+
+def vec(x=0.0, y=0.0, z=0.0):
+    '''Allocates a float 3-vector. Call once at init, not in a loop'''
+    return array('f', (x, y, z))
+
+def put(out, x, y, z):
+    out[0] = x
+    out[1] = y
+    out[2] = z
+    return out
+
+def copy(a, out):
+    out[0] = a[0]
+    out[1] = a[1]
+    out[2] = a[2]
+    return out
+
+def dot(a, b):
+    return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+
+def norm2(a):
+    return a[0]*a[0] + a[1]*a[1] + a[2]*a[2]
+
+def norm(a):
+    return sqrt(a[0]*a[0] + a[1]*a[1] + a[2]*a[2])
+
+def cross(a, b, out):
+    x = a[1]*b[2] - a[2]*b[1]
+    y = a[2]*b[0] - a[0]*b[2]
+    z = a[0]*b[1] - a[1]*b[0]
+    out[0] = x
+    out[1] = y
+    out[2] = z
+    return out
+
+def add(a, b, out):
+    out[0] = a[0] + b[0]
+    out[1] = a[1] + b[1]
+    out[2] = a[2] + b[2]
+    return out
+
+def sub(a, b, out):
+    out[0] = a[0] - b[0]
+    out[1] = a[1] - b[1]
+    out[2] = a[2] - b[2]
+    return out
+
+def scale(a, k, out):
+    out[0] = a[0]*k
+    out[1] = a[1]*k
+    out[2] = a[2]*k
+    return out
+
+def axpy(k, x, y, out):
+    '''out = k*x + y'''
+    out[0] = k*x[0] + y[0]
+    out[1] = k*x[1] + y[1]
+    out[2] = k*x[2] + y[2]
+    return out
+
+def clamp(a, limit, out):
+    '''Clamps each component to [-limit, limit]'''
+    for i in range(3):
+        v = a[i]
+        out[i] = limit if v > limit else (-limit if v < -limit else v)
+    return out
+
+def normalize(a, out):
+    '''Writes a/|a| to out and returns |a|. A zero vector is copied unchanged'''
+    n = sqrt(a[0]*a[0] + a[1]*a[1] + a[2]*a[2])
+    if n > 0:
+        k = 1.0/n
+        out[0] = a[0]*k
+        out[1] = a[1]*k
+        out[2] = a[2]*k
+    else:
+        copy(a, out)
+    return n
+
+def matvec(m, a, out):
+    '''out = M a for a row-major 3x3 matrix m (9 elements)'''
+    x = m[0]*a[0] + m[1]*a[1] + m[2]*a[2]
+    y = m[3]*a[0] + m[4]*a[1] + m[5]*a[2]
+    z = m[6]*a[0] + m[7]*a[1] + m[8]*a[2]
+    out[0] = x
+    out[1] = y
+    out[2] = z
+    return out
+
+'''
+Fixed point (Q FX_SHIFT) variant
+'''
+FX_SHIFT = 8
+FX_ONE = 1 << FX_SHIFT
+
+def fx_vec(x=0, y=0, z=0):
+    '''Allocates a fixed-point 3-vector (array('l')). Call once at init'''
+    return array('l', (x, y, z))
+
+def to_fx(a, out):
+    out[0] = int(a[0]*FX_ONE)
+    out[1] = int(a[1]*FX_ONE)
+    out[2] = int(a[2]*FX_ONE)
+    return out
+
+def from_fx(a, out):
+    k = 1.0/FX_ONE
+    out[0] = a[0]*k
+    out[1] = a[1]*k
+    out[2] = a[2]*k
+    return out
+
+def fx_dot(a, b):
+    return ((a[0]*b[0]) >> FX_SHIFT) + ((a[1]*b[1]) >> FX_SHIFT) + ((a[2]*b[2]) >> FX_SHIFT)
+
+def fx_cross(a, b, out):
+    x = ((a[1]*b[2]) >> FX_SHIFT) - ((a[2]*b[1]) >> FX_SHIFT)
+    y = ((a[2]*b[0]) >> FX_SHIFT) - ((a[0]*b[2]) >> FX_SHIFT)
+    z = ((a[0]*b[1]) >> FX_SHIFT) - ((a[1]*b[0]) >> FX_SHIFT)
+    out[0] = x
+    out[1] = y
+    out[2] = z
+    return out
+
+def fx_scale(a, k, out):
+    '''k is fixed point too'''
+    out[0] = (a[0]*k) >> FX_SHIFT
+    out[1] = (a[1]*k) >> FX_SHIFT
+    out[2] = (a[2]*k) >> FX_SHIFT
+    return out
+
+def fx_sub(a, b, out):
+    out[0] = a[0] - b[0]
+    out[1] = a[1] - b[1]
+    out[2] = a[2] - b[2]
+    return out
+
+def _isqrt(n):
+    if n <= 0:
+        return 0
+    x = n
+    y = (x + 1) >> 1
+    while y < x:
+        x = y
+        y = (x + n // x) >> 1
+    return x
+
+def fx_norm(a):
+    return _isqrt(a[0]*a[0] + a[1]*a[1] + a[2]*a[2])